@@ -8,7 +8,8 @@ from pathlib import Path
 # Tilføj rodmappen til Python-stien for at sikre, at vi kan importere JAILA
 sys.path.append(str(Path(__file__).parent.parent))
 
-from JAILA import multihop_juridisk_søgning, juridisk_søgning, check_weaviate_connection
+from JAILA import multihop_juridisk_søgning, juridisk_søgning
+from JAILA.service import get_service
 
 st.set_page_config(
     page_title="JAILA - Juridisk AI Assistent",
@@ -17,9 +18,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource(show_spinner="Starter JAILA...")
+def hent_service():
+    """Én varmet service per Streamlit-proces - deles af alle sessioner og reruns"""
+    service = get_service()
+    service.warm_up()
+    return service
+
 def main():
-    # Tjek Weaviate-forbindelse
-    connection_status = check_weaviate_connection()
+    # Tjek Weaviate-forbindelse (genbruges i service.connection_check_interval sekunder)
+    connection_status = hent_service().weaviate_available()
     
     if not connection_status:
         st.warning("⚠️ Kunne ikke forbinde til Weaviate-databasen. Kører i begrænset tilstand.")
@@ -1,14 +1,17 @@
 # JAILA/hybrid_search.py - Implementering af hybrid søgning uden brug af Weaviate vectorizer
 
-import weaviate
 import json
-import os
-import requests
 from typing import List, Dict, Any, Optional
-from JAILA.config import weaviate_url, openai_api_key, CLASS_NAME
+from JAILA.config import openai_api_key, CLASS_NAME
+from JAILA.service import get_service
 
 def generate_embedding_directly(text: str) -> List[float]:
     """Generer embedding direkte ved at kalde OpenAI API fra Python-koden i stedet for gennem Weaviate"""
+    service = get_service()
+    embedding = service.embedding_cache.get(text)
+    if embedding is not None:
+        return embedding
+    
     url = "https://api.openai.com/v1/embeddings"
     headers = {
         "Authorization": f"Bearer {openai_api_key}",
@@ -20,9 +23,11 @@ def generate_embedding_directly(text: str) -> List[float]:
     }
     
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=10)
+        response = service.http.post(url, headers=headers, json=data, timeout=10)
         if response.status_code == 200:
-            return response.json()["data"][0]["embedding"]
+            embedding = response.json()["data"][0]["embedding"]
+            service.embedding_cache.put(text, embedding)
+            return embedding
         else:
             print(f"Fejl ved generering af embedding: Status {response.status_code}")
             print(response.text)
@@ -38,13 +43,8 @@ def hybrid_search_with_custom_embeddings(query: str, limit: int = 5, offset: int
     i Weaviate baseret på både vektor-afstand og nøgleord.
     """
     try:
-        # Opret Weaviate-klient
-        client = weaviate.Client(
-            url=weaviate_url,
-            additional_headers={
-                "X-OpenAI-Api-Key": openai_api_key
-            }
-        )
+        # Delt Weaviate-klient
+        client = get_service().weaviate_client
         
         # Generer embedding direkte
         query_embedding = generate_embedding_directly(query)
@@ -81,8 +81,8 @@ def hybrid_search_with_custom_embeddings(query: str, limit: int = 5, offset: int
 def keyword_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
     """Udfør en nøgleordsbaseret søgning (BM25) som fallback"""
     try:
-        # Opret Weaviate-klient
-        client = weaviate.Client(url=weaviate_url)
+        # Delt Weaviate-klient
+        client = get_service().weaviate_client
         
         # Udfør BM25 søgning
         result = client.query.get(
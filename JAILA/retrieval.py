@@ -3,19 +3,17 @@ Opslagsfunktioner for JAILA.
 Indeholder RAG-funktionalitet, herunder standard, multihop og hybrid søgning.
 """
 import re
-import os
 from typing import List, Dict, Any, Optional, Tuple
 
 from langchain.chains.question_answering import load_qa_chain
-from langchain_openai import ChatOpenAI
 from langchain.schema import Document
 from langchain.schema.runnable import RunnablePassthrough
 from langchain.schema.output_parser import StrOutputParser
 from langchain.memory import ConversationBufferMemory
 
-from JAILA.connections import get_vector_store, check_weaviate_connection
-from JAILA.prompts import create_multihop_prompt_templates, create_qa_prompt_template
-from JAILA.config import DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from JAILA.connections import DummyVectorStore
+from JAILA.config import DEFAULT_MODEL, DEFAULT_TEMPERATURE, CLASS_NAME
+from JAILA.service import get_service
 from JAILA.hybrid_search import robust_search  # Importerer vores nye robuste søgemetode
 
 # Import MultiQueryRetriever hvis tilgængelig
@@ -26,8 +24,8 @@ except ImportError:
     MultiQueryRetriever = None
 
 def setup_llm(model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE):
-    """Opsæt og returner en LLM-model."""
-    return ChatOpenAI(model_name=model, temperature=temperature)
+    """Returner den delte LLM-model for (model, temperatur)."""
+    return get_service().llm(model, temperature)
 
 def setup_retriever(k: int = 5):
     """
@@ -39,7 +37,7 @@ def setup_retriever(k: int = 5):
     Returns:
         En retriever til at hente dokumenter.
     """
-    vector_store = get_vector_store()
+    vector_store = get_service().vector_store
     return vector_store.as_retriever(search_kwargs={"k": k})
 
 def setup_advanced_retriever(llm=None, k: int = 5):
@@ -60,7 +58,7 @@ def setup_advanced_retriever(llm=None, k: int = 5):
     if llm is None:
         llm = setup_llm()
     
-    vector_store = get_vector_store()
+    vector_store = get_service().vector_store
     print("Bruger MultiQueryRetriever for forbedrede resultater")
     
     retriever = MultiQueryRetriever.from_llm(
@@ -96,7 +94,7 @@ def juridisk_søgning(spørgsmål: str, antal_resultater: int = 5, model: str =
     
     # Fallback: Brug standard-metoden hvis den robuste fejler
     # Kontroller Weaviate-forbindelse
-    if not check_weaviate_connection():
+    if not get_service().weaviate_available():
         return {
             "answer": "Beklager, jeg kunne ikke oprette forbindelse til vores juridiske database. Prøv igen senere.",
             "question": spørgsmål,
@@ -121,7 +119,7 @@ def juridisk_søgning(spørgsmål: str, antal_resultater: int = 5, model: str =
     context = format_docs(docs)
     
     # Opret QA-kæde med vores prompt
-    qa_prompt = create_qa_prompt_template()
+    qa_prompt = get_service().qa_prompt
     qa_chain = load_qa_chain(
         llm=llm,
         chain_type="stuff",
@@ -150,7 +148,7 @@ def multihop_juridisk_søgning(spørgsmål: str, antal_resultater: int = 5, mode
         En ordbog med det endelige svar, spørgsmålet og mellemliggende resultater.
     """
     # Kontroller Weaviate-forbindelse
-    if not check_weaviate_connection():
+    if not get_service().weaviate_available():
         return {
             "answer": "Beklager, jeg kunne ikke oprette forbindelse til vores juridiske database. Prøv igen senere.",
             "question": spørgsmål,
@@ -168,7 +166,7 @@ def multihop_juridisk_søgning(spørgsmål: str, antal_resultater: int = 5, mode
         print("Bruger standard retriever i stedet")
         retriever = setup_retriever(k=antal_resultater)
     
-    prompt_templates = create_multihop_prompt_templates()
+    prompt_templates = get_service().multihop_prompts
     
     # Trin 1: Genererer delspørgsmål baseret på det oprindelige spørgsmål
     print(f"Analyserer spørgsmål: {spørgsmål}")
@@ -268,10 +266,10 @@ def robust_juridisk_søgning(spørgsmål: str, antal_resultater: int = 5, model:
     """Udfør juridisk søgning med vores robuste søgemetode, der virker selvom Weaviate har DNS-problemer"""
     
     # Konverter spørgsmål til en prompt
-    prompt_template = create_qa_prompt_template()
+    prompt_template = get_service().qa_prompt
     
-    # Opret LLM
-    llm = ChatOpenAI(temperature=DEFAULT_TEMPERATURE, model=model, api_key=os.environ.get("OPENAI_API_KEY"))
+    # Delt LLM
+    llm = setup_llm(model=model)
     
     # Brug vores robuste søgefunktion i stedet for standard Weaviate-søgning
     søgeresultater = robust_search(spørgsmål, limit=antal_resultater)
@@ -323,11 +321,11 @@ def hybrid_søgning(query: str, filters: Optional[Dict] = None, limit: int = 5)
         print(f"Robust søgning fejlede: {e}")
     
     # Hvis robust søgning fejler, prøv den oprindelige metode
-    if not check_weaviate_connection():
+    if not get_service().weaviate_available():
         print("Advarsel: Weaviate er ikke tilgængelig. Kan ikke udføre hybrid søgning.")
         return []
     
-    vector_store = get_vector_store()
+    vector_store = get_service().vector_store
     if not isinstance(vector_store, DummyVectorStore):
         try:
             # Få adgang til den underliggende Weaviate-klient
@@ -0,0 +1,198 @@
+"""
+Procesdelte ressourcer for JAILA.
+Holder LLM-klienter, Weaviate-klient, vektorlager, prompts og embedding cache,
+så de oprettes én gang per proces i stedet for ved hvert opslag.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+import weaviate
+from langchain_community.vectorstores import Weaviate
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from JAILA.config import weaviate_url, openai_api_key, CLASS_NAME, METADATA_FIELDS, DEFAULT_MODEL, DEFAULT_TEMPERATURE
+from JAILA.connections import DummyVectorStore
+from JAILA.prompts import create_multihop_prompt_templates, create_qa_prompt_template
+
+# Typiske forespørgsler til opvarmning af embedding cache og søgestier
+WARMUP_QUERIES = (
+    "ligningslovens § 33 A",
+    "skattepligt ved fraflytning",
+)
+
+
+class EmbeddingCache:
+    """Trådsikker LRU cache: tekst -> embedding"""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._items: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._items.get(text)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(text)
+            self.hits += 1
+            return embedding
+
+    def put(self, text: str, embedding: List[float]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[text] = embedding
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class JAILAService:
+    """Lazy singletons for klienter og vektorlager - oprettes ved første brug"""
+
+    def __init__(self, connection_check_interval: float = 30.0, embedding_cache_size: int = 1024):
+        """
+        Args:
+            connection_check_interval: Sekunder et Weaviate forbindelsestjek genbruges
+            embedding_cache_size: Antal query embeddings der huskes
+        """
+        self.connection_check_interval = connection_check_interval
+        self.embedding_cache = EmbeddingCache(embedding_cache_size)
+        self.http = requests.Session()  # Genbruger HTTPS forbindelser til OpenAI
+        self._lock = threading.RLock()
+        self._llms: Dict[Tuple[str, float], ChatOpenAI] = {}
+        self._client = None
+        self._vector_store = None
+        self._qa_prompt = None
+        self._multihop_prompts = None
+        self._connection_ok: Optional[bool] = None
+        self._connection_checked = 0.0
+
+    @property
+    def weaviate_client(self) -> weaviate.Client:
+        """Delt Weaviate-klient"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = weaviate.Client(
+                        url=weaviate_url,
+                        additional_headers={
+                            "X-OpenAI-Api-Key": openai_api_key
+                        }
+                    )
+        return self._client
+
+    def weaviate_available(self, max_age: Optional[float] = None) -> bool:
+        """Kontroller Weaviate-forbindelsen - resultatet genbruges i max_age sekunder"""
+        max_age = self.connection_check_interval if max_age is None else max_age
+        if self._connection_ok is not None and time.monotonic() - self._connection_checked < max_age:
+            return self._connection_ok
+
+        with self._lock:
+            try:
+                self.weaviate_client.schema.get()
+                self._connection_ok = True
+            except Exception as e:
+                print(f"Fejl ved Weaviate-forbindelse: {e}")
+                # Ny klient ved næste forsøg (fx efter genstart af Weaviate)
+                self._client = None
+                self._connection_ok = False
+            self._connection_checked = time.monotonic()
+        return self._connection_ok
+
+    @property
+    def vector_store(self):
+        """Delt LangChain Weaviate vektorlager (DummyVectorStore hvis Weaviate ikke svarer)"""
+        if self._vector_store is None:
+            with self._lock:
+                if self._vector_store is not None:
+                    return self._vector_store
+                if not self.weaviate_available():
+                    print(f"Advarsel: Kan ikke forbinde til Weaviate på {weaviate_url}")
+                    # Dummy caches ikke - næste kald prøver igen
+                    return DummyVectorStore()
+                try:
+                    self._vector_store = Weaviate(
+                        client=self.weaviate_client,
+                        index_name=CLASS_NAME,
+                        text_key="text_for_embedding",
+                        embedding=OpenAIEmbeddings(openai_api_key=openai_api_key),
+                        attributes=METADATA_FIELDS
+                    )
+                except Exception as e:
+                    print(f"Fejl ved oprettelse af vektorlager: {e}")
+                    return DummyVectorStore()
+        return self._vector_store
+
+    def llm(self, model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE) -> ChatOpenAI:
+        """Delt LLM-klient per (model, temperatur)"""
+        key = (model, temperature)
+        if key not in self._llms:
+            with self._lock:
+                if key not in self._llms:
+                    self._llms[key] = ChatOpenAI(model=model, temperature=temperature, api_key=openai_api_key)
+        return self._llms[key]
+
+    @property
+    def qa_prompt(self):
+        if self._qa_prompt is None:
+            self._qa_prompt = create_qa_prompt_template()
+        return self._qa_prompt
+
+    @property
+    def multihop_prompts(self) -> Dict:
+        if self._multihop_prompts is None:
+            self._multihop_prompts = create_multihop_prompt_templates()
+        return self._multihop_prompts
+
+    def warm_up(self, queries: Iterable[str] = WARMUP_QUERIES, model: str = DEFAULT_MODEL) -> Dict[str, float]:
+        """
+        Opret klienter og prim forbindelser og embedding cache før første opslag.
+
+        Returns:
+            Sekunder brugt per trin
+        """
+        # Lokal import - hybrid_search bruger selv servicen
+        from JAILA.hybrid_search import generate_embedding_directly
+
+        timings = {}
+        start = time.perf_counter()
+        self.weaviate_available(max_age=0)
+        self.vector_store
+        timings['weaviate'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.llm(model)
+        self.qa_prompt
+        self.multihop_prompts
+        timings['llm'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            generate_embedding_directly(query)
+        timings['embeddings'] = time.perf_counter() - start
+
+        print("JAILA service klar: " + ", ".join(f"{step} {seconds:.2f}s" for step, seconds in timings.items()))
+        return timings
+
+
+_service: Optional[JAILAService] = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> JAILAService:
+    """Processens JAILAService (oprettes ved første kald)"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = JAILAService()
+        return _service
@@ -0,0 +1,9 @@
+"""
+BENCHMARKS - Måling af graf-opbygning og traversering for graph_retriever
+
+Scripts køres fra graph_retriever mappen:
+    python benchmarks/graph_traversal_benchmark.py --help   # BFS/bedst-først på Ligningsloven-størrelse
+
+Grafer genereres syntetisk på stk./nr. niveau (eller indlæses fra
+'færdige grapher'), så benchmarks kan køre uden LLM kald.
+"""
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+GRAPH TRAVERSAL BENCHMARK - Adjacency-indekseret traversering vs. kant-scanning
+
+Bygger en EnhancedTaxLawGraph på Ligningsloven-størrelse med stk./nr.
+granularitet (syntetisk eller fra 'færdige grapher' JSON) og måler
+latency for:
+- legacy: den oprindelige get_related_entities (fuld kant-scanning per node)
+- bfs: GraphCore.bfs via get_related_entities
+- weighted: GraphCore.weighted_traversal via get_strongest_related
+
+Legacy og bfs skal returnere samme node-mængde (minus startnoden) - det tjekkes.
+
+BRUG:
+python benchmarks/graph_traversal_benchmark.py
+python benchmarks/graph_traversal_benchmark.py --paragraphs 179 --max-depth 3 --queries 200
+python benchmarks/graph_traversal_benchmark.py --graph-file "færdige grapher/ligningsloven_UNIFIED_V8_FINAL_AFSNIT_COMPATIBLE.json"
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# Tilføj graph_retriever mappen til Python-stien
+sys.path.append(str(Path(__file__).parent.parent))
+
+from enhanced_graph_retriever_strategy import EnhancedTaxLawGraph
+
+RELATION_TYPES = ['explicit_reference', 'conceptual', 'procedural']
+STRENGTHS = ['strong', 'medium', 'weak']
+
+
+def build_synthetic_graph(paragraphs: int = 179, max_stk: int = 6, max_nr: int = 8,
+                          references_per_node: float = 1.5, seed: int = 42) -> EnhancedTaxLawGraph:
+    """
+    Syntetisk lov med §, stk. og nr. noder
+
+    Default svarer til Ligningsloven (179 paragraffer, ~700 stk/nr chunks) med
+    hierarkiske relationer plus tilfældige krydsreferencer mellem entities.
+    """
+    rng = random.Random(seed)
+    graph = EnhancedTaxLawGraph("ligningsloven_syntetisk")
+
+    for number in range(1, paragraphs + 1):
+        paragraph_id = f"§{number}"
+        chapter = f"Kapitel {1 + number * 5 // paragraphs}"
+        graph.add_legal_entity_node(paragraph_id, f"Paragraf {number}", {
+            'entity_type': 'paragraph', 'paragraph_number': str(number), 'chapter': chapter
+        })
+
+        for stk in range(1, rng.randint(1, max_stk) + 1):
+            stk_id = f"§{number}, stk. {stk}"
+            graph.add_legal_entity_node(stk_id, f"Stk. {stk}", {
+                'entity_type': 'stykke', 'paragraph_number': str(number), 'stykke_number': str(stk),
+                'parent_paragraph': paragraph_id, 'chapter': chapter
+            })
+
+            # Ca. hvert fjerde stykke har nummererede opremsninger
+            if rng.random() < 0.25:
+                for nr in range(1, rng.randint(2, max_nr) + 1):
+                    graph.add_legal_entity_node(f"{stk_id}, nr. {nr}", f"Nr. {nr}", {
+                        'entity_type': 'nummer', 'paragraph_number': str(number), 'stykke_number': str(stk),
+                        'nummer': str(nr), 'parent_paragraph': paragraph_id, 'chapter': chapter
+                    })
+
+    graph.finalize_hierarchical_relations()
+
+    node_ids = list(graph.nodes)
+    for _ in range(int(len(node_ids) * references_per_node)):
+        source, target = rng.sample(node_ids, 2)
+        graph.add_relation(source, target, rng.choice(RELATION_TYPES), rng.choice(STRENGTHS),
+                           f"{source} relaterer til {target}")
+
+    return graph
+
+
+def load_graph_file(path: str) -> EnhancedTaxLawGraph:
+    """Indlæs en unified graf ('færdige grapher' format: entities + relations)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    graph = EnhancedTaxLawGraph(data.get('metadata', {}).get('law_name', Path(path).stem))
+    for entity in data.get('entities', []):
+        graph.add_legal_entity_node(entity['id'], entity.get('content', ''), {
+            'entity_type': entity.get('type', 'paragraph'), 'title': entity.get('title', entity['id'])
+        })
+    for relation in data.get('relations', []):
+        graph.add_relation(relation['source'], relation['target'], relation.get('type', 'conceptual'),
+                           relation.get('strength', 'medium'), relation.get('description', ''))
+    return graph
+
+
+def legacy_related_entities(edges: List[Dict], entity_id: str, max_depth: int = 2) -> List[str]:
+    """Den oprindelige traversering: pop(0) kø og fuld kant-scanning per node (til sammenligning)"""
+    related = set()
+    to_explore = [(entity_id, 0)]
+
+    while to_explore:
+        current_id, depth = to_explore.pop(0)
+        if depth >= max_depth:
+            continue
+        for edge in edges:
+            if edge['source'] == current_id:
+                related.add(edge['target'])
+                to_explore.append((edge['target'], depth + 1))
+            elif edge['target'] == current_id:
+                related.add(edge['source'])
+                to_explore.append((edge['source'], depth + 1))
+
+    return list(related)
+
+
+def time_calls(function, starts: List[str]) -> List[float]:
+    """Latency i ms per kald"""
+    latencies = []
+    for start in starts:
+        begin = time.perf_counter()
+        function(start)
+        latencies.append((time.perf_counter() - begin) * 1000)
+    return latencies
+
+
+def main():
+    """Kør graph traversal benchmark"""
+    parser = argparse.ArgumentParser(description='Traversal benchmark for EnhancedTaxLawGraph')
+    parser.add_argument('--graph-file', help='Unified graf JSON i stedet for syntetisk graf')
+    parser.add_argument('--paragraphs', type=int, default=179, help='Antal paragraffer (default: 179 = Ligningsloven)')
+    parser.add_argument('--references-per-node', type=float, default=1.5)
+    parser.add_argument('--max-depth', type=int, default=2)
+    parser.add_argument('--queries', type=int, default=100, help='Antal startnoder (default: 100)')
+    parser.add_argument('--legacy-queries', type=int, default=20,
+                        help='Antal startnoder for legacy scanning - den er langsom (default: 20)')
+    parser.add_argument('--limit', type=int, default=10, help='Top-N for bedst-først traversering')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print("📊 GRAPH TRAVERSAL BENCHMARK")
+    print("=" * 50)
+
+    begin = time.perf_counter()
+    if args.graph_file:
+        graph = load_graph_file(args.graph_file)
+    else:
+        graph = build_synthetic_graph(args.paragraphs, references_per_node=args.references_per_node, seed=args.seed)
+    build_seconds = time.perf_counter() - begin
+
+    stats = graph.get_statistics()
+    print(f"   Graf: {stats['total_nodes']} noder, {stats['total_edges']} kanter "
+          f"({stats['hierarchical_edges']} hierarkiske), bygget på {build_seconds:.2f}s")
+    node_types = sorted(stats['node_types'].items(), key=lambda item: -item[1])[:6]
+    print(f"   Node typer (top 6): {dict(node_types)}")
+
+    rng = random.Random(args.seed)
+    node_ids = list(graph.nodes)
+    starts = [rng.choice(node_ids) for _ in range(args.queries)]
+    legacy_starts = starts[:args.legacy_queries]
+
+    # Samme resultat som den oprindelige algoritme (startnoden tælles ikke med)
+    mismatches = sum(
+        set(legacy_related_entities(graph.edges, start, args.max_depth)) - {start}
+        != set(graph.get_related_entities(start, args.max_depth))
+        for start in legacy_starts
+    )
+
+    results = {
+        'legacy': time_calls(lambda s: legacy_related_entities(graph.edges, s, args.max_depth), legacy_starts),
+        'bfs': time_calls(lambda s: graph.get_related_entities(s, args.max_depth), starts),
+        'weighted': time_calls(lambda s: graph.get_strongest_related(s, args.max_depth, args.limit), starts),
+    }
+
+    print(f"\n📋 RESULTATER (max_depth={args.max_depth})")
+    print(f"{'metode':>10} {'kald':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, latencies in results.items():
+        print(f"{name:>10} {len(latencies):>6} {np.percentile(latencies, 50):>9.3f} "
+              f"{np.percentile(latencies, 95):>9.3f} {max(latencies):>9.3f}")
+
+    speedup = np.median(results['legacy']) / max(np.median(results['bfs']), 1e-9)
+    print(f"\n⚡ BFS speedup vs. legacy (median): {speedup:.0f}x")
+    print(f"{'✅' if not mismatches else '❌'} Resultat-mismatch legacy vs. bfs: {mismatches}/{len(legacy_starts)}")
+
+
+if __name__ == "__main__":
+    main()
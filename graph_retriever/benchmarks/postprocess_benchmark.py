@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+POSTPROCESS BENCHMARK - Kolonnebaseret graf-efterbehandling vs. per-kant løkker
+
+Bygger en syntetisk TaxLawGraph (default 100k kanter) med forældreløse,
+duplikerede og inkonsistente kanter og måler:
+- legacy: den oprindelige _validate_and_optimize_graph (en Python-løkke per trin,
+          remove_edge per inkonsistent kant, has_edge_between per kapitel-par)
+- columnar: graph_postprocess.postprocess_graph
+
+Begge skal ende med samme kanter (source, target, type, score) - det tjekkes.
+
+BRUG:
+python benchmarks/postprocess_benchmark.py
+python benchmarks/postprocess_benchmark.py --edges 200000 --nodes 40000 --chapter-size 30
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+# Tilføj graph_retriever mappen til Python-stien
+sys.path.append(str(Path(__file__).parent.parent))
+
+from graph_postprocess import postprocess_graph
+from graph_retriever_strategy import GraphRetrieverImplementation, TaxLawGraph
+
+LLM_TYPES = ['conceptual', 'procedural', 'explicit_reference', 'hierarchical']
+STRENGTHS = ['strong', 'medium', 'weak']
+
+
+def build_synthetic_graph(nodes: int = 20000, edges: int = 100000, chapter_size: int = 20,
+                          auto_fraction: float = 0.3, orphan_fraction: float = 0.01,
+                          duplicate_fraction: float = 0.03, seed: int = 42) -> TaxLawGraph:
+    """Syntetisk lov-graf med støj - samme seed giver samme graf"""
+    rng = random.Random(seed)
+    graph = TaxLawGraph("Syntetisk lov")
+    node_ids = [f"§ {i // 10 + 1}, stk. {i % 10 + 1}" for i in range(nodes)]
+
+    for position, node_id in enumerate(node_ids):
+        referenced = node_ids[rng.randrange(nodes)]
+        graph.nodes[node_id] = {
+            'id': node_id,
+            'content': f"Bestemmelse {node_id}, jf. {referenced}.",
+            'law': graph.law_name,
+            'chapter': f"Kapitel {position // chapter_size + 1}" if chapter_size else None,
+        }
+
+    relations = []
+    for _ in range(edges):
+        position = rng.randrange(nodes)
+        source = node_ids[position]
+        if rng.random() < orphan_fraction:
+            target = f"§ {nodes + rng.randrange(1000)}"
+        elif rng.random() < 0.5:
+            # Lokale kanter - samme eller nabo-kapitel
+            span = max(chapter_size, 10)
+            target = node_ids[min(nodes - 1, max(0, position + rng.randrange(-span, span + 1)))]
+        else:
+            target = rng.choice(node_ids)
+
+        if rng.random() < auto_fraction:
+            relation = {'source': source, 'target': target, 'type': 'hierarchical', 'strength': 1.0,
+                        'explanation': 'auto', 'law': graph.law_name, 'auto_generated': True}
+        else:
+            relation = {'source': source, 'target': target, 'type': rng.choice(LLM_TYPES),
+                        'strength': rng.choice(STRENGTHS), 'explanation': 'llm', 'law': graph.law_name}
+            if rng.random() < 0.3:
+                relation['score'] = round(rng.uniform(0.2, 0.9), 2)
+        relations.append(relation)
+
+        if rng.random() < duplicate_fraction:
+            relations.append(dict(relation))
+
+    graph.edges = relations
+    return graph
+
+
+def legacy_postprocess(graph: TaxLawGraph, implementation: GraphRetrieverImplementation) -> None:
+    """Den oprindelige efterbehandling (uden prints) - én løkke per trin"""
+    graph.edges = [edge for edge in graph.edges if edge['source'] in graph.nodes and edge['target'] in graph.nodes]
+
+    seen = set()
+    deduplicated = []
+    for edge in graph.edges:
+        key = (edge['source'], edge['target'], edge['type'])
+        if key not in seen:
+            seen.add(key)
+            deduplicated.append(edge)
+    graph.edges = deduplicated
+
+    inconsistent = []
+    for edge in graph.edges:
+        source_node, target_node = graph.nodes[edge['source']], graph.nodes[edge['target']]
+        if edge.get('auto_generated', False):
+            continue
+        if edge['type'] == 'hierarchical':
+            source_ch, target_ch = source_node.get('chapter'), target_node.get('chapter')
+            if source_node.get('law') != target_node.get('law') or (source_ch and target_ch and source_ch != target_ch):
+                inconsistent.append(edge)
+                continue
+        if edge['type'] == 'explicit_reference' and not implementation._validate_explicit_reference(edge, source_node):
+            inconsistent.append(edge)
+    for edge in inconsistent:
+        graph.remove_edge(edge)
+
+    for edge in graph.edges:
+        edge['score'] = edge.get('score', 0.5)
+        edge['score'] += {'explicit_reference': 0.2, 'hierarchical': 0.1}.get(edge['type'], 0.0)
+        edge['score'] += {'strong': 0.3, 'medium': 0.1}.get(edge['strength'], 0.0) \
+            if isinstance(edge['strength'], str) else 0.0
+        edge['score'] = min(edge['score'], 1.0)
+
+    if len(graph.edges) > 1000:
+        fixed = [edge for edge in graph.edges if edge.get('auto_generated', False)]
+        llm = sorted((edge for edge in graph.edges if not edge.get('auto_generated', False)),
+                     key=lambda edge: edge.get('score', 0), reverse=True)
+        graph.edges = fixed + llm[:int(len(llm) * 0.8)]
+
+    counts = dict.fromkeys(graph.nodes, 0)
+    for edge in graph.edges:
+        counts[edge['source']] += 1
+        counts[edge['target']] += 1
+
+    chapters: Dict[str, list] = {}
+    for node_id, node in graph.nodes.items():
+        if node.get('chapter'):
+            chapters.setdefault(node['chapter'], []).append(node_id)
+    for chapter, members in chapters.items():
+        for i, first in enumerate(members):
+            for second in members[i + 1:]:
+                if not graph.core.has_edge_between(first, second):
+                    graph.add_relation(first, second, 'hierarchical', 'weak', f"Samme kapitel: {chapter}")
+
+
+def edge_set(graph: TaxLawGraph) -> Set[Tuple]:
+    return {(edge['source'], edge['target'], edge['type'], round(edge.get('score', 0.0), 6)) for edge in graph.edges}
+
+
+def main():
+    """Kør postprocess benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark af graf-efterbehandling (legacy vs. kolonnebaseret)')
+    parser.add_argument('--nodes', type=int, default=20000)
+    parser.add_argument('--edges', type=int, default=100000)
+    parser.add_argument('--chapter-size', type=int, default=20, help='Noder per kapitel (0 = ingen kapitler)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-legacy', action='store_true', help='Kun kolonnebaseret (legacy er langsom)')
+    args = parser.parse_args()
+
+    print("📊 POSTPROCESS BENCHMARK")
+    print("=" * 50)
+
+    implementation = GraphRetrieverImplementation(verbose=False)
+    build = lambda: build_synthetic_graph(args.nodes, args.edges, args.chapter_size, seed=args.seed)
+
+    graph = build()
+    print(f"   Graf: {len(graph.nodes)} noder, {len(graph.edges)} kanter (inkl. støj)")
+
+    start = time.perf_counter()
+    stats = postprocess_graph(graph, validate_explicit=implementation._validate_explicit_reference)
+    columnar_seconds = time.perf_counter() - start
+    connectivity = stats['connectivity']
+    print(f"\n📋 KOLONNEBASERET: {columnar_seconds:.2f}s")
+    print(f"   Fjernet: {stats['orphaned']} forældreløse, {stats['duplicates']} dubletter, "
+          f"{stats['inconsistent']} inkonsistente, {stats['weak_filtered']} svage")
+    print(f"   Tilføjet: {stats['structural_added']} kapitel-relationer -> {stats['final_edges']} kanter")
+    print(f"   Komponenter: {connectivity['components']} (største {connectivity['largest_component']}, "
+          f"isolerede {connectivity['isolated_nodes']})")
+
+    if args.skip_legacy:
+        return
+
+    legacy_graph = build()
+    start = time.perf_counter()
+    legacy_postprocess(legacy_graph, implementation)
+    legacy_seconds = time.perf_counter() - start
+    print(f"\n📋 LEGACY: {legacy_seconds:.2f}s -> {len(legacy_graph.edges)} kanter")
+
+    print(f"\n⚡ Speedup: {legacy_seconds / max(columnar_seconds, 1e-9):.1f}x")
+    same = edge_set(graph) == edge_set(legacy_graph) and len(graph.edges) == len(legacy_graph.edges)
+    print(f"{'✅' if same else '❌'} Samme kanter legacy vs. kolonnebaseret: {same}")
+
+
+if __name__ == "__main__":
+    main()
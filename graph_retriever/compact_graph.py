@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+"""
+COMPACT GRAPH - Array-baseret (CSR) lagring af lov-grafer
+========================================================
+
+Kompakt, persistent format for GraphRetriever:
+- Node ids interneres til heltal (position i node_ids)
+- Adjacency gemmes som CSR i NumPy: indptr[i]:indptr[i+1] er naboerne til node i
+- Relation type (uint8 index i relation_types) og styrke (float32) som parallelle arrays
+- Node tekst gemmes ikke - kun en reference til chunk_id, som slås op i Weaviate
+
+Grafen er urettet til traversering: hver relation ligger i begge nodes
+rækker, og edge_reverse markerer den kopi der peger fra target mod source.
+
+PERSISTENS (én mappe per lov):
+    graph.json                generation, law_name, node_ids, chunk_ids, node_types, relation_types
+    indptr-<gen>.npy          int64 [n_nodes + 1]
+    indices-<gen>.npy         int32 [n_entries]
+    edge_types-<gen>.npy      uint8 [n_entries]
+    edge_strengths-<gen>.npy  float32 [n_entries]
+    edge_reverse-<gen>.npy    bool [n_entries]
+    neighbor_index-<gen>.npy  int32 [n_nodes, top_n]    (valgfri, graph_neighborhoods)
+    neighbor_score-<gen>.npy  float32 [n_nodes, top_n]  (valgfri, graph_neighborhoods)
+
+<gen> er en generation pr. save(), som graph.json peger på.
+
+Arrays indlæses med mmap_mode='r', så indlæsning tager millisekunder og
+flere worker-processer deler de samme sider i OS page cache.
+
+BRUG:
+    compact = CompactGraph.from_tax_law_graph(graph)
+    compact.save("graphs/ligningsloven")
+    compact = CompactGraph.load("graphs/ligningsloven")
+    compact.related("§15O", max_depth=2)
+"""
+
+import heapq
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from graph_core import edge_weight
+
+FORMAT_VERSION = 1
+METADATA_FILE = "graph.json"
+ARRAY_FILES = ("indptr", "indices", "edge_types", "edge_strengths", "edge_reverse")
+NEIGHBORHOOD_FILES = ("neighbor_index", "neighbor_score")
+
+
+class CompactGraph:
+    """Uforanderlig CSR graf for én lov"""
+
+    def __init__(self, law_name: str, node_ids: Sequence[str], chunk_ids: Sequence[Optional[str]],
+                 node_types: Sequence[str], relation_types: Sequence[str], indptr: np.ndarray,
+                 indices: np.ndarray, edge_types: np.ndarray, edge_strengths: np.ndarray,
+                 edge_reverse: np.ndarray):
+        self.law_name = law_name
+        self.node_ids = list(node_ids)
+        self.chunk_ids = list(chunk_ids)
+        self.node_types = list(node_types)
+        self.relation_types = list(relation_types)
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_types = edge_types
+        self.edge_strengths = edge_strengths
+        self.edge_reverse = edge_reverse
+        self._index = {node_id: position for position, node_id in enumerate(self.node_ids)}
+        self._chunk_index: Optional[Dict[str, str]] = None  # chunk_id -> node_id, bygges ved første opslag
+        # Forudberegnede top-N naboer (graph_neighborhoods.compute_neighborhoods)
+        self.neighbor_index: Optional[np.ndarray] = None
+        self.neighbor_score: Optional[np.ndarray] = None
+        self.neighborhood_info: Optional[Dict] = None
+
+    # -------------------------------------------------------------------------
+    # Opbygning
+    # -------------------------------------------------------------------------
+
+    @classmethod
+    def from_edges(cls, law_name: str, nodes: Iterable[Dict], edges: Iterable[Dict]) -> "CompactGraph":
+        """
+        Byg CSR graf fra node- og kant-dicts
+
+        Args:
+            nodes: Dicts med 'id' og evt. 'chunk_id' og 'entity_type'/'type'
+            edges: Dicts med 'source', 'target', 'type' og 'strength' (strong/medium/weak eller tal)
+                   Kanter til ukendte noder springes over.
+        """
+        node_ids, chunk_ids, node_types = [], [], []
+        index = {}
+        for node in nodes:
+            if node['id'] in index:
+                continue
+            index[node['id']] = len(node_ids)
+            node_ids.append(node['id'])
+            chunk_ids.append(node.get('chunk_id'))
+            node_types.append(node.get('entity_type') or node.get('type') or '')
+
+        relation_types: List[str] = []
+        type_index: Dict[str, int] = {}
+        sources, targets, types, strengths = [], [], [], []
+        for edge in edges:
+            source = index.get(edge['source'])
+            target = index.get(edge['target'])
+            if source is None or target is None or source == target:
+                continue
+            relation_type = edge.get('type') or ''
+            if relation_type not in type_index:
+                type_index[relation_type] = len(relation_types)
+                relation_types.append(relation_type)
+            sources.append(source)
+            targets.append(target)
+            types.append(type_index[relation_type])
+            strengths.append(edge_weight(edge))
+
+        return cls.from_arrays(law_name, node_ids, chunk_ids, node_types, relation_types,
+                               sources, targets, types, strengths)
+
+    @classmethod
+    def from_arrays(cls, law_name: str, node_ids: Sequence[str], chunk_ids: Sequence[Optional[str]],
+                    node_types: Sequence[str], relation_types: Sequence[str], sources, targets,
+                    types, strengths) -> "CompactGraph":
+        """
+        Byg CSR graf fra parallelle kant-arrays (node index, relation type index, styrke)
+
+        Bruges af from_edges og til at flette grafer uden at gå via dicts.
+        """
+        if len(relation_types) > np.iinfo(np.uint8).max:
+            raise ValueError(f"For mange relation typer ({len(relation_types)}) til uint8 edge_types")
+
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        # Urettet: hver relation gemmes i både source og target rækken
+        rows = np.concatenate([sources, targets])
+        columns = np.concatenate([targets, sources])
+        reverse = np.concatenate([np.zeros(len(sources), dtype=bool), np.ones(len(targets), dtype=bool)])
+        entry_types = np.tile(np.asarray(types, dtype=np.uint8), 2)
+        entry_strengths = np.tile(np.asarray(strengths, dtype=np.float32), 2)
+
+        order = np.argsort(rows, kind='stable')
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(node_ids)), out=indptr[1:])
+
+        return cls(
+            law_name, node_ids, chunk_ids, node_types, relation_types, indptr,
+            columns[order].astype(np.int32), entry_types[order], entry_strengths[order], reverse[order]
+        )
+
+    def edge_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Relationerne som (sources, targets, types, strengths) - én række per relation"""
+        rows = np.repeat(np.arange(len(self.node_ids), dtype=np.int64), np.diff(self.indptr))
+        forward = ~np.asarray(self.edge_reverse)
+        return (rows[forward], np.asarray(self.indices)[forward].astype(np.int64),
+                np.asarray(self.edge_types)[forward], np.asarray(self.edge_strengths)[forward])
+
+    @classmethod
+    def from_tax_law_graph(cls, graph) -> "CompactGraph":
+        """Byg fra graph_retriever.TaxLawGraph (GraphNode/GraphRelation dataclasses)"""
+        nodes = (
+            {'id': node.id, 'chunk_id': node.metadata.get('chunk_id'),
+             'entity_type': node.metadata.get('entity_type', '')}
+            for node in graph.nodes.values()
+        )
+        edges = (
+            {'source': relation.source, 'target': relation.target,
+             'type': relation.relation_type, 'strength': relation.strength}
+            for relation in graph.relations
+        )
+        return cls.from_edges(graph.law_name, nodes, edges)
+
+    @classmethod
+    def from_unified_json(cls, path: str) -> "CompactGraph":
+        """Byg fra en unified graf fil ('færdige grapher' format: entities + relations)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        law_name = data.get('metadata', {}).get('law_name') or os.path.splitext(os.path.basename(path))[0]
+        nodes = (
+            {'id': entity['id'], 'chunk_id': entity.get('chunk_id'), 'entity_type': entity.get('type', '')}
+            for entity in data.get('entities', [])
+        )
+        # Enkelte relationer bruger from/to/relationship i stedet for source/target/type
+        edges = (
+            {'source': relation.get('source', relation.get('from')),
+             'target': relation.get('target', relation.get('to')),
+             'type': relation.get('type', relation.get('relationship')),
+             'strength': relation.get('strength', relation.get('metadata', {}).get('relation_strength', 'medium'))}
+            for relation in data.get('relations', [])
+        )
+        return cls.from_edges(law_name, nodes, edges)
+
+    # -------------------------------------------------------------------------
+    # Persistens
+    # -------------------------------------------------------------------------
+
+    def save(self, directory: str) -> None:
+        """
+        Gem graf som graph.json + .npy filer i directory
+
+        Arrays skrives under et nyt generation-navn og graph.json udskiftes
+        atomisk til sidst, så processer der har den gamle graf memory-mappet
+        (hot reload) aldrig ser halvskrevne eller trunkerede filer.
+        """
+        os.makedirs(directory, exist_ok=True)
+        generation = f"{time.time_ns():x}"
+        for name in ARRAY_FILES + (NEIGHBORHOOD_FILES if self.has_neighborhoods else ()):
+            np.save(os.path.join(directory, f"{name}-{generation}.npy"), np.asarray(getattr(self, name)))
+
+        metadata = {
+            'format_version': FORMAT_VERSION,
+            'generation': generation,
+            'law_name': self.law_name,
+            'node_ids': self.node_ids,
+            'chunk_ids': self.chunk_ids,
+            'node_types': self.node_types,
+            'relation_types': self.relation_types,
+            'neighborhoods': self.neighborhood_info if self.has_neighborhoods else None,
+        }
+        # Skriv metadata sidst - dens tilstedeværelse markerer en komplet graf
+        temp_path = os.path.join(directory, METADATA_FILE + ".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        os.replace(temp_path, os.path.join(directory, METADATA_FILE))
+
+        _remove_old_generations(directory, generation)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "CompactGraph":
+        """Indlæs graf gemt med save() - arrays memory-mappes som standard"""
+        with open(os.path.join(directory, METADATA_FILE), 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        if metadata.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Ukendt graf format version {metadata.get('format_version')} i {directory}")
+
+        mmap_mode = 'r' if mmap else None
+        generation = metadata['generation']
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}-{generation}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAY_FILES
+        }
+
+        graph = cls(
+            metadata['law_name'], metadata['node_ids'], metadata['chunk_ids'],
+            metadata['node_types'], metadata['relation_types'], **arrays
+        )
+        if metadata.get('neighborhoods'):
+            graph.set_neighborhoods(
+                *(np.load(os.path.join(directory, f"{name}-{generation}.npy"), mmap_mode=mmap_mode)
+                  for name in NEIGHBORHOOD_FILES),
+                metadata['neighborhoods']
+            )
+        return graph
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        """Er der en komplet gemt graf i directory?"""
+        return os.path.exists(os.path.join(directory, METADATA_FILE))
+
+    # -------------------------------------------------------------------------
+    # Opslag og traversering
+    # -------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._index
+
+    @property
+    def num_relations(self) -> int:
+        """Antal relationer (hver relation fylder to CSR entries)"""
+        return len(self.indices) // 2
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes brugt af CSR arrays (inkl. nabo-tabel)"""
+        names = ARRAY_FILES + (NEIGHBORHOOD_FILES if self.has_neighborhoods else ())
+        return sum(int(getattr(self, name).nbytes) for name in names)
+
+    def index_of(self, node_id: str) -> Optional[int]:
+        return self._index.get(node_id)
+
+    @property
+    def has_neighborhoods(self) -> bool:
+        return self.neighbor_index is not None
+
+    def set_neighborhoods(self, neighbor_index: np.ndarray, neighbor_score: np.ndarray, info: Dict) -> None:
+        """Sæt forudberegnet top-N nabo-tabel ([n_nodes, top_n], -1 = tom plads)"""
+        if len(neighbor_index) != len(self.node_ids) or neighbor_index.shape != neighbor_score.shape:
+            raise ValueError(f"Nabo-tabel {neighbor_index.shape} passer ikke til {len(self.node_ids)} noder")
+        self.neighbor_index = neighbor_index
+        self.neighbor_score = neighbor_score
+        self.neighborhood_info = dict(info)
+
+    def top_neighbors(self, node_id: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Forudberegnede naboer [(node_id, score)] faldende - ét række-opslag
+
+        Uden nabo-tabel bruges strongest_related (traversering) som fallback.
+        """
+        position = self._index.get(node_id)
+        if position is None:
+            return []
+        if not self.has_neighborhoods:
+            candidates = self.strongest_related(node_id, max_depth=2)
+            return [(node, score) for node, score in candidates if self.chunk_id_for(node)][:limit]
+
+        row = self.neighbor_index[position, :limit].tolist()
+        scores = self.neighbor_score[position, :limit].tolist()
+        return [(self.node_ids[neighbor], score) for neighbor, score in zip(row, scores) if neighbor >= 0]
+
+    def node_for_chunk(self, chunk_id: str) -> Optional[str]:
+        """Node id for et chunk_id (fx et søgehit) - None hvis chunken ikke er i grafen"""
+        if self._chunk_index is None:
+            self._chunk_index = {chunk: node for node, chunk in zip(self.node_ids, self.chunk_ids) if chunk}
+        return self._chunk_index.get(chunk_id)
+
+    def chunk_id_for(self, node_id: str) -> Optional[str]:
+        """chunk_id som node teksten skal hentes fra (None hvis ukendt)"""
+        position = self._index.get(node_id)
+        return self.chunk_ids[position] if position is not None else None
+
+    def neighbors(self, node_id: str) -> List[Tuple[str, str, float]]:
+        """[(nabo, relation type, styrke)] for en node"""
+        position = self._index.get(node_id)
+        if position is None:
+            return []
+        start, end = self.indptr[position], self.indptr[position + 1]
+        return [
+            (self.node_ids[neighbor], self.relation_types[relation_type], float(strength))
+            for neighbor, relation_type, strength in zip(
+                self.indices[start:end], self.edge_types[start:end], self.edge_strengths[start:end]
+            )
+        ]
+
+    def related(self, node_id: str, max_depth: int = 2) -> List[str]:
+        """BFS: relaterede noder inden for max_depth, nærmeste først (start ikke medtaget)"""
+        position = self._index.get(node_id)
+        if position is None:
+            return []
+
+        indptr, indices = self.indptr, self.indices
+        depths = {position: 0}
+        queue = deque([position])
+        while queue:
+            current = queue.popleft()
+            depth = depths[current]
+            if depth >= max_depth:
+                continue
+            for neighbor in indices[indptr[current]:indptr[current + 1]].tolist():
+                if neighbor not in depths:
+                    depths[neighbor] = depth + 1
+                    queue.append(neighbor)
+
+        del depths[position]
+        return [self.node_ids[neighbor] for neighbor in depths]
+
+    def strongest_related(self, node_id: str, max_depth: int = 2,
+                          limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Bedst-først efter produkt af kantstyrker: [(node_id, score)] faldende"""
+        position = self._index.get(node_id)
+        if position is None:
+            return []
+
+        indptr, indices, strengths = self.indptr, self.indices, self.edge_strengths
+        heap = [(-1.0, 0, position)]
+        best = {position: 1.0}
+        settled = set()
+        results = []
+
+        while heap:
+            negative_score, depth, current = heapq.heappop(heap)
+            if current in settled:
+                continue
+            settled.add(current)
+            score = -negative_score
+            if current != position:
+                results.append((self.node_ids[current], score))
+                if limit is not None and len(results) >= limit:
+                    break
+            if depth >= max_depth:
+                continue
+
+            start, end = indptr[current], indptr[current + 1]
+            for neighbor, strength in zip(indices[start:end].tolist(), strengths[start:end].tolist()):
+                next_score = score * strength
+                if neighbor in settled or next_score <= best.get(neighbor, 0.0):
+                    continue
+                best[neighbor] = next_score
+                heapq.heappush(heap, (-next_score, depth + 1, neighbor))
+
+        return results
+
+    def get_statistics(self) -> Dict:
+        """Graf statistikker (samme nøgler som TaxLawGraph.get_statistics)"""
+        return {
+            'nodes': len(self.node_ids),
+            'relations': self.num_relations,
+            'avg_connections': len(self.indices) / len(self.node_ids) if self.node_ids else 0,
+            'law': self.law_name,
+            'array_bytes': self.nbytes,
+            'neighborhoods': self.neighborhood_info
+        }
+
+
+def _remove_old_generations(directory: str, keep_generation: str) -> None:
+    """Slet arrays fra tidligere save() kald (åbne memory-maps beholder deres data)"""
+    suffix = f"-{keep_generation}.npy"
+    for filename in os.listdir(directory):
+        if not filename.endswith(".npy") or filename.endswith(suffix):
+            continue
+        if filename.rsplit("-", 1)[0] in ARRAY_FILES + NEIGHBORHOOD_FILES:
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                # Windows tillader ikke sletning af memory-mappede filer - ryddes ved næste save
+                pass
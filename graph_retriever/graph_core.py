@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+GRAPH CORE - Fælles adjacency-indekseret graf kerne
+==================================================
+
+Delt lagerstruktur for TaxLawGraph og EnhancedTaxLawGraph. Kanterne gemmes
+stadig som dicts (samme format som før), men indekseres ved indsættelse i:
+- outgoing: node_id -> kanter hvor noden er source
+- incoming: node_id -> kanter hvor noden er target
+- edges_by_type: relation type -> kanter
+
+Traversering koster derfor O(grad) per besøgt node i stedet for en fuld
+scanning af alle kanter per node. remove_edge er også O(grad): kanten fjernes
+straks fra adjacency listerne, mens kantlisten og type-indekset ryddes samlet
+(én O(E) gennemgang) næste gang de læses - mange fjernelser i træk koster
+derfor ikke O(E) hver.
+
+TRAVERSERING:
+- bfs(): deque-baseret bredde-først med visited sæt (hver node besøges én gang)
+- weighted_traversal(): bedst-først efter akkumuleret kantstyrke (heapq)
+
+BRUG:
+    core = GraphCore()
+    core.add_edge({'source': '§15O', 'target': '§15P', 'type': 'explicit_reference', 'strength': 'strong'})
+    core.bfs('§15O', max_depth=2)
+    core.weighted_traversal('§15O', max_depth=3, limit=10)
+"""
+
+import heapq
+from collections import defaultdict, deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Kantstyrke som tal - LLM relationer bruger strong/medium/weak, auto-genererede 1.0
+STRENGTH_WEIGHTS = {
+    'strong': 1.0,
+    'medium': 0.6,
+    'weak': 0.3,
+}
+
+DIRECTIONS = ('both', 'out', 'in')
+
+EdgeFilter = Callable[[Dict], bool]
+
+
+def edge_weight(edge: Dict) -> float:
+    """Kantstyrke som tal mellem 0 og 1 (strong/medium/weak eller numerisk)"""
+    strength = edge.get('strength', 'medium')
+    if isinstance(strength, str):
+        return STRENGTH_WEIGHTS.get(strength.lower(), STRENGTH_WEIGHTS['medium'])
+    try:
+        return max(0.0, min(float(strength), 1.0))
+    except (TypeError, ValueError):
+        return STRENGTH_WEIGHTS['medium']
+
+
+class GraphCore:
+    """Kant-lager med ind/ud adjacency og type-indeks"""
+
+    def __init__(self, edges: Optional[Iterable[Dict]] = None):
+        self._edges: List[Dict] = []
+        self.outgoing: Dict[str, List[Dict]] = defaultdict(list)
+        self.incoming: Dict[str, List[Dict]] = defaultdict(list)
+        self._edges_by_type: Dict[str, List[Dict]] = defaultdict(list)
+        # id() af fjernede kanter der stadig står i _edges/_edges_by_type (se _compact)
+        self._removed: Set[int] = set()
+        if edges:
+            self.set_edges(edges)
+
+    @property
+    def edges(self) -> List[Dict]:
+        """Alle kanter i indsættelsesrækkefølge"""
+        self._compact()
+        return self._edges
+
+    @property
+    def edges_by_type(self) -> Dict[str, List[Dict]]:
+        """relation type -> kanter"""
+        self._compact()
+        return self._edges_by_type
+
+    # -------------------------------------------------------------------------
+    # Mutation - hold indekserne i sync med kantlisten
+    # -------------------------------------------------------------------------
+
+    def add_edge(self, edge: Dict) -> Dict:
+        """Tilføj kant og indekser den"""
+        if id(edge) in self._removed:
+            # Samme objekt genindsat før oprydning - ryd op så det ikke står der to gange
+            self._compact()
+        self._edges.append(edge)
+        self.outgoing[edge['source']].append(edge)
+        self.incoming[edge['target']].append(edge)
+        self._edges_by_type[edge.get('type', '')].append(edge)
+        return edge
+
+    def remove_edge(self, edge: Dict) -> None:
+        """Fjern en bestemt kant (identitet) fra lager og indekser - O(grad)"""
+        if not _remove_identity(self.outgoing.get(edge['source'], []), edge):
+            return  # Ikke i grafen (eller allerede fjernet)
+        _remove_identity(self.incoming.get(edge['target'], []), edge)
+        self._removed.add(id(edge))
+
+    def set_edges(self, edges: Iterable[Dict]) -> None:
+        """Erstat alle kanter og genopbyg indekserne"""
+        edges = list(edges)  # Kan være self.edges selv
+        self._edges = []
+        self.outgoing = defaultdict(list)
+        self.incoming = defaultdict(list)
+        self._edges_by_type = defaultdict(list)
+        self._removed = set()
+        for edge in edges:
+            self.add_edge(edge)
+
+    def _compact(self) -> None:
+        """Fjern kanter markeret af remove_edge fra kantlisten og type-indekset (én O(E) gennemgang)"""
+        if not self._removed:
+            return
+        removed = self._removed
+        self._edges = [edge for edge in self._edges if id(edge) not in removed]
+        for relation_type, edges in list(self._edges_by_type.items()):
+            kept = [edge for edge in edges if id(edge) not in removed]
+            if kept:
+                self._edges_by_type[relation_type] = kept
+            else:
+                del self._edges_by_type[relation_type]
+        self._removed = set()
+
+    # -------------------------------------------------------------------------
+    # Opslag
+    # -------------------------------------------------------------------------
+
+    def edges_of_type(self, relation_type: str) -> List[Dict]:
+        """Alle kanter af en given type"""
+        return list(self.edges_by_type.get(relation_type, ()))
+
+    def neighbors(self, node_id: str, direction: str = 'both',
+                  edge_filter: Optional[EdgeFilter] = None) -> Iterator[Tuple[str, Dict]]:
+        """(nabo, kant) par for en node - O(grad)"""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Ukendt retning '{direction}' - brug en af {DIRECTIONS}")
+
+        if direction in ('both', 'out'):
+            for edge in self.outgoing.get(node_id, ()):
+                if edge_filter is None or edge_filter(edge):
+                    yield edge['target'], edge
+        if direction in ('both', 'in'):
+            for edge in self.incoming.get(node_id, ()):
+                if edge_filter is None or edge_filter(edge):
+                    yield edge['source'], edge
+
+    def degree(self, node_id: str) -> int:
+        """Antal kanter (ind + ud) for en node"""
+        return len(self.outgoing.get(node_id, ())) + len(self.incoming.get(node_id, ()))
+
+    def has_edge_between(self, node_a: str, node_b: str, relation_type: Optional[str] = None) -> bool:
+        """Findes der en kant mellem to noder (uanset retning)?"""
+        # Scan den korteste af de to adjacency lister
+        if self.degree(node_a) > self.degree(node_b):
+            node_a, node_b = node_b, node_a
+        for neighbor, edge in self.neighbors(node_a):
+            if neighbor == node_b and (relation_type is None or edge.get('type') == relation_type):
+                return True
+        return False
+
+    # -------------------------------------------------------------------------
+    # Traversering
+    # -------------------------------------------------------------------------
+
+    def bfs(self, start: str, max_depth: int = 2, direction: str = 'both',
+            edge_filter: Optional[EdgeFilter] = None) -> Dict[str, int]:
+        """
+        Bredde-først søgning fra start
+
+        Returns:
+            node_id -> dybde for alle noder inden for max_depth (start ikke medtaget),
+            i den rækkefølge de blev fundet
+        """
+        depths = {start: 0}
+        queue = deque([start])
+
+        while queue:
+            current = queue.popleft()
+            depth = depths[current]
+            if depth >= max_depth:
+                continue
+            for neighbor, _ in self.neighbors(current, direction, edge_filter):
+                if neighbor not in depths:
+                    depths[neighbor] = depth + 1
+                    queue.append(neighbor)
+
+        del depths[start]
+        return depths
+
+    def weighted_traversal(self, start: str, max_depth: int = 2, limit: Optional[int] = None,
+                           min_score: float = 0.0, direction: str = 'both',
+                           edge_filter: Optional[EdgeFilter] = None) -> List[Tuple[str, float]]:
+        """
+        Bedst-først traversering efter kantstyrke
+
+        En sti scores som produktet af kantstyrkerne, så stærke direkte
+        relationer kommer før svage eller lange stier. Hver node får scoren
+        fra sin bedste sti.
+
+        Args:
+            max_depth: Maks antal hop fra start
+            limit: Stop når så mange noder er fundet
+            min_score: Stier med lavere score følges ikke
+
+        Returns:
+            [(node_id, score)] sorteret efter faldende score (start ikke medtaget)
+        """
+        # Max-heap via negativ score; tæller bryder uafgjort deterministisk
+        heap = [(-1.0, 0, 0, start)]
+        counter = 1
+        best = {start: 1.0}
+        settled = set()
+        results = []
+
+        while heap:
+            negative_score, _, depth, current = heapq.heappop(heap)
+            if current in settled:
+                continue
+            settled.add(current)
+
+            score = -negative_score
+            if current != start:
+                results.append((current, score))
+                if limit is not None and len(results) >= limit:
+                    break
+
+            if depth >= max_depth:
+                continue
+
+            for neighbor, edge in self.neighbors(current, direction, edge_filter):
+                if neighbor in settled:
+                    continue
+                next_score = score * edge_weight(edge)
+                if next_score < min_score or next_score <= best.get(neighbor, 0.0):
+                    continue
+                best[neighbor] = next_score
+                heapq.heappush(heap, (-next_score, counter, depth + 1, neighbor))
+                counter += 1
+
+        return results
+
+
+def _remove_identity(edges: List[Dict], edge: Dict) -> bool:
+    """Fjern præcis dette kant-objekt (ikke bare en lig dict) - True hvis det fandtes"""
+    for position, candidate in enumerate(edges):
+        if candidate is edge:
+            del edges[position]
+            return True
+    return False
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+GRAPH POSTPROCESS - Kolonnebaseret validering og optimering af lov-grafer
+========================================================================
+
+Efterbehandling af en bygget TaxLawGraph i ét gennemløb over kant-kolonner
+(NumPy) i stedet for en Python-løkke per trin:
+
+1. Kanter til ukendte noder fjernes            (maske på node index -1)
+2. Dubletter (source, target, type) fjernes     (np.unique på heltalsnøgle)
+3. Inkonsistente LLM kanter fjernes             (hierarchical: lov/kapitel som koder;
+                                                 explicit_reference: tekst-tjek kun på de få LLM kanter)
+4. Kanter scores                                (vektoriseret type/styrke boost)
+5. Svage LLM kanter filtreres (store grafer)    (stabil argsort, top 80%)
+6. Connectivity                                 (np.bincount + scipy connected_components)
+7. Manglende kapitel-relationer tilføjes        (np.triu_indices minus eksisterende par)
+
+Kant-dicts bevares (samme format som før) - kolonnerne er kun et indeks, og
+grafens adjacency genopbygges én gang til sidst.
+
+BRUG:
+    stats = postprocess_graph(graph, validate_explicit=implementation._validate_explicit_reference)
+"""
+
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+DEFAULT_EDGE_SCORE = 0.5
+TYPE_BOOST = {'explicit_reference': 0.2, 'hierarchical': 0.1}
+STRENGTH_BOOST = {'strong': 0.3, 'medium': 0.1}
+
+# Svage kanter filtreres kun i store grafer, og kun blandt LLM kanter
+WEAK_EDGE_MIN_EDGES = 1000
+WEAK_EDGE_KEEP_FRACTION = 0.8
+
+
+def _codes(values: List) -> np.ndarray:
+    """Kategoriske værdier -> heltalskoder (None/'' får -1)"""
+    lookup: Dict = {}
+    return np.fromiter(
+        (-1 if value in (None, '') else lookup.setdefault(value, len(lookup)) for value in values),
+        dtype=np.int64, count=len(values)
+    )
+
+
+class EdgeColumns:
+    """Kanterne som parallelle NumPy kolonner (én konvertering per efterbehandling)"""
+
+    def __init__(self, edges: List[Dict], node_index: Dict[str, int]):
+        count = len(edges)
+        self.edges = edges
+        self.source = np.fromiter((node_index.get(edge['source'], -1) for edge in edges), dtype=np.int64, count=count)
+        self.target = np.fromiter((node_index.get(edge['target'], -1) for edge in edges), dtype=np.int64, count=count)
+        self.type_names = sorted({edge.get('type', '') for edge in edges})
+        type_lookup = {name: code for code, name in enumerate(self.type_names)}
+        self.type = np.fromiter((type_lookup[edge.get('type', '')] for edge in edges), dtype=np.int64, count=count)
+        self.auto = np.fromiter((bool(edge.get('auto_generated', False)) for edge in edges), dtype=bool, count=count)
+        # Styrke boost og eksisterende score (NaN = ingen score endnu)
+        self.strength_boost = np.fromiter(
+            (STRENGTH_BOOST.get(edge.get('strength'), 0.0) if isinstance(edge.get('strength'), str) else 0.0
+             for edge in edges), dtype=np.float64, count=count
+        )
+        self.score = np.fromiter((edge.get('score', np.nan) for edge in edges), dtype=np.float64, count=count)
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+    def type_mask(self, relation_type: str) -> np.ndarray:
+        if relation_type not in self.type_names:
+            return np.zeros(len(self), dtype=bool)
+        return self.type == self.type_names.index(relation_type)
+
+
+def first_occurrences(columns: EdgeColumns, keep: np.ndarray, n_nodes: int) -> np.ndarray:
+    """Maske der kun beholder første forekomst af hver (source, target, type)"""
+    candidates = np.flatnonzero(keep)
+    keys = (columns.source[candidates] * n_nodes + columns.target[candidates]) * max(len(columns.type_names), 1) \
+        + columns.type[candidates]
+    _, first = np.unique(keys, return_index=True)
+    result = np.zeros(len(columns), dtype=bool)
+    result[candidates[first]] = True
+    return result
+
+
+def consistent_edges(columns: EdgeColumns, keep: np.ndarray, law_codes: np.ndarray, chapter_codes: np.ndarray,
+                     node_ids: List[str], nodes: Dict[str, Dict],
+                     validate_explicit: Optional[Callable[[Dict, Dict], bool]] = None) -> np.ndarray:
+    """
+    Maske for logisk konsistente kanter (deterministiske kanter er altid konsistente)
+
+    hierarchical: samme lov, og samme kapitel hvis begge noder har et
+    explicit_reference: validate_explicit(edge, source_node) - kun for LLM kanter
+    """
+    result = keep.copy()
+    checked = keep & ~columns.auto
+    source = np.where(checked, columns.source, 0)
+    target = np.where(checked, columns.target, 0)
+
+    hierarchical = checked & columns.type_mask('hierarchical')
+    same_law = law_codes[source] == law_codes[target]
+    source_chapter, target_chapter = chapter_codes[source], chapter_codes[target]
+    chapter_conflict = (source_chapter >= 0) & (target_chapter >= 0) & (source_chapter != target_chapter)
+    result &= ~(hierarchical & (~same_law | chapter_conflict))
+
+    if validate_explicit is not None:
+        for position in np.flatnonzero(checked & columns.type_mask('explicit_reference')).tolist():
+            edge = columns.edges[position]
+            if not validate_explicit(edge, nodes[node_ids[columns.source[position]]]):
+                result[position] = False
+
+    return result
+
+
+def score_edges(columns: EdgeColumns) -> np.ndarray:
+    """Score = (eksisterende eller 0.5) + type boost + styrke boost, max 1.0"""
+    type_boost = np.zeros(len(columns))
+    for relation_type, boost in TYPE_BOOST.items():
+        type_boost[columns.type_mask(relation_type)] = boost
+    base = np.where(np.isnan(columns.score), DEFAULT_EDGE_SCORE, columns.score)
+    return np.minimum(base + type_boost + columns.strength_boost, 1.0)
+
+
+def filter_weak_edges(columns: EdgeColumns, keep: np.ndarray, scores: np.ndarray,
+                      keep_fraction: float = WEAK_EDGE_KEEP_FRACTION) -> np.ndarray:
+    """Behold de bedste keep_fraction af LLM kanterne (stabil sortering som sorted(reverse=True))"""
+    llm = np.flatnonzero(keep & ~columns.auto)
+    ranked = llm[np.argsort(-scores[llm], kind='stable')]
+    result = keep & columns.auto
+    result[ranked[:int(len(llm) * keep_fraction)]] = True
+    return result
+
+
+def connectivity_statistics(n_nodes: int, source: np.ndarray, target: np.ndarray) -> Dict:
+    """Grad-statistik og sammenhængskomponenter (urettet)"""
+    if n_nodes == 0:
+        return {}
+    degrees = np.bincount(source, minlength=n_nodes) + np.bincount(target, minlength=n_nodes)
+    adjacency = coo_matrix((np.ones(len(source), dtype=np.int8), (source, target)), shape=(n_nodes, n_nodes))
+    components, labels = connected_components(adjacency, directed=False)
+    return {
+        'total_nodes': n_nodes,
+        'total_edges': len(source),
+        'avg_connections': float(degrees.mean()),
+        'max_connections': int(degrees.max()),
+        'min_connections': int(degrees.min()),
+        'isolated_nodes': int((degrees == 0).sum()),
+        'components': int(components),
+        'largest_component': int(np.bincount(labels).max())
+    }
+
+
+def missing_chapter_pairs(chapter_codes: np.ndarray, source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Node-par i samme kapitel uden en kant (uanset retning)
+
+    Returns:
+        [[i, j]] med i før j i node-rækkefølge
+    """
+    n_nodes = len(chapter_codes)
+    existing = np.unique(np.minimum(source, target) * n_nodes + np.maximum(source, target))
+    pairs = []
+    for chapter in np.unique(chapter_codes[chapter_codes >= 0]):
+        members = np.flatnonzero(chapter_codes == chapter)
+        first, second = np.triu_indices(len(members), k=1)
+        candidate = np.stack([members[first], members[second]], axis=1)
+        missing = ~np.isin(candidate[:, 0] * n_nodes + candidate[:, 1], existing)
+        pairs.append(candidate[missing])
+    return np.concatenate(pairs) if pairs else np.zeros((0, 2), dtype=np.int64)
+
+
+def postprocess_graph(graph, validate_explicit: Optional[Callable[[Dict, Dict], bool]] = None,
+                      verbose: bool = False) -> Dict:
+    """
+    Validér, score, filtrér og komplettér en TaxLawGraph i ét kolonnebaseret gennemløb
+
+    Args:
+        graph: TaxLawGraph (nodes dict + edges gennem GraphCore)
+        validate_explicit: (edge, source_node) -> bool for LLM explicit_reference kanter
+
+    Returns:
+        Statistik: fjernede kanter per trin, connectivity og tilføjede kapitel-relationer
+    """
+    node_ids = list(graph.nodes)
+    node_index = {node_id: position for position, node_id in enumerate(node_ids)}
+    edges = graph.edges
+    columns = EdgeColumns(edges, node_index)
+    stats = {'initial_edges': len(edges)}
+
+    # 1. Kanter til ukendte noder
+    keep = (columns.source >= 0) & (columns.target >= 0)
+    stats['orphaned'] = int(len(columns) - keep.sum())
+
+    # 2. Dubletter
+    deduplicated = first_occurrences(columns, keep, len(node_ids))
+    stats['duplicates'] = int(keep.sum() - deduplicated.sum())
+    keep = deduplicated
+
+    # 3. Konsistens
+    law_codes = _codes([graph.nodes[node_id].get('law') for node_id in node_ids])
+    chapter_codes = _codes([graph.nodes[node_id].get('chapter') for node_id in node_ids])
+    consistent = consistent_edges(columns, keep, law_codes, chapter_codes, node_ids, graph.nodes, validate_explicit)
+    stats['inconsistent'] = int(keep.sum() - consistent.sum())
+    keep = consistent
+
+    # 4. Scoring
+    scores = score_edges(columns)
+
+    # 5. Svage LLM kanter (kun store grafer)
+    if keep.sum() > WEAK_EDGE_MIN_EDGES:
+        filtered = filter_weak_edges(columns, keep, scores)
+        stats['weak_filtered'] = int(keep.sum() - filtered.sum())
+        keep = filtered
+    else:
+        stats['weak_filtered'] = 0
+
+    # Skriv scores tilbage og genopbyg adjacency én gang
+    kept = np.flatnonzero(keep)
+    kept_scores = scores[kept].tolist()
+    kept_edges = [edges[position] for position in kept.tolist()]
+    for edge, score in zip(kept_edges, kept_scores):
+        edge['score'] = score
+    graph.edges = kept_edges
+
+    # 6. Connectivity
+    stats['connectivity'] = connectivity_statistics(len(node_ids), columns.source[kept], columns.target[kept])
+
+    # 7. Manglende kapitel-relationer
+    pairs = missing_chapter_pairs(chapter_codes, columns.source[kept], columns.target[kept])
+    for first, second in pairs.tolist():
+        graph.add_relation(
+            source=node_ids[first],
+            target=node_ids[second],
+            relation_type='hierarchical',
+            strength='weak',
+            explanation=f"Samme kapitel: {graph.nodes[node_ids[first]].get('chapter')}"
+        )
+    stats['structural_added'] = len(pairs)
+    stats['final_edges'] = len(graph.edges)
+
+    if verbose:
+        print(f"🧹 Removed {stats['orphaned']} orphaned, {stats['duplicates']} duplicate, "
+              f"{stats['inconsistent']} inconsistent and {stats['weak_filtered']} weak edges")
+        if stats['structural_added']:
+            print(f"📝 Added {stats['structural_added']} missing structural relations")
+
+    return stats
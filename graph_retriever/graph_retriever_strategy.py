@@ -21,6 +21,28 @@ STRUKTUR ANALYSE - LIGNINGSLOVEN:
 - Noter tilknyttet hver paragraf
 """
 
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from graph_core import GraphCore
+from graph_postprocess import postprocess_graph
+from reference_extractor import extract_reference_relations
+from token_counter import TokenCounter
+
+# Relationstyper LLM'en skal finde - explicit_reference og hierarchical
+# findes deterministisk af reference_extractor
+LLM_RELATION_TYPES = ('conceptual', 'procedural')
+
+# Metadata felter der ikke sendes med til LLM'en (store og allerede udnyttet deterministisk)
+LLM_EXCLUDED_METADATA = ('entities', 'notes_text', 'related_paragraphs')
+
+# Model til relation extraction - indgår i checkpoint nøglen
+GRAPH_BUILDER_MODEL = "gpt-4o-2024-08-06"
+
 # =============================================================================
 # 1. LLM INSTRUKTIONER TIL GRAF BYGGNING
 # =============================================================================
@@ -82,45 +104,130 @@ VIGTIGE REGLER:
 # 2. BATCHING STRATEGI FOR OPTIMAL KONTEKST
 # =============================================================================
 
+LLM_BATCH_HEADER = "PARAGRAFFER TIL ANALYSE:\n\n"
+
+LLM_BATCH_INSTRUCTION = (
+    "\nINSTRUKTIBON: Analyser ovenstående paragraffer og identificer de konceptuelle og procedurale relationer mellem dem. Eksplicitte referencer og hierarkiske relationer er allerede fundet automatisk - medtag dem ikke. Returner resultatet som JSON med følgende struktur:\n"
+    '{"relations": [{"source_paragraph": "§X", "target_paragraph": "§Y", "relation_type": "conceptual", "relation_strength": "strong", "explanation": "Forklaring på dansk"}]}'
+)
+
+
+def format_paragraph_for_llm(paragraph):
+    """Én paragraf som den sendes til LLM'en (bruges både til prompt og token-optælling)"""
+    content = f"PARAGRAF: {paragraph['id']}\n"
+    if 'title' in paragraph:
+        content += f"TITEL: {paragraph['title']}\n"
+    content += f"INDHOLD: {paragraph['content']}\n"
+    metadata = {key: value for key, value in paragraph.get('metadata', {}).items()
+                if key not in LLM_EXCLUDED_METADATA}
+    content += f"METADATA: {json.dumps(metadata, ensure_ascii=False)}\n"
+    content += "-" * 80 + "\n\n"
+    return content
+
+
 class BatchingStrategy:
     """
     Strategi for at batche paragraffer for maksimal kontekstforståelse
+    
+    Tokens tælles med modellens tokenizer på præcis den tekst der sendes
+    (inkl. system prompt og instruktion), og kapitler bin-packes i batches
+    under budgettet, så hvert kald bærer mest muligt uden at overskride det.
     """
     
-    def __init__(self):
-        self.max_tokens_per_batch = 15000  # Lad plads til system prompt
-        self.overlap_paragraphs = 2        # Overlap mellem batches
-        
+    def __init__(self, max_tokens_per_batch=15000, overlap_paragraphs=2, token_counter=None):
+        """
+        Args:
+            max_tokens_per_batch: Budget for hele prompten (system + paragraffer + instruktion)
+            overlap_paragraphs: Overlap mellem batches når et kapitel må splittes
+            token_counter: Delt TokenCounter (kalibreres af GraphRetrieverImplementation)
+        """
+        self.max_tokens_per_batch = max_tokens_per_batch  # Lad plads til system prompt
+        self.overlap_paragraphs = overlap_paragraphs      # Overlap mellem batches
+        self.token_counter = token_counter or TokenCounter(GRAPH_BUILDER_MODEL)
+        self._paragraph_tokens = {}  # id(paragraph) -> tokens
+        
+    @property
+    def prompt_overhead(self):
+        """Faste tokens per kald: system prompt, header, instruktion og besked-format"""
+        return self.token_counter.count_messages([
+            {"role": "system", "content": GRAPH_BUILDER_PROMPT},
+            {"role": "user", "content": LLM_BATCH_HEADER + LLM_BATCH_INSTRUCTION}
+        ])
+    
+    @property
+    def payload_budget(self):
+        """Tokens til rådighed for paragraffer i ét batch"""
+        budget = self.max_tokens_per_batch - self.prompt_overhead
+        # Uden rigtig tokenizer: korrigér approksimationen med målt kalibrering
+        if not self.token_counter.exact:
+            budget = int(budget / max(self.token_counter.calibration, 1.0))
+        return max(budget, 1)
+    
     def create_batches(self, paragraphs, law_structure):
         """
         Skab batches baseret på juridisk struktur og token limits
         
         PRIORITERING:
         1. Hold kapitler sammen når muligt
-        2. Hold afsnit sammen når muligt  
-        3. Hold relaterede paragraffer sammen
-        4. Respekter token limits
+        2. Split kun kapitler der alene overskrider budgettet (med overlap)
+        3. Bin-pack hele kapitler/kapitel-dele i så få batches som muligt
+           (first-fit decreasing) - et kapitel deles aldrig mellem batches
+        4. Respekter token budget (præcis optælling)
         """
-        batches = []
+        budget = self.payload_budget
+        units = []
         
         # Organiser efter hierarkisk struktur
         chapters = self._group_by_chapter(paragraphs, law_structure)
         
-        for chapter_name, chapter_paragraphs in chapters.items():
+        for position, (chapter_name, chapter_paragraphs) in enumerate(chapters.items()):
+            tokens = self._estimate_tokens(chapter_paragraphs)
             # Prøv at holde hele kapitler sammen
-            if self._estimate_tokens(chapter_paragraphs) <= self.max_tokens_per_batch:
-                batches.append({
-                    'paragraphs': chapter_paragraphs,
-                    'context_type': 'full_chapter',
-                    'chapter': chapter_name
-                })
+            if tokens <= budget:
+                units.append({'position': position, 'chapter': chapter_name,
+                              'paragraphs': chapter_paragraphs, 'tokens': tokens, 'split': False})
             else:
-                # Split kapitel i mindre batches
-                sub_batches = self._split_chapter(chapter_paragraphs)
-                batches.extend(sub_batches)
-                
+                # Split kapitel i mindre dele
+                for part in self._split_chapter(chapter_paragraphs):
+                    units.append({'position': position, 'chapter': chapter_name,
+                                  'paragraphs': part['paragraphs'], 'tokens': part['estimated_tokens'], 'split': True})
+        
+        bins = self._pack_units(units, budget)
+        
+        overhead = self.prompt_overhead
+        batches = []
+        for packed in bins:
+            packed.sort(key=lambda unit: unit['position'])
+            chapter_names = list(dict.fromkeys(unit['chapter'] for unit in packed))
+            if len(packed) == 1:
+                context_type = 'chapter_split' if packed[0]['split'] else 'full_chapter'
+            else:
+                context_type = 'packed_chapters'
+            batches.append({
+                'paragraphs': [p for unit in packed for p in unit['paragraphs']],
+                'context_type': context_type,
+                'chapter': chapter_names[0] if len(chapter_names) == 1 else chapter_names,
+                'estimated_tokens': overhead + sum(unit['tokens'] for unit in packed)
+            })
+        
         return batches
     
+    def _pack_units(self, units, budget):
+        """First-fit decreasing bin-packing af kapitel-enheder under budget"""
+        bins = []
+        loads = []
+        for unit in sorted(units, key=lambda u: (-u['tokens'], u['position'])):
+            for index, load in enumerate(loads):
+                if load + unit['tokens'] <= budget:
+                    bins[index].append(unit)
+                    loads[index] += unit['tokens']
+                    break
+            else:
+                bins.append([unit])
+                loads.append(unit['tokens'])
+        # Dokument-rækkefølge på tværs af batches
+        return sorted(bins, key=lambda packed: min(unit['position'] for unit in packed))
+    
     def _group_by_chapter(self, paragraphs, law_structure):
         """Gruppér paragraffer efter kapitel"""
         
@@ -143,14 +250,19 @@ class BatchingStrategy:
         return chapters
     
     def _estimate_tokens(self, paragraphs):
-        """Estimér tokens for en gruppe paragraffer"""
-        # Simpel estimering: ~4 karakterer per token
-        total_chars = sum(len(p['content']) for p in paragraphs)
-        return total_chars // 4
+        """Tokens for en gruppe paragraffer, talt på den tekst der sendes til LLM'en"""
+        total = 0
+        for paragraph in paragraphs:
+            key = id(paragraph)
+            if key not in self._paragraph_tokens:
+                self._paragraph_tokens[key] = self.token_counter.count(format_paragraph_for_llm(paragraph))
+            total += self._paragraph_tokens[key]
+        return total
     
     def _split_chapter(self, chapter_paragraphs):
         """Split et kapitel i mindre batches med overlap"""
         
+        budget = self.payload_budget
         batches = []
         current_batch = []
         current_tokens = 0
@@ -159,19 +271,18 @@ class BatchingStrategy:
             para_tokens = self._estimate_tokens([paragraph])
             
             # If adding this paragraph would exceed limit, start new batch
-            if current_tokens + para_tokens > self.max_tokens_per_batch and current_batch:
-                # Add overlap from previous batch
-                overlap_start = max(0, len(current_batch) - self.overlap_paragraphs)
-                overlap_paragraphs = current_batch[overlap_start:]
-                
+            if current_tokens + para_tokens > budget and current_batch:
                 batches.append({
                     'paragraphs': current_batch,
                     'context_type': 'chapter_split',
                     'estimated_tokens': current_tokens
                 })
                 
-                # Start new batch with overlap
-                current_batch = overlap_paragraphs + [paragraph]
+                # Start new batch with overlap - kun så meget overlap som budgettet tillader
+                overlap = current_batch[max(0, len(current_batch) - self.overlap_paragraphs):]
+                while overlap and self._estimate_tokens(overlap) + para_tokens > budget:
+                    overlap = overlap[1:]
+                current_batch = overlap + [paragraph]
                 current_tokens = self._estimate_tokens(current_batch)
             else:
                 current_batch.append(paragraph)
@@ -186,6 +297,20 @@ class BatchingStrategy:
             })
         
         return batches
+    
+    def describe(self, batches):
+        """Batch statistik: antal, tokens og udnyttelse af budgettet"""
+        tokens = [batch['estimated_tokens'] for batch in batches]
+        oversized = sum(1 for t in tokens if t > self.max_tokens_per_batch)
+        return {
+            'batches': len(batches),
+            'tokenizer': self.token_counter.name,
+            'total_prompt_tokens': sum(tokens),
+            'max_batch_tokens': max(tokens, default=0),
+            'avg_fill_pct': 100 * sum(tokens) / (len(tokens) * self.max_tokens_per_batch) if tokens else 0.0,
+            # Enkelt-paragraffer større end budgettet kan ikke splittes yderligere
+            'oversized_batches': oversized
+        }
 
 # =============================================================================
 # 3. GRAF STRUKTUR DEFINITION
@@ -199,9 +324,18 @@ class TaxLawGraph:
     def __init__(self, law_name):
         self.law_name = law_name
         self.nodes = {}  # paragraph_id -> node_data
-        self.edges = []  # list of relations
+        self.core = GraphCore()  # relations + ind/ud adjacency og type-indeks
         self.hierarchical_relations = []  # Auto-generated hierarchical relations
         
+    @property
+    def edges(self):
+        """Liste af relationer (brug add_relation/remove_edge for at ændre den)"""
+        return self.core.edges
+    
+    @edges.setter
+    def edges(self, edges):
+        self.core.set_edges(edges)
+    
     def add_paragraph_node(self, paragraph_id, content, metadata):
         """Tilføj paragraf som node i grafen med fuld stk./nr. support"""
         # Extract granular information
@@ -222,6 +356,7 @@ class TaxLawGraph:
             'nr': nr_num,
             'entity_type': entity_type,
             'parent_paragraph': parent_paragraph,
+            'chunk_id': metadata.get('chunk_id'),
             'type': 'legal_entity',
             'embedding': None  # Tilføjes senere
         }
@@ -269,37 +404,29 @@ class TaxLawGraph:
                 }
                 self.hierarchical_relations.append(hierarchical_relation)
     
-    def add_relation(self, source, target, relation_type, strength, explanation):
-        """Tilføj relation mellem paragraffer"""
-        self.edges.append({
+    def add_relation(self, source, target, relation_type, strength, explanation, **attributes):
+        """Tilføj relation mellem paragraffer (attributes: fx auto_generated, subtype, score)"""
+        self.core.add_edge({
             'source': source,
             'target': target,
             'type': relation_type,
             'strength': strength,
             'explanation': explanation,
-            'law': self.law_name
+            'law': self.law_name,
+            **attributes
         })
     
+    def remove_edge(self, edge):
+        """Fjern en relation fra grafen"""
+        self.core.remove_edge(edge)
+    
     def get_related_paragraphs(self, paragraph_id, max_depth=2):
-        """Find relaterede paragraffer op til en given dybde"""
-        related = set()
-        to_explore = [(paragraph_id, 0)]
-        
-        while to_explore:
-            current_id, depth = to_explore.pop(0)
-            if depth >= max_depth:
-                continue
-                
-            # Find direkte forbindelser
-            for edge in self.edges:
-                if edge['source'] == current_id:
-                    related.add(edge['target'])
-                    to_explore.append((edge['target'], depth + 1))
-                elif edge['target'] == current_id:
-                    related.add(edge['source'])
-                    to_explore.append((edge['source'], depth + 1))
-        
-        return list(related)
+        """Find relaterede paragraffer op til en given dybde (BFS, nærmeste først)"""
+        return list(self.core.bfs(paragraph_id, max_depth=max_depth))
+    
+    def get_strongest_related(self, paragraph_id, max_depth=2, limit=10):
+        """Find relaterede paragraffer bedst-først efter kantstyrke: [(id, score)]"""
+        return self.core.weighted_traversal(paragraph_id, max_depth=max_depth, limit=limit)
 
 # =============================================================================
 # 4. IMPLEMENTERINGS STRATEGI
@@ -310,53 +437,190 @@ class GraphRetrieverImplementation:
     Implementering af graph retriever for skattelove
     """
     
-    def __init__(self, verbose=True):
+    def __init__(self, verbose=True, max_in_flight=4, max_retries=2, checkpoint_dir=None):
+        """
+        Args:
+            max_in_flight: Maks samtidige LLM kald under graf-bygning
+            max_retries: Genforsøg per batch ved API fejl (eksponentiel backoff)
+            checkpoint_dir: Mappe til per-batch resultater - gør bygningen genoptagelig
+        """
         self.graphs = {}  # law_name -> TaxLawGraph
+        self.cross_law_relations = {}  # law_name -> referencer til andre love (til unified graf)
         self.embeddings_model = "text-embedding-3-large"
         self.verbose = verbose
-        
-    def build_graph_for_law(self, law_name, paragraphs):
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.checkpoint_dir = checkpoint_dir
+        self._client = None
+        self._client_lock = threading.Lock()
+        # Delt tokenizer: bruges til batching og kalibreres mod faktiske prompt_tokens
+        self.token_counter = TokenCounter(GRAPH_BUILDER_MODEL)
+        
+    def build_graph_for_law(self, law_name, paragraphs, use_llm=True, resume=True):
         """
         Byg graf for en specifik skattelov
         
         PROCES:
         1. Analysér lovens struktur
-        2. Skab batches for optimal kontekst
-        3. Send batches til LLM for relation extraction
-        4. Byg graf baseret på LLM output
+        2. Find explicit_reference og hierarchical relationer deterministisk
+        3. Skab batches for optimal kontekst
+        4. Send batches til LLM - kun for conceptual/procedural relationer
         5. Validér og optimér graf
+        
+        Args:
+            paragraphs: [{'id', 'content', 'metadata'}] - fx reference_extractor.paragraphs_from_chunks
+            use_llm: False bygger kun den deterministiske citations-graf (ingen API kald)
+            resume: Genbrug batch-checkpoints fra et tidligere (evt. afbrudt) kørsel
         """
         
         # 1. Analysér struktur
         law_structure = self._analyze_law_structure(paragraphs)
         
-        # 2. Skab batches
-        batching = BatchingStrategy()
-        batches = batching.create_batches(paragraphs, law_structure)
-        
-        # 3. Proces hver batch med LLM
         graph = TaxLawGraph(law_name)
+        for paragraph in paragraphs:
+            graph.add_paragraph_node(
+                paragraph['id'], 
+                paragraph['content'],
+                paragraph['metadata']
+            )
         
-        for batch in batches:
-            relations = self._extract_relations_from_batch(batch)
-            
-            # Tilføj noder og relationer til graf
-            for paragraph in batch['paragraphs']:
-                graph.add_paragraph_node(
-                    paragraph['id'], 
-                    paragraph['content'],
-                    paragraph['metadata']
-                )
+        # 2. Regelbaserede relationer (referencer i tekst, entities, noter og struktur)
+        reference_relations, cross_law_relations = extract_reference_relations(law_name, paragraphs)
+        self.cross_law_relations[law_name] = cross_law_relations
+        for relation in reference_relations:
+            self._add_relation_to_graph(graph, relation)
+        
+        if self.verbose:
+            print(f"🔗 Deterministic extraction: {len(reference_relations)} relations "
+                  f"({len(cross_law_relations)} references to other laws)")
+        
+        if use_llm:
+            # 3. Skab batches
+            batching = BatchingStrategy(token_counter=self.token_counter)
+            batches = batching.create_batches(paragraphs, law_structure)
+            if self.verbose:
+                stats = batching.describe(batches)
+                print(f"📦 {stats['batches']} batches, {stats['total_prompt_tokens']:,} prompt tokens "
+                      f"({stats['tokenizer']}, {stats['avg_fill_pct']:.0f}% avg fill)")
             
-            for relation in relations:
-                graph.add_relation(**relation)
+            # 4. Proces batches parallelt med LLM - flet via dedup + scoring
+            for relation in self._run_llm_batches(law_name, batches, resume):
+                self._add_relation_to_graph(graph, relation)
         
-        # 4. Post-processing og validering
+        # 5. Post-processing og validering
         self._validate_and_optimize_graph(graph)
         
         self.graphs[law_name] = graph
         return graph
     
+    def _run_llm_batches(self, law_name, batches, resume=True):
+        """
+        Kør LLM extraction for alle batches med højst max_in_flight samtidige kald
+        
+        Hvert færdigt batch gemmes som checkpoint (nøgle = hash af batch indhold,
+        model og prompt), så en afbrudt bygning genoptages uden at betale for de
+        batches der allerede er kørt. Fejlede batches checkpointes ikke og køres
+        igen næste gang.
+        
+        Returns:
+            Flettede relationer (_deduplicate_relations + _score_relations)
+        """
+        checkpoint_dir = os.path.join(self.checkpoint_dir, law_name.lower()) if self.checkpoint_dir else None
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        
+        all_relations = []
+        pending = []
+        for batch in batches:
+            path = os.path.join(checkpoint_dir, f"batch_{self._batch_key(batch)}.json") if checkpoint_dir else None
+            if resume and path and os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    all_relations.extend(json.load(f)['relations'])
+            else:
+                pending.append((batch, path))
+        
+        resumed = len(batches) - len(pending)
+        if self.verbose:
+            print(f"🚀 LLM extraction: {len(pending)} batches ({resumed} resumed from checkpoint), "
+                  f"max {self.max_in_flight} in flight")
+        
+        failed = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, self.max_in_flight), thread_name_prefix="graph-batch") as executor:
+            futures = {executor.submit(self._extract_with_retry, batch): (batch, path) for batch, path in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                batch, path = futures[future]
+                try:
+                    relations = future.result()
+                except Exception as e:
+                    failed += 1
+                    if self.verbose:
+                        print(f"⚠️ Batch failed after {self.max_retries + 1} attempts: {e}")
+                    continue
+                
+                all_relations.extend(relations)
+                if path:
+                    self._write_checkpoint(path, batch, relations)
+                if self.verbose:
+                    print(f"   [{done}/{len(pending)}] {len(relations)} relations "
+                          f"from {len(batch['paragraphs'])} paragraphs")
+        
+        if self.verbose:
+            print(f"✅ LLM extraction done in {time.perf_counter() - start:.1f}s")
+            if failed:
+                print(f"⚠️ {failed} batches failed - run again with resume=True to retry only those")
+            tokens = self.token_counter.report()
+            if tokens['calls']:
+                print(f"🔢 Prompt tokens: predicted {tokens['predicted_tokens']:,} vs actual {tokens['actual_tokens']:,} "
+                      f"({tokens['mean_abs_error_pct']:.1f}% mean error, {self.token_counter.name})")
+        
+        return self._score_relations(self._deduplicate_relations(all_relations))
+    
+    def _extract_with_retry(self, batch):
+        """_request_relations med eksponentiel backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._request_relations(batch)
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(2 ** attempt)
+    
+    def _batch_key(self, batch):
+        """Stabil nøgle for et batch - ændres når indhold, model eller prompt ændres"""
+        digest = hashlib.sha1()
+        digest.update(GRAPH_BUILDER_MODEL.encode('utf-8'))
+        digest.update(GRAPH_BUILDER_PROMPT.encode('utf-8'))
+        digest.update(self._prepare_batch_for_llm(batch).encode('utf-8'))
+        return digest.hexdigest()[:20]
+    
+    def _write_checkpoint(self, path, batch, relations):
+        """Skriv batch resultat atomisk (tmp + rename)"""
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'paragraphs': [paragraph['id'] for paragraph in batch['paragraphs']],
+                'relations': relations,
+                'model': GRAPH_BUILDER_MODEL,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+            }, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    
+    def _get_client(self):
+        """Delt OpenAI klient (trådsikker) på tværs af batch workers"""
+        with self._client_lock:
+            if self._client is None:
+                import openai
+                self._client = openai.OpenAI()
+            return self._client
+    
+    def _add_relation_to_graph(self, graph, relation):
+        """Tilføj en relation dict (fra LLM eller reference_extractor) til grafen"""
+        attributes = {key: value for key, value in relation.items()
+                      if key not in ('source', 'target', 'type', 'strength', 'explanation')}
+        graph.add_relation(relation['source'], relation['target'], relation['type'],
+                           relation['strength'], relation['explanation'], **attributes)
+    
     def _analyze_law_structure(self, paragraphs):
         """Analysér lovens hierarkiske struktur"""
         import re
@@ -478,42 +742,9 @@ class GraphRetrieverImplementation:
         return None
     
     def _extract_relations_from_batch(self, batch):
-        """Send batch til LLM og udtræk relationer"""
-        import openai
-        import json
-        import re
-        from typing import List, Dict
-        
+        """Send batch til LLM og udtræk relationer (fejl giver tom liste)"""
         try:
-            # Prepare batch content for LLM
-            batch_content = self._prepare_batch_for_llm(batch)
-            
-            # Create OpenAI client
-            client = openai.OpenAI()
-            
-            # Send to LLM with our specialized prompt
-            response = client.chat.completions.create(
-                model="gpt-4o-2024-08-06",  # Best for complex reasoning
-                messages=[
-                    {"role": "system", "content": GRAPH_BUILDER_PROMPT},
-                    {"role": "user", "content": batch_content}
-                ],
-                temperature=0.1,  # Low temperature for consistent extraction
-                max_tokens=4000,
-                response_format={"type": "json_object"}
-            )
-            
-            # Parse LLM response
-            response_text = response.choices[0].message.content
-            relations_data = json.loads(response_text)
-            
-            # Extract and validate relations
-            relations = []
-            if "relations" in relations_data:
-                for relation_data in relations_data["relations"]:
-                    relation = self._validate_and_format_relation(relation_data)
-                    if relation:
-                        relations.append(relation)
+            relations = self._request_relations(batch)
             
             # Deduplicate relations
             relations = self._deduplicate_relations(relations)
@@ -535,21 +766,52 @@ class GraphRetrieverImplementation:
                 print(f"⚠️ Error extracting relations: {e}")
             return []
     
-    def _prepare_batch_for_llm(self, batch):
-        """Prepare batch content for LLM processing"""
+    def _request_relations(self, batch):
+        """
+        Ét LLM kald for et batch - returnerer validerede (ikke flettede) relationer
         
-        content = "PARAGRAFFER TIL ANALYSE:\n\n"
+        Fejl (API, JSON) kastes videre, så kalderen kan forsøge igen.
+        """
+        # Prepare batch content for LLM
+        batch_content = self._prepare_batch_for_llm(batch)
+        
+        # Send to LLM with our specialized prompt
+        response = self._get_client().chat.completions.create(
+            model=GRAPH_BUILDER_MODEL,  # Best for complex reasoning
+            messages=[
+                {"role": "system", "content": GRAPH_BUILDER_PROMPT},
+                {"role": "user", "content": batch_content}
+            ],
+            temperature=0.1,  # Low temperature for consistent extraction
+            max_tokens=4000,
+            response_format={"type": "json_object"}
+        )
+        
+        # Forudsagt vs. faktisk prompt størrelse - kalibrerer batching
+        usage = getattr(response, 'usage', None)
+        if usage is not None and 'estimated_tokens' in batch:
+            self.token_counter.record_actual(batch['estimated_tokens'], usage.prompt_tokens)
+        
+        # Parse LLM response
+        response_text = response.choices[0].message.content
+        relations_data = json.loads(response_text)
+        
+        # Extract and validate relations
+        relations = []
+        for relation_data in relations_data.get("relations", []):
+            relation = self._validate_and_format_relation(relation_data)
+            # Referencer og hierarki kommer fra reference_extractor
+            if relation and relation['type'] in LLM_RELATION_TYPES:
+                relations.append(relation)
         
-        for paragraph in batch['paragraphs']:
-            content += f"PARAGRAF: {paragraph['id']}\n"
-            if 'title' in paragraph:
-                content += f"TITEL: {paragraph['title']}\n"
-            content += f"INDHOLD: {paragraph['content']}\n"
-            content += f"METADATA: {json.dumps(paragraph.get('metadata', {}), ensure_ascii=False)}\n"
-            content += "-" * 80 + "\n\n"
+        return relations
+    
+    def _prepare_batch_for_llm(self, batch):
+        """Prepare batch content for LLM processing"""
         
-        content += "\nINSTRUKTIBON: Analyser ovenstående paragraffer og identificer alle juridiske relationer mellem dem. Returner resultatet som JSON med følgende struktur:\n"
-        content += '{"relations": [{"source_paragraph": "§X", "target_paragraph": "§Y", "relation_type": "explicit_reference", "relation_strength": "strong", "explanation": "Forklaring på dansk"}]}'
+        content = LLM_BATCH_HEADER
+        content += "".join(format_paragraph_for_llm(paragraph) for paragraph in batch['paragraphs'])
+        content += LLM_BATCH_INSTRUCTION
         
         return content
     
@@ -637,120 +899,30 @@ class GraphRetrieverImplementation:
         return relations
     
     def _validate_and_optimize_graph(self, graph):
-        """Validér og optimér den byggede graf"""
+        """Validér og optimér den byggede graf (ét kolonnebaseret gennemløb - se graph_postprocess.py)"""
         
         if self.verbose:
             initial_nodes = len(graph.nodes)
             initial_edges = len(graph.edges)
             print(f"🔍 Validating graph: {initial_nodes} nodes, {initial_edges} edges")
         
-        # 1. Remove edges with non-existent nodes
-        valid_edges = []
-        orphaned_references = []
-        
-        for edge in graph.edges:
-            source_exists = edge['source'] in graph.nodes
-            target_exists = edge['target'] in graph.nodes
-            
-            if source_exists and target_exists:
-                valid_edges.append(edge)
-            else:
-                orphaned_references.append(edge)
-                if self.verbose:
-                    print(f"⚠️ Removing orphaned edge: {edge['source']} -> {edge['target']}")
-        
-        graph.edges = valid_edges
-        
-        # 2. Remove duplicate edges (same source, target, type)
-        seen_edges = set()
-        deduplicated_edges = []
-        
-        for edge in graph.edges:
-            edge_key = (edge['source'], edge['target'], edge['type'])
-            if edge_key not in seen_edges:
-                seen_edges.add(edge_key)
-                deduplicated_edges.append(edge)
-            else:
-                if self.verbose:
-                    print(f"🔄 Removing duplicate edge: {edge['source']} -> {edge['target']}")
-        
-        graph.edges = deduplicated_edges
-        
-        # 3. Validate edge consistency
-        self._validate_edge_consistency(graph)
-        
-        # 4. Score and rank edges
-        self._score_graph_edges(graph)
-        
-        # 5. Remove weak edges (optional optimization)
-        if len(graph.edges) > 1000:  # Only for large graphs
-            graph.edges = self._filter_weak_edges(graph.edges)
-        
-        # 6. Validate graph connectivity
-        connectivity_stats = self._analyze_graph_connectivity(graph)
-        
-        # 7. Add structural relations if missing
-        self._add_missing_structural_relations(graph)
+        stats = postprocess_graph(graph, validate_explicit=self._validate_explicit_reference, verbose=self.verbose)
         
         if self.verbose:
             final_nodes = len(graph.nodes)
             final_edges = len(graph.edges)
+            connectivity = stats['connectivity']
             print(f"✅ Graph validation complete:")
             print(f"   Nodes: {initial_nodes} -> {final_nodes}")
             print(f"   Edges: {initial_edges} -> {final_edges}")
-            print(f"   Orphaned references removed: {len(orphaned_references)}")
-            print(f"   Average connections per node: {final_edges / final_nodes:.1f}")
+            print(f"   Orphaned references removed: {stats['orphaned']}")
+            if connectivity:
+                print(f"   Average connections per node: {final_edges / final_nodes:.1f}")
+                print(f"   Components: {connectivity['components']} "
+                      f"(largest {connectivity['largest_component']}, isolated {connectivity['isolated_nodes']})")
         
         return graph
     
-    def _validate_edge_consistency(self, graph):
-        """Validate logical consistency of edges"""
-        
-        inconsistent_edges = []
-        
-        for edge in graph.edges:
-            # Check for logical inconsistencies
-            source_node = graph.nodes.get(edge['source'])
-            target_node = graph.nodes.get(edge['target'])
-            
-            if not source_node or not target_node:
-                continue
-            
-            # Check if hierarchical relations make sense
-            if edge['type'] == 'hierarchical':
-                if not self._validate_hierarchical_relation(source_node, target_node):
-                    inconsistent_edges.append(edge)
-                    continue
-            
-            # Check if explicit references are valid
-            if edge['type'] == 'explicit_reference':
-                if not self._validate_explicit_reference(edge, source_node):
-                    inconsistent_edges.append(edge)
-                    continue
-        
-        # Remove inconsistent edges
-        for edge in inconsistent_edges:
-            graph.edges.remove(edge)
-            if self.verbose:
-                print(f"⚠️ Removed inconsistent edge: {edge['source']} -> {edge['target']} ({edge['type']})")
-    
-    def _validate_hierarchical_relation(self, source_node, target_node):
-        """Validate if hierarchical relation makes sense"""
-        
-        # Both nodes should be in same law
-        if source_node.get('law') != target_node.get('law'):
-            return False
-        
-        # Check chapter relationships
-        source_ch = source_node.get('chapter')
-        target_ch = target_node.get('chapter')
-        
-        if source_ch and target_ch and source_ch != target_ch:
-            # Cross-chapter hierarchical relations are rare
-            return False
-        
-        return True
-    
     def _validate_explicit_reference(self, edge, source_node):
         """Validate explicit reference by checking source content"""
         
@@ -771,133 +943,60 @@ class GraphRetrieverImplementation:
                 return True
         
         return False
-    
-    def _score_graph_edges(self, graph):
-        """Score all edges in the graph"""
-        
-        for edge in graph.edges:
-            if 'score' not in edge:
-                edge['score'] = 0.5  # Default score
-            
-            # Boost score based on type
-            if edge['type'] == 'explicit_reference':
-                edge['score'] += 0.2
-            elif edge['type'] == 'hierarchical':
-                edge['score'] += 0.1
-            
-            # Boost score based on strength
-            if edge['strength'] == 'strong':
-                edge['score'] += 0.3
-            elif edge['strength'] == 'medium':
-                edge['score'] += 0.1
-            
-            # Cap at 1.0
-            edge['score'] = min(edge['score'], 1.0)
-    
-    def _filter_weak_edges(self, edges):
-        """Remove edges with very low scores"""
-        
-        # Sort by score descending
-        sorted_edges = sorted(edges, key=lambda x: x.get('score', 0), reverse=True)
-        
-        # Keep top 80% of edges
-        keep_count = int(len(sorted_edges) * 0.8)
-        filtered_edges = sorted_edges[:keep_count]
-        
-        if self.verbose:
-            removed_count = len(edges) - len(filtered_edges)
-            print(f"🧹 Filtered out {removed_count} weak edges")
-        
-        return filtered_edges
-    
-    def _analyze_graph_connectivity(self, graph):
-        """Analyze graph connectivity statistics"""
-        
-        if not graph.nodes:
-            return {}
-        
-        # Count connections per node
-        connection_counts = {}
-        for node_id in graph.nodes:
-            connection_counts[node_id] = 0
-        
-        for edge in graph.edges:
-            connection_counts[edge['source']] += 1
-            connection_counts[edge['target']] += 1
-        
-        # Calculate statistics
-        counts = list(connection_counts.values())
-        stats = {
-            'total_nodes': len(graph.nodes),
-            'total_edges': len(graph.edges),
-            'avg_connections': sum(counts) / len(counts) if counts else 0,
-            'max_connections': max(counts) if counts else 0,
-            'min_connections': min(counts) if counts else 0,
-            'isolated_nodes': sum(1 for c in counts if c == 0)
-        }
-        
-        return stats
-    
-    def _add_missing_structural_relations(self, graph):
-        """Add obvious structural relations that might have been missed"""
-        
-        # Group nodes by chapter
-        chapters = {}
-        for node_id, node_data in graph.nodes.items():
-            chapter = node_data.get('chapter')
-            if chapter:
-                if chapter not in chapters:
-                    chapters[chapter] = []
-                chapters[chapter].append(node_id)
-        
-        # Add hierarchical relations within chapters if missing
-        added_relations = 0
-        for chapter, paragraphs in chapters.items():
-            for i, para1 in enumerate(paragraphs):
-                for para2 in paragraphs[i+1:]:
-                    # Check if relation already exists
-                    relation_exists = any(
-                        (edge['source'] == para1 and edge['target'] == para2) or
-                        (edge['source'] == para2 and edge['target'] == para1)
-                        for edge in graph.edges
-                    )
-                    
-                    if not relation_exists:
-                        # Add weak hierarchical relation
-                        graph.add_relation(
-                            source=para1,
-                            target=para2,
-                            relation_type='hierarchical',
-                            strength='weak',
-                            explanation=f"Samme kapitel: {chapter}"
-                        )
-                        added_relations += 1
-        
-        if self.verbose and added_relations > 0:
-            print(f"📝 Added {added_relations} missing structural relations")
 
 # =============================================================================
 # 5. COST ESTIMATION FOR LIGNINGSLOVEN
 # =============================================================================
 
-def estimate_cost_ligningsloven():
+LIGNINGSLOVEN_CHUNKS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'multihop_rag', 'chunker', 'output',
+    'Ligningsloven (2023-01-13 nr. 42)_chunks.jsonl'
+)
+
+# Typisk LLM relation - output tokens estimeres ud fra dens token størrelse
+SAMPLE_RELATION = {
+    "source_paragraph": "§ 15 O, stk. 1", "target_paragraph": "§ 15 P, stk. 2",
+    "relation_type": "conceptual", "relation_strength": "medium",
+    "explanation": "Begge bestemmelser regulerer fradrag for samme type udgift og skal læses sammen"
+}
+
+
+def estimate_cost_ligningsloven(paragraphs=None, relations_per_paragraph=3, max_tokens_per_batch=15000):
     """
     Estimér omkostninger for at bygge graf for Ligningsloven
+    
+    Estimatet bygger de faktiske batches (samme BatchingStrategy som
+    build_graph_for_law) og tæller tokens med modellens tokenizer, så
+    system prompt, instruktion, metadata og overlap per batch er med.
+    
+    Args:
+        paragraphs: Paragraf-format (default: Ligningsloven fra chunker output)
+        relations_per_paragraph: Forventede LLM relationer per paragraf (output)
     """
+    if paragraphs is None:
+        from reference_extractor import paragraphs_from_chunks
+        with open(LIGNINGSLOVEN_CHUNKS, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        paragraphs = next(iter(paragraphs_from_chunks(records).values()))
+    
+    token_counter = TokenCounter(GRAPH_BUILDER_MODEL)
+    batching = BatchingStrategy(max_tokens_per_batch=max_tokens_per_batch, token_counter=token_counter)
+    law_structure = GraphRetrieverImplementation(verbose=False)._analyze_law_structure(paragraphs)
+    batches = batching.create_batches(paragraphs, law_structure)
     
-    # Baseret på tidligere analyse:
-    total_paragraphs = 701  # Kun paragraffer, ikke noter
-    avg_tokens_per_paragraph = 200  # Konservativt estimat
-    total_input_tokens = total_paragraphs * avg_tokens_per_paragraph
+    # Input: hele prompten per kald (system + paragraffer inkl. overlap + instruktion)
+    total_paragraphs = len(paragraphs)
+    total_input_tokens = sum(batch['estimated_tokens'] for batch in batches)
+    
+    # Output: JSON relationer, én per forventet relation
+    tokens_per_relation = token_counter.count(json.dumps(SAMPLE_RELATION, ensure_ascii=False)) + 2
+    estimated_relations = total_paragraphs * relations_per_paragraph
+    total_output_tokens = estimated_relations * tokens_per_relation
     
     # GPT-4o-2024-08-06 priser:
     input_cost_per_1k = 0.0025  # $2.50 per 1M tokens
     output_cost_per_1k = 0.01   # $10.00 per 1M tokens
     
-    # Estimeret output: ~50 tokens per relation, ~3 relationer per paragraf
-    estimated_relations = total_paragraphs * 3
-    total_output_tokens = estimated_relations * 50
-    
     input_cost = (total_input_tokens / 1000) * input_cost_per_1k
     output_cost = (total_output_tokens / 1000) * output_cost_per_1k
     
@@ -905,6 +1004,8 @@ def estimate_cost_ligningsloven():
     
     return {
         'total_paragraphs': total_paragraphs,
+        'batches': len(batches),
+        'tokenizer': token_counter.name,
         'total_input_tokens': total_input_tokens,
         'total_output_tokens': total_output_tokens,
         'input_cost_usd': input_cost,
@@ -922,6 +1023,7 @@ if __name__ == "__main__":
     cost_estimate = estimate_cost_ligningsloven()
     print("COST ESTIMATE FOR LIGNINGSLOVEN GRAPH:")
     print(f"Total paragraffer: {cost_estimate['total_paragraphs']}")
+    print(f"Batches: {cost_estimate['batches']} ({cost_estimate['tokenizer']})")
     print(f"Input tokens: {cost_estimate['total_input_tokens']:,}")
     print(f"Output tokens: {cost_estimate['total_output_tokens']:,}")
     print(f"Total cost: ${cost_estimate['total_cost_usd']:.3f} / {cost_estimate['total_cost_dkk']:.0f} DKK")
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+REFERENCE EXTRACTOR - Deterministisk (regelbaseret) citations-graf fra chunks
+============================================================================
+
+Finder explicit_reference og hierarchical relationer direkte i chunk-teksten
+og chunk-felterne i ét CPU-gennemløb - uden LLM kald:
+
+1. HIERARKISKE RELATIONER (fra strukturfelterne paragraph/stk/nr):
+   § 7 -> § 7, stk. 1 -> § 7, stk. 1, nr. 22
+2. PARAGRAF-FAMILIER (fra related_paragraphs):
+   § 2 <-> § 2 A, § 8 <-> § 8 V
+3. EKSPLICITTE REFERENCER (fra text og entities):
+   "jf. § 9 C, stk. 3", "§§ 26 og 27", "ligningslovens § 33 A",
+   "kildeskattelovens § 1", relative "stk. 2" og "nr. 3" i samme paragraf
+   Referencer i noter tilknyttes den paragraf noten hører til (svag styrke).
+
+Referencer til andre love returneres separat som cross_law_relations.
+LLM'en er derefter kun nødvendig for conceptual/procedural relationer.
+
+Node ids følger chunk headings: "§ 7", "§ 7, stk. 1", "§ 7, stk. 1, nr. 22".
+
+BRUG:
+    python reference_extractor.py ../multihop_rag/chunker/output/*_chunks.jsonl --output graphs
+
+    from reference_extractor import paragraphs_from_chunks, extract_reference_relations
+    paragraphs = paragraphs_from_chunks(records)["Ligningsloven"]
+    relations, cross_law = extract_reference_relations("Ligningsloven", paragraphs)
+"""
+
+import argparse
+import json
+import re
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Paragraf nummer med evt. bogstav: "9", "9 C", "33A" (bogstavet må ikke starte et ord)
+_PARAGRAPH_NUMBER = r'\d+(?:\s?[A-ZÆØÅ](?![A-Za-zÆØÅæøå]))?'
+_LIST_SEPARATOR = r'\s*(?:,|og|eller|-|–)\s*'
+
+# "[ligningslovens|denne lovs] §[§] 9 C[, 10 og 12][, stk. 3[, nr. 2]]"
+REFERENCE_PATTERN = re.compile(
+    r'(?:(?P<law>[A-Za-zÆØÅæøå-]+lovens|denne lovs)\s+)?'
+    r'(?P<signs>§§?)\s*'
+    rf'(?P<paragraphs>{_PARAGRAPH_NUMBER}(?:{_LIST_SEPARATOR}{_PARAGRAPH_NUMBER})*)'
+    r'(?:\s*,\s*stk\.\s*(?P<stk>\d+))?'
+    r'(?:\s*,\s*nr\.\s*(?P<nr>\d+))?'
+)
+
+# Relativ reference inden for samme paragraf: "stk. 2", "stk. 1, 2 og 4", "stk. 2, nr. 3"
+RELATIVE_PATTERN = re.compile(
+    r'\bstk\.\s*(?P<stks>\d+(?:' + _LIST_SEPARATOR + r'\d+(?!\s*(?:kr|pct|%)))*)'
+    r'(?:\s*,\s*nr\.\s*(?P<nr>\d+))?'
+)
+
+_NUMBER_PATTERN = re.compile(_PARAGRAPH_NUMBER)
+
+# Styrker - tekst i selve bestemmelsen vejer mere end noter og familier
+STRENGTH_STRUCTURAL = 1.0
+STRENGTH_TEXT = 'strong'
+STRENGTH_FAMILY = 'medium'
+STRENGTH_NOTE = 'weak'
+
+
+# =============================================================================
+# 1. NODE IDS OG CHUNK KONVERTERING
+# =============================================================================
+
+def normalize_paragraph(number: str) -> str:
+    """'9C', '9 C' og '§ 9 C' -> '§ 9 C'"""
+    number = number.replace('§', '').strip()
+    match = re.match(r'(\d+)\s*([A-ZÆØÅ]?)$', number)
+    if not match:
+        return f"§ {number}"
+    digits, letter = match.groups()
+    return f"§ {digits} {letter}" if letter else f"§ {digits}"
+
+
+def entity_id(paragraph: str, stk: Optional[str] = None, nr: Optional[str] = None) -> str:
+    """Node id i chunk heading format: '§ 7, stk. 1, nr. 22'"""
+    node_id = normalize_paragraph(paragraph)
+    if stk:
+        node_id += f", stk. {stk}"
+        if nr:
+            node_id += f", nr. {nr}"
+    return node_id
+
+
+def law_title_from_genitive(genitive: str) -> str:
+    """'ligningslovens' -> 'Ligningsloven'"""
+    return genitive[:-1].capitalize()
+
+
+def paragraphs_from_chunks(records: Iterable[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Konvertér chunk records (*_chunks.jsonl) til paragraf-format per lov
+
+    Returns:
+        law_title -> [{'id', 'content', 'metadata'}] som GraphRetrieverImplementation
+        bruger. Noter lægges i metadata['notes_text'] på den paragraf de hører til,
+        og paragraf/stk forældre uden egen chunk oprettes som tomme noder.
+    """
+    by_chunk_id: Dict[str, Dict] = {}
+    notes: List[Dict] = []
+    per_law: Dict[str, Dict[str, Dict]] = defaultdict(dict)
+
+    for record in records:
+        if record.get('type') == 'notes':
+            notes.append(record)
+            continue
+        if not record.get('paragraph'):
+            continue
+
+        law = record.get('title') or 'Ukendt'
+        paragraph = normalize_paragraph(record['paragraph'])
+        stk, nr = record.get('stk') or '', record.get('nr') or ''
+        node_id = entity_id(paragraph, stk, nr)
+        parent = entity_id(paragraph, stk) if nr else (paragraph if stk else '')
+
+        node = {
+            'id': node_id,
+            'content': record.get('text', ''),
+            'metadata': {
+                'chunk_id': record.get('chunk_id'),
+                'law': law,
+                'entity_type': 'nummer' if nr else ('stykke' if stk else 'paragraph'),
+                'paragraph_number': paragraph[2:],
+                'stykke_number': stk,
+                'nummer': nr,
+                'parent_paragraph': parent,
+                'section': record.get('section', ''),
+                'entities': record.get('entities') or [],
+                'related_chunk_ids': record.get('related_paragraphs') or [],
+                'notes_text': [],
+            }
+        }
+        per_law[law][node_id] = node
+        if record.get('chunk_id'):
+            by_chunk_id[record['chunk_id']] = node
+
+    # Strukturelle forældre (§ og stk.) der ikke har deres egen chunk
+    for law, nodes in per_law.items():
+        for node in list(nodes.values()):
+            parent = node['metadata']['parent_paragraph']
+            while parent and parent not in nodes:
+                paragraph, _, rest = parent.partition(', stk. ')
+                grandparent = paragraph if rest else ''
+                nodes[parent] = {
+                    'id': parent,
+                    'content': '',
+                    'metadata': {
+                        'chunk_id': None, 'law': law,
+                        'entity_type': 'stykke' if rest else 'paragraph',
+                        'paragraph_number': paragraph[2:], 'stykke_number': rest, 'nummer': '',
+                        'parent_paragraph': grandparent, 'section': node['metadata']['section'],
+                        'entities': [], 'related_chunk_ids': [], 'notes_text': [],
+                    }
+                }
+                parent = grandparent
+
+    for note in notes:
+        owner = by_chunk_id.get(note.get('related_paragraph_chunk_id'))
+        if owner is not None and note.get('text'):
+            owner['metadata']['notes_text'].append(note['text'])
+
+    # Resolve related_paragraphs chunk_ids til node ids (kun inden for samme lov)
+    for nodes in per_law.values():
+        for node in nodes.values():
+            metadata = node['metadata']
+            metadata['related_paragraphs'] = sorted({
+                by_chunk_id[chunk_id]['id'] for chunk_id in metadata.pop('related_chunk_ids')
+                if chunk_id in by_chunk_id and by_chunk_id[chunk_id]['metadata']['law'] == metadata['law']
+            })
+
+    return {law: list(nodes.values()) for law, nodes in per_law.items()}
+
+
+# =============================================================================
+# 2. REFERENCE PARSING
+# =============================================================================
+
+def parse_references(text: str) -> List[Tuple[Optional[str], str]]:
+    """
+    Find referencer i en tekst
+
+    Returns:
+        [(lov-titel eller None for samme lov, relativ id)]. Relative ids er enten
+        absolutte ('§ 9 C, stk. 3') eller relative til kildens paragraf ('stk. 2', 'stk. 2, nr. 3').
+    """
+    references = []
+    spans = []
+
+    for match in REFERENCE_PATTERN.finditer(text):
+        spans.append(match.span())
+        law = match.group('law')
+        law_title = None if not law or law == 'denne lovs' else law_title_from_genitive(law)
+        numbers = _NUMBER_PATTERN.findall(match.group('paragraphs'))
+        if match.group('signs') == '§':
+            numbers = numbers[:1]
+        for position, number in enumerate(numbers):
+            # stk./nr. hører kun til den sidste paragraf i en liste ("§§ 2 og 3, stk. 1")
+            is_last = position == len(numbers) - 1
+            references.append((law_title, entity_id(
+                number,
+                match.group('stk') if is_last else None,
+                match.group('nr') if is_last else None
+            )))
+
+    for match in RELATIVE_PATTERN.finditer(text):
+        if any(start <= match.start() < end for start, end in spans):
+            continue
+        stks = re.findall(r'\d+', match.group('stks'))
+        for position, stk in enumerate(stks):
+            nr = match.group('nr') if position == len(stks) - 1 else None
+            references.append((None, f"stk. {stk}" + (f", nr. {nr}" if nr else '')))
+
+    return references
+
+
+def resolve_reference(target: str, nodes) -> Optional[str]:
+    """Find mest specifikke eksisterende node: nr -> stk -> paragraf"""
+    while target:
+        if target in nodes:
+            return target
+        if ', ' not in target:
+            # "§ 3 I behandlingen" fanges som § 3 I - prøv uden bogstav
+            without_letter = re.sub(r'\s[A-ZÆØÅ]$', '', target)
+            return without_letter if without_letter != target and without_letter in nodes else None
+        target = target.rsplit(', ', 1)[0]
+    return None
+
+
+# =============================================================================
+# 3. RELATION EXTRACTION
+# =============================================================================
+
+def extract_reference_relations(law_name: str, paragraphs: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Byg explicit_reference og hierarchical relationer for én lov
+
+    Args:
+        law_name: Lovens titel (fx 'Ligningsloven') - bruges til at genkende egne referencer
+        paragraphs: [{'id', 'content', 'metadata'}] fx fra paragraphs_from_chunks
+
+    Returns:
+        (relationer inden for loven, referencer til andre love). Relationerne har
+        samme format som GraphRetrieverImplementation._validate_and_format_relation
+        plus auto_generated/subtype; cross-law relationer har desuden 'target_law'.
+    """
+    nodes = {paragraph['id']: paragraph for paragraph in paragraphs}
+    own_law = law_name.lower()
+    relations: Dict[Tuple[str, str, str], Dict] = {}
+    cross_law: Dict[Tuple[str, str, str], Dict] = {}
+
+    def add(source, target, relation_type, strength, explanation, subtype, target_law=None):
+        if source == target:
+            return
+        key = (source, target, target_law or '')
+        store = cross_law if target_law else relations
+        existing = store.get(key)
+        # Behold den stærkeste forekomst (tekst > familie > note)
+        if existing and _strength_rank(existing['strength']) >= _strength_rank(strength):
+            return
+        relation = {
+            'source': source,
+            'target': target,
+            'type': relation_type,
+            'strength': strength,
+            'explanation': explanation,
+            'auto_generated': True,
+            'subtype': subtype,
+        }
+        if target_law:
+            relation['target_law'] = target_law
+        store[key] = relation
+
+    for node_id, paragraph in nodes.items():
+        metadata = paragraph.get('metadata', {})
+
+        # 1. Hierarki: forælder indeholder barn
+        parent = metadata.get('parent_paragraph')
+        if parent and parent in nodes:
+            add(parent, node_id, 'hierarchical', STRENGTH_STRUCTURAL,
+                f"Hierarkisk relation: {parent} indeholder {node_id}", metadata.get('entity_type', ''))
+
+        # 2. Paragraf-familier (§ 2 og § 2 A osv.) på paragraf-niveau
+        source_paragraph = normalize_paragraph(node_id.split(',')[0])
+        for related_id in metadata.get('related_paragraphs', []):
+            related_paragraph = normalize_paragraph(related_id.split(',')[0])
+            if related_paragraph != source_paragraph and related_paragraph in nodes and source_paragraph in nodes:
+                pair = sorted((source_paragraph, related_paragraph))
+                add(pair[0], pair[1], 'hierarchical', STRENGTH_FAMILY,
+                    f"Paragraf-familie: {pair[0]} og {pair[1]}", 'paragraph_family')
+
+        # 3. Eksplicitte referencer i tekst, entities og noter
+        sources = [(paragraph.get('content', ''), STRENGTH_TEXT, 'text')]
+        sources += [(entity, STRENGTH_TEXT, 'entities') for entity in metadata.get('entities', [])]
+        sources += [(note, STRENGTH_NOTE, 'note') for note in metadata.get('notes_text', [])]
+
+        for text, strength, origin in sources:
+            for law_title, reference in parse_references(text):
+                if law_title and law_title.lower() != own_law:
+                    add(node_id, reference, 'explicit_reference', strength,
+                        f"{node_id} henviser til {law_title.lower()}s {reference}", origin, target_law=law_title)
+                    continue
+
+                target = reference if reference.startswith('§') else f"{source_paragraph}, {reference}"
+                # "stk. 2" i et nr. refererer til stk. i samme paragraf
+                resolved = resolve_reference(target, nodes)
+                if not resolved or node_id == resolved or node_id.startswith(resolved + ','):
+                    # Egen overskrift ("§ 1. ...") eller henvisning til egen forælder
+                    continue
+                add(node_id, resolved, 'explicit_reference', strength,
+                    f"{node_id} henviser til {resolved}", origin)
+
+    return list(relations.values()), list(cross_law.values())
+
+
+def _strength_rank(strength) -> float:
+    ranks = {'weak': 0.3, 'medium': 0.6, 'strong': 1.0}
+    return ranks.get(strength, strength) if isinstance(strength, str) else float(strength)
+
+
+def extract_corpus(records: Iterable[Dict]) -> Dict[str, Dict]:
+    """
+    Kør extraction for hele korpusset (alle love) i ét gennemløb
+
+    Returns:
+        law_title -> {'paragraphs', 'relations', 'cross_law_relations'}
+    """
+    result = {}
+    for law, paragraphs in paragraphs_from_chunks(records).items():
+        relations, cross_law = extract_reference_relations(law, paragraphs)
+        result[law] = {'paragraphs': paragraphs, 'relations': relations, 'cross_law_relations': cross_law}
+    return result
+
+
+# =============================================================================
+# 4. CLI - byg og gem grafer for hele korpusset
+# =============================================================================
+
+def _iter_jsonl(paths: List[str]) -> Iterable[Dict]:
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def main():
+    """Byg deterministiske reference-grafer og gem dem som CompactGraph"""
+    from compact_graph import CompactGraph
+
+    parser = argparse.ArgumentParser(description='Regelbaseret citations-graf fra *_chunks.jsonl')
+    parser.add_argument('chunk_files', nargs='+', help='Chunk filer (*_chunks.jsonl)')
+    parser.add_argument('--output', help='Gem grafer som CompactGraph i denne mappe (én undermappe per lov)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    corpus = extract_corpus(_iter_jsonl(args.chunk_files))
+    elapsed = time.perf_counter() - start
+
+    print("🔗 DETERMINISTISK REFERENCE EXTRACTION")
+    print("=" * 50)
+    for law, extracted in sorted(corpus.items()):
+        relations = extracted['relations']
+        by_type = defaultdict(int)
+        for relation in relations:
+            by_type[f"{relation['type']}/{relation['subtype']}"] += 1
+        print(f"📘 {law}: {len(extracted['paragraphs'])} noder, {len(relations)} relationer, "
+              f"{len(extracted['cross_law_relations'])} til andre love")
+        for name, count in sorted(by_type.items()):
+            print(f"   {name}: {count}")
+
+        if args.output:
+            nodes = (
+                {'id': p['id'], 'chunk_id': p['metadata'].get('chunk_id'), 'entity_type': p['metadata'].get('entity_type')}
+                for p in extracted['paragraphs']
+            )
+            path = f"{args.output}/{law.lower()}"
+            CompactGraph.from_edges(law.lower(), nodes, relations).save(path)
+            print(f"   💾 Gemt i {path}")
+
+    print(f"\n⏱️ {elapsed:.2f}s for {len(corpus)} love (ingen LLM kald)")
+
+
+if __name__ == "__main__":
+    main()
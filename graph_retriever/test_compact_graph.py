@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Test CompactGraph - CSR opbygning, persistens (generationer, mmap) og nabo-opslag
+================================================================================
+
+KØRSEL:
+    python -m pytest graph_retriever/test_compact_graph.py -q
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Modulerne i graph_retriever importerer hinanden flat (fx "from graph_core import ...")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compact_graph import ARRAY_FILES, METADATA_FILE, NEIGHBORHOOD_FILES, CompactGraph
+
+NODES = [
+    {'id': '§ 1', 'chunk_id': 'c1', 'entity_type': 'paragraph'},
+    {'id': '§ 1, stk. 1', 'chunk_id': 'c11', 'entity_type': 'stykke'},
+    {'id': '§ 2', 'chunk_id': 'c2', 'entity_type': 'paragraph'},
+    {'id': '§ 3', 'chunk_id': None, 'entity_type': 'paragraph'},   # virtuel node uden tekst
+    {'id': '§ 4', 'chunk_id': 'c4', 'type': 'paragraph'},
+]
+EDGES = [
+    {'source': '§ 1', 'target': '§ 1, stk. 1', 'type': 'hierarchical', 'strength': 'strong'},
+    {'source': '§ 1', 'target': '§ 2', 'type': 'references', 'strength': 'medium'},
+    {'source': '§ 2', 'target': '§ 3', 'type': 'references', 'strength': 'weak'},
+    {'source': '§ 3', 'target': '§ 4', 'type': 'exception', 'strength': 0.5},
+    {'source': '§ 1', 'target': '§ 99', 'type': 'references'},                      # ukendt node
+    {'source': '§ 2', 'target': '§ 2', 'type': 'references'},                       # selv-løkke
+]
+
+
+@pytest.fixture
+def graph():
+    return CompactGraph.from_edges("Ligningsloven", NODES, EDGES)
+
+
+def assert_same_graph(a: CompactGraph, b: CompactGraph):
+    assert a.law_name == b.law_name
+    assert a.node_ids == b.node_ids
+    assert a.chunk_ids == b.chunk_ids
+    assert a.node_types == b.node_types
+    assert a.relation_types == b.relation_types
+    for name in ARRAY_FILES:
+        np.testing.assert_array_equal(np.asarray(getattr(a, name)), np.asarray(getattr(b, name)))
+
+
+# --- Opbygning ---
+
+def test_from_edges_builds_undirected_csr(graph):
+    assert len(graph) == 5
+    assert graph.num_relations == 4                       # ukendt node og selv-løkke springes over
+    assert graph.node_types[4] == 'paragraph'             # 'type' bruges når 'entity_type' mangler
+    assert graph.indptr.tolist() == [0, 2, 3, 5, 7, 8]
+
+    assert sorted(graph.neighbors('§ 1')) == [('§ 1, stk. 1', 'hierarchical', 1.0),
+                                              ('§ 2', 'references', pytest.approx(0.6))]
+    # Urettet: relationen ligger også i target-noden, markeret som reverse
+    neighbors = graph.neighbors('§ 1, stk. 1')
+    assert neighbors == [('§ 1', 'hierarchical', 1.0)]
+    assert graph.edge_reverse[graph.indptr[1]]
+
+
+def test_from_arrays_round_trips_edge_arrays(graph):
+    sources, targets, types, strengths = graph.edge_arrays()
+    rebuilt = CompactGraph.from_arrays(graph.law_name, graph.node_ids, graph.chunk_ids, graph.node_types,
+                                       graph.relation_types, sources, targets, types, strengths)
+    assert_same_graph(graph, rebuilt)
+    assert sources.tolist() == [0, 0, 2, 3]
+    assert targets.tolist() == [1, 2, 3, 4]
+    np.testing.assert_allclose(strengths, [1.0, 0.6, 0.3, 0.5])
+
+
+def test_from_arrays_without_edges():
+    graph = CompactGraph.from_arrays("Tom", ['a', 'b'], [None, None], ['', ''], [], [], [], [], [])
+    assert graph.indptr.tolist() == [0, 0, 0]
+    assert graph.num_relations == 0
+    assert graph.neighbors('a') == []
+
+
+def test_from_arrays_rejects_too_many_relation_types():
+    relation_types = [f"type_{i}" for i in range(300)]
+    with pytest.raises(ValueError):
+        CompactGraph.from_arrays("Lov", ['a'], [None], [''], relation_types, [], [], [], [])
+
+
+# --- Persistens ---
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_round_trip(graph, tmp_path, mmap):
+    directory = str(tmp_path / "ligningsloven")
+    assert not CompactGraph.exists(directory)
+    graph.save(directory)
+    assert CompactGraph.exists(directory)
+
+    loaded = CompactGraph.load(directory, mmap=mmap)
+    assert_same_graph(graph, loaded)
+    assert loaded.neighbors('§ 2') == graph.neighbors('§ 2')
+    for name in ARRAY_FILES:
+        assert isinstance(getattr(loaded, name), np.memmap) == mmap
+
+
+def test_save_switches_generation_and_removes_old_arrays(graph, tmp_path):
+    directory = str(tmp_path / "graf")
+    graph.save(directory)
+    first = CompactGraph.load(directory)
+    with open(os.path.join(directory, METADATA_FILE), encoding='utf-8') as f:
+        first_generation = json.load(f)['generation']
+
+    smaller = CompactGraph.from_edges("Ligningsloven", NODES[:2], EDGES[:1])
+    smaller.save(directory)
+    with open(os.path.join(directory, METADATA_FILE), encoding='utf-8') as f:
+        second_generation = json.load(f)['generation']
+
+    assert second_generation != first_generation
+    files = sorted(name for name in os.listdir(directory) if name.endswith(".npy"))
+    assert files == sorted(f"{name}-{second_generation}.npy" for name in ARRAY_FILES)
+    assert not any(name.endswith(".tmp") for name in os.listdir(directory))
+
+    # Den nye generation indlæses; den allerede memory-mappede graf kan stadig læses
+    assert_same_graph(smaller, CompactGraph.load(directory))
+    assert first.neighbors('§ 2') == graph.neighbors('§ 2')
+
+
+def test_load_rejects_unknown_format_version(graph, tmp_path):
+    directory = str(tmp_path / "graf")
+    graph.save(directory)
+    path = os.path.join(directory, METADATA_FILE)
+    with open(path, encoding='utf-8') as f:
+        metadata = json.load(f)
+    metadata['format_version'] = 999
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+
+    with pytest.raises(ValueError):
+        CompactGraph.load(directory)
+
+
+# --- Opslag ---
+
+def test_node_for_chunk(graph):
+    assert graph.node_for_chunk('c2') == '§ 2'
+    assert graph.node_for_chunk('c11') == '§ 1, stk. 1'
+    assert graph.node_for_chunk('ukendt') is None
+    assert graph.chunk_id_for('§ 3') is None
+    assert graph.chunk_id_for('§ 99') is None
+
+
+def test_related_and_strongest_related(graph):
+    assert graph.related('§ 1', max_depth=1) == ['§ 1, stk. 1', '§ 2']
+    assert graph.related('§ 1', max_depth=2) == ['§ 1, stk. 1', '§ 2', '§ 3']
+    assert graph.related('§ 99') == []
+
+    strongest = graph.strongest_related('§ 1', max_depth=3)
+    assert [node for node, _ in strongest] == ['§ 1, stk. 1', '§ 2', '§ 3', '§ 4']
+    assert strongest[2][1] == pytest.approx(0.6 * 0.3)
+    assert graph.strongest_related('§ 1', max_depth=3, limit=2) == strongest[:2]
+
+
+def test_top_neighbors_without_table_falls_back_to_traversal(graph):
+    assert not graph.has_neighborhoods
+    # Noder uden chunk_id (§ 3) udelades - de har ingen tekst at hente, men § 4 nås gennem § 3
+    assert [node for node, _ in graph.top_neighbors('§ 2')] == ['§ 1', '§ 1, stk. 1', '§ 4']
+    assert len(graph.top_neighbors('§ 2', limit=1)) == 1
+    assert graph.top_neighbors('§ 99') == []
+
+
+def test_top_neighbors_with_table(graph, tmp_path):
+    neighbor_index = np.full((len(graph), 3), -1, dtype=np.int32)
+    neighbor_score = np.zeros((len(graph), 3), dtype=np.float32)
+    neighbor_index[0] = [2, 1, -1]
+    neighbor_score[0] = [1.0, 0.5, 0.0]
+    graph.set_neighborhoods(neighbor_index, neighbor_score, {'method': 'ppr', 'top_n': 3})
+
+    assert graph.top_neighbors('§ 1') == [('§ 2', 1.0), ('§ 1, stk. 1', 0.5)]
+    assert graph.top_neighbors('§ 1', limit=1) == [('§ 2', 1.0)]
+    assert graph.top_neighbors('§ 4') == []                # tom række
+
+    # Tabellen følger med ved save/load
+    directory = str(tmp_path / "graf")
+    graph.save(directory)
+    for name in NEIGHBORHOOD_FILES:
+        assert any(filename.startswith(name + "-") for filename in os.listdir(directory))
+    loaded = CompactGraph.load(directory)
+    assert loaded.neighborhood_info == {'method': 'ppr', 'top_n': 3}
+    assert loaded.top_neighbors('§ 1') == graph.top_neighbors('§ 1')
+
+
+def test_set_neighborhoods_rejects_wrong_shape(graph):
+    with pytest.raises(ValueError):
+        graph.set_neighborhoods(np.zeros((2, 3), dtype=np.int32), np.zeros((2, 3), dtype=np.float32), {})
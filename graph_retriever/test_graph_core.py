@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test GraphCore - indekser, fjernelse af kanter og traversering
+==============================================================
+
+KØRSEL:
+    python -m pytest graph_retriever/test_graph_core.py -q
+"""
+
+import os
+import sys
+
+import pytest
+
+# Modulerne i graph_retriever importerer hinanden flat (fx "from graph_core import ...")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from graph_core import GraphCore
+
+
+def edge(source, target, relation_type='references', strength='medium'):
+    return {'source': source, 'target': target, 'type': relation_type, 'strength': strength}
+
+
+@pytest.fixture
+def core():
+    return GraphCore([
+        edge('§ 1', '§ 2', 'hierarchical', 'strong'),
+        edge('§ 1', '§ 3'),
+        edge('§ 2', '§ 3', 'exception', 'weak'),
+        edge('§ 3', '§ 4'),
+        edge('§ 4', '§ 4'),                                   # selv-løkke
+    ])
+
+
+def assert_consistent(core):
+    """Indekserne indeholder præcis kanterne i core.edges"""
+    ids = sorted(id(e) for e in core.edges)
+    assert sorted(id(e) for edges in core.outgoing.values() for e in edges) == ids
+    assert sorted(id(e) for edges in core.incoming.values() for e in edges) == ids
+    assert sorted(id(e) for edges in core.edges_by_type.values() for e in edges) == ids
+
+
+def test_remove_edge_updates_all_indexes_and_keeps_order(core):
+    removed = core.edges[1]
+    core.remove_edge(removed)
+
+    assert [(e['source'], e['target']) for e in core.edges] == [('§ 1', '§ 2'), ('§ 2', '§ 3'), ('§ 3', '§ 4'),
+                                                                ('§ 4', '§ 4')]
+    assert core.degree('§ 1') == 1
+    assert not core.has_edge_between('§ 1', '§ 3')
+    assert core.bfs('§ 1', max_depth=1) == {'§ 2': 1}
+    assert len(core.edges_of_type('references')) == 2
+    assert_consistent(core)
+
+
+def test_remove_many_edges_then_read(core):
+    for e in [e for e in core.edges if e['type'] != 'hierarchical']:
+        core.remove_edge(e)
+
+    assert [(e['source'], e['target']) for e in core.edges] == [('§ 1', '§ 2')]
+    assert core.edges_of_type('exception') == []
+    assert 'references' not in core.edges_by_type
+    assert core.degree('§ 4') == 0
+    assert_consistent(core)
+
+
+def test_remove_self_loop_and_unknown_edge(core):
+    loop = core.edges[-1]
+    core.remove_edge(loop)
+    core.remove_edge(loop)                                    # allerede fjernet - ingen effekt
+    core.remove_edge(edge('§ 1', '§ 2', 'hierarchical', 'strong'))  # lig dict, men ikke samme objekt
+
+    assert len(core.edges) == 4
+    assert core.degree('§ 4') == 1
+    assert_consistent(core)
+
+
+def test_readd_removed_edge_before_compaction(core):
+    e = core.edges[0]
+    core.remove_edge(e)
+    core.add_edge(e)
+
+    assert [id(x) for x in core.edges].count(id(e)) == 1
+    assert core.edges[-1] is e
+    assert core.has_edge_between('§ 1', '§ 2', 'hierarchical')
+    assert_consistent(core)
+
+
+def test_set_edges_with_own_edges_after_removal(core):
+    core.remove_edge(core.edges[0])
+    core.set_edges(core.edges)
+
+    assert len(core.edges) == 4
+    assert_consistent(core)
+
+
+def test_weighted_traversal_after_removal(core):
+    assert [node for node, _ in core.weighted_traversal('§ 1', max_depth=2)] == ['§ 2', '§ 3', '§ 4']
+    core.remove_edge(core.edges[1])                           # § 1 -> § 3 (medium)
+
+    ranked = core.weighted_traversal('§ 1', max_depth=2)
+    assert [node for node, _ in ranked] == ['§ 2', '§ 3']
+    assert ranked[1][1] == pytest.approx(1.0 * 0.3)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+TOKEN COUNTER - Tokenizer-præcis optælling til batching og omkostningsestimat
+============================================================================
+
+Bruger tiktoken med modellens encoding (o200k_base for gpt-4o, ellers
+cl100k_base). Hvis tiktoken ikke er installeret eller encoding-filen ikke
+kan hentes (offline miljø), bruges en lokal approksimation der tæller ord,
+tal og tegnsætning som BPE gør, og som kalibreres løbende mod de faktiske
+prompt_tokens OpenAI returnerer.
+
+BRUG:
+    counter = TokenCounter("gpt-4o-2024-08-06")
+    counter.count("§ 15 O. Fradrag ...")
+    counter.record_actual(predicted=1200, actual=1187)
+    counter.report()
+"""
+
+import math
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Encodings at prøve i rækkefølge, hvis modellen ikke kendes af tiktoken-versionen
+_FALLBACK_ENCODINGS = ("o200k_base", "cl100k_base")
+
+# Tokens per besked i chat formatet (rolle + separatorer)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Ord, tal og enkelt-tegn - samme opdeling som BPE's pre-tokenizer
+_PIECES = re.compile(r"[A-Za-zÆØÅæøåÉéÜüÖöÄä]+|\d+|[^\sA-Za-zÆØÅæøåÉéÜüÖöÄä\d]")
+
+
+def _load_encoding(model: str):
+    """tiktoken encoding for modellen - None hvis tiktoken/encodings ikke er tilgængelige"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        pass
+    for name in _FALLBACK_ENCODINGS:
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception:
+            continue
+    return None
+
+
+def approximate_tokens(text: str) -> int:
+    """
+    Lokal BPE-approksimation: korte ord er ét token, lange danske ord
+    splittes i ~4 tegns stykker, tal i grupper af 3, tegnsætning ét token hver
+    """
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        if piece.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        elif piece[0].isalpha():
+            tokens += 1 if len(piece) <= 4 else math.ceil(len(piece) / 4)
+        else:
+            tokens += 1
+    return tokens
+
+
+class TokenCounter:
+    """Tokenizer-præcis optælling med kalibrering mod faktiske API tal"""
+
+    def __init__(self, model: str = "gpt-4o-2024-08-06"):
+        self.model = model
+        self._encoding = _load_encoding(model)
+        self._lock = threading.Lock()
+        self.measurements: List[Tuple[int, int]] = []  # (predicted, actual)
+
+    @property
+    def exact(self) -> bool:
+        """Bruges en rigtig tiktoken encoding?"""
+        return self._encoding is not None
+
+    @property
+    def name(self) -> str:
+        return f"tiktoken:{self._encoding.name}" if self.exact else "approx-bpe"
+
+    @property
+    def calibration(self) -> float:
+        """Faktor faktiske/forudsagte tokens (1.0 indtil der er målinger)"""
+        with self._lock:
+            predicted = sum(p for p, _ in self.measurements)
+            actual = sum(a for _, a in self.measurements)
+        return actual / predicted if predicted else 1.0
+
+    def count(self, text: str) -> int:
+        """Antal tokens i en tekst"""
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return approximate_tokens(text)
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        """Prompt tokens for en chat besked-liste (inkl. format-overhead)"""
+        return sum(self.count(message.get('content', '')) + MESSAGE_OVERHEAD_TOKENS for message in messages) + 3
+
+    def record_actual(self, predicted: int, actual: Optional[int]) -> None:
+        """Gem forudsagt vs. faktisk prompt_tokens fra et API svar"""
+        if actual:
+            with self._lock:
+                self.measurements.append((predicted, actual))
+
+    def report(self) -> Dict[str, float]:
+        """Sammenlign forudsagte og faktiske prompt tokens"""
+        with self._lock:
+            measurements = list(self.measurements)
+        if not measurements:
+            return {'calls': 0}
+
+        predicted = sum(p for p, _ in measurements)
+        actual = sum(a for _, a in measurements)
+        errors = [abs(p - a) / a for p, a in measurements if a]
+        return {
+            'calls': len(measurements),
+            'predicted_tokens': predicted,
+            'actual_tokens': actual,
+            'mean_abs_error_pct': 100 * sum(errors) / len(errors) if errors else 0.0,
+            'calibration': actual / predicted if predicted else 1.0
+        }
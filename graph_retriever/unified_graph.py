@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+UNIFIED GRAPH - Én graf på tværs af love
+=======================================
+
+Skatteretlige spørgsmål krydser love (fx KSL § 1 skattepligt -> LL fradrag),
+men hver lov har sin egen graf. Her flettes per-lov graferne til én
+CompactGraph med globale node ids og krydshenvisninger som kanter:
+
+    global id:  "<lov>:<node id>"   fx "ligningsloven:§ 9, stk. 1"
+    kanter:     alle relationer fra lov-graferne (samme type og styrke)
+                + cross_law_reference fra "kildeskattelovens § 1" osv.
+
+Krydshenvisninger kommer fra reference_extractor (cross_law_relations med
+'target_law') og opløses mod mållovens noder (nr -> stk -> paragraf).
+Henvisninger til love uden graf (fx personskatteloven) springes over.
+
+Traversering, naboskaber (graph_neighborhoods) og chunk_id opslag virker
+dermed på tværs af love via ét indeks.
+
+BRUG:
+    unified = merge_graphs(law_graphs, cross_law_relations)
+    unified.top_neighbors("kildeskatteloven:§ 1, stk. 1", limit=5)
+
+    python unified_graph.py ../multihop_rag/chunker/output/*_chunks.jsonl --output graphs
+"""
+
+import argparse
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from compact_graph import CompactGraph
+from graph_core import edge_weight
+from reference_extractor import resolve_reference
+
+UNIFIED_GRAPH_NAME = "unified"
+CROSS_LAW_RELATION = "cross_law_reference"
+GLOBAL_ID_SEPARATOR = ":"
+
+
+def global_id(law_name: str, node_id: str) -> str:
+    """'Ligningsloven', '§ 9, stk. 1' -> 'ligningsloven:§ 9, stk. 1'"""
+    return f"{law_name.lower()}{GLOBAL_ID_SEPARATOR}{node_id}"
+
+
+def split_global_id(node_id: str) -> Tuple[Optional[str], str]:
+    """'ligningsloven:§ 9' -> ('ligningsloven', '§ 9'); lokale ids giver (None, id)"""
+    law, separator, local_id = node_id.partition(GLOBAL_ID_SEPARATOR)
+    return (law, local_id) if separator else (None, node_id)
+
+
+def merge_graphs(graphs: Iterable[CompactGraph],
+                 cross_law_relations: Optional[Dict[str, List[Dict]]] = None) -> CompactGraph:
+    """
+    Flet per-lov grafer til én graf med globale ids og krydshenvisninger
+
+    Args:
+        graphs: CompactGraph per lov (law_name bruges som prefix)
+        cross_law_relations: kilde-lov -> relationer med 'source', 'target', 'target_law'
+                             og 'strength' (fra extract_reference_relations)
+    """
+    graphs = [graph for graph in graphs if graph.law_name != UNIFIED_GRAPH_NAME]
+    node_ids, chunk_ids, node_types = [], [], []
+    relation_types: List[str] = []
+    type_index: Dict[str, int] = {}
+    sources, targets, types, strengths = [], [], [], []
+    offsets: Dict[str, int] = {}
+
+    # Relationer fra lov-graferne - flyttes blokvis med lovens offset
+    for graph in graphs:
+        offset = len(node_ids)
+        offsets[graph.law_name.lower()] = offset
+        node_ids.extend(global_id(graph.law_name, node_id) for node_id in graph.node_ids)
+        chunk_ids.extend(graph.chunk_ids)
+        node_types.extend(graph.node_types)
+
+        remap = np.asarray([type_index.setdefault(name, len(type_index)) for name in graph.relation_types],
+                           dtype=np.int64)
+        graph_sources, graph_targets, graph_types, graph_strengths = graph.edge_arrays()
+        sources.append(graph_sources + offset)
+        targets.append(graph_targets + offset)
+        types.append(remap[graph_types.astype(np.int64)] if len(remap) else graph_types.astype(np.int64))
+        strengths.append(graph_strengths)
+
+    # Krydshenvisninger - opløses mod mållovens noder
+    by_law = {graph.law_name.lower(): graph for graph in graphs}
+    cross_type = type_index.setdefault(CROSS_LAW_RELATION, len(type_index))
+    cross = {}
+    for source_law, relations in (cross_law_relations or {}).items():
+        source_graph = by_law.get(source_law.lower())
+        if source_graph is None:
+            continue
+        for relation in relations:
+            target_graph = by_law.get(relation.get('target_law', '').lower())
+            source = source_graph.index_of(relation['source'])
+            if target_graph is None or source is None:
+                continue
+            target_id = resolve_reference(relation['target'], target_graph._index)
+            if target_id is None:
+                continue
+            key = (offsets[source_graph.law_name.lower()] + source,
+                   offsets[target_graph.law_name.lower()] + target_graph.index_of(target_id))
+            # Behold stærkeste forekomst per par
+            cross[key] = max(cross.get(key, 0.0), edge_weight(relation))
+
+    if cross:
+        pairs = np.asarray(list(cross), dtype=np.int64)
+        sources.append(pairs[:, 0])
+        targets.append(pairs[:, 1])
+        types.append(np.full(len(pairs), cross_type, dtype=np.int64))
+        strengths.append(np.asarray(list(cross.values()), dtype=np.float32))
+
+    relation_types = [name for name, _ in sorted(type_index.items(), key=lambda item: item[1])]
+    concat = lambda parts, dtype: np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+    return CompactGraph.from_arrays(
+        UNIFIED_GRAPH_NAME, node_ids, chunk_ids, node_types, relation_types,
+        concat(sources, np.int64), concat(targets, np.int64), concat(types, np.uint8), concat(strengths, np.float32)
+    )
+
+
+def cross_law_statistics(graph: CompactGraph) -> Dict[str, int]:
+    """Antal krydshenvisninger per (kilde-lov -> mål-lov)"""
+    if CROSS_LAW_RELATION not in graph.relation_types:
+        return {}
+    sources, targets, types, _ = graph.edge_arrays()
+    cross = types == graph.relation_types.index(CROSS_LAW_RELATION)
+    counts: Dict[str, int] = {}
+    for source, target in zip(sources[cross].tolist(), targets[cross].tolist()):
+        key = f"{split_global_id(graph.node_ids[source])[0]} -> {split_global_id(graph.node_ids[target])[0]}"
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def main():
+    """Byg unified graf for hele korpusset fra chunk filer"""
+    from reference_extractor import _iter_jsonl, extract_corpus
+
+    parser = argparse.ArgumentParser(description='Unified graf på tværs af love')
+    parser.add_argument('chunk_files', nargs='+', help='Chunk filer (*_chunks.jsonl)')
+    parser.add_argument('--output', help='Gem unified graf i <output>/unified')
+    parser.add_argument('--top-n', type=int, default=20, help='Forudberegnede naboer per node (0 = ingen)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    corpus = extract_corpus(_iter_jsonl(args.chunk_files))
+    graphs = []
+    for law, extracted in corpus.items():
+        nodes = (
+            {'id': p['id'], 'chunk_id': p['metadata'].get('chunk_id'), 'entity_type': p['metadata'].get('entity_type')}
+            for p in extracted['paragraphs']
+        )
+        graphs.append(CompactGraph.from_edges(law.lower(), nodes, extracted['relations']))
+    unified = merge_graphs(graphs, {law: extracted['cross_law_relations'] for law, extracted in corpus.items()})
+
+    if args.top_n > 0:
+        from graph_neighborhoods import compute_neighborhoods
+        compute_neighborhoods(unified, top_n=args.top_n)
+
+    print("🌐 UNIFIED GRAPH")
+    print("=" * 50)
+    print(f"📘 {len(graphs)} love, {len(unified)} noder, {unified.num_relations} relationer "
+          f"på {time.perf_counter() - start:.2f}s")
+    for pair, count in sorted(cross_law_statistics(unified).items()):
+        print(f"   🔗 {pair}: {count}")
+
+    if args.output:
+        path = f"{args.output}/{UNIFIED_GRAPH_NAME}"
+        unified.save(path)
+        print(f"💾 Gemt i {path}")
+
+
+if __name__ == "__main__":
+    main()
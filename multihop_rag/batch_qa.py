@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+BATCH QA - Kør mange spørgsmål gennem MultihopJuridiskRAG eller JAILA
+====================================================================
+
+Til evaluering og bulk-kørsler (fx natlig regressionstest af svarkvalitet
+og pris på et fast spørgsmålssæt):
+
+- Bounded concurrency: --concurrency spørgsmål ad gangen
+- Delte caches: én varm motor (rag_service / JAILA.service) for hele batchen
+- Checkpoint: hver besvaret linje skrives straks til output; en afbrudt
+  kørsel genoptages ved at køre samme kommando igen (færdige id'er springes over).
+  Efter kørslen omskrives output med én linje per id (den nyeste), og
+  statistikken dækker hele checkpoint filen - ikke kun den seneste kørsel
+
+INPUT (JSONL):  {"id": "q1", "question": "..."}   (id er valgfri - default linjenummer)
+OUTPUT (JSONL): id, question, engine, answer, latency, tokens (prompt/completion/total,
+                cost_usd, requests), hops, sources, error
+
+Token forbrug og pris tælles via LangChain's OpenAI callback og dækker kun
+LLM kaldene - query embeddings (SearchEngine.embed_query,
+JAILA.hybrid_search.generate_embedding_directly) kaldes uden om LangChain
+og er ikke med.
+
+BRUG:
+    python batch_qa.py questions.jsonl -o answers.jsonl
+    python batch_qa.py questions.jsonl -o answers.jsonl --engine jaila --concurrency 2
+    python batch_qa.py questions.jsonl -o answers.jsonl --retry-errors --summary summary.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Set
+
+import numpy as np
+from langchain.callbacks import get_openai_callback
+
+# Repo-roden (til JAILA pakken)
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+class MultihopEngine:
+    """MultihopJuridiskRAG.ask via den delte RAGService"""
+
+    name = "multihop"
+
+    def __init__(self, weaviate_url: str = "http://localhost:8080", verbose: bool = False):
+        from rag_service import get_service
+        self.service = get_service(weaviate_url, verbose=verbose)
+
+    def warm_up(self) -> None:
+        self.service.warm_up()
+
+    def answer(self, question: str) -> Dict:
+        result = self.service.rag.ask(question)
+        return {
+            "answer": result.get("answer", ""),
+            "hops": result.get("hops_performed", 1 if result.get("document_count") else 0),
+            "confidence": result.get("confidence"),
+            "sources": [{"reference": source["reference"], "chunk_id": source["chunk_id"],
+                         "type": source["type"], "hop": source["hop"]}
+                        for source in result.get("sources", [])]
+        }
+
+
+class JAILAEngine:
+    """JAILA.juridisk_søgning (robust søgning + ét LLM kald) via JAILA.service"""
+
+    name = "jaila"
+
+    def __init__(self, model: str = None):
+        from JAILA.config import DEFAULT_MODEL
+        from JAILA.retrieval import juridisk_søgning
+        self.search = juridisk_søgning
+        self.model = model or DEFAULT_MODEL
+
+    def warm_up(self) -> None:
+        from JAILA.service import get_service
+        get_service().warm_up(model=self.model)
+
+    def answer(self, question: str) -> Dict:
+        result = self.search(question, model=self.model)
+        documents = result.get("source_documents", [])
+        return {
+            "answer": result.get("answer", ""),
+            "hops": 1 if documents else 0,
+            "sources": [{key: doc.metadata.get(key) for key in ("title", "paragraph", "stk", "nr")}
+                        for doc in documents]
+        }
+
+
+def load_questions(path: str) -> List[Dict]:
+    """Læs spørgsmål fra JSONL (id default = linjenummer)"""
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not item.get("question"):
+                print(f"⚠️ Linje {line_number}: intet 'question' felt - springes over")
+                continue
+            questions.append({"id": str(item.get("id", line_number)), "question": item["question"]})
+    return questions
+
+
+def load_rows(output_path: str) -> Dict[str, Dict]:
+    """Linjer i output (checkpoint) per id - står et id der flere gange (--retry-errors), gælder den sidste"""
+    rows = {}
+    if not os.path.exists(output_path):
+        return rows
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Halv linje fra en afbrudt kørsel
+            # pop: et genkørt id flyttes til sin nyeste position
+            rows.pop(str(row["id"]), None)
+            rows[str(row["id"])] = row
+    return rows
+
+
+def completed_ids(output_path: str, retry_errors: bool = False) -> Set[str]:
+    """Id'er der allerede står i output (checkpoint) - fejlede tæller ikke med retry_errors"""
+    return {row_id for row_id, row in load_rows(output_path).items()
+            if not (retry_errors and row.get("error"))}
+
+
+def compact_output(output_path: str) -> Dict[str, Dict]:
+    """Omskriv output med én linje per id (den sidste) - atomisk, så checkpointet aldrig går tabt"""
+    rows = load_rows(output_path)
+    temp_path = output_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for row in rows.values():
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(temp_path, output_path)
+    return rows
+
+
+def run_question(engine, item: Dict) -> Dict:
+    """Besvar ét spørgsmål og mål latency og token forbrug"""
+    row = {"id": item["id"], "question": item["question"], "engine": engine.name,
+           "answer": None, "hops": 0, "sources": [], "error": None}
+    start = time.perf_counter()
+    # Tæller kun dette spørgsmåls LLM kald - også dem i RAG'ens thread pool
+    with get_openai_callback() as usage:
+        try:
+            row.update(engine.answer(item["question"]))
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+    row["latency"] = round(time.perf_counter() - start, 3)
+    row["tokens"] = {
+        "prompt": usage.prompt_tokens,
+        "completion": usage.completion_tokens,
+        "total": usage.total_tokens,
+        "cost_usd": round(usage.total_cost, 6),
+        "requests": usage.successful_requests
+    }
+    return row
+
+
+def run_batch(engine, questions: List[Dict], output_path: str, concurrency: int = 4) -> List[Dict]:
+    """Kør spørgsmål med bounded concurrency og skriv hver linje så snart den er færdig"""
+    rows = []
+    with open(output_path, 'a', encoding='utf-8') as output, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-qa") as executor:
+        futures = [executor.submit(run_question, engine, item) for item in questions]
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            output.write(json.dumps(row, ensure_ascii=False) + "\n")
+            output.flush()
+            rows.append(row)
+            status = "❌" if row["error"] else "✅"
+            print(f"   {status} [{done}/{len(questions)}] {row['id']}: {row['latency']:.1f}s, "
+                  f"{row['tokens']['total']} tokens, {row['hops']} hops, {len(row['sources'])} kilder")
+    return rows
+
+
+def summarize(rows: List[Dict], wall_seconds: float) -> Dict:
+    """Samlet latency, token forbrug og pris (LLM kald - uden query embeddings) for alle linjer i output"""
+    answered = [row for row in rows if not row["error"]]
+    latencies = np.asarray([row["latency"] for row in answered]) if answered else np.zeros(1)
+    return {
+        "questions": len(rows),
+        "errors": len(rows) - len(answered),
+        "wall_seconds": round(wall_seconds, 2),
+        "latency_p50": round(float(np.percentile(latencies, 50)), 3),
+        "latency_p95": round(float(np.percentile(latencies, 95)), 3),
+        "latency_max": round(float(latencies.max()), 3),
+        "mean_hops": round(float(np.mean([row["hops"] for row in answered])), 2) if answered else 0.0,
+        "total_tokens": sum(row["tokens"]["total"] for row in rows),
+        "cost_usd": round(sum(row["tokens"]["cost_usd"] for row in rows), 4),
+        "cost_excludes": "query embeddings"
+    }
+
+
+def main():
+    """Kør batch QA"""
+    parser = argparse.ArgumentParser(description='Batch spørgsmål gennem MultihopJuridiskRAG eller JAILA')
+    parser.add_argument('questions', help='JSONL med {"id", "question"}')
+    parser.add_argument('-o', '--output', required=True, help='JSONL output (genoptages hvis den findes)')
+    parser.add_argument('--engine', choices=['multihop', 'jaila'], default='multihop')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--weaviate-url', default='http://localhost:8080')
+    parser.add_argument('--model', default=None, help='LLM model (kun jaila)')
+    parser.add_argument('--no-resume', action='store_true', help='Start forfra (overskriver output)')
+    parser.add_argument('--retry-errors', action='store_true', help='Kør fejlede spørgsmål igen ved genoptagelse')
+    parser.add_argument('--summary', help='Skriv samlet statistik som JSON')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    print("📦 BATCH QA")
+    print("=" * 50)
+
+    questions = load_questions(args.questions)
+    if args.no_resume and os.path.exists(args.output):
+        os.remove(args.output)
+    done = completed_ids(args.output, retry_errors=args.retry_errors)
+    pending = [item for item in questions if item["id"] not in done]
+    print(f"   {len(questions)} spørgsmål, {len(done)} allerede besvaret, {len(pending)} tilbage")
+
+    wall_seconds = 0.0
+    if pending:
+        engine = (MultihopEngine(args.weaviate_url, args.verbose) if args.engine == "multihop"
+                  else JAILAEngine(args.model))
+        start = time.perf_counter()
+        engine.warm_up()
+        print(f"   🔥 {engine.name} klar på {time.perf_counter() - start:.1f}s - concurrency {args.concurrency}")
+
+        start = time.perf_counter()
+        run_batch(engine, pending, args.output, args.concurrency)
+        wall_seconds = time.perf_counter() - start
+
+    # Hele checkpointet (også tidligere kørsler), én linje per id
+    rows = list(compact_output(args.output).values()) if os.path.exists(args.output) else []
+    if not rows:
+        return
+    summary = summarize(rows, wall_seconds)
+
+    print(f"\n📊 {summary['questions']} i {args.output} ({summary['errors']} fejl), "
+          f"denne kørsel {len(pending)} på {summary['wall_seconds']:.1f}s")
+    print(f"   Latency p50={summary['latency_p50']:.1f}s p95={summary['latency_p95']:.1f}s "
+          f"max={summary['latency_max']:.1f}s, gns. {summary['mean_hops']} hops")
+    print(f"   Tokens: {summary['total_tokens']}, pris: ${summary['cost_usd']:.4f} (LLM kald - uden query embeddings)")
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"💾 Statistik gemt i {args.summary}")
+
+
+if __name__ == "__main__":
+    main()
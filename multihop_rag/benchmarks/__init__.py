@@ -0,0 +1,11 @@
+"""
+BENCHMARKS - Måling af index-, import- og søgeperformance for multihop_rag
+
+Scripts køres fra multihop_rag mappen:
+    python benchmarks/schema_benchmark.py --help   # HNSW/komprimering recall mod rigtig Weaviate
+    python benchmarks/perf_benchmark.py --help     # Import + query latency (mock eller Weaviate)
+    python benchmarks/retrieval_eval.py --help     # Recall@k/MRR mod golden_queries.jsonl (offline mock)
+
+mock_weaviate.py indeholder en in-memory stand-in for weaviate.Client med
+stubbede embeddings, så benchmarks kan køre uden Weaviate og OpenAI.
+"""
@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+"""
+MOCK WEAVIATE - In-memory stand-in for weaviate.Client (v3 API) til benchmarks
+
+Dækker den del af klienten som import scripts, SearchEngine, simple_search og
+law_partitions bruger:
+- schema: get/exists/create_class/delete_class/update_config/property.create + tenants
+- query.get: with_where, with_near_vector, with_near_text, with_bm25, with_hybrid,
+  with_limit, with_offset, with_additional, with_tenant
+- query.aggregate: with_meta_count, with_where, with_tenant
+- batch: context manager, add_data_object, delete_objects
+
+where filtre valideres mod klassens schema som på serveren: ukendte felter og
+felter med indexFilterable=False giver GraphQL errors (batch.delete_objects
+rejser ValueError).
+
+Embeddings stubbes med deterministisk feature hashing (StubEmbedder), så der
+hverken kræves Weaviate container eller OpenAI nøgle. Vektorsøgning er eksakt
+(brute-force NumPy) - latency tal måler altså vores egen Python-kode, ikke HNSW.
+"""
+
+import copy
+import math
+import re
+import uuid
+import zlib
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Felter text2vec-openai vektoriserer i LegalDocument (se legal_schema.PROPERTY_SPECS)
+_EMBED_FIELD = "text_for_embedding"
+_BM25_FIELDS = ("text", "title", "topic", "heading", "summary", "keywords", "text_for_embedding")
+
+
+def _tokenize(text: Any) -> List[str]:
+    if isinstance(text, list):
+        text = " ".join(str(item) for item in text)
+    return _TOKEN_PATTERN.findall(str(text or "").lower())
+
+
+class StubEmbedder:
+    """Deterministisk hashing-embedding - ens tekst giver ens vektor, ord-overlap giver høj cosine"""
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def embed(self, text: Any) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in _tokenize(text):
+            hashed = zlib.crc32(token.encode("utf-8"))
+            vector[hashed % self.dimensions] += 1.0 if (hashed >> 16) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+
+class StubOpenAI:
+    """Erstatning for openai.OpenAI - kun embeddings.create bruges af SearchEngine"""
+
+    def __init__(self, embedder: StubEmbedder, **kwargs):
+        def create(model: str = None, input: Any = None, dimensions: int = None, **_):
+            inputs = input if isinstance(input, list) else [input]
+            data = [SimpleNamespace(embedding=embedder.embed(text), index=i) for i, text in enumerate(inputs)]
+            return SimpleNamespace(data=data, model=model)
+
+        self.embeddings = SimpleNamespace(create=create)
+
+
+class _Partition:
+    """Objekter for én klasse/tenant med lazy vektor-matrix og BM25 index"""
+
+    def __init__(self):
+        self.objects: List[Dict[str, Any]] = []
+        self._matrix = None
+        self._bm25 = None
+
+    def add(self, obj: Dict[str, Any]) -> None:
+        self.objects.append(obj)
+        self._matrix = None
+        self._bm25 = None
+
+    def remove(self, predicate) -> int:
+        before = len(self.objects)
+        self.objects = [obj for obj in self.objects if not predicate(obj)]
+        self._matrix = None
+        self._bm25 = None
+        return before - len(self.objects)
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            if self.objects:
+                vectors = np.asarray([obj["vector"] for obj in self.objects], dtype=np.float32)
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                self._matrix = vectors / np.maximum(norms, 1e-12)
+            else:
+                self._matrix = np.zeros((0, 0), dtype=np.float32)
+        return self._matrix
+
+    def bm25_index(self):
+        if self._bm25 is None:
+            postings = defaultdict(dict)
+            lengths = []
+            for position, obj in enumerate(self.objects):
+                tokens = []
+                for field in _BM25_FIELDS:
+                    tokens.extend(_tokenize(obj["properties"].get(field)))
+                lengths.append(len(tokens))
+                for token in tokens:
+                    postings[token][position] = postings[token].get(position, 0) + 1
+            average = (sum(lengths) / len(lengths)) if lengths else 0.0
+            self._bm25 = (postings, lengths, average)
+        return self._bm25
+
+
+def _like_to_regex(pattern: str) -> re.Pattern:
+    escaped = re.escape(pattern).replace(r'\*', '.*').replace(r'\?', '.')
+    return re.compile(f'^{escaped}$', re.IGNORECASE | re.DOTALL)
+
+
+def _filter_value(where: Dict[str, Any]) -> Any:
+    for key in ("valueText", "valueString", "valueInt", "valueNumber", "valueBoolean", "valueDate",
+                "valueTextArray", "valueStringArray"):
+        if key in where:
+            return where[key]
+    return None
+
+
+def _where_paths(where: Optional[Dict[str, Any]]) -> List[str]:
+    """Alle property navne et where filter bruger"""
+    if not where:
+        return []
+    if where.get("operator") in ("And", "Or"):
+        return [path for operand in where.get("operands", []) for path in _where_paths(operand)]
+    return [where["path"][-1]]
+
+
+def where_errors(class_obj: Dict[str, Any], where: Optional[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """GraphQL errors Weaviate giver for et where filter (tom liste hvis filteret er gyldigt)"""
+    properties = {prop["name"]: prop for prop in class_obj.get("properties") or []}
+    if not properties:
+        return []  # Auto-schema: klassen er oprettet uden properties
+    errors = []
+    for name in dict.fromkeys(_where_paths(where)):
+        if name == "id" or name.startswith("_"):
+            continue
+        prop = properties.get(name)
+        if prop is None:
+            errors.append({"message": f"no such prop with name '{name}' found in class "
+                                      f"'{class_obj['class']}' in the schema"})
+        # Legacy properties har kun indexInverted - Weaviate default er filterable
+        elif not prop.get("indexFilterable", prop.get("indexInverted", True)):
+            errors.append({"message": f"Filtering by property '{name}' requires inverted index. "
+                                      f"Is `indexFilterable` option of property '{name}' enabled?"})
+    return errors
+
+
+def matches_where(properties: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluér et Weaviate where filter mod et objekts properties"""
+    if not where:
+        return True
+
+    operator = where.get("operator")
+    if operator == "And":
+        return all(matches_where(properties, operand) for operand in where.get("operands", []))
+    if operator == "Or":
+        return any(matches_where(properties, operand) for operand in where.get("operands", []))
+
+    actual = properties.get(where["path"][-1])
+    expected = _filter_value(where)
+    values = actual if isinstance(actual, list) else [actual]
+
+    if operator == "Equal":
+        return any(value == expected for value in values)
+    if operator == "NotEqual":
+        return all(value != expected for value in values)
+    if operator == "Like":
+        regex = _like_to_regex(str(expected))
+        return any(value is not None and regex.match(str(value)) for value in values)
+    if operator == "ContainsAny":
+        return bool(set(values) & set(expected or []))
+    if operator == "ContainsAll":
+        return set(expected or []) <= set(values)
+    if operator == "IsNull":
+        return (actual is None) == bool(expected)
+    if operator in ("GreaterThan", "GreaterThanEqual", "LessThan", "LessThanEqual"):
+        if actual is None:
+            return False
+        return {
+            "GreaterThan": actual > expected,
+            "GreaterThanEqual": actual >= expected,
+            "LessThan": actual < expected,
+            "LessThanEqual": actual <= expected,
+        }[operator]
+
+    raise ValueError(f"Mock understøtter ikke operator: {operator}")
+
+
+class _GetBuilder:
+    """Svarer til weaviate.gql.get.GetBuilder"""
+
+    def __init__(self, db: "InMemoryWeaviate", class_name: str, properties: List[str]):
+        self._db = db
+        self._class_name = class_name
+        self._properties = list(properties) if isinstance(properties, (list, tuple)) else [properties]
+        self._where = None
+        self._near_vector = None
+        self._near_text = None
+        self._bm25 = None
+        self._hybrid = None
+        self._limit = None
+        self._offset = 0
+        self._additional: List[str] = []
+        self._tenant = None
+
+    def with_where(self, where):
+        self._where = where
+        return self
+
+    def with_near_vector(self, content):
+        self._near_vector = content
+        return self
+
+    def with_near_text(self, content):
+        self._near_text = content
+        return self
+
+    def with_bm25(self, query, properties=None):
+        self._bm25 = query
+        return self
+
+    def with_hybrid(self, query, alpha=0.75, vector=None, properties=None, fusion_type=None):
+        self._hybrid = {"query": query, "alpha": alpha, "vector": vector}
+        return self
+
+    def with_limit(self, limit):
+        self._limit = limit
+        return self
+
+    def with_offset(self, offset):
+        self._offset = offset
+        return self
+
+    def with_additional(self, properties):
+        self._additional.extend(properties if isinstance(properties, (list, tuple)) else [properties])
+        return self
+
+    def with_tenant(self, tenant):
+        self._tenant = tenant
+        return self
+
+    def do(self) -> Dict[str, Any]:
+        try:
+            partition = self._db._partition(self._class_name, self._tenant)
+        except KeyError as e:
+            return {"errors": [{"message": str(e)}], "data": None}
+        errors = where_errors(self._db._classes[self._class_name], self._where)
+        if errors:
+            return {"errors": errors, "data": {"Get": {self._class_name: None}}}
+
+        ranked = self._rank(partition)
+        if ranked is None:
+            ranked = ((position, None) for position in range(len(partition.objects)))
+
+        results = []
+        skipped = 0
+        for position, score in ranked:
+            obj = partition.objects[position]
+            if not matches_where(obj["properties"], self._where):
+                continue
+            if skipped < self._offset:
+                skipped += 1
+                continue
+            results.append(self._render(obj, score))
+            if self._limit is not None and len(results) >= self._limit:
+                break
+
+        return {"data": {"Get": {self._class_name: results}}}
+
+    def _rank(self, partition: _Partition):
+        """Returnér [(position, score)] sorteret, eller None for insertion order"""
+        vector = None
+        if self._near_vector is not None:
+            vector = self._near_vector["vector"]
+        elif self._near_text is not None:
+            vector = self._db.embedder.embed(" ".join(self._near_text.get("concepts", [])))
+
+        if vector is not None:
+            similarities = self._similarities(partition, vector)
+            order = np.argsort(-similarities)
+            return [(int(i), ("distance", float(1.0 - similarities[i]))) for i in order]
+
+        if self._bm25 is not None:
+            scores = self._bm25_scores(partition, self._bm25)
+            return [(position, ("score", score)) for position, score in
+                    sorted(scores.items(), key=lambda item: -item[1])]
+
+        if self._hybrid is not None:
+            return self._rank_hybrid(partition)
+
+        return None
+
+    @staticmethod
+    def _similarities(partition: _Partition, vector) -> np.ndarray:
+        matrix = partition.matrix()
+        if not len(matrix):
+            return np.zeros(0, dtype=np.float32)
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        return matrix @ query
+
+    @staticmethod
+    def _bm25_scores(partition: _Partition, text: str) -> Dict[int, float]:
+        postings, lengths, average = partition.bm25_index()
+        k1, b = 1.2, 0.75
+        total = len(lengths)
+        scores = defaultdict(float)
+        for token in set(_tokenize(text)):
+            documents = postings.get(token)
+            if not documents:
+                continue
+            idf = math.log(1 + (total - len(documents) + 0.5) / (len(documents) + 0.5))
+            for position, tf in documents.items():
+                norm = tf + k1 * (1 - b + b * lengths[position] / (average or 1))
+                scores[position] += idf * tf * (k1 + 1) / norm
+        return scores
+
+    def _rank_hybrid(self, partition: _Partition):
+        """relativeScoreFusion: min-max normaliserede vektor og BM25 scores vægtet med alpha"""
+        vector = self._hybrid["vector"]
+        if vector is None:
+            vector = self._db.embedder.embed(self._hybrid["query"])
+        fused = np.zeros(len(partition.objects), dtype=np.float64)
+
+        similarities = self._similarities(partition, vector).astype(np.float64)
+        if len(similarities):
+            spread = similarities.max() - similarities.min()
+            fused += self._hybrid["alpha"] * ((similarities - similarities.min()) / spread if spread > 0 else 1.0)
+
+        scores = self._bm25_scores(partition, self._hybrid["query"])
+        if scores:
+            low, high = min(scores.values()), max(scores.values())
+            for position, score in scores.items():
+                fused[position] += (1 - self._hybrid["alpha"]) * ((score - low) / (high - low) if high > low else 1.0)
+
+        order = np.argsort(-fused, kind="stable")
+        return [(int(i), ("score", float(fused[i]))) for i in order]
+
+    def _render(self, obj: Dict[str, Any], score) -> Dict[str, Any]:
+        rendered = {name: copy.copy(obj["properties"].get(name)) for name in self._properties}
+
+        if self._additional:
+            additional = {}
+            for name in self._additional:
+                if name == "id":
+                    additional["id"] = obj["id"]
+                elif name == "vector":
+                    additional["vector"] = list(obj["vector"])
+                elif name == "distance" and score and score[0] == "distance":
+                    additional["distance"] = score[1]
+                elif name == "certainty" and score and score[0] == "distance":
+                    additional["certainty"] = 1.0 - score[1] / 2.0
+                elif name == "score" and score and score[0] == "score":
+                    additional["score"] = str(score[1])
+                else:
+                    additional[name] = None
+            rendered["_additional"] = additional
+
+        return rendered
+
+
+class _AggregateBuilder:
+    """Svarer til weaviate.gql.aggregate.AggregateBuilder (kun meta count)"""
+
+    def __init__(self, db: "InMemoryWeaviate", class_name: str):
+        self._db = db
+        self._class_name = class_name
+        self._where = None
+        self._tenant = None
+
+    def with_meta_count(self):
+        return self
+
+    def with_where(self, where):
+        self._where = where
+        return self
+
+    def with_tenant(self, tenant):
+        self._tenant = tenant
+        return self
+
+    def do(self) -> Dict[str, Any]:
+        try:
+            partition = self._db._partition(self._class_name, self._tenant)
+        except KeyError as e:
+            return {"errors": [{"message": str(e)}], "data": None}
+        errors = where_errors(self._db._classes[self._class_name], self._where)
+        if errors:
+            return {"errors": errors, "data": {"Aggregate": {self._class_name: None}}}
+        count = sum(1 for obj in partition.objects if matches_where(obj["properties"], self._where))
+        return {"data": {"Aggregate": {self._class_name: [{"meta": {"count": count}}]}}}
+
+
+class _Query:
+    def __init__(self, db: "InMemoryWeaviate"):
+        self._db = db
+
+    def get(self, class_name: str, properties=None):
+        return _GetBuilder(self._db, class_name, properties or [])
+
+    def aggregate(self, class_name: str):
+        return _AggregateBuilder(self._db, class_name)
+
+
+class _Properties:
+    def __init__(self, db: "InMemoryWeaviate"):
+        self._db = db
+
+    def create(self, class_name: str, schema_property: Dict[str, Any]) -> None:
+        self._db._classes[class_name].setdefault("properties", []).append(copy.deepcopy(schema_property))
+
+
+class _Schema:
+    def __init__(self, db: "InMemoryWeaviate"):
+        self._db = db
+        self.property = _Properties(db)
+
+    def get(self, class_name: Optional[str] = None) -> Dict[str, Any]:
+        if class_name:
+            return copy.deepcopy(self._db._classes[class_name])
+        return {"classes": [copy.deepcopy(c) for c in self._db._classes.values()]}
+
+    def exists(self, class_name: str) -> bool:
+        return class_name in self._db._classes
+
+    def create_class(self, schema_class: Dict[str, Any]) -> None:
+        name = schema_class["class"]
+        if name in self._db._classes:
+            raise ValueError(f"class name {name} already exists")
+        self._db._classes[name] = copy.deepcopy(schema_class)
+        self._db._data[name] = {}
+
+    def delete_class(self, class_name: str) -> None:
+        self._db._classes.pop(class_name, None)
+        self._db._data.pop(class_name, None)
+
+    def delete_all(self) -> None:
+        self._db._classes.clear()
+        self._db._data.clear()
+
+    def update_config(self, class_name: str, config: Dict[str, Any]) -> None:
+        def merge(target, source):
+            for key, value in source.items():
+                if isinstance(value, dict) and isinstance(target.get(key), dict):
+                    merge(target[key], value)
+                else:
+                    target[key] = copy.deepcopy(value)
+        merge(self._db._classes[class_name], config)
+
+    def get_class_tenants(self, class_name: str):
+        return [SimpleNamespace(name=name) for name in self._db._data.get(class_name, {}) if name is not None]
+
+    def add_class_tenants(self, class_name: str, tenants) -> None:
+        for tenant in tenants:
+            self._db._data[class_name].setdefault(tenant.name, _Partition())
+
+    def remove_class_tenants(self, class_name: str, tenants: List[str]) -> None:
+        for name in tenants:
+            self._db._data[class_name].pop(name, None)
+
+
+class _Batch:
+    """Svarer til weaviate.batch.Batch - objekter skrives direkte (ingen buffering)"""
+
+    def __init__(self, db: "InMemoryWeaviate"):
+        self._db = db
+        self.batch_size = None
+
+    def configure(self, batch_size=None, dynamic=False, **kwargs):
+        self.batch_size = batch_size
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+    def flush(self):
+        pass
+
+    def add_data_object(self, data_object: Dict[str, Any], class_name: str, uuid: Optional[str] = None,
+                        vector=None, tenant: Optional[str] = None) -> str:
+        partition = self._db._partition(class_name, tenant)
+        object_id = str(uuid or _new_uuid())
+        properties = copy.deepcopy(data_object)
+
+        if vector is None:
+            vector = self._db.embedder.embed(properties.get(_EMBED_FIELD) or properties.get("text"))
+
+        partition.add({"id": object_id, "properties": properties, "vector": list(vector)})
+        return object_id
+
+    def delete_objects(self, class_name: str, where: Dict[str, Any], output: str = "minimal",
+                       dry_run: bool = False, tenant: Optional[str] = None) -> Dict[str, Any]:
+        partition = self._db._partition(class_name, tenant)
+        errors = where_errors(self._db._classes[class_name], where)
+        if errors:
+            raise ValueError("; ".join(error["message"] for error in errors))
+        deleted = partition.remove(lambda obj: matches_where(obj["properties"], where))
+        return {"results": {"matches": deleted, "successful": deleted, "failed": 0}}
+
+
+def _new_uuid() -> str:
+    return str(uuid.uuid4())
+
+
+class InMemoryWeaviate:
+    """In-memory erstatning for weaviate.Client(url=..., additional_headers=...)"""
+
+    def __init__(self, url: str = "http://localhost:8080", additional_headers: Optional[Dict] = None,
+                 embedder: Optional[StubEmbedder] = None, **kwargs):
+        self.url = url
+        self.embedder = embedder or StubEmbedder()
+        self._classes: Dict[str, Dict[str, Any]] = {}
+        # class -> tenant (None for ikke-partitionerede klasser) -> _Partition
+        self._data: Dict[str, Dict[Optional[str], _Partition]] = {}
+        self.schema = _Schema(self)
+        self.query = _Query(self)
+        self.batch = _Batch(self)
+
+    def is_ready(self) -> bool:
+        return True
+
+    def _partition(self, class_name: str, tenant: Optional[str]) -> _Partition:
+        if class_name not in self._classes:
+            raise KeyError(f"class {class_name} not found")
+
+        multi_tenant = self._classes[class_name].get("multiTenancyConfig", {}).get("enabled")
+        if multi_tenant and not tenant:
+            raise KeyError(f"class {class_name} has multi-tenancy enabled, but request was without tenant")
+        if not multi_tenant:
+            tenant = None
+
+        partitions = self._data[class_name]
+        if tenant not in partitions:
+            if multi_tenant:
+                raise KeyError(f"tenant not found: {tenant}")
+            partitions[None] = _Partition()
+        return partitions[tenant]
+
+    def object_count(self) -> int:
+        return sum(len(p.objects) for partitions in self._data.values() for p in partitions.values())
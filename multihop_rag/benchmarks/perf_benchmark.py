@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+PERF BENCHMARK - Import throughput og query latency for hele søgestakken
+
+Tager de medfølgende *_chunks.jsonl filer, skalerer dem evt. syntetisk
+(10x/100x), importerer dem gennem import scripts og afspiller derefter et
+query workload gennem SearchEngine.search (alle strategier) og simple_search
+funktionerne. Rapporterer docs/s for import samt p50/p95/p99 latency og QPS
+per strategi.
+
+BACKENDS:
+- mock (default): InMemoryWeaviate + stubbede embeddings - kræver hverken
+  Weaviate eller OpenAI nøgle. Måler vores egen kode, ikke HNSW.
+- weaviate: lokal Weaviate container. Import genskaber LegalDocument (tom
+  klasse før hver importer) og kræver derfor --allow-overwrite. Query
+  embeddings skal matche indekset - kræver --real-embeddings.
+
+BRUG:
+python benchmarks/perf_benchmark.py
+python benchmarks/perf_benchmark.py --scale 1 10 100 --queries 300 --concurrency 4
+python benchmarks/perf_benchmark.py --backend weaviate --skip-import --real-embeddings
+python benchmarks/perf_benchmark.py --backend weaviate --allow-overwrite --real-embeddings
+python benchmarks/perf_benchmark.py --partitioning tenant --output perf_results.json
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+import numpy as np
+
+MULTIHOP_DIR = Path(__file__).parent.parent
+REPO_ROOT = MULTIHOP_DIR.parent
+CHUNKS_DIR = MULTIHOP_DIR / "chunker" / "output"
+IMPORTER_DIR = MULTIHOP_DIR / "embedder import"
+
+# Tilføj multihop_rag og repo roden (simple_search.py) til Python-stien
+sys.path.append(str(MULTIHOP_DIR))
+sys.path.append(str(REPO_ROOT))
+
+from legal_schema import CLASS_NAME, SchemaSettings, add_schema_arguments, get_class_schema, settings_from_args
+from law_partitions import PartitionRouter
+from record_pipeline import iter_raw_records
+from benchmarks.mock_weaviate import InMemoryWeaviate, StubEmbedder, StubOpenAI
+
+IMPORTERS = {
+    "simple": "import_simple_1024.py",
+    "incremental": "import_incremental_1024.py",
+}
+
+SEARCH_ENGINE_STRATEGIES = ["auto", "paragraph", "semantic", "keyword", "hybrid"]
+SIMPLE_SEARCH_STRATEGIES = ["paragraph_search", "semantic_search", "keyword_search"]
+
+# Faste forespørgsler - suppleres med forespørgsler genereret fra korpus
+BASE_QUERIES = [
+    "Hvad siger ligningsloven § 33 A om lønindkomst fra udlandet?",
+    "§ 8 A stk. 1 gaver til almennyttige foreninger",
+    "fradrag for befordring mellem hjem og arbejde",
+    "kildeskatteloven § 2 begrænset skattepligt",
+    "skattelempelse ved udenlandsk arbejde",
+    "hvordan beskattes aktieavance ved salg af unoterede aktier",
+    "personalegoder og fri bil",
+    "statsskatteloven § 4 skattepligtig indkomst",
+    "renteudgifter fradrag",
+    "rejsefradrag kost og logi",
+]
+
+# Felter der refererer til andre chunks og skal følge med ved syntetisk skalering
+_REFERENCE_FIELDS = ("related_note_chunks", "related_paragraph_chunk_id", "related_paragraphs")
+
+
+def find_chunk_files(directory: Path = CHUNKS_DIR) -> List[str]:
+    """Find de medfølgende *_chunks.jsonl filer"""
+    return sorted(str(path) for path in Path(directory).glob("*_chunks.jsonl"))
+
+
+def _scaled_id(chunk_id: str, copy_index: int) -> str:
+    if copy_index == 0 or not chunk_id:
+        return chunk_id
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{chunk_id}:{copy_index}"))
+
+
+def scale_corpus(files: List[str], factor: int, output_dir: str) -> List[str]:
+    """
+    Skalér korpus syntetisk med faktor N
+
+    Kopi k får nye (deterministiske) chunk_ids, referencer peger ind i samme
+    kopi, og teksten får en markør så stub-embeddings ikke er identiske.
+    """
+    if factor <= 1:
+        return list(files)
+
+    scaled_files = []
+    for file in files:
+        target = Path(output_dir) / f"x{factor}_{Path(file).name}"
+        with open(target, "w", encoding="utf-8") as out:
+            records = list(iter_raw_records(file))
+            for copy_index in range(factor):
+                for record in records:
+                    scaled = dict(record)
+                    scaled["chunk_id"] = _scaled_id(record.get("chunk_id"), copy_index)
+                    for field in _REFERENCE_FIELDS:
+                        value = record.get(field)
+                        if isinstance(value, list):
+                            scaled[field] = [_scaled_id(v, copy_index) if isinstance(v, str) else v for v in value]
+                        elif isinstance(value, str):
+                            scaled[field] = _scaled_id(value, copy_index)
+                    if copy_index:
+                        scaled["text"] = f"{record.get('text', '')} (syntetisk kopi {copy_index})"
+                        scaled.pop("text_for_embedding", None)
+                    out.write(json.dumps(scaled, ensure_ascii=False) + "\n")
+        scaled_files.append(str(target))
+
+    return scaled_files
+
+
+def build_workload(files: List[str], size: int, seed: int = 42) -> List[str]:
+    """Byg et blandet query workload: faste spørgsmål, paragraf-opslag og nøgleord"""
+    rng = random.Random(seed)
+    generated = []
+
+    for file in files:
+        for record in iter_raw_records(file):
+            if record.get("type") == "paragraf" and record.get("paragraph"):
+                title = record.get("title", "")
+                if record.get("stk"):
+                    generated.append(f"{record['paragraph']}, stk. {record['stk']} i {title.lower()}")
+                else:
+                    generated.append(f"{record['paragraph']} i {title.lower()}")
+            for keyword in (record.get("keywords") or [])[:1]:
+                generated.append(str(keyword))
+
+    rng.shuffle(generated)
+    workload = list(BASE_QUERIES) + generated
+    return [workload[i % len(workload)] for i in range(size)]
+
+
+def load_script(name: str, path: Path):
+    """Indlæs et script (fx import scripts i 'embedder import') som modul"""
+    spec = importlib.util.spec_from_file_location(name, str(path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    """Skjul print output fra import/søgekode under måling"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def summarize_latencies(latencies_ms: List[float], wall_seconds: float) -> Dict[str, float]:
+    """p50/p95/p99/mean latency og QPS"""
+    if not latencies_ms:
+        return {"queries": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "qps": 0.0}
+    values = np.asarray(latencies_ms)
+    return {
+        "queries": len(latencies_ms),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+        "qps": len(latencies_ms) / wall_seconds if wall_seconds > 0 else 0.0,
+    }
+
+
+def replay(search: Callable[[str], Any], queries: List[str], concurrency: int = 1,
+           warmup: int = 3) -> Dict[str, Any]:
+    """Afspil queries gennem én søgefunktion og mål latency per kald (efter warmup kald)"""
+    for query in queries[:warmup]:
+        try:
+            search(query)
+        except Exception:
+            pass
+
+    errors = 0
+
+    def timed(query: str) -> Optional[float]:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            search(query)
+        except Exception:
+            errors += 1
+            return None
+        return (time.perf_counter() - start) * 1000
+
+    wall_start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(timed, queries))
+    else:
+        latencies = [timed(query) for query in queries]
+    wall_seconds = time.perf_counter() - wall_start
+
+    stats = summarize_latencies([l for l in latencies if l is not None], wall_seconds)
+    stats["errors"] = errors
+    return stats
+
+
+def run_import(importer: str, module, client, files: List[str], batch_size: int,
+               settings: SchemaSettings) -> Dict[str, Any]:
+    """Importér filer gennem et af import scripts og mål throughput"""
+    documents = sum(1 for file in files for _ in iter_raw_records(file))
+
+    # Hver importer starter fra en tom klasse - ellers springer den inkrementelle alle records over
+    if get_class_schema(client, CLASS_NAME) is not None:
+        client.schema.delete_class(CLASS_NAME)
+
+    start = time.perf_counter()
+    if importer == "simple":
+        module.create_optimized_schema(client, force_recreate=True, settings=settings)
+        module.import_documents_optimized(client, files, batch_size=batch_size, rate_limit=0)
+    else:
+        module.ensure_schema_exists(client, settings=settings)
+        module.import_documents_incremental(client, files, batch_size=batch_size, rate_limit=0)
+    seconds = time.perf_counter() - start
+
+    return {"documents": documents, "seconds": seconds, "docs_per_sec": documents / seconds if seconds else 0.0}
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    """Print import og query tabeller"""
+    print("\n📥 IMPORT THROUGHPUT")
+    print(f"{'skala':>6} {'importer':<12} {'docs':>9} {'sek':>9} {'docs/s':>10}")
+    for row in results["imports"]:
+        print(f"{row['scale']:>5}x {row['importer']:<12} {row['documents']:>9} "
+              f"{row['seconds']:>9.2f} {row['docs_per_sec']:>10.1f}")
+
+    print("\n🔎 QUERY LATENCY")
+    print(f"{'skala':>6} {'strategi':<32} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'QPS':>8} {'fejl':>5}")
+    for row in results["queries"]:
+        print(f"{row['scale']:>5}x {row['strategy']:<32} {row['queries']:>5} {row['p50_ms']:>8.2f} "
+              f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['qps']:>8.1f} {row['errors']:>5}")
+
+
+def main():
+    """Kør import + query benchmark"""
+    parser = argparse.ArgumentParser(description='Import throughput og query latency benchmark')
+    parser.add_argument('--backend', choices=["mock", "weaviate"], default="mock")
+    parser.add_argument('--weaviate-url', default="http://localhost:8080")
+    parser.add_argument('--files', nargs='*', help='Chunk filer (default: chunker/output/*_chunks.jsonl)')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1], help='Syntetiske skaleringsfaktorer (fx 1 10 100)')
+    parser.add_argument('--importers', nargs='+', choices=list(IMPORTERS), default=list(IMPORTERS))
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--queries', type=int, default=200, help='Antal queries per strategi')
+    parser.add_argument('--concurrency', type=int, default=1, help='Samtidige queries (QPS under load)')
+    parser.add_argument('--warmup', type=int, default=3, help='Umålte queries før hver strategi (caches/indekser)')
+    parser.add_argument('--strategies', nargs='+',
+                        default=[f"engine:{s}" for s in SEARCH_ENGINE_STRATEGIES] +
+                                [f"simple:{s}" for s in SIMPLE_SEARCH_STRATEGIES])
+    parser.add_argument('--stub-dims', type=int, default=256, help='Dimensioner for stub-embeddings (mock)')
+    parser.add_argument('--real-embeddings', action='store_true', help='Brug OpenAI til query embeddings')
+    parser.add_argument('--skip-import', action='store_true', help='Kun query replay (weaviate backend)')
+    parser.add_argument('--allow-overwrite', action='store_true',
+                        help='Tillad at import genskaber LegalDocument i en rigtig Weaviate')
+    parser.add_argument('--output', help='Gem resultater som JSON')
+    parser.add_argument('--verbose', action='store_true', help='Vis output fra import/søgekode')
+    add_schema_arguments(parser)
+    args = parser.parse_args()
+
+    if args.backend == "weaviate" and not args.skip_import and not args.allow_overwrite:
+        print("❌ Import mod rigtig Weaviate sletter LegalDocument - brug --allow-overwrite eller --skip-import")
+        return
+    if args.backend == "weaviate" and not args.real_embeddings:
+        print(f"❌ Stub-embeddings ({args.stub_dims} dims) matcher ikke det rigtige indeks - brug --real-embeddings")
+        return
+
+    files = args.files or find_chunk_files()
+    if not files:
+        print(f"❌ Ingen *_chunks.jsonl filer fundet i {CHUNKS_DIR}")
+        return
+
+    embedder = StubEmbedder(args.stub_dims)
+    # Import scripts afbryder uden nøgle - mock/stub kalder aldrig OpenAI
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-stub")
+
+    print("📊 PERF BENCHMARK")
+    print("=" * 50)
+    print(f"   Backend: {args.backend}, filer: {len(files)}, skala: {args.scale}, concurrency: {args.concurrency}")
+
+    results = {"config": vars(args), "imports": [], "queries": []}
+    settings = settings_from_args(args)
+
+    with contextlib.ExitStack() as stack:
+        db_holder = {}
+        if args.backend == "mock":
+            stack.enter_context(mock.patch("weaviate.Client", lambda *a, **kw: db_holder["db"]))
+            db_holder["db"] = InMemoryWeaviate(embedder=embedder)
+
+        with quiet(not args.verbose):
+            importer_modules = {name: load_script(name.replace("-", "_"), IMPORTER_DIR / IMPORTERS[name])
+                                for name in args.importers} if not args.skip_import else {}
+            import search_engine
+            import simple_search
+        if not args.real_embeddings:
+            stack.enter_context(mock.patch.object(search_engine, "OpenAI", lambda *a, **kw: StubOpenAI(embedder)))
+
+        with tempfile.TemporaryDirectory(prefix="jaila_bench_") as tmp:
+            for factor in args.scale:
+                scaled_files = scale_corpus(files, factor, tmp)
+                print(f"\n📈 Skala {factor}x")
+
+                for importer, module in importer_modules.items():
+                    if args.backend == "mock":
+                        db_holder["db"] = InMemoryWeaviate(embedder=embedder)
+                    client = db_holder.get("db") or module.create_weaviate_client()
+                    with quiet(not args.verbose):
+                        row = run_import(importer, module, client, scaled_files, args.batch_size, settings)
+                    row.update({"scale": factor, "importer": importer})
+                    results["imports"].append(row)
+                    print(f"   📥 {importer}: {row['documents']} docs på {row['seconds']:.1f}s "
+                          f"({row['docs_per_sec']:.0f} docs/s)")
+
+                # Søg mod den senest importerede database
+                with quiet(not args.verbose):
+                    engine = search_engine.SearchEngine(weaviate_url=args.weaviate_url, verbose=False)
+                    simple_search.client = engine.client
+                    simple_search.router = PartitionRouter(engine.client)
+
+                queries = build_workload(files, args.queries)
+                for strategy in args.strategies:
+                    family, name = strategy.split(":", 1)
+                    if family == "engine":
+                        search = lambda q, st=name: engine.search(q, limit=5, search_type=st)
+                    else:
+                        search = lambda q, fn=getattr(simple_search, name): fn(q, 5)
+                    with quiet(not args.verbose):
+                        stats = replay(search, queries, args.concurrency, args.warmup)
+                    stats.update({"scale": factor, "strategy": strategy})
+                    results["queries"].append(stats)
+                    print(f"   🔎 {strategy:<28} p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms "
+                          f"p99={stats['p99_ms']:.2f}ms QPS={stats['qps']:.1f}")
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            json.dump(results, out, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultater gemt i {args.output}")
+
+
+if __name__ == "__main__":
+    main()
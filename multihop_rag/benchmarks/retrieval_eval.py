@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+RETRIEVAL EVAL - Recall@k, MRR og latency mod et golden query sæt
+
+golden_queries.jsonl indeholder danske skattespørgsmål med de bestemmelser
+(lov, §, stk., nr.) et godt søgeresultat skal indeholde:
+
+    {"id": "g01", "kind": "explicit", "question": "...",
+     "expected": [{"law": "Ligningsloven", "paragraph": "§ 9 C", "stk": "2"}]}
+
+kind er "explicit" (spørgsmålet nævner §) eller "natural" (fritekst).
+Et hit tæller hvis lov og § matcher og stk./nr. matcher når de er angivet -
+også note-chunks til bestemmelsen (de bærer samme heading).
+
+For hver strategi (SearchEngine.search med search_type, samt JAILA robust_search)
+rapporteres recall@k, MRR og p50/p95 latency - samlet og per kind.
+
+Backends:
+- mock (default): chunk filerne importeres i InMemoryWeaviate med stubbede
+  embeddings - kører offline uden Weaviate og OpenAI. Stub-embeddings er
+  leksikalske (feature hashing), så semantiske tal er en nedre grænse;
+  paragraf-, nøgleords- og rangeringslogik måles præcist.
+- weaviate: eksisterende LegalDocument index og rigtige query embeddings.
+
+BRUG:
+python benchmarks/retrieval_eval.py
+python benchmarks/retrieval_eval.py --k 1 3 5 10 --strategies engine:paragraph jaila:robust_search
+python benchmarks/retrieval_eval.py --backend weaviate --output eval.json
+python benchmarks/retrieval_eval.py --per-query          # vis første relevante rang per spørgsmål
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest import mock
+
+import numpy as np
+
+MULTIHOP_DIR = Path(__file__).parent.parent
+REPO_ROOT = MULTIHOP_DIR.parent
+GOLDEN_FILE = Path(__file__).parent / "golden_queries.jsonl"
+
+# Tilføj multihop_rag og repo roden (JAILA pakken) til Python-stien
+sys.path.append(str(MULTIHOP_DIR))
+sys.path.append(str(REPO_ROOT))
+
+from benchmarks.mock_weaviate import InMemoryWeaviate, StubEmbedder, StubOpenAI
+from benchmarks.perf_benchmark import IMPORTER_DIR, IMPORTERS, find_chunk_files, load_script, quiet
+from legal_schema import SchemaSettings
+from record_pipeline import iter_raw_records
+from retrieval_coverage import parse_reference
+
+SEARCH_ENGINE_STRATEGIES = ["auto", "paragraph", "semantic", "keyword", "hybrid"]
+DEFAULT_STRATEGIES = [f"engine:{s}" for s in SEARCH_ENGINE_STRATEGIES] + ["jaila:robust_search"]
+
+Reference = Tuple[str, Optional[str], Optional[str], str]
+
+
+def load_golden(path: Path = GOLDEN_FILE) -> List[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def expected_reference(expected: Dict) -> Reference:
+    """Golden reference -> (lov, paragraf-nøgle, stk, nr) - fx ('ligningsloven', '9c', '2', '')"""
+    parsed = parse_reference(expected["paragraph"])
+    return (expected.get("law", "").lower(), parsed[0] if parsed else None,
+            expected.get("stk"), str(expected.get("nr") or ""))
+
+
+def result_reference(result: Dict) -> Reference:
+    """
+    Søgeresultat -> (lov, paragraf-nøgle, stk, nr)
+
+    SearchEngine lægger heading i 'stk' og topic i 'paragraph' ('§ 9 C, stk. 2'),
+    robust_search returnerer de rå felter ('§ 9 C' og '2') - begge håndteres.
+    """
+    paragraph, stk = None, None
+    for key in ('heading', 'stk', 'paragraph', 'topic'):
+        parsed = parse_reference(str(result.get(key) or ""))
+        if parsed:
+            paragraph = paragraph or parsed[0]
+            stk = stk or parsed[1]
+            if stk:
+                break
+    raw_stk = str(result.get('stk') or "").strip()
+    if stk is None and raw_stk.isdigit():
+        stk = raw_stk
+    return (str(result.get('title') or "").lower(), paragraph, stk, str(result.get('nr') or "").strip())
+
+
+def matches(expected: Reference, found: Reference) -> bool:
+    law, paragraph, stk, nr = expected
+    return (paragraph is not None and found[1] == paragraph
+            and (not law or found[0] == law)
+            and (stk is None or found[2] == stk)
+            and (not nr or found[3] == nr))
+
+
+def score_query(expected: List[Reference], results: List[Dict], ks: List[int]) -> Dict:
+    """Recall@k og reciprocal rank for ét spørgsmål"""
+    found = [result_reference(result) for result in results]
+    # Rang (1-baseret) hvor hver forventet reference først optræder
+    ranks = []
+    for reference in expected:
+        rank = next((i for i, hit in enumerate(found, 1) if matches(reference, hit)), None)
+        ranks.append(rank)
+    first = min((rank for rank in ranks if rank), default=None)
+    return {
+        "recall": {k: sum(1 for rank in ranks if rank and rank <= k) / len(expected) for k in ks},
+        "reciprocal_rank": 1.0 / first if first else 0.0,
+        "first_relevant_rank": first
+    }
+
+
+def evaluate(search: Callable[[str, int], List[Dict]], golden: List[Dict], ks: List[int],
+             warmup: int = 2) -> Dict[str, Any]:
+    """Kør alle golden queries gennem én søgefunktion"""
+    limit = max(ks)
+    for item in golden[:warmup]:
+        with contextlib.suppress(Exception):
+            search(item["question"], limit)
+
+    per_query = []
+    for item in golden:
+        expected = [expected_reference(reference) for reference in item["expected"]]
+        start = time.perf_counter()
+        try:
+            results = search(item["question"], limit) or []
+            error = None
+        except Exception as e:
+            results, error = [], f"{type(e).__name__}: {e}"
+        latency_ms = (time.perf_counter() - start) * 1000
+        row = {"id": item["id"], "kind": item.get("kind", ""), "latency_ms": latency_ms, "error": error,
+               **score_query(expected, results[:limit], ks)}
+        per_query.append(row)
+
+    return {"summary": summarize(per_query, ks), "by_kind": {
+        kind: summarize([row for row in per_query if row["kind"] == kind], ks)
+        for kind in sorted({row["kind"] for row in per_query})
+    }, "queries": per_query}
+
+
+def summarize(rows: List[Dict], ks: List[int]) -> Dict[str, float]:
+    if not rows:
+        return {}
+    latencies = np.asarray([row["latency_ms"] for row in rows])
+    summary = {f"recall@{k}": float(np.mean([row["recall"][k] for row in rows])) for k in ks}
+    summary.update({
+        "mrr": float(np.mean([row["reciprocal_rank"] for row in rows])),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "queries": len(rows),
+        "errors": sum(1 for row in rows if row["error"])
+    })
+    return summary
+
+
+def check_golden(golden: List[Dict], files: List[str]) -> List[str]:
+    """Forventede referencer der ikke findes i chunk filerne (fejl i golden sættet)"""
+    corpus = set()
+    for file in files:
+        for record in iter_raw_records(file):
+            corpus.add(result_reference(record))
+    missing = []
+    for item in golden:
+        for reference in item["expected"]:
+            if not any(matches(expected_reference(reference), found) for found in corpus):
+                missing.append(f"{item['id']}: {reference}")
+    return missing
+
+
+def build_searches(strategies: List[str], engine, robust_search) -> Dict[str, Callable[[str, int], List[Dict]]]:
+    searches = {}
+    for strategy in strategies:
+        family, name = strategy.split(":", 1)
+        if family == "engine":
+            searches[strategy] = lambda query, limit, st=name: engine.search(query, limit=limit, search_type=st)
+        elif family == "jaila" and name == "robust_search":
+            searches[strategy] = lambda query, limit: robust_search(query, limit=limit)
+        else:
+            raise ValueError(f"Ukendt strategi: {strategy}")
+    return searches
+
+
+def print_report(results: Dict[str, Dict], ks: List[int], per_query: bool = False) -> None:
+    columns = [f"recall@{k}" for k in ks] + ["mrr"]
+    print(f"\n{'strategi':<24} {'kind':<9} " + " ".join(f"{c:>9}" for c in columns) + f" {'p50 ms':>9} {'p95 ms':>9}")
+    for strategy, result in results.items():
+        for kind, summary in [("alle", result["summary"])] + list(result["by_kind"].items()):
+            print(f"{strategy:<24} {kind:<9} " + " ".join(f"{summary[c]:>9.3f}" for c in columns) +
+                  f" {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f}")
+        errors = result["summary"]["errors"]
+        if errors:
+            print(f"   ⚠️ {errors} forespørgsler fejlede")
+
+    if per_query:
+        print(f"\n{'id':<6} " + " ".join(f"{strategy.split(':')[1][:10]:>10}" for strategy in results))
+        for index, row in enumerate(next(iter(results.values()))["queries"]):
+            ranks = [results[strategy]["queries"][index]["first_relevant_rank"] for strategy in results]
+            print(f"{row['id']:<6} " + " ".join(f"{rank or '-':>10}" for rank in ranks))
+
+
+def main():
+    """Kør retrieval evaluering"""
+    parser = argparse.ArgumentParser(description='Recall@k, MRR og latency mod golden query sæt')
+    parser.add_argument('--backend', choices=["mock", "weaviate"], default="mock")
+    parser.add_argument('--weaviate-url', default="http://localhost:8080")
+    parser.add_argument('--golden', default=str(GOLDEN_FILE))
+    parser.add_argument('--files', nargs='*', help='Chunk filer til mock index (default: chunker/output/*_chunks.jsonl)')
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 3, 5, 10])
+    parser.add_argument('--strategies', nargs='+', default=DEFAULT_STRATEGIES)
+    parser.add_argument('--stub-dims', type=int, default=256, help='Dimensioner for stub-embeddings (mock)')
+    parser.add_argument('--warmup', type=int, default=2, help='Umålte forespørgsler per strategi')
+    parser.add_argument('--per-query', action='store_true', help='Vis første relevante rang per spørgsmål')
+    parser.add_argument('--output', help='Gem resultater som JSON')
+    parser.add_argument('--verbose', action='store_true', help='Vis output fra import/søgekode')
+    args = parser.parse_args()
+
+    ks = sorted(set(args.k))
+    golden = load_golden(Path(args.golden))
+    files = args.files or find_chunk_files()
+
+    print("🎯 RETRIEVAL EVAL")
+    print("=" * 50)
+    print(f"   Backend: {args.backend}, {len(golden)} golden queries, k={ks}")
+
+    missing = check_golden(golden, files) if files else []
+    for reference in missing:
+        print(f"   ⚠️ Golden reference findes ikke i chunk filerne - {reference}")
+
+    embedder = StubEmbedder(args.stub_dims)
+    if args.backend == "mock" and not os.environ.get("OPENAI_API_KEY"):
+        # Import scripts afbryder uden nøgle - mock/stub kalder aldrig OpenAI
+        os.environ["OPENAI_API_KEY"] = "benchmark-stub"
+
+    with contextlib.ExitStack() as stack:
+        if args.backend == "mock":
+            db = InMemoryWeaviate(embedder=embedder)
+            stack.enter_context(mock.patch("weaviate.Client", lambda *a, **kw: db))
+            with quiet(not args.verbose):
+                importer = load_script("import_simple_1024", IMPORTER_DIR / IMPORTERS["simple"])
+                start = time.perf_counter()
+                importer.create_optimized_schema(db, force_recreate=True, settings=SchemaSettings())
+                importer.import_documents_optimized(db, files, batch_size=200, rate_limit=0)
+            print(f"   📥 Mock index bygget af {len(files)} filer på {time.perf_counter() - start:.1f}s")
+
+        with quiet(not args.verbose):
+            import search_engine
+            from JAILA import hybrid_search
+            if args.backend == "mock":
+                stack.enter_context(mock.patch.object(search_engine, "OpenAI", lambda *a, **kw: StubOpenAI(embedder)))
+                stack.enter_context(mock.patch.object(hybrid_search, "generate_embedding_directly", embedder.embed))
+            engine = search_engine.SearchEngine(weaviate_url=args.weaviate_url, verbose=False)
+
+        results = {}
+        for strategy, search in build_searches(args.strategies, engine, hybrid_search.robust_search).items():
+            with quiet(not args.verbose):
+                results[strategy] = evaluate(search, golden, ks, warmup=args.warmup)
+            summary = results[strategy]["summary"]
+            print(f"   🔎 {strategy:<24} recall@{ks[-1]}={summary[f'recall@{ks[-1]}']:.3f} "
+                  f"MRR={summary['mrr']:.3f} p50={summary['p50_ms']:.2f}ms")
+
+    print_report(results, ks, args.per_query)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"config": vars(args), "missing_golden": missing, "results": results}, f,
+                      ensure_ascii=False, indent=2, default=str)
+        print(f"\n💾 Resultater gemt i {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+SCHEMA BENCHMARK - Recall og latency på tværs af HNSW/komprimering settings
+
+Henter eksisterende 1024-dim vektorer fra LegalDocument (ingen OpenAI kald),
+bygger midlertidige benchmark-klasser med forskellige SchemaSettings og
+måler recall@k mod eksakt (brute-force) cosine søgning samt query latency.
+Ved PQ/BQ måles også oversampling + rescoring med fulde vektorer, som
+SearchEngine._search_semantic bruger på et komprimeret indeks.
+
+BRUG:
+python benchmarks/schema_benchmark.py
+python benchmarks/schema_benchmark.py --ef-construction 128 256 --max-connections 32 64 --ef 64 128 256
+python benchmarks/schema_benchmark.py --compression none pq bq --sample-size 3000
+python benchmarks/schema_benchmark.py --compression pq bq --oversampling 1 2 4 8
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict, Any
+
+import numpy as np
+import weaviate
+
+# Tilføj multihop_rag mappen til Python-stien
+sys.path.append(str(Path(__file__).parent.parent))
+
+from legal_schema import CLASS_NAME, SchemaSettings, build_class_definition, build_vector_index_config
+from search_engine import SearchEngine
+
+BENCH_CLASS_NAME = "LegalDocumentBench"
+
+
+def fetch_vectors(client, sample_size: int, page_size: int = 500) -> List[Dict[str, Any]]:
+    """Hent chunk_id + vektor for op til sample_size objekter fra LegalDocument"""
+    objects = []
+    offset = 0
+
+    while len(objects) < sample_size:
+        result = (
+            client.query
+            .get(CLASS_NAME, ["chunk_id"])
+            .with_additional(["vector"])
+            .with_limit(min(page_size, sample_size - len(objects)))
+            .with_offset(offset)
+            .do()
+        )
+        docs = result.get('data', {}).get('Get', {}).get(CLASS_NAME, []) or []
+        if not docs:
+            break
+
+        for doc in docs:
+            vector = doc.get('_additional', {}).get('vector')
+            if vector:
+                objects.append({"chunk_id": doc.get('chunk_id'), "vector": vector})
+
+        offset += len(docs)
+
+    return objects
+
+
+def exact_top_k(index_vectors: np.ndarray, query_vectors: np.ndarray, k: int) -> np.ndarray:
+    """Eksakt cosine top-k som ground truth (returnerer index positioner)"""
+    index_norm = index_vectors / np.linalg.norm(index_vectors, axis=1, keepdims=True)
+    query_norm = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    similarities = query_norm @ index_norm.T
+    top = np.argpartition(-similarities, kth=min(k, similarities.shape[1] - 1), axis=1)[:, :k]
+    # Sortér de k bedste per query
+    order = np.take_along_axis(similarities, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def build_bench_class(client, settings: SchemaSettings, index_objects: List[Dict[str, Any]],
+                      batch_size: int = 200) -> float:
+    """Opret benchmark-klasse og importér vektorer - returnerer import tid i sekunder"""
+    if client.schema.exists(BENCH_CLASS_NAME):
+        client.schema.delete_class(BENCH_CLASS_NAME)
+
+    # PQ trænes efter import (Weaviate kræver data til kmeans), BQ skal sættes ved oprettelse
+    create_settings = settings if settings.compression != "pq" else SchemaSettings(
+        ef_construction=settings.ef_construction,
+        max_connections=settings.max_connections,
+        ef=settings.ef
+    )
+    client.schema.create_class(build_class_definition(create_settings, class_name=BENCH_CLASS_NAME, vectorizer="none"))
+
+    start = time.perf_counter()
+    client.batch.configure(batch_size=batch_size, dynamic=False)
+    with client.batch as batch:
+        for position, obj in enumerate(index_objects):
+            batch.add_data_object(
+                data_object={"chunk_id": obj["chunk_id"] or str(position)},
+                class_name=BENCH_CLASS_NAME,
+                vector=obj["vector"]
+            )
+    import_seconds = time.perf_counter() - start
+
+    if settings.compression == "pq":
+        client.schema.update_config(BENCH_CLASS_NAME, {
+            "vectorIndexConfig": {"pq": build_vector_index_config(settings)["pq"]}
+        })
+        # Giv Weaviate tid til at træne codebook og komprimere
+        time.sleep(5)
+
+    return import_seconds
+
+
+def run_queries(client, query_vectors: np.ndarray, k: int, oversampling: int = 1) -> Dict[str, Any]:
+    """Kør near_vector queries mod benchmark-klassen og mål latency (inkl. evt. rescoring)"""
+    latencies = []
+    hits = []
+
+    for vector in query_vectors:
+        start = time.perf_counter()
+        query = (
+            client.query
+            .get(BENCH_CLASS_NAME, ["chunk_id"])
+            .with_near_vector({"vector": vector.tolist()})
+            .with_limit(k * oversampling)
+        )
+        if oversampling > 1:
+            query = query.with_additional(["vector"])
+        result = query.do()
+        docs = result.get('data', {}).get('Get', {}).get(BENCH_CLASS_NAME, []) or []
+        if oversampling > 1:
+            docs = SearchEngine._rescore_with_full_vectors(vector.tolist(), docs, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits.append([doc.get('chunk_id') for doc in docs])
+
+    return {"latencies_ms": latencies, "hits": hits}
+
+
+def recall_at_k(hits: List[List[str]], truth: List[List[str]], k: int) -> float:
+    """Gennemsnitlig recall@k"""
+    if not truth:
+        return 0.0
+    return sum(len(set(h[:k]) & set(t[:k])) / k for h, t in zip(hits, truth)) / len(truth)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil af en liste (0 hvis tom)"""
+    return float(np.percentile(values, pct)) if values else 0.0
+
+
+def main():
+    """Kør schema benchmark"""
+    parser = argparse.ArgumentParser(description='Recall/latency benchmark for LegalDocument schema settings')
+    parser.add_argument('--weaviate-url', default="http://localhost:8080")
+    parser.add_argument('--sample-size', type=int, default=2000,
+                        help='Antal vektorer at hente fra LegalDocument (default: 2000)')
+    parser.add_argument('--queries', type=int, default=100,
+                        help='Antal vektorer holdt ude som queries (default: 100)')
+    parser.add_argument('--k', type=int, default=10, help='recall@k (default: 10)')
+    parser.add_argument('--ef-construction', type=int, nargs='+', default=[128, 256])
+    parser.add_argument('--max-connections', type=int, nargs='+', default=[32, 64])
+    parser.add_argument('--ef', type=int, nargs='+', default=[64, 128, 256])
+    parser.add_argument('--compression', nargs='+', default=["none"], choices=["none", "pq", "bq"])
+    parser.add_argument('--oversampling', type=int, nargs='+', default=[1],
+                        help='Rescoring oversampling faktorer - kun brugt ved pq/bq (default: 1 = ingen rescoring)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    client = weaviate.Client(url=args.weaviate_url)
+
+    print("📊 SCHEMA BENCHMARK")
+    print("=" * 50)
+
+    objects = fetch_vectors(client, args.sample_size + args.queries)
+    if len(objects) <= args.queries:
+        print("❌ For få vektorer i LegalDocument - importér data først")
+        return
+
+    random.Random(args.seed).shuffle(objects)
+    query_objects = objects[:args.queries]
+    index_objects = objects[args.queries:]
+    print(f"   Index: {len(index_objects)} vektorer, queries: {len(query_objects)}, k={args.k}")
+
+    index_vectors = np.asarray([o["vector"] for o in index_objects], dtype=np.float32)
+    query_vectors = np.asarray([o["vector"] for o in query_objects], dtype=np.float32)
+    index_ids = [o["chunk_id"] for o in index_objects]
+    truth = [[index_ids[i] for i in row] for row in exact_top_k(index_vectors, query_vectors, args.k)]
+
+    rows = []
+    grid = itertools.product(args.ef_construction, args.max_connections, args.compression)
+
+    try:
+        for ef_construction, max_connections, compression in grid:
+            settings = SchemaSettings(
+                ef_construction=ef_construction,
+                max_connections=max_connections,
+                ef=args.ef[0],
+                compression=None if compression == "none" else compression
+            )
+            print(f"\n🔧 efConstruction={ef_construction}, maxConnections={max_connections}, compression={compression}")
+            import_seconds = build_bench_class(client, settings, index_objects)
+
+            # Rescoring giver kun mening på komprimerede vektorer
+            oversampling_values = args.oversampling if compression != "none" else [1]
+
+            # ef er mutable - genbrug samme index for alle ef værdier
+            for ef, oversampling in itertools.product(args.ef, oversampling_values):
+                client.schema.update_config(BENCH_CLASS_NAME, {"vectorIndexConfig": {"ef": ef}})
+                measured = run_queries(client, query_vectors, args.k, oversampling)
+                row = {
+                    "ef_construction": ef_construction,
+                    "max_connections": max_connections,
+                    "compression": compression,
+                    "ef": ef,
+                    "oversampling": oversampling,
+                    "recall": recall_at_k(measured["hits"], truth, args.k),
+                    "p50_ms": percentile(measured["latencies_ms"], 50),
+                    "p95_ms": percentile(measured["latencies_ms"], 95),
+                    "import_s": import_seconds
+                }
+                rows.append(row)
+                print(f"   ef={ef:<4} x{oversampling:<2} recall@{args.k}={row['recall']:.3f}  "
+                      f"p50={row['p50_ms']:.1f}ms  p95={row['p95_ms']:.1f}ms")
+    finally:
+        if client.schema.exists(BENCH_CLASS_NAME):
+            client.schema.delete_class(BENCH_CLASS_NAME)
+
+    print(f"\n📋 RESULTATER (recall@{args.k})")
+    print(f"{'efC':>5} {'maxC':>5} {'komp':>5} {'ef':>5} {'over':>5} {'recall':>8} {'p50 ms':>8} {'p95 ms':>8} {'import s':>9}")
+    for row in sorted(rows, key=lambda r: (-r["recall"], r["p95_ms"])):
+        print(f"{row['ef_construction']:>5} {row['max_connections']:>5} {row['compression']:>5} {row['ef']:>5} "
+              f"{row['oversampling']:>5} {row['recall']:>8.3f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['import_s']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
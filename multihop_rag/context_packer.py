@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+CONTEXT PACKER - Token-budgetteret kontekst til multihop svar-prompten
+=====================================================================
+
+Pakker dokumenterne fra alle hops ind i et fast token-budget
+(LangChainRAGConfig.max_context_length) i stedet for at sende alt hvad
+søgningerne returnerede:
+
+1. Rangering: retrieval score vægtet med hop (HOP 1 > HOP 2 > HOP 3),
+   paragraffer før noter. Alle søgninger lægges på certainty-skalaen:
+   semantiske hits bruger certainty, præcise § opslag (where-filter) en fast
+   høj score, og øvrige hits uden certainty (BM25, graf) rangen inden for
+   deres egen søgemetode
+2. Noter med samme tekst (samme note hentet via flere paragraffer eller
+   chunks) medtages kun én gang
+3. Grådig pakning efter værdi; det første dokument der ikke kan være der
+   afkortes, hvis der er mindst context_overlap tokens tilbage
+
+Tokens tælles med tiktoken (modellens encoding). Er encoding-filen ikke
+tilgængelig (offline), bruges et estimat på ~4 tegn per token.
+
+BRUG:
+    packer = ContextPacker(max_tokens=12000, min_fragment_tokens=300, model="gpt-4o-2024-08-06")
+    packed = packer.pack(documents)
+    packed.for_hop(1), packed.tokens, packed.dropped
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from langchain.schema import Document
+
+# Vægt per hop - senere hops er opfølgning og mindre centrale
+HOP_WEIGHTS = {1: 1.0, 2: 0.85, 3: 0.7}
+PARAGRAPH_BONUS = 0.1
+
+# Retrieval score for hits uden certainty (samme skala som certainty)
+EXACT_MATCH_METHODS = ('paragraph_where', 'direct_id')
+EXACT_MATCH_SCORE = 0.9     # Præcist § match - over typiske semantiske hits (~0.75-0.85)
+RANKED_SCORE_TOP = 0.8      # Bedste hit i en søgning uden score (keyword, graf)
+RANKED_SCORE_STEP = 0.02    # Fald per plads i samme søgning
+RANKED_SCORE_MIN = 0.5
+NOTE_TYPES = ('note', 'notes')
+
+# Tokens per dokument til header (reference, chunk id, type)
+DOCUMENT_OVERHEAD_TOKENS = 25
+
+
+def _load_encoding(model: str):
+    """tiktoken encoding - None hvis tiktoken eller encoding-filen ikke er tilgængelig"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            return None
+
+
+def _normalized_hash(text: str) -> str:
+    return hashlib.sha1(re.sub(r'\s+', ' ', text).strip().lower().encode('utf-8')).hexdigest()
+
+
+@dataclass
+class PackedContext:
+    """Resultat af en pakning"""
+    documents: List[Document] = field(default_factory=list)
+    dropped: List[Document] = field(default_factory=list)
+    tokens: int = 0
+    budget: int = 0
+    duplicate_notes: int = 0
+    truncated: int = 0
+
+    def for_hop(self, hop_number: int) -> List[Document]:
+        """Medtagne dokumenter fra et hop (i rangeret rækkefølge)"""
+        return [doc for doc in self.documents if doc.metadata.get('hop', 1) == hop_number]
+
+
+class ContextPacker:
+    """Vælg og afkort dokumenter så svar-prompten holder sig inden for et token-budget"""
+
+    def __init__(self, max_tokens: int = 12000, min_fragment_tokens: int = 300,
+                 model: str = "gpt-4o-2024-08-06"):
+        self.max_tokens = max_tokens
+        self.min_fragment_tokens = min_fragment_tokens
+        self._encoding = _load_encoding(model)
+
+    def count_tokens(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Afkort tekst til max_tokens (på token-grænse hvis tiktoken findes)"""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[:max_tokens]) + "..."
+        return text if len(text) <= max_tokens * 4 else text[:max_tokens * 4] + "..."
+
+    @staticmethod
+    def retrieval_score(metadata: Dict) -> float:
+        """Retrieval score på certainty-skalaen - uafhængig af hvilken søgning der fandt dokumentet"""
+        certainty = metadata.get('certainty') or 0.0
+        if certainty > 0:
+            return certainty
+        if metadata.get('search_method') in EXACT_MATCH_METHODS:
+            return EXACT_MATCH_SCORE
+        rank = metadata.get('rank', 0)
+        return max(RANKED_SCORE_TOP - RANKED_SCORE_STEP * rank, RANKED_SCORE_MIN)
+
+    @classmethod
+    def score(cls, doc: Document) -> float:
+        """Værdi af et dokument: retrieval score x hop vægt (+ bonus for paragraffer)"""
+        metadata = doc.metadata
+        value = cls.retrieval_score(metadata) * HOP_WEIGHTS.get(metadata.get('hop', 1), 0.5)
+        if metadata.get('type') == 'paragraf':
+            value += PARAGRAPH_BONUS
+        return value
+
+    def pack(self, documents: List[Document], budget: Optional[int] = None) -> PackedContext:
+        """
+        Pak de mest værdifulde dokumenter ind i budgettet
+
+        Args:
+            documents: Kandidater (fx DocumentPool fra alle hops)
+            budget: Token-budget (default max_tokens)
+
+        Returns:
+            PackedContext med medtagne dokumenter i rangeret rækkefølge; afkortede
+            dokumenter er kopier med metadata['truncated'] = True
+        """
+        packed = PackedContext(budget=budget or self.max_tokens)
+        remaining = packed.budget
+        seen_notes = set()
+
+        # Stabil sortering - lige scores beholder fund-rækkefølgen
+        ranked = sorted(documents, key=self.score, reverse=True)
+        for doc in ranked:
+            if doc.metadata.get('type') in NOTE_TYPES:
+                note_hash = _normalized_hash(doc.page_content)
+                if note_hash in seen_notes:
+                    packed.duplicate_notes += 1
+                    continue
+                seen_notes.add(note_hash)
+
+            cost = self.count_tokens(doc.page_content) + DOCUMENT_OVERHEAD_TOKENS
+            if cost <= remaining:
+                packed.documents.append(doc)
+                packed.tokens += cost
+                remaining -= cost
+            elif remaining - DOCUMENT_OVERHEAD_TOKENS >= self.min_fragment_tokens:
+                fragment = self.truncate(doc.page_content, remaining - DOCUMENT_OVERHEAD_TOKENS)
+                packed.documents.append(Document(page_content=fragment, metadata={**doc.metadata, 'truncated': True}))
+                packed.tokens += remaining
+                packed.truncated += 1
+                remaining = 0
+            else:
+                packed.dropped.append(doc)
+
+        return packed
+
+    def statistics(self, packed: PackedContext) -> Dict:
+        return {
+            'documents': len(packed.documents),
+            'dropped': len(packed.dropped),
+            'tokens': packed.tokens,
+            'budget': packed.budget,
+            'duplicate_notes': packed.duplicate_notes,
+            'truncated': packed.truncated
+        }
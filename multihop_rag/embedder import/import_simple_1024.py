@@ -15,14 +15,21 @@ BRUG:
 python import_simple_1024.py --force-recreate
 """
 
-import json
 import weaviate
 import os
 from dotenv import load_dotenv
 import time
-import jsonlines
 import argparse
-from typing import List, Dict, Any
+from typing import List, Dict
+import sys
+from pathlib import Path
+
+# Tilføj multihop_rag mappen til Python-stien for fælles moduler
+sys.path.append(str(Path(__file__).parent.parent))
+
+from legal_schema import SchemaSettings, ensure_schema, enable_compression, add_schema_arguments, settings_from_args
+from law_partitions import PartitionRouter, ensure_tenants, is_partitioned, list_tenants, tenant_for_law
+from record_pipeline import RecordStats, iter_records, iter_batches, JSON_DECODER
 
 # Indlæs miljøvariabler fra .env filen
 load_dotenv()
@@ -51,441 +58,47 @@ def create_weaviate_client():
         print(f"❌ Fejl ved oprettelse af forbindelse til Weaviate: {e}")
         exit(1)
 
-def create_optimized_schema(client, force_recreate=False):
-    """Opret optimeret schema med 1024 dimensioner"""
-    print("🔧 Kontrollerer eksisterende skema...")
-    
-    schema = client.schema.get()
-    existing_classes = [c['class'] for c in schema.get('classes', [])]
-    
-    if "LegalDocument" in existing_classes:
-        if force_recreate:
-            print("♻️  Sletter eksisterende skema for at genskabe det med 1024 dimensioner...")
-            client.schema.delete_class("LegalDocument")
-        else:
-            print("ℹ️  Skema findes allerede. Brug --force-recreate for at genskabe.")
-            return
-    
-    print("🔧 Opretter optimeret skema med 1024 dimensioner...")
-    
-    # Optimeret class definition med 1024 dimensioner
-    class_obj = {
-        "class": "LegalDocument",
-        "vectorizer": "text2vec-openai",
-        "moduleConfig": {
-            "text2vec-openai": {
-                "model": "text-embedding-3-large",
-                "modelVersion": "latest",
-                "dimensions": 1024,  # ← OPTIMERET: 1024 dimensioner
-                "type": "text"
-            },
-            "generative-openai": {}
-        },
-        "invertedIndexConfig": {
-            "bm25": {
-                "b": 0.75,  # Optimeret for juridiske dokumenter
-                "k1": 1.2   # Optimeret for paragrafsøgning
-            },
-            "stopwords": {
-                "preset": "en"  # Dansk ikke tilgængelig, engelsk fungerer ok
-            }
-        },
-        "properties": [
-            # PRIMÆRE TEKSTFELTER (Optimeret til 1024 dim)
-            {
-                "name": "text",
-                "dataType": ["text"],
-                "description": "Original paragraf/note tekst",
-                "indexInverted": True,
-                "tokenization": "word",
-                "moduleConfig": {
-                    "text2vec-openai": {
-                        "skip": True  # Bruger text_for_embedding i stedet
-                    }
-                }
-            },
-            {
-                "name": "text_for_embedding",
-                "dataType": ["text"],
-                "description": "Optimeret tekst til 1024-dim embedding",
-                "indexInverted": False,  # Kun til vector search
-                "moduleConfig": {
-                    "text2vec-openai": {
-                        "skip": False,  # Denne bruges til embedding
-                        "vectorizePropertyName": False
-                    }
-                }
-            },
-            
-            # IDENTIFIKATIONSFELTER (Høj præcision søgning)
-            {
-                "name": "chunk_id",
-                "dataType": ["text"],
-                "description": "Unik chunk identifier (UUID)",
-                "indexInverted": True,
-                "tokenization": "field"  # Behandl som én enhed
-            },
-            {
-                "name": "title",
-                "dataType": ["text"],
-                "description": "Lovens titel",
-                "indexInverted": True,
-                "tokenization": "word",
-                "moduleConfig": {
-                    "text2vec-openai": {
-                        "skip": False,  # Include i embedding for semantisk søgning
-                        "vectorizePropertyName": False
-                    }
-                }
-            },
-            {
-                "name": "type",
-                "dataType": ["text"],
-                "description": "Type: 'paragraf' eller 'notes'",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            {
-                "name": "topic",
-                "dataType": ["text"],
-                "description": "§ reference eller emne (fx '§ 33 A')",
-                "indexInverted": True,
-                "tokenization": "field",  # Bevar § 33 A som helhed
-                "moduleConfig": {
-                    "text2vec-openai": {
-                        "skip": True  # Præcis søgning, ikke semantisk
-                    }
-                }
-            },
-            
-            # METADATA FELTER
-            {
-                "name": "document_name",
-                "dataType": ["text"],
-                "description": "Kilde dokumentnavn",
-                "indexInverted": True,
-                "tokenization": "word"
-            },
-            {
-                "name": "law_number",
-                "dataType": ["text"],
-                "description": "Lovnummer (fx '2023-01-13 nr. 42')",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            {
-                "name": "status",
-                "dataType": ["text"],
-                "description": "Status: 'gældende' eller 'historisk'",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            {
-                "name": "date",
-                "dataType": ["text"],
-                "description": "Lovens dato",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            
-            # SØGEOPTIMERING
-            {
-                "name": "keywords",
-                "dataType": ["text[]"],
-                "description": "Ekstraherede søgenøgleord",
-                "indexInverted": True
-            },
-            {
-                "name": "entities",
-                "dataType": ["text[]"],
-                "description": "Navngivne entiteter (organisationer, love, etc.)",
-                "indexInverted": True
-            },
-            {
-                "name": "rule_type",
-                "dataType": ["text"],
-                "description": "Regeltype (definition, procedure, sanktion, etc.)",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            
-            # RELATIONSHIP FELTER (Optimeret til hurtig lookup)
-            {
-                "name": "note_reference_ids",
-                "dataType": ["text[]"],
-                "description": "Note reference IDs for paragraf→note mapping",
-                "indexInverted": True
-            },
-            {
-                "name": "related_note_chunks",
-                "dataType": ["text[]"],
-                "description": "Relaterede note chunk IDs",
-                "indexInverted": True
-            },
-            {
-                "name": "related_paragraph_chunk_id",
-                "dataType": ["text"],
-                "description": "Relateret paragraf chunk ID (note→paragraf)",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            
-            # EKSTRA FELTER
-            {
-                "name": "summary",
-                "dataType": ["text"],
-                "description": "AI-genereret sammendrag",
-                "indexInverted": True,
-                "tokenization": "word",
-                "moduleConfig": {
-                    "text2vec-openai": {
-                        "skip": False,  # Include i embedding
-                        "vectorizePropertyName": False
-                    }
-                }
-            },
-            {
-                "name": "dom_references",
-                "dataType": ["text[]"],
-                "description": "Referencer til domme og afgørelser",
-                "indexInverted": True
-            },
-            
-            # MANGLENDE FELTER FRA JSONL
-            {
-                "name": "heading",
-                "dataType": ["text"],
-                "description": "Overskrift (fx § 1, stk. 1)",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            {
-                "name": "interpretation_flag",
-                "dataType": ["boolean"],
-                "description": "Flag for fortolkning"
-            },
-            {
-                "name": "llm_model_used",
-                "dataType": ["text"],
-                "description": "LLM model brugt til generering",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            {
-                "name": "note_number",
-                "dataType": ["text"],
-                "description": "Note nummer",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            {
-                "name": "note_references",
-                "dataType": ["text"],
-                "description": "JSON string med note referencer"
-            },
-            {
-                "name": "notes",
-                "dataType": ["text"],
-                "description": "JSON string med noter"
-            },
-            {
-                "name": "nr",
-                "dataType": ["text"],
-                "description": "Nummer (fx 1, 2, 3)",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            {
-                "name": "paragraph",
-                "dataType": ["text"],
-                "description": "Paragraf reference (fx § 1)",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            {
-                "name": "related_paragraph_ref",
-                "dataType": ["text"],
-                "description": "Relateret paragraf reference",
-                "indexInverted": True,
-                "tokenization": "field"
-            },
-            {
-                "name": "related_paragraph_text",
-                "dataType": ["text"],
-                "description": "Relateret paragraf tekst",
-                "indexInverted": True,
-                "tokenization": "word"
-            },
-            {
-                "name": "related_paragraphs",
-                "dataType": ["text[]"],
-                "description": "Liste af relaterede paragraf IDs",
-                "indexInverted": True
-            },
-            {
-                "name": "rule_type_confidence",
-                "dataType": ["number"],
-                "description": "Konfidensscore for regeltypen"
-            },
-            {
-                "name": "rule_type_explanation",
-                "dataType": ["text"],
-                "description": "Forklaring af regeltypen",
-                "indexInverted": True,
-                "tokenization": "word"
-            },
-            {
-                "name": "section",
-                "dataType": ["text"],
-                "description": "Sektion (fx AFSNIT I. SKATTEPLIGTEN)",
-                "indexInverted": True,
-                "tokenization": "word"
-            },
-            {
-                "name": "stk",
-                "dataType": ["text"],
-                "description": "Stykke nummer (fx 1, 2, 3)",
-                "indexInverted": True,
-                "tokenization": "field"
-            }
-        ]
-    }
-    
+def create_optimized_schema(client, force_recreate=False, settings: SchemaSettings = None):
+    """Opret optimeret schema med 1024 dimensioner (delt definition i legal_schema.py)"""
     try:
-        client.schema.create_class(class_obj)
-        print("✅ Optimeret schema oprettet med 1024 dimensioner!")
-        
-        # Verificer schema konfiguration
-        schema = client.schema.get()
-        for cls in schema.get('classes', []):
-            if cls['class'] == 'LegalDocument':
-                dimensions = cls['moduleConfig']['text2vec-openai'].get('dimensions', 'default')
-                print(f"🎯 Schema verificeret - Dimensioner: {dimensions}")
-                break
-        
+        ensure_schema(client, settings=settings, force_recreate=force_recreate)
     except Exception as e:
         print(f"❌ Schema oprettelse fejl: {e}")
         raise
 
-def prepare_document_for_embedding(doc: Dict[str, Any]) -> Dict[str, Any]:
-    """Forbered dokument til optimeret 1024-dim embedding"""
-    
-    # Opret optimeret tekst til embedding
-    embedding_parts = []
-    
-    # 1. Titel (vigtig kontekst)
-    if doc.get('title'):
-        embedding_parts.append(f"Titel: {doc['title']}")
-    
-    # 2. Type og topic (strukturel kontekst)
-    if doc.get('type') and doc.get('topic'):
-        embedding_parts.append(f"{doc['type']}: {doc['topic']}")
-    
-    # 3. Hoved tekst (prioriteret)
-    if doc.get('text'):
-        # Begræns tekst længde for optimal embedding
-        text = doc['text']
-        if len(text) > 6000:  # Optimal længde for 1024 dim
-            text = text[:6000] + "..."
-        embedding_parts.append(text)
-    
-    # 4. Sammendrag hvis tilgængeligt
-    if doc.get('summary'):
-        embedding_parts.append(f"Sammendrag: {doc['summary']}")
-    
-    # Kombiner til optimeret embedding tekst
-    doc['text_for_embedding'] = " | ".join(embedding_parts)
-    
-    # Håndter special felter som ikke er direkte kompatible med Weaviate
-    
-    # Convert note_references list til JSON string
-    if 'note_references' in doc and isinstance(doc['note_references'], list):
-        doc['note_references'] = json.dumps(doc['note_references'])
-    
-    # Convert notes dict til JSON string  
-    if 'notes' in doc and isinstance(doc['notes'], dict):
-        doc['notes'] = json.dumps(doc['notes'])
-    
-    # Sørg for at alle tekst felter er strings
-    for field in ['chunk_id', 'section', 'paragraph', 'stk', 'nr', 'heading', 
-                  'type', 'document_name', 'title', 'date', 'status', 'law_number', 
-                  'topic', 'summary', 'rule_type', 'related_paragraph_chunk_id',
-                  'note_number', 'related_paragraph_ref', 'related_paragraph_text',
-                  'rule_type_explanation', 'llm_model_used']:
-        if field in doc and doc[field] is not None:
-            doc[field] = str(doc[field])
-        elif field in doc and doc[field] is None:
-            # Fjern None værdier for at undgå fejl
-            del doc[field]
-    
-    # Sørg for at number felter er numeriske
-    if 'rule_type_confidence' in doc and doc['rule_type_confidence'] is not None:
-        try:
-            doc['rule_type_confidence'] = float(doc['rule_type_confidence'])
-        except (ValueError, TypeError):
-            doc['rule_type_confidence'] = 0.0
-    
-    # Sørg for at boolean felter er booleans
-    if 'interpretation_flag' in doc:
-        doc['interpretation_flag'] = bool(doc['interpretation_flag'])
-    
-    # Håndter list felter
-    for list_field in ['keywords', 'entities', 'dom_references', 'related_note_chunks', 
-                       'related_paragraphs']:
-        if list_field in doc:
-            if isinstance(doc[list_field], list):
-                # Konverter alle elementer til strings
-                doc[list_field] = [str(item) for item in doc[list_field] if item is not None]
-            elif doc[list_field] is not None:
-                # Hvis det ikke er en liste, gør det til en liste
-                doc[list_field] = [str(doc[list_field])]
-            else:
-                # Fjern None værdier
-                del doc[list_field]
-    
-    return doc
-
-def import_documents_optimized(client, jsonl_files: List[str], batch_size: int = 8):
-    """Import dokumenter med optimeret 1024-dim embedding"""
+def import_documents_optimized(client, jsonl_files: List[str], batch_size: int = 8, rate_limit: float = 0.3):
+    """Import dokumenter med optimeret 1024-dim embedding (rate_limit = pause i sekunder mellem batches)"""
     
     print(f"📥 IMPORTERER MED 1024-DIM OPTIMERING")
-    print(f"Batch size: {batch_size} (optimeret for stabilitet)")
+    print(f"Batch size: {batch_size} (optimeret for stabilitet), JSON: {JSON_DECODER}")
     print("-" * 40)
     
     total_imported = 0
     total_errors = 0
     
+    # Partitioneret schema: hver lov importeres i sin egen tenant
+    tenants = set(list_tenants(client)) if is_partitioned(client) else None
+    
     for file in jsonl_files:
         print(f"\n📄 Importerer: {file}")
         
         try:
-            with jsonlines.open(file) as reader:
-                batch = []
+            # Streaming læsning - records valideres og forberedes til embedding undervejs
+            stats = RecordStats()
+            
+            for batch in iter_batches(iter_records(file, stats), batch_size):
+                success, errors = import_batch_with_retry(client, batch, tenants=tenants)
+                total_imported += success
+                total_errors += errors
                 
-                for i, obj in enumerate(reader):
-                    # Forbered til optimeret embedding
-                    obj = prepare_document_for_embedding(obj)
-                    batch.append(obj)
-                    
-                    if len(batch) >= batch_size:
-                        # Import batch
-                        success, errors = import_batch_with_retry(client, batch)
-                        total_imported += success
-                        total_errors += errors
-                        
-                        print(f"   ✅ {total_imported} importeret, ❌ {total_errors} fejl")
-                        
-                        batch = []
-                        
-                        # Rate limiting for stabilitet
-                        time.sleep(0.3)
+                print(f"   ✅ {total_imported} importeret, ❌ {total_errors} fejl")
                 
-                # Import sidste batch
-                if batch:
-                    success, errors = import_batch_with_retry(client, batch)
-                    total_imported += success
-                    total_errors += errors
-                    print(f"   ✅ {total_imported} importeret, ❌ {total_errors} fejl")
+                # Rate limiting for stabilitet
+                if rate_limit:
+                    time.sleep(rate_limit)
+            
+            total_errors += stats.invalid_json + stats.missing_chunk_id
+            print(f"   📋 {stats.summary()}")
                     
         except Exception as e:
             print(f"❌ Fejl ved læsning af {file}: {e}")
@@ -496,8 +109,14 @@ def import_documents_optimized(client, jsonl_files: List[str], batch_size: int =
     print(f"❌ Fejl: {total_errors}")
     print(f"📊 Success rate: {(total_imported/(total_imported+total_errors)*100):.1f}%" if (total_imported+total_errors) > 0 else "N/A")
 
-def import_batch_with_retry(client, batch: List[Dict], max_retries: int = 3):
-    """Import batch med retry logik"""
+def import_batch_with_retry(client, batch: List[Dict], max_retries: int = 3, tenants: set = None):
+    """Import batch med retry logik
+    
+    tenants: Kendte lov-partitioner hvis LegalDocument er partitioneret (None = ikke partitioneret)
+    """
+    
+    if tenants is not None:
+        ensure_tenants(client, [obj.get('title') for obj in batch], known=tenants)
     
     for attempt in range(max_retries):
         try:
@@ -507,7 +126,8 @@ def import_batch_with_retry(client, batch: List[Dict], max_retries: int = 3):
                 for obj in batch:
                     batch_client.add_data_object(
                         data_object=obj,
-                        class_name="LegalDocument"
+                        class_name="LegalDocument",
+                        tenant=tenant_for_law(obj.get('title')) if tenants is not None else None
                     )
             
             return len(batch), 0  # success, errors
@@ -528,15 +148,18 @@ def verify_import_quality(client):
     print("-" * 30)
     
     try:
+        router = PartitionRouter(client)
+        
         # Check antal dokumenter
-        result = client.query.aggregate("LegalDocument").with_meta_count().do()
-        count = result.get('data', {}).get('Aggregate', {}).get('LegalDocument', [{}])[0].get('meta', {}).get('count', 0)
+        count = router.count()
         
         print(f"📊 Total dokumenter: {count}")
+        if router.partitioned:
+            for tenant in router.tenants:
+                print(f"   🗂️ {tenant}: {router.count(law_title=tenant)}")
         
         # Test vector størrelse
-        result = client.query.get("LegalDocument", ["chunk_id"]).with_additional(["vector"]).with_limit(1).do()
-        docs = result.get('data', {}).get('Get', {}).get('LegalDocument', [])
+        docs = router.get(lambda: client.query.get("LegalDocument", ["chunk_id"]).with_additional(["vector"]).with_limit(1), limit=1)
         
         if docs and docs[0].get('_additional', {}).get('vector'):
             vector_size = len(docs[0]['_additional']['vector'])
@@ -555,12 +178,11 @@ def verify_import_quality(client):
             try:
                 start_time = time.time()
                 
-                results = client.query.get("LegalDocument", ["chunk_id", "title", "topic"]).with_near_text({
+                docs = router.get(lambda: client.query.get("LegalDocument", ["chunk_id", "title", "topic"]).with_near_text({
                     "concepts": [query]
-                }).with_limit(5).do()
+                }).with_limit(5).with_additional(["distance"]), limit=5)
                 
                 elapsed = time.time() - start_time
-                docs = results.get('data', {}).get('Get', {}).get('LegalDocument', [])
                 
                 print(f"   '{query}': {len(docs)} resultater i {elapsed:.3f}s ✅")
                 
@@ -582,6 +204,7 @@ def main():
                        help='Batch størrelse (default: 8)')
     parser.add_argument('--files', nargs='*',
                        help='Specifikke .jsonl filer at importere')
+    add_schema_arguments(parser)
     
     args = parser.parse_args()
     
@@ -589,7 +212,8 @@ def main():
     client = create_weaviate_client()
     
     # Opret/check schema
-    create_optimized_schema(client, force_recreate=args.force_recreate)
+    settings = settings_from_args(args)
+    create_optimized_schema(client, force_recreate=args.force_recreate, settings=settings)
     
     # Find filer at importere
     if args.files:
@@ -613,6 +237,9 @@ def main():
     # Start import
     import_documents_optimized(client, jsonl_files, batch_size=args.batch_size)
     
+    # PQ trænes på de importerede vektorer
+    enable_compression(client, settings)
+    
     # Verificer kvalitet
     verify_import_quality(client)
     
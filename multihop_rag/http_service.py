@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+HTTP SERVICE - Async ASGI API over SearchEngine og MultihopJuridiskRAG
+=====================================================================
+
+Én varm motor (rag_service.RAGService: én Weaviate klient, én OpenAI klient,
+delte caches) som flere frontends kan dele over HTTP:
+
+- Bounded worker pool: søgninger og spørgsmål kører i en fast thread pool
+  (motorerne er synkrone). Er alle workers og køpladser optaget, afvises nye
+  forespørgsler straks med 503 + Retry-After i stedet for at hobe sig op.
+- Request coalescing: identiske samtidige forespørgsler (samme endpoint og
+  samme normaliserede parametre) deler én kørsel. Senere ankomne til en
+  streaming-kørsel får de tokens der allerede er sendt, og derefter resten.
+
+ENDPOINTS:
+    GET  /health        status, kø og coalescing statistik
+    POST /search        {"query": "...", "limit": 5, "search_type": "auto"}  (også GET ?query=...)
+    POST /ask           {"question": "..."}
+    POST /ask/stream    {"question": "..."} -> Server-Sent Events: token*, result | error
+
+Implementeret direkte mod ASGI-specifikationen - kræver kun en ASGI server.
+
+BRUG:
+    uvicorn http_service:app --port 8000                  (fra multihop_rag/)
+    python http_service.py --port 8000 --max-workers 4 --max-queue 16
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from rag_service import RAGService, get_service
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class ServiceOverloaded(Exception):
+    """Alle workers og køpladser er optaget - forespørgslen afvises (503)"""
+
+
+class BadRequest(Exception):
+    """Ugyldig forespørgsel (400)"""
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+class BoundedWorkerPool:
+    """Thread pool med fast kø-loft - forespørgsler ud over loftet afvises straks"""
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http-worker")
+        # Tilgås kun fra event loop tråden - ingen lås nødvendig
+        self.pending = 0
+        self.completed = 0
+        self.shed = 0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        if self.pending >= self.max_workers + self.max_queue:
+            self.shed += 1
+            raise ServiceOverloaded(f"{self.pending} forespørgsler i gang/kø")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def statistics(self) -> Dict:
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'pending': self.pending,
+            'queued': max(self.pending - self.max_workers, 0),
+            'completed': self.completed,
+            'shed': self.shed
+        }
+
+
+class RequestCoalescer:
+    """Identiske samtidige forespørgsler deler én kørsel"""
+
+    def __init__(self):
+        self.inflight: Dict[Tuple, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key: Tuple, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(factory())
+            self.inflight[key] = task
+            task.add_done_callback(lambda _, key=key: self.inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: en klient der afbryder må ikke annullere kørslen for de andre
+        return await asyncio.shield(task)
+
+    def statistics(self) -> Dict:
+        return {'inflight': len(self.inflight), 'executions': self.executions, 'coalesced': self.coalesced}
+
+
+class AnswerStream:
+    """Én streaming-kørsel med vilkårligt mange lyttere (også sent ankomne)"""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.result: Optional[Dict] = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self._listeners: List[asyncio.Queue] = []
+
+    def publish(self, token: str) -> None:
+        self.tokens.append(token)
+        for queue in self._listeners:
+            queue.put_nowait(("token", token))
+
+    def finish(self, result: Optional[Dict] = None, error: Optional[BaseException] = None) -> None:
+        self.result, self.error, self.done = result, error, True
+        for queue in self._listeners:
+            queue.put_nowait(("done", None))
+
+    async def events(self) -> AsyncIterator[Tuple[str, Any]]:
+        """('token', tekst)* efterfulgt af ('result', dict) eller ('error', exception)"""
+        queue: asyncio.Queue = asyncio.Queue()
+        # Indhent hvad der allerede er streamet (tilmelding sker i samme loop-tick)
+        for token in self.tokens:
+            queue.put_nowait(("token", token))
+        if self.done:
+            queue.put_nowait(("done", None))
+        else:
+            self._listeners.append(queue)
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == "done":
+                    break
+                yield kind, value
+        finally:
+            if queue in self._listeners:
+                self._listeners.remove(queue)
+        if self.error is not None:
+            yield "error", self.error
+        else:
+            yield "result", self.result
+
+    async def wait(self) -> Dict:
+        """Vent på det færdige svar (rejser kørslens fejl)"""
+        async for kind, value in self.events():
+            if kind == "error":
+                raise value
+            if kind == "result":
+                return value
+
+
+class QueryService:
+    """Async facade over RAGService med worker pool og request coalescing"""
+
+    def __init__(self, rag_service: Optional[RAGService] = None, max_workers: int = 4, max_queue: int = 16):
+        self.rag_service = rag_service or get_service()
+        self.pool = BoundedWorkerPool(max_workers, max_queue)
+        self.coalescer = RequestCoalescer()
+        self.streams: Dict[str, AnswerStream] = {}
+        self.started = time.time()
+
+    async def search(self, query: str, limit: int = 5, search_type: str = "auto") -> List[Dict]:
+        query = _normalize(query)
+        return await self.coalescer.run(
+            ("search", query, limit, search_type),
+            lambda: self.pool.run(self._search, query, limit, search_type)
+        )
+
+    def _search(self, query: str, limit: int, search_type: str) -> List[Dict]:
+        return self.rag_service.search_engine.search(query, limit=limit, search_type=search_type)
+
+    async def ask(self, question: str) -> Dict:
+        question = _normalize(question)
+        stream = self.streams.get(question)
+        if stream is not None:
+            # Samme spørgsmål streames allerede - del den kørsel
+            self.coalescer.coalesced += 1
+            return await stream.wait()
+        return await self.coalescer.run(("ask", question), lambda: self.pool.run(self._ask, question))
+
+    def _ask(self, question: str, on_token: Optional[Callable[[str], None]] = None) -> Dict:
+        return self.rag_service.rag.ask(question, on_token=on_token)
+
+    def ask_stream(self, question: str) -> AnswerStream:
+        """Start (eller tilslut) en streaming-kørsel - ServiceOverloaded hvis køen er fuld"""
+        question = _normalize(question)
+        stream = self.streams.get(question)
+        if stream is not None:
+            self.coalescer.coalesced += 1
+            return stream
+
+        if self.pool.pending >= self.pool.max_workers + self.pool.max_queue:
+            self.pool.shed += 1
+            raise ServiceOverloaded(f"{self.pool.pending} forespørgsler i gang/kø")
+
+        loop = asyncio.get_running_loop()
+        stream = self.streams[question] = AnswerStream()
+        self.coalescer.executions += 1
+        on_token = lambda token: loop.call_soon_threadsafe(stream.publish, token)
+
+        async def run():
+            try:
+                stream.finish(result=await self.pool.run(self._ask, question, on_token))
+            except Exception as e:
+                stream.finish(error=e)
+            finally:
+                self.streams.pop(question, None)
+
+        asyncio.ensure_future(run())
+        return stream
+
+    async def warm_up(self) -> Dict[str, float]:
+        return await asyncio.get_running_loop().run_in_executor(self.pool.executor, self.rag_service.warm_up)
+
+    def statistics(self) -> Dict:
+        return {
+            'uptime': time.time() - self.started,
+            'warmed_up': self.rag_service.warmed_up,
+            'pool': self.pool.statistics(),
+            'coalescing': {**self.coalescer.statistics(), 'streams': len(self.streams)}
+        }
+
+
+# -----------------------------------------------------------------------------
+# ASGI
+# -----------------------------------------------------------------------------
+
+def _json_bytes(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: ".encode("utf-8") + _json_bytes(data) + b"\n\n"
+
+
+class HTTPApp:
+    """ASGI app: routing, JSON og fejlhåndtering"""
+
+    def __init__(self, service_factory: Callable[[], QueryService], warm_up: bool = True, verbose: bool = True):
+        self._service_factory = service_factory
+        self._service: Optional[QueryService] = None
+        self.warm_up = warm_up
+        self.verbose = verbose
+        self.routes = {
+            ("GET", "/health"): self._health,
+            ("GET", "/search"): self._search,
+            ("POST", "/search"): self._search,
+            ("POST", "/ask"): self._ask,
+            ("POST", "/ask/stream"): self._ask_stream,
+        }
+
+    @property
+    def service(self) -> QueryService:
+        if self._service is None:
+            self._service = self._service_factory()
+        return self._service
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    if self.warm_up:
+                        await self.service.warm_up()
+                    await send({"type": "lifespan.startup.complete"})
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+            elif message["type"] == "lifespan.shutdown":
+                if self._service is not None:
+                    self._service.pool.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        handler = self.routes.get((method, path))
+        try:
+            if handler is None:
+                allowed = any(route_path == path for _, route_path in self.routes)
+                status = 405 if allowed else 404
+                await self._respond(send, status, {"error": "Metode ikke tilladt" if allowed else "Ukendt endpoint"})
+                return
+            params = dict((key, values[-1]) for key, values in
+                          parse_qs(scope.get("query_string", b"").decode("utf-8")).items())
+            if method == "POST":
+                params.update(await self._read_json(receive))
+            await handler(params, send)
+        except BadRequest as e:
+            await self._respond(send, 400, {"error": str(e)})
+        except ServiceOverloaded as e:
+            await self._respond(send, 503, {"error": f"Service overbelastet: {e}"}, [(b"retry-after", b"1")])
+        except Exception as e:
+            if self.verbose:
+                traceback.print_exc()
+            await self._respond(send, 500, {"error": str(e)})
+
+    @staticmethod
+    async def _read_json(receive: Callable) -> Dict:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if len(body) > MAX_BODY_BYTES:
+                raise BadRequest("Body for stor")
+            if not message.get("more_body", False):
+                break
+        if not body:
+            return {}
+        try:
+            data = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise BadRequest("Ugyldig JSON")
+        if not isinstance(data, dict):
+            raise BadRequest("JSON body skal være et objekt")
+        return data
+
+    @staticmethod
+    async def _respond(send: Callable, status: int, data: Any, headers: Optional[List] = None) -> None:
+        body = _json_bytes(data)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                        (b"content-length", str(len(body)).encode())] + (headers or []),
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _text(params: Dict, name: str) -> str:
+        value = params.get(name)
+        if not isinstance(value, str) or not value.strip():
+            raise BadRequest(f"'{name}' mangler")
+        return value
+
+    async def _health(self, params: Dict, send: Callable) -> None:
+        await self._respond(send, 200, {"status": "ok", **self.service.statistics()})
+
+    async def _search(self, params: Dict, send: Callable) -> None:
+        query = self._text(params, "query")
+        try:
+            limit = int(params.get("limit", 5))
+        except (TypeError, ValueError):
+            raise BadRequest("'limit' skal være et heltal")
+        if not 1 <= limit <= 50:
+            raise BadRequest("'limit' skal være mellem 1 og 50")
+        search_type = str(params.get("search_type", "auto"))
+        results = await self.service.search(query, limit, search_type)
+        await self._respond(send, 200, {"query": query, "results": results})
+
+    async def _ask(self, params: Dict, send: Callable) -> None:
+        question = self._text(params, "question")
+        await self._respond(send, 200, await self.service.ask(question))
+
+    async def _ask_stream(self, params: Dict, send: Callable) -> None:
+        stream = self.service.ask_stream(self._text(params, "question"))
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream; charset=utf-8"),
+                        (b"cache-control", b"no-cache")],
+        })
+        async for kind, value in stream.events():
+            if kind == "token":
+                chunk = _sse("token", {"text": value})
+            elif kind == "error":
+                chunk = _sse("error", {"error": str(value)})
+            else:
+                chunk = _sse("result", value)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def create_app(rag_service: Optional[RAGService] = None, max_workers: int = 4, max_queue: int = 16,
+               warm_up: bool = True, verbose: bool = True) -> HTTPApp:
+    """ASGI app - servicen (og motoren) oprettes først ved opstart eller første forespørgsel"""
+    return HTTPApp(lambda: QueryService(rag_service, max_workers, max_queue), warm_up=warm_up, verbose=verbose)
+
+
+# Til `uvicorn http_service:app`
+app = create_app()
+
+
+def main():
+    """Start HTTP service"""
+    parser = argparse.ArgumentParser(description='HTTP API over SearchEngine og MultihopJuridiskRAG')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--weaviate-url', default='http://localhost:8080')
+    parser.add_argument('--max-workers', type=int, default=4, help='Samtidige kørsler')
+    parser.add_argument('--max-queue', type=int, default=16, help='Ventende kørsler før 503')
+    parser.add_argument('--no-warm-up', action='store_true', help='Spring opvarmning ved opstart over')
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ uvicorn er ikke installeret - pip install uvicorn (eller brug en anden ASGI server)")
+        return
+
+    print("🌐 JURIDISK RAG HTTP SERVICE")
+    print(f"   http://{args.host}:{args.port}  workers={args.max_workers} kø={args.max_queue}")
+    service_app = create_app(get_service(args.weaviate_url), args.max_workers, args.max_queue,
+                             warm_up=not args.no_warm_up)
+    uvicorn.run(service_app, host=args.host, port=args.port, lifespan="on")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,14 +11,20 @@ from langchain.prompts import PromptTemplate
 import os
 import sys
 from dotenv import load_dotenv
-from typing import List, Dict, Optional, Tuple, Any
+from typing import Callable, List, Dict, Optional, Tuple, Any
 import time
-import json
+import threading
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 
 # Import vores eksisterende søgemaskine
 from search_engine import SearchEngine
+from context_packer import ContextPacker, PackedContext
+from retrieval_coverage import CoverageScore, has_explicit_reference, score_coverage
+from planning import DocumentAnalysis, PlanningResult, QueryAnalysis, parse_planning_output, response_format
 
 # Indlæs miljøvariabler
 load_dotenv()
@@ -39,21 +45,37 @@ class LangChainRAGConfig:
     temperature: float = 0.1
     max_tokens: int = 2000
     
+    # Per-stage modeller - query/dokument analyse er JSON planlægning og kører på en lille model,
+    # svaret genereres altid med `model`. None = brug `model` til alle stages
+    query_analysis_model: Optional[str] = "gpt-4o-mini"
+    doc_analysis_model: Optional[str] = "gpt-4o-mini"
+    escalate_on_parse_failure: bool = True  # Gentag med `model` hvis JSON ikke kan parses
+    escalation_confidence_threshold: float = 0.5  # Gentag med `model` hvis analysens confidence er lavere
+    
+    # Planlægnings-stages - schema-bundet JSON (structured outputs) og korte svar
+    structured_outputs: bool = True  # False for modeller uden response_format=json_schema
+    query_analysis_max_tokens: int = 400
+    doc_analysis_max_tokens: int = 600
+    
     # Retrieval settings
     max_documents_per_hop: int = 5
     max_hops: int = 3
     search_strategy: SearchStrategy = SearchStrategy.MULTIHOP
     include_related_notes: bool = True
     
-    # Context settings
-    max_context_length: int = 12000
-    context_overlap: int = 300
+    # Context settings (tokens) - håndhæves af ContextPacker i svar-prompten
+    max_context_length: int = 12000  # Token-budget for dokumenter i svar-prompten
+    context_overlap: int = 300  # Mindste fragment når det sidste dokument afkortes til budgettet
     
     # Multihop settings
     enable_multihop: bool = True
-    hop_confidence_threshold: float = 0.4
+    hop_confidence_threshold: float = 0.7  # Coverage gate: HOP 1 dækning herover -> svar direkte (se retrieval_coverage.py)
     max_reasoning_depth: int = 3
     
+    # Parallel retrieval settings
+    max_parallel_searches: int = 4  # Samtidige søgninger (HOP 1 + analysens queries)
+    max_analysis_queries: int = 3  # Ekstra søgninger fra query analysens search_queries/paragraphs
+    
     # Citation settings
     include_citations: bool = True
     citation_format: str = "detailed"
@@ -80,8 +102,13 @@ class WeaviateRetriever:
         
         # Konverter til LangChain Document format
         documents = []
+        method_ranks = Counter()
         for result in search_results:
-            # Byg metadata
+            # Rang inden for søgemetoden (paragraf/semantisk/keyword/graf rangerer hver for sig)
+            method = result.get('search_method', '')
+            rank = method_ranks[method]
+            method_ranks[method] += 1
+            # Byg metadata (certainty/search_method/rank bruges af ContextPacker til rangering)
             metadata = {
                 "chunk_id": result.get('chunk_id', ''),
                 "title": result.get('title', ''),
@@ -90,7 +117,10 @@ class WeaviateRetriever:
                 "nr": result.get('nr', ''),
                 "type": result.get('type', ''),
                 "law_number": result.get('law_number', ''),
-                "reference": self._build_reference_string(result)
+                "reference": self._build_reference_string(result),
+                "search_method": result.get('search_method', ''),
+                "certainty": result.get('certainty') or 0.0,
+                "rank": rank
             }
             
             # Byg page_content
@@ -122,6 +152,52 @@ class WeaviateRetriever:
         
         return ", ".join(parts) if parts else "N/A"
 
+class DocumentPool:
+    """
+    Dokumenter fundet på tværs af hops - nøglet på chunk_id
+    
+    Et dokument tilhører det hop det først blev fundet i, så samme paragraf
+    hverken analyseres igen eller sendes flere gange i svar-prompten.
+    """
+    
+    def __init__(self, hops: int = 3):
+        self.hops = hops
+        self._documents: Dict[str, Document] = {}
+        self._first_hop: Dict[str, int] = {}
+        self.duplicates = 0
+    
+    @staticmethod
+    def _key(doc: Document) -> str:
+        return doc.metadata.get('chunk_id') or doc.page_content
+    
+    def add(self, documents: List[Document], hop_number: int) -> List[Document]:
+        """Tilføj dokumenter fra et hop - returnerer kun de nye"""
+        added = []
+        for doc in documents:
+            key = self._key(doc)
+            if key in self._documents:
+                self.duplicates += 1
+                continue
+            doc.metadata['hop'] = hop_number
+            self._documents[key] = doc
+            self._first_hop[key] = hop_number
+            added.append(doc)
+        return added
+    
+    def for_hop(self, hop_number: int) -> List[Document]:
+        """Dokumenter først fundet i et hop (i fund-rækkefølge)"""
+        return [doc for key, doc in self._documents.items() if self._first_hop[key] == hop_number]
+    
+    def first_hop(self, chunk_id: str) -> Optional[int]:
+        return self._first_hop.get(chunk_id)
+    
+    def as_hops(self) -> Dict[str, List[Document]]:
+        """{"hop1": [...], "hop2": [...], "hop3": [...]} - formatet resten af pipelinen bruger"""
+        return {f"hop{hop}": self.for_hop(hop) for hop in range(1, self.hops + 1)}
+    
+    def __len__(self) -> int:
+        return len(self._documents)
+
 class MultihopJuridiskRAG:
     """
     LangChain-baseret Juridisk RAG med Multihop Reasoning
@@ -130,7 +206,8 @@ class MultihopJuridiskRAG:
     for at besvare komplekse juridiske spørgsmål.
     """
     
-    def __init__(self, config: LangChainRAGConfig = None, weaviate_url: str = "http://localhost:8080", verbose: bool = True):
+    def __init__(self, config: LangChainRAGConfig = None, weaviate_url: str = "http://localhost:8080", verbose: bool = True,
+                 search_engine: Optional[SearchEngine] = None, validate_connections: bool = True):
         """
         Initialize LangChain RAG system
         
@@ -138,6 +215,8 @@ class MultihopJuridiskRAG:
             config: RAG konfiguration
             weaviate_url: Weaviate database URL
             verbose: Print progress og debug info
+            search_engine: Eksisterende SearchEngine der genbruges (fx fra rag_service)
+            validate_connections: Test Weaviate/OpenAI ved opstart (rag_service gør det i warm_up)
         """
         self.config = config or LangChainRAGConfig()
         self.verbose = verbose
@@ -150,8 +229,23 @@ class MultihopJuridiskRAG:
             openai_api_key=os.getenv("OPENAI_API_KEY")
         )
         
-        # Initialize søgemaskinen
-        self.search_engine = SearchEngine(weaviate_url=weaviate_url, verbose=verbose)
+        # Små, hurtige modeller til planlægnings-stages (deles hvis samme model)
+        self.stage_llms = {
+            "query_analysis": self._llm_for(self.config.query_analysis_model),
+            "doc_analysis": self._llm_for(self.config.doc_analysis_model)
+        }
+        self.stage_results = {"query_analysis": QueryAnalysis, "doc_analysis": DocumentAnalysis}
+        self.stage_max_tokens = {
+            "query_analysis": self.config.query_analysis_max_tokens,
+            "doc_analysis": self.config.doc_analysis_max_tokens
+        }
+        self._metrics_lock = threading.Lock()
+        self.stage_metrics = {
+            stage: {"calls": 0, "escalations": 0, "parse_failures": 0} for stage in self.stage_llms
+        }
+        
+        # Initialize søgemaskinen (eller genbrug en delt instans)
+        self.search_engine = search_engine or SearchEngine(weaviate_url=weaviate_url, verbose=verbose)
         
         # Initialize retriever
         self.retriever = WeaviateRetriever(
@@ -160,19 +254,46 @@ class MultihopJuridiskRAG:
             max_docs=self.config.max_documents_per_hop
         )
         
+        # Token-budget for svar-prompten
+        self.context_packer = ContextPacker(
+            max_tokens=self.config.max_context_length,
+            min_fragment_tokens=self.config.context_overlap,
+            model=self.config.model
+        )
+        
+        # Delt pool til samtidig query analyse og søgninger
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(2, self.config.max_parallel_searches),
+            thread_name_prefix="multihop"
+        )
+        
         # Setup multihop reasoning chain
         self._setup_multihop_chain()
         
         # Test forbindelser
-        self._validate_connections()
+        if validate_connections:
+            self._validate_connections()
         
         if self.verbose:
             print("🚀 LANGCHAIN MULTIHOP RAG SYSTEM KLAR")
             print(f"   Model: {self.config.model}")
+            print(f"   Analyse modeller: query={self.config.query_analysis_model or self.config.model}, "
+                  f"dokumenter={self.config.doc_analysis_model or self.config.model}")
             print(f"   Max hops: {self.config.max_hops}")
             print(f"   Max docs per hop: {self.config.max_documents_per_hop}")
             print(f"   Multihop enabled: {self.config.enable_multihop}")
     
+    def _llm_for(self, model: Optional[str]) -> ChatOpenAI:
+        """ChatOpenAI for en stage - hovedmodellen genbruges hvis stagen ikke har sin egen"""
+        if not model or model == self.config.model:
+            return self.llm
+        return ChatOpenAI(
+            model=model,
+            temperature=self.config.temperature,
+            max_tokens=self.config.max_tokens,
+            openai_api_key=os.getenv("OPENAI_API_KEY")
+        )
+    
     def _setup_multihop_chain(self):
         """Setup LangChain chains for multihop reasoning"""
         
@@ -195,7 +316,8 @@ SVAR I JSON FORMAT:
     "concepts": ["koncept1", "koncept2"],
     "needs_multihop": true/false,
     "reasoning": "forklaring af hvorfor multihop er nødvendig",
-    "search_queries": ["query1", "query2", "query3"]
+    "search_queries": ["query1", "query2", "query3"],
+    "confidence": 0.0-1.0 (hvor sikker du er på analysen)
 }}
 """)
         
@@ -220,7 +342,8 @@ SVAR I JSON FORMAT:
     "missing_info": ["info1", "info2"],
     "references": ["ref1", "ref2"],
     "needs_more_search": true/false,
-    "next_queries": ["query1", "query2"]
+    "next_queries": ["query1", "query2"],
+    "confidence": 0.0-1.0 (hvor sikker du er på analysen)
 }}
 """)
         
@@ -270,12 +393,13 @@ KOMPLET JURIDISK SVAR:
         except Exception as e:
             raise ConnectionError(f"Kan ikke forbinde til OpenAI API via LangChain: {e}")
     
-    def ask(self, question: str) -> Dict:
+    def ask(self, question: str, on_token: Optional[Callable[[str], None]] = None) -> Dict:
         """
         Hovedfunktion: Still juridisk spørgsmål med multihop reasoning
         
         Args:
             question: Det juridiske spørgsmål
+            on_token: Kaldes med hver tekstbid af det endelige svar mens det genereres (streaming)
             
         Returns:
             Dict med svar, kilder, reasoning path og metadata
@@ -287,103 +411,233 @@ KOMPLET JURIDISK SVAR:
             print("=" * 80)
         
         if self.config.enable_multihop:
-            return self._multihop_reasoning(question, start_time)
+            return self._multihop_reasoning(question, start_time, on_token)
         else:
-            return self._single_hop_answer(question, start_time)
+            return self._single_hop_answer(question, start_time, on_token)
+    
+    def _submit(self, fn: Callable, *args):
+        """Kør i den delte pool med kalderens contextvars (fx get_openai_callback token-tælling)"""
+        return self._executor.submit(contextvars.copy_context().run, fn, *args)
     
-    def _multihop_reasoning(self, question: str, start_time: float) -> Dict:
+    def _complete(self, prompt: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Svar-LLM kald - streamet til on_token hvis angivet"""
+        if on_token is None:
+            return self.llm.invoke([HumanMessage(content=prompt)]).content
+        
+        parts = []
+        for chunk in self.llm.stream([HumanMessage(content=prompt)]):
+            if chunk.content:
+                parts.append(chunk.content)
+                on_token(chunk.content)
+        return "".join(parts)
+    
+    def _multihop_reasoning(self, question: str, start_time: float,
+                            on_token: Optional[Callable[[str], None]] = None) -> Dict:
         """
         MULTIHOP REASONING PIPELINE
         """
         reasoning_path = []
-        all_documents = {"hop1": [], "hop2": [], "hop3": []}
+        pool = DocumentPool(hops=3)
         
-        # STEP 1: Query Analysis
+        # STEP 1+2: Query Analysis og Initial Search (HOP 1) samtidigt
+        # HOP 1 på det rå spørgsmål afhænger ikke af analysen - den starter spekulativt.
+        # Spørgsmål med en eksplicit § reference søger først alene: rammer HOP 1 præcist,
+        # er query analysen overflødig (se coverage gate nedenfor)
+        explicit_reference = has_explicit_reference(question)
         if self.verbose:
-            print("🔍 STEP 1: Query Analysis")
+            print("🔍 STEP 1+2: Query Analysis + Initial Search (HOP 1)")
+        
+        hop1_future = self._submit(self._perform_search, question, 1)
+        analysis_future = None if explicit_reference else self._submit(self._analyze_query, question)
+        
+        initial_docs = pool.add(hop1_future.result(), hop_number=1)
+        coverage = score_coverage(question, initial_docs)
+        
+        if not self._coverage_sufficient(coverage):
+            if analysis_future is None:
+                analysis_future = self._submit(self._analyze_query, question)
+            query_analysis = analysis_future.result()
+            reasoning_path.append({
+                "step": "query_analysis",
+                "analysis": query_analysis.to_dict(),
+                "timestamp": time.time() - start_time
+            })
+            
+            # Analysens ekstra queries søges parallelt
+            extra_queries = self._analysis_queries(question, query_analysis)
+            for docs in [future.result() for future in
+                         [self._submit(self._perform_search, query, 1) for query in extra_queries]]:
+                initial_docs += pool.add(docs, hop_number=1)
+            coverage = score_coverage(question, initial_docs)
         
-        query_analysis = self._analyze_query(question)
-        reasoning_path.append({
-            "step": "query_analysis",
-            "analysis": query_analysis,
-            "timestamp": time.time() - start_time
-        })
+        if not initial_docs:
+            return self._create_no_results_response(question, reasoning_path, time.time() - start_time)
+        
+        # COVERAGE GATE: præcist § match med noter/høj certainty -> ingen dokument-analyse eller flere hops
+        if self._coverage_sufficient(coverage):
+            if self.verbose:
+                print(f"   ✅ Dækning {coverage.score:.2f} >= {self.config.hop_confidence_threshold:.2f} "
+                      f"(match: {coverage.exact_match}) - springer analyse og hops over")
+            reasoning_path.append({
+                "step": "coverage_gate",
+                "analysis": {"reasoning": f"HOP 1 dækker spørgsmålet (score {coverage.score:.2f})",
+                             **coverage.to_dict()},
+                "documents_found": len(initial_docs),
+                "timestamp": time.time() - start_time
+            })
+        else:
+            self._follow_up_hops(question, pool, initial_docs, reasoning_path, start_time)
+        
+        if self.verbose and pool.duplicates:
+            print(f"   ♻️ {pool.duplicates} dokumenter allerede fundet i tidligere hop - sendes kun én gang")
+        all_documents = pool.as_hops()
         
-        # STEP 2: Initial Search (HOP 1)
+        # STEP 5: Generate Final Answer
         if self.verbose:
-            print("🔍 STEP 2: Initial Search (HOP 1)")
+            print("🤖 STEP 6: Generate Multihop Answer")
         
-        initial_docs = self._perform_search(question, hop_number=1)
-        all_documents["hop1"] = initial_docs
+        packed = self._pack_context([doc for docs in all_documents.values() for doc in docs])
+        final_answer = self._generate_multihop_answer(question, packed, reasoning_path, on_token)
         
-        if not initial_docs:
-            return self._create_no_results_response(question, reasoning_path, time.time() - start_time)
+        # STEP 6: Package Response
+        response_time = time.time() - start_time
+        response = self._package_multihop_response(final_answer, all_documents, reasoning_path, response_time)
+        response["context"] = self.context_packer.statistics(packed)
+        response["coverage"] = coverage.to_dict()
+        return response
+    
+    def _coverage_sufficient(self, coverage: CoverageScore) -> bool:
+        """Dækker HOP 1 spørgsmålet godt nok til at springe analyse og flere hops over?"""
+        return coverage.score >= self.config.hop_confidence_threshold
+    
+    def _follow_up_hops(self, question: str, pool: DocumentPool, initial_docs: List[Document],
+                        reasoning_path: List, start_time: float) -> None:
+        """STEP 3-5: Analysér HOP 1 og søg videre (HOP 2/3) så længe analysen beder om det"""
         
         # STEP 3: Analyze Initial Results
         doc_analysis = self._analyze_documents(question, initial_docs, hop_number=1)
         reasoning_path.append({
             "step": "hop1_analysis",
-            "analysis": doc_analysis,
+            "analysis": doc_analysis.to_dict(),
             "documents_found": len(initial_docs),
             "timestamp": time.time() - start_time
         })
         
         # STEP 4: Determine if more hops needed
-        if doc_analysis.get("needs_more_search") and len(reasoning_path) < self.config.max_hops:
-            
-            # HOP 2
-            if self.verbose:
-                print("🔍 STEP 4: Follow-up Search (HOP 2)")
-            
-            for next_query in doc_analysis.get("next_queries", [])[:2]:  # Max 2 follow-up queries
-                hop2_docs = self._perform_search(next_query, hop_number=2)
-                all_documents["hop2"].extend(hop2_docs)
-            
-            if all_documents["hop2"]:
-                hop2_analysis = self._analyze_documents(question, all_documents["hop2"], hop_number=2)
-                reasoning_path.append({
-                    "step": "hop2_analysis",
-                    "analysis": hop2_analysis,
-                    "documents_found": len(all_documents["hop2"]),
-                    "timestamp": time.time() - start_time
-                })
-                
-                # HOP 3 (if needed)
-                if hop2_analysis.get("needs_more_search") and len(reasoning_path) < self.config.max_hops:
-                    if self.verbose:
-                        print("🔍 STEP 5: Deep Search (HOP 3)")
-                    
-                    for next_query in hop2_analysis.get("next_queries", [])[:1]:  # Max 1 deep query
-                        hop3_docs = self._perform_search(next_query, hop_number=3)
-                        all_documents["hop3"].extend(hop3_docs)
+        if not (doc_analysis.needs_more_search and len(reasoning_path) < self.config.max_hops):
+            return
         
-        # STEP 5: Generate Final Answer
+        # HOP 2
         if self.verbose:
-            print("🤖 STEP 6: Generate Multihop Answer")
+            print("🔍 STEP 4: Follow-up Search (HOP 2)")
         
-        final_answer = self._generate_multihop_answer(question, all_documents, reasoning_path)
+        # Max 2 follow-up queries - søges samtidigt, kun nye dokumenter analyseres
+        hop2_queries = doc_analysis.next_queries[:2]
+        hop2_docs = pool.add(self._search_parallel(hop2_queries, hop_number=2), hop_number=2)
+        if not hop2_docs:
+            return
         
-        # STEP 6: Package Response
-        response_time = time.time() - start_time
-        return self._package_multihop_response(final_answer, all_documents, reasoning_path, response_time)
+        hop2_analysis = self._analyze_documents(question, hop2_docs, hop_number=2)
+        reasoning_path.append({
+            "step": "hop2_analysis",
+            "analysis": hop2_analysis.to_dict(),
+            "documents_found": len(hop2_docs),
+            "timestamp": time.time() - start_time
+        })
+        
+        # HOP 3 (if needed)
+        if hop2_analysis.needs_more_search and len(reasoning_path) < self.config.max_hops:
+            if self.verbose:
+                print("🔍 STEP 5: Deep Search (HOP 3)")
+            
+            hop3_queries = hop2_analysis.next_queries[:1]  # Max 1 deep query
+            pool.add(self._search_parallel(hop3_queries, hop_number=3), hop_number=3)
     
-    def _analyze_query(self, question: str) -> Dict:
+    def _analyze_query(self, question: str) -> QueryAnalysis:
         """Analyser spørgsmål for multihop strategi"""
         try:
             prompt = self.query_analysis_template.format(question=question)
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            
-            # Parse JSON response
-            import re
-            json_match = re.search(r'\{.*\}', response.content, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return {"needs_multihop": False, "search_queries": [question]}
+            analysis = self._run_planning_stage("query_analysis", prompt)
+            if analysis is not None:
+                return analysis
+            return QueryAnalysis(search_queries=[question])
         except Exception as e:
             if self.verbose:
                 print(f"⚠️  Query analysis fejl: {e}")
-            return {"needs_multihop": False, "search_queries": [question]}
+            return QueryAnalysis(search_queries=[question])
+    
+    def _run_planning_stage(self, stage: str, prompt: str) -> Optional[PlanningResult]:
+        """
+        Kør en planlægnings-stage med schema-bundet output på stagens (lille) model
+        
+        Eskalerer til hovedmodellen hvis svaret ikke kan parses, eller hvis
+        analysens egen confidence er under escalation_confidence_threshold
+        (mangler confidence i svaret, eskaleres der ikke).
+        
+        Returns:
+            Typet analyse eller None hvis heller ikke hovedmodellen gav gyldigt output
+        """
+        stage_llm = self.stage_llms[stage]
+        result = self._invoke_planning(stage, stage_llm, prompt)
+        
+        if stage_llm is self.llm:
+            return result
+        
+        if result is None:
+            if not self.config.escalate_on_parse_failure:
+                return None
+            reason = "ugyldigt output"
+        elif result.confidence is not None and result.confidence < self.config.escalation_confidence_threshold:
+            reason = f"confidence {result.confidence:.2f}"
+        else:
+            return result
+        
+        if self.verbose:
+            print(f"   ⬆️ {stage}: eskalerer til {self.config.model} ({reason})")
+        self._record_stage(stage, "escalations")
+        escalated = self._invoke_planning(stage, self.llm, prompt)
+        return escalated if escalated is not None else result
+    
+    def _invoke_planning(self, stage: str, llm: ChatOpenAI, prompt: str) -> Optional[PlanningResult]:
+        """Ét planlægningskald: bundet max_tokens og (hvis slået til) json_schema response_format"""
+        result_type = self.stage_results[stage]
+        options = {"max_tokens": self.stage_max_tokens[stage]}
+        if self.config.structured_outputs:
+            options["response_format"] = response_format(result_type)
+        
+        response = llm.bind(**options).invoke([HumanMessage(content=prompt)])
+        self._record_stage(stage, "calls")
+        
+        result = parse_planning_output(response.content, result_type)
+        if result is None:
+            self._record_stage(stage, "parse_failures")
+            if self.verbose:
+                print(f"   ⚠️ {stage}: kunne ikke parse output ({len(response.content or '')} tegn)")
+        return result
+    
+    def _record_stage(self, stage: str, counter: str) -> None:
+        with self._metrics_lock:
+            self.stage_metrics[stage][counter] += 1
+    
+    def _analysis_queries(self, question: str, query_analysis: QueryAnalysis) -> List[str]:
+        """Ekstra HOP 1 søgninger fra query analysen (search_queries + nævnte paragraffer)"""
+        law_prefix = f"{query_analysis.laws[0]} " if query_analysis.laws else ""
+        
+        candidates = list(query_analysis.search_queries)
+        candidates += [f"{law_prefix}{paragraph}" for paragraph in query_analysis.paragraphs]
+        
+        queries, seen = [], {question.strip().lower()}
+        for query in candidates:
+            if query.strip().lower() in seen:
+                continue
+            seen.add(query.strip().lower())
+            queries.append(query.strip())
+        return queries[:self.config.max_analysis_queries]
+    
+    def _search_parallel(self, queries: List[str], hop_number: int) -> List[Document]:
+        """Søg flere queries samtidigt - resultater i query-rækkefølge"""
+        futures = [self._submit(self._perform_search, query, hop_number) for query in queries]
+        return [doc for future in futures for doc in future.result()]
     
     def _perform_search(self, query: str, hop_number: int) -> List[Document]:
         """Udfør søgning for et specifikt hop"""
@@ -397,7 +651,7 @@ KOMPLET JURIDISK SVAR:
         
         return docs
     
-    def _analyze_documents(self, question: str, documents: List[Document], hop_number: int) -> Dict:
+    def _analyze_documents(self, question: str, documents: List[Document], hop_number: int) -> DocumentAnalysis:
         """Analyser dokumenter for at bestemme næste skridt"""
         try:
             docs_text = "\n\n".join([f"DOC {i+1}: {doc.page_content[:500]}..." for i, doc in enumerate(documents)])
@@ -407,27 +661,34 @@ KOMPLET JURIDISK SVAR:
                 documents=docs_text
             )
             
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            
-            # Parse JSON response
-            import re
-            json_match = re.search(r'\{.*\}', response.content, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return {"needs_more_search": False, "next_queries": []}
+            analysis = self._run_planning_stage("doc_analysis", prompt)
+            if analysis is not None:
+                return analysis
+            return DocumentAnalysis()
         except Exception as e:
             if self.verbose:
                 print(f"⚠️  Document analysis fejl: {e}")
-            return {"needs_more_search": False, "next_queries": []}
+            return DocumentAnalysis()
     
-    def _generate_multihop_answer(self, question: str, all_documents: Dict, reasoning_path: List) -> str:
-        """Generer final answer baseret på alle hops"""
+    def _pack_context(self, documents: List[Document]) -> PackedContext:
+        """Vælg dokumenter til svar-prompten inden for max_context_length tokens"""
+        packed = self.context_packer.pack(documents)
         
-        # Format documents fra alle hops
-        hop1_text = self._format_documents_for_prompt(all_documents["hop1"])
-        hop2_text = self._format_documents_for_prompt(all_documents["hop2"])
-        hop3_text = self._format_documents_for_prompt(all_documents["hop3"])
+        if self.verbose:
+            print(f"   📦 Kontekst: {len(packed.documents)}/{len(documents)} dokumenter, "
+                  f"{packed.tokens}/{packed.budget} tokens"
+                  f"{f', {packed.duplicate_notes} dublet-noter' if packed.duplicate_notes else ''}")
+        
+        return packed
+    
+    def _generate_multihop_answer(self, question: str, packed: PackedContext, reasoning_path: List,
+                                  on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Generer final answer baseret på de pakkede dokumenter fra alle hops"""
+        
+        # Format documents fra alle hops (rangeret, inden for token-budgettet)
+        hop1_text = self._format_documents_for_prompt(packed.for_hop(1))
+        hop2_text = self._format_documents_for_prompt(packed.for_hop(2))
+        hop3_text = self._format_documents_for_prompt(packed.for_hop(3))
         
         # Format reasoning path
         reasoning_text = "\n".join([
@@ -443,8 +704,7 @@ KOMPLET JURIDISK SVAR:
             reasoning_path=reasoning_text
         )
         
-        response = self.llm.invoke([HumanMessage(content=prompt)])
-        return response.content
+        return self._complete(prompt, on_token)
     
     def _format_documents_for_prompt(self, documents: List[Document]) -> str:
         """Format dokumenter til LLM prompt"""
@@ -463,12 +723,13 @@ Chunk ID: {metadata.get('chunk_id', 'N/A')[:8]}...
 Type: {metadata.get('type', 'N/A')}
 
 INDHOLD:
-{doc.page_content[:1000]}{'...' if len(doc.page_content) > 1000 else ''}
+{doc.page_content}
 """)
         
         return "\n".join(formatted)
     
-    def _single_hop_answer(self, question: str, start_time: float) -> Dict:
+    def _single_hop_answer(self, question: str, start_time: float,
+                           on_token: Optional[Callable[[str], None]] = None) -> Dict:
         """Fallback til single-hop hvis multihop er deaktiveret"""
         if self.verbose:
             print("🔍 SINGLE HOP MODE")
@@ -480,7 +741,7 @@ INDHOLD:
             return self._create_no_results_response(question, [], time.time() - start_time)
         
         # Simpel generation
-        docs_text = self._format_documents_for_prompt(documents)
+        docs_text = self._format_documents_for_prompt(self._pack_context(documents).documents)
         
         simple_prompt = f"""
 Du er ekspert i dansk skatteret. Besvar følgende spørgsmål baseret på dokumenterne.
@@ -493,10 +754,10 @@ DOKUMENTER:
 SVAR:
 """
         
-        response = self.llm.invoke([HumanMessage(content=simple_prompt)])
+        answer = self._complete(simple_prompt, on_token)
         
         return {
-            "answer": response.content,
+            "answer": answer,
             "sources": [self._doc_to_source(doc) for doc in documents],
             "document_count": len(documents),
             "reasoning_path": [{"step": "single_hop", "documents_found": len(documents)}],
@@ -513,6 +774,8 @@ SVAR:
         
         # Beregn confidence baseret på antal hops og dokumenter
         confidence = self._calculate_multihop_confidence(all_documents, reasoning_path)
+        # Hops der fandt dokumenter - også HOP 1 når coverage gaten sprang analysen over
+        hops_performed = sum(1 for docs in all_documents.values() if docs)
         
         return {
             "answer": answer,
@@ -521,7 +784,7 @@ SVAR:
             "confidence": confidence,
             "reasoning_path": reasoning_path,
             "multihop_used": True,
-            "hops_performed": len([step for step in reasoning_path if "hop" in step["step"]]),
+            "hops_performed": hops_performed,
             "documents_per_hop": {
                 "hop1": len(all_documents["hop1"]),
                 "hop2": len(all_documents["hop2"]),
@@ -532,7 +795,9 @@ SVAR:
             "config": {
                 "max_hops": self.config.max_hops,
                 "max_docs_per_hop": self.config.max_documents_per_hop,
-                "enable_multihop": self.config.enable_multihop
+                "enable_multihop": self.config.enable_multihop,
+                "query_analysis_model": self.config.query_analysis_model or self.config.model,
+                "doc_analysis_model": self.config.doc_analysis_model or self.config.model
             }
         }
     
@@ -543,6 +808,7 @@ SVAR:
             "title": doc.metadata.get('title', 'N/A'),
             "reference": doc.metadata.get('reference', 'N/A'),
             "type": doc.metadata.get('type', 'N/A'),
+            "hop": doc.metadata.get('hop', 1),
             "text_preview": doc.page_content[:200] + "..."
         }
     
@@ -557,8 +823,8 @@ SVAR:
         elif total_docs >= 3:
             base_score += 0.1
         
-        # Boost for successful multihop
-        successful_hops = len([step for step in reasoning_path if "hop" in step["step"] and step.get("documents_found", 0) > 0])
+        # Boost for successful multihop - hops med dokumenter (uafhængigt af om de blev analyseret)
+        successful_hops = sum(1 for docs in all_documents.values() if docs)
         base_score += successful_hops * 0.1
         
         # Boost for paragraph documents
@@ -607,6 +873,8 @@ SVAR:
                 elif question == '/config':
                     print(f"Nuværende konfiguration:")
                     print(f"  Model: {self.config.model}")
+                    print(f"  Analyse modeller: {self.config.query_analysis_model} / {self.config.doc_analysis_model}")
+                    print(f"  Eskaleringer: {self.stage_metrics}")
                     print(f"  Max hops: {self.config.max_hops}")
                     print(f"  Max docs per hop: {self.config.max_documents_per_hop}")
                     print(f"  Multihop enabled: {self.config.enable_multihop}")
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+LAW PARTITIONS - Per-lov partitionering af LegalDocument (Weaviate multi-tenancy)
+
+Når LegalDocument er oprettet med multi-tenancy (import --partitioning tenant)
+ligger hver lov i sin egen tenant med sit eget HNSW indeks. Forespørgsler der
+nævner en lov sendes kun til den lovs tenant, mens forespørgsler på tværs af
+love sendes parallelt til alle tenants og flettes.
+
+På en ikke-partitioneret klasse kører PartitionRouter bare forespørgslen
+direkte, så kaldere ikke behøver at kende forskel.
+
+Svarer Weaviate med GraphQL errors (ugyldigt filter, ukendt tenant/felt) og
+ingen partition returnerer data, rejses PartitionQueryError - så kaldernes
+fallbacks kører i stedet for at fejlen ligner "ingen hits".
+
+BRUG:
+    router = PartitionRouter(client)
+    docs = router.get(lambda: client.query.get("LegalDocument", fields).with_near_vector(...),
+                      law_title=detect_law(query), limit=5)
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from weaviate import Tenant
+
+from legal_schema import CLASS_NAME
+
+# Lovnavne (og forkortelser) i forespørgsler -> title feltet i chunks
+LAW_ALIASES = {
+    'aktieavancebeskatningsloven': 'Aktieavancebeskatningsloven',
+    'aktieavancebeskatningslov': 'Aktieavancebeskatningsloven',
+    'kildeskatteloven': 'Kildeskatteloven',
+    'kildeskattelov': 'Kildeskatteloven',
+    'ligningsloven': 'Ligningsloven',
+    'ligningslov': 'Ligningsloven',
+    'statsskatteloven': 'Statsskatteloven',
+    'statsskattelov': 'Statsskatteloven',
+    'ksl': 'Kildeskatteloven',
+    'abl': 'Aktieavancebeskatningsloven',
+    'll': 'Ligningsloven',
+}
+
+# Tenant navne må kun indeholde A-Z, a-z, 0-9, _ og -
+_DANISH_TRANSLITERATION = str.maketrans({'æ': 'ae', 'ø': 'oe', 'å': 'aa', 'Æ': 'Ae', 'Ø': 'Oe', 'Å': 'Aa'})
+
+
+def detect_law(query: str) -> Optional[str]:
+    """Find lov-titel nævnt i forespørgslen (fx 'Ligningsloven') eller None"""
+    query_lower = query.lower()
+
+    for alias, law_title in LAW_ALIASES.items():
+        # Korte forkortelser skal stå som selvstændige ord ("ll" i "alle" tæller ikke)
+        if len(alias) <= 3:
+            if re.search(rf'\b{alias}\b', query_lower):
+                return law_title
+        elif alias in query_lower:
+            return law_title
+
+    return None
+
+
+def tenant_for_law(law_title: Optional[str]) -> str:
+    """Tenant navn for en lov-titel (fx 'Ligningsloven' -> 'Ligningsloven')"""
+    if not law_title:
+        return "Ukendt"
+    name = str(law_title).strip().translate(_DANISH_TRANSLITERATION)
+    name = re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_')
+    return name or "Ukendt"
+
+
+def is_partitioned(client, class_name: str = CLASS_NAME) -> bool:
+    """Er klassen oprettet med multi-tenancy?"""
+    schema = client.schema.get()
+    for class_obj in schema.get('classes', []):
+        if class_obj.get('class') == class_name:
+            return bool(class_obj.get('multiTenancyConfig', {}).get('enabled'))
+    return False
+
+
+def list_tenants(client, class_name: str = CLASS_NAME) -> List[str]:
+    """Navne på alle tenants (tom liste hvis klassen ikke er partitioneret)"""
+    if not is_partitioned(client, class_name):
+        return []
+    return sorted(tenant.name for tenant in client.schema.get_class_tenants(class_name))
+
+
+def ensure_tenants(client, law_titles: Iterable[str], class_name: str = CLASS_NAME,
+                   known: Optional[set] = None) -> set:
+    """
+    Opret manglende tenants for de givne love
+
+    Args:
+        known: Cache af tenants der allerede findes - opdateres og returneres
+    """
+    known = set(list_tenants(client, class_name)) if known is None else known
+    missing = sorted({tenant_for_law(title) for title in law_titles} - known)
+
+    if missing:
+        client.schema.add_class_tenants(class_name, [Tenant(name=name) for name in missing])
+        print(f"   ➕ Oprettet partitioner: {', '.join(missing)}")
+        known.update(missing)
+
+    return known
+
+
+class PartitionQueryError(Exception):
+    """Forespørgslen fejlede (GraphQL errors) i alle partitioner den blev sendt til"""
+
+
+def _error_messages(errors) -> str:
+    if isinstance(errors, list):
+        return "; ".join(str(error.get('message', error)) if isinstance(error, dict) else str(error)
+                         for error in errors)
+    return str(errors)
+
+
+def _merge_key(doc: Dict):
+    """
+    Sorteringsnøgle på tværs af partitioner - lavest distance først
+
+    Kun vektor-afstande (distance/certainty) er sammenlignelige mellem tenants;
+    BM25/hybrid 'score' afhænger af hver tenants egne IDF statistikker.
+    """
+    additional = doc.get('_additional') or {}
+    if additional.get('distance') is not None:
+        return float(additional['distance'])
+    if additional.get('certainty') is not None:
+        return -float(additional['certainty'])
+    return None
+
+
+def merge_partition_results(per_partition: List[List[Dict]], limit: Optional[int] = None) -> List[Dict]:
+    """Flet resultater fra flere partitioner efter vektor-afstand (ellers round-robin)"""
+    docs = [doc for docs in per_partition for doc in docs if doc]
+
+    if docs and all(_merge_key(doc) is not None for doc in docs):
+        docs.sort(key=_merge_key)
+    else:
+        # Ingen sammenlignelig score - bevar hver partitions egen rækkefølge
+        docs = []
+        for position in range(max((len(d) for d in per_partition), default=0)):
+            docs.extend(d[position] for d in per_partition if position < len(d) and d[position])
+
+    return docs[:limit] if limit else docs
+
+
+class PartitionRouter:
+    """Router forespørgsler til den rigtige lov-partition eller fan-out parallelt"""
+
+    def __init__(self, client, class_name: str = CLASS_NAME, max_workers: int = 4, verbose: bool = False):
+        self.client = client
+        self.class_name = class_name
+        self.verbose = verbose
+        self.tenants: List[str] = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="law-partition")
+        self.refresh()
+
+    @property
+    def partitioned(self) -> bool:
+        return bool(self.tenants)
+
+    def refresh(self) -> None:
+        """Genindlæs listen af tenants (efter import af nye love)"""
+        try:
+            self.tenants = list_tenants(self.client, self.class_name)
+        except Exception as e:
+            if self.verbose:
+                print(f"   ⚠️ Kunne ikke hente partitioner: {e}")
+            self.tenants = []
+
+        if self.verbose and self.tenants:
+            print(f"🗂️ {self.class_name} partitioneret per lov: {', '.join(self.tenants)}")
+
+    def tenants_for(self, law_title: Optional[str] = None) -> List[Optional[str]]:
+        """Tenants en forespørgsel skal sendes til ([None] = ingen partitionering)"""
+        if not self.partitioned:
+            return [None]
+        if law_title:
+            tenant = tenant_for_law(law_title)
+            if tenant in self.tenants:
+                return [tenant]
+        return list(self.tenants)
+
+    def get(self, build_query: Callable, law_title: Optional[str] = None,
+            limit: Optional[int] = None) -> List[Dict]:
+        """
+        Kør en Get forespørgsel mod de relevante partitioner
+
+        Args:
+            build_query: Funktion der returnerer en ny (ikke kørt) query builder
+            law_title: Lov-titel fra detect_law - begrænser til én partition
+            limit: Maks antal resultater efter fletning
+
+        Returns:
+            Liste af objekter som fra result['data']['Get'][class_name]
+
+        Raises:
+            PartitionQueryError: GraphQL errors og ingen partition returnerede data
+        """
+        tenants = self.tenants_for(law_title)
+        runs = list(self._executor.map(lambda tenant: self._run(build_query, tenant), tenants)
+                    if len(tenants) > 1 else [self._run(build_query, tenants[0])])
+        per_partition = [docs for docs, _ in runs]
+
+        errors = {tenant or self.class_name: errors for tenant, (_, errors) in zip(tenants, runs) if errors}
+        if errors:
+            message = ", ".join(f"{name}: {_error_messages(error)}" for name, error in errors.items())
+            if not any(per_partition):
+                raise PartitionQueryError(message)
+            # Delvist svar - brug de partitioner der svarede, men skjul ikke fejlen
+            print(f"   ⚠️ Fejl i partition(er) {message}")
+
+        if len(tenants) == 1:
+            docs = per_partition[0]
+            return docs[:limit] if limit else docs
+        return merge_partition_results(per_partition, limit)
+
+    def count(self, law_title: Optional[str] = None, where: Optional[Dict] = None) -> int:
+        """Antal objekter (summeret over partitioner)"""
+        def _count(tenant):
+            query = self.client.query.aggregate(self.class_name).with_meta_count()
+            if where:
+                query = query.with_where(where)
+            if tenant:
+                query = query.with_tenant(tenant)
+            result = query.do()
+            aggregate = (((result.get('data') or {}).get('Aggregate') or {}).get(self.class_name) or [{}])[0]
+            return aggregate.get('meta', {}).get('count', 0)
+
+        return sum(self._executor.map(_count, self.tenants_for(law_title)))
+
+    def close(self) -> None:
+        """Luk thread pool'en (ved proces-nedlukning)"""
+        self._executor.shutdown(wait=False)
+
+    def _run(self, build_query: Callable, tenant: Optional[str]) -> Tuple[List[Dict], Any]:
+        """(objekter, GraphQL errors eller None) for én partition"""
+        query = build_query()
+        if tenant:
+            query = query.with_tenant(tenant)
+        result = query.do()
+
+        docs = ((result.get('data') or {}).get('Get') or {}).get(self.class_name) or []
+        return docs, result.get('errors')
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+LEGAL SCHEMA - Fælles, versioneret Weaviate schema for LegalDocument
+
+Én definition af LegalDocument klassen som bruges af både
+import_simple_1024.py, import_incremental_1024.py og benchmarks.
+
+FEATURES:
+- Schema versionsnummer gemt i klassens description
+- Migration af eksisterende klasser (tilføj felter, opdatér mutable settings)
+- Tunede HNSW parametre (efConstruction, maxConnections, ef)
+- Valgfri PQ/BQ vektor-komprimering
+- Valgfri per-lov partitionering via multi-tenancy (se law_partitions.py)
+- Danske stopord i BM25 indekset
+- indexFilterable kun på felter vi faktisk filtrerer på
+
+BRUG:
+    from legal_schema import SchemaSettings, ensure_schema
+    ensure_schema(client, SchemaSettings(ef=128))
+"""
+
+import re
+from dataclasses import dataclass, replace
+from typing import List, Dict, Any, Optional
+
+CLASS_NAME = "LegalDocument"
+
+# Øges når class definitionen ændres - se MIGRATIONS nederst
+SCHEMA_VERSION = 2
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+EMBEDDING_DIMENSIONS = 1024
+
+# Komprimerede vektorer giver approksimative afstande - hent N x limit kandidater
+# og rescore mod de fulde 1024-dim vektorer (se SearchEngine._search_semantic)
+COMPRESSION_MODES = ("pq", "bq")
+DEFAULT_RESCORE_OVERSAMPLING = 4
+
+# Weaviate har ikke et dansk preset - vi bruger "none" + Snowball's danske stopordsliste
+DANISH_STOPWORDS = [
+    "og", "i", "jeg", "det", "at", "en", "den", "til", "er", "som", "på", "de",
+    "med", "han", "af", "for", "ikke", "der", "var", "mig", "sig", "men", "et",
+    "har", "om", "vi", "min", "havde", "ham", "hun", "nu", "over", "da", "fra",
+    "du", "ud", "sin", "dem", "os", "op", "man", "hans", "hvor", "eller", "hvad",
+    "skal", "selv", "her", "alle", "vil", "blev", "kunne", "ind", "når", "være",
+    "dog", "noget", "ville", "jo", "deres", "efter", "ned", "skulle", "denne",
+    "end", "dette", "mit", "også", "under", "have", "dig", "anden", "hende",
+    "mine", "alt", "meget", "sit", "sine", "vor", "mod", "disse", "hvis", "din",
+    "nogle", "hos", "blive", "mange", "ad", "bliver", "hendes", "været", "thi",
+    "jer", "sådan"
+]
+
+# Felter der bruges i where-filtre (search_engine.py, simple_search.py, import_incremental_1024.py).
+# Alle andre felter får indexFilterable=False for et mindre inverted index - og Weaviate
+# afviser filtre på dem. test_schema_filters.py tjekker at alle "path" felter står her.
+FILTERABLE_PROPERTIES = {
+    "chunk_id", "title", "type", "topic", "paragraph", "stk", "nr",
+    "text"  # simple_search.keyword_search bruger Like på text
+}
+
+# (navn, dataType, beskrivelse, tokenization, searchable, vectorize)
+# vectorize: "skip" = ikke i embedding, "embed" = i embedding uden feltnavn,
+#            None = Weaviate default (som de oprindelige import scripts)
+PROPERTY_SPECS = [
+    # PRIMÆRE TEKSTFELTER
+    ("text", "text", "Original paragraf/note tekst", "word", True, "skip"),
+    ("text_for_embedding", "text", "Optimeret tekst til 1024-dim embedding", None, False, "embed"),
+
+    # IDENTIFIKATIONSFELTER
+    ("chunk_id", "text", "Unik chunk identifier (UUID)", "field", True, None),
+    ("title", "text", "Lovens titel", "word", True, "embed"),
+    ("type", "text", "Type: 'paragraf' eller 'notes'", "field", True, None),
+    ("topic", "text", "§ reference eller emne (fx '§ 33 A')", "field", True, "skip"),
+
+    # METADATA FELTER
+    ("document_name", "text", "Kilde dokumentnavn", "word", True, None),
+    ("law_number", "text", "Lovnummer (fx '2023-01-13 nr. 42')", "field", True, None),
+    ("status", "text", "Status: 'gældende' eller 'historisk'", "field", True, None),
+    ("date", "text", "Lovens dato", "field", True, None),
+
+    # SØGEOPTIMERING
+    ("keywords", "text[]", "Ekstraherede søgenøgleord", None, True, None),
+    ("entities", "text[]", "Navngivne entiteter (organisationer, love, etc.)", None, True, None),
+    ("rule_type", "text", "Regeltype (definition, procedure, sanktion, etc.)", "field", True, None),
+
+    # RELATIONSHIP FELTER
+    ("note_reference_ids", "text[]", "Note reference IDs for paragraf→note mapping", None, True, None),
+    ("related_note_chunks", "text[]", "Relaterede note chunk IDs", None, True, None),
+    ("related_paragraph_chunk_id", "text", "Relateret paragraf chunk ID (note→paragraf)", "field", True, None),
+
+    # EKSTRA FELTER
+    ("summary", "text", "AI-genereret sammendrag", "word", True, "embed"),
+    ("dom_references", "text[]", "Referencer til domme og afgørelser", None, True, None),
+    ("heading", "text", "Overskrift (fx § 1, stk. 1)", "field", True, None),
+    ("interpretation_flag", "boolean", "Flag for fortolkning", None, False, None),
+    ("llm_model_used", "text", "LLM model brugt til generering", "field", True, None),
+    ("note_number", "text", "Note nummer", "field", True, None),
+    ("note_references", "text", "JSON string med note referencer", None, True, None),
+    ("notes", "text", "JSON string med noter", None, True, None),
+    ("nr", "text", "Nummer (fx 1, 2, 3)", "field", True, None),
+    ("paragraph", "text", "Paragraf reference (fx § 1)", "field", True, None),
+    ("related_paragraph_ref", "text", "Relateret paragraf reference", "field", True, None),
+    ("related_paragraph_text", "text", "Relateret paragraf tekst", "word", True, None),
+    ("related_paragraphs", "text[]", "Liste af relaterede paragraf IDs", None, True, None),
+    ("rule_type_confidence", "number", "Konfidensscore for regeltypen", None, False, None),
+    ("rule_type_explanation", "text", "Forklaring af regeltypen", "word", True, None),
+    ("section", "text", "Sektion (fx AFSNIT I. SKATTEPLIGTEN)", "word", True, None),
+    ("stk", "text", "Stykke nummer (fx 1, 2, 3)", "field", True, None),
+]
+
+PROPERTY_NAMES = [spec[0] for spec in PROPERTY_SPECS]
+
+
+@dataclass
+class SchemaSettings:
+    """Tunbare index-indstillinger for LegalDocument"""
+    # HNSW - immutable efter oprettelse (kræver --force-recreate)
+    ef_construction: int = 256   # Default 128 - højere giver bedre graf for ~10k juridiske chunks
+    max_connections: int = 32    # Default 64 - 32 er nok ved 1024 dims og halverer graf-memory
+    # HNSW - mutable, kan ændres på en eksisterende klasse
+    ef: int = 128                # Default -1 (dynamisk) - fast ef giver stabil latency
+    distance: str = "cosine"
+
+    # Vektor komprimering: None, "pq" eller "bq"
+    compression: Optional[str] = None
+    pq_segments: int = 256       # 1024 dims / 4 dims per segment
+    pq_centroids: int = 256
+    pq_training_limit: int = 100000
+    rescore_oversampling: int = DEFAULT_RESCORE_OVERSAMPLING
+
+    # Én tenant (eget HNSW indeks) per lov - immutable efter oprettelse
+    multi_tenancy: bool = False
+
+    # Inverted index
+    bm25_b: float = 0.75
+    bm25_k1: float = 1.2
+    danish_stopwords: bool = True
+
+
+def _build_property(spec: tuple) -> Dict[str, Any]:
+    """Byg én Weaviate property ud fra PROPERTY_SPECS"""
+    name, data_type, description, tokenization, searchable, vectorize = spec
+
+    prop = {
+        "name": name,
+        "dataType": [data_type],
+        "description": description,
+        "indexFilterable": name in FILTERABLE_PROPERTIES,
+    }
+
+    # indexSearchable er kun tilladt på text/text[]
+    if data_type in ("text", "text[]"):
+        prop["indexSearchable"] = searchable
+
+    if tokenization:
+        prop["tokenization"] = tokenization
+
+    if vectorize == "skip":
+        prop["moduleConfig"] = {"text2vec-openai": {"skip": True}}
+    elif vectorize == "embed":
+        prop["moduleConfig"] = {"text2vec-openai": {"skip": False, "vectorizePropertyName": False}}
+
+    return prop
+
+
+def build_vector_index_config(settings: SchemaSettings) -> Dict[str, Any]:
+    """Byg HNSW vectorIndexConfig inkl. evt. komprimering"""
+    config = {
+        "distance": settings.distance,
+        "efConstruction": settings.ef_construction,
+        "maxConnections": settings.max_connections,
+        "ef": settings.ef,
+    }
+
+    if settings.compression == "pq":
+        config["pq"] = {
+            "enabled": True,
+            "segments": settings.pq_segments,
+            "centroids": settings.pq_centroids,
+            "trainingLimit": settings.pq_training_limit,
+            "encoder": {"type": "kmeans", "distribution": "log-normal"}
+        }
+    elif settings.compression == "bq":
+        config["bq"] = {"enabled": True}
+    elif settings.compression is not None:
+        raise ValueError(f"Ukendt komprimering: {settings.compression} (brug 'pq' eller 'bq')")
+
+    return config
+
+
+def build_inverted_index_config(settings: SchemaSettings) -> Dict[str, Any]:
+    """Byg invertedIndexConfig med BM25 og stopord"""
+    if settings.danish_stopwords:
+        stopwords = {"preset": "none", "additions": DANISH_STOPWORDS}
+    else:
+        stopwords = {"preset": "none"}
+
+    return {
+        "bm25": {
+            "b": settings.bm25_b,    # Optimeret for juridiske dokumenter
+            "k1": settings.bm25_k1   # Optimeret for paragrafsøgning
+        },
+        "stopwords": stopwords
+    }
+
+
+def build_class_definition(settings: Optional[SchemaSettings] = None,
+                           class_name: str = CLASS_NAME,
+                           vectorizer: str = "text2vec-openai") -> Dict[str, Any]:
+    """
+    Byg komplet LegalDocument class definition
+
+    Args:
+        settings: Index indstillinger (default SchemaSettings())
+        class_name: Klassenavn - benchmarks bruger midlertidige navne
+        vectorizer: "text2vec-openai" eller "none" når vektorer leveres direkte
+    """
+    settings = settings or SchemaSettings()
+
+    class_obj = {
+        "class": class_name,
+        "description": f"Danske skattelove og noter (schema v{SCHEMA_VERSION})",
+        "vectorizer": vectorizer,
+        "vectorIndexType": "hnsw",
+        "vectorIndexConfig": build_vector_index_config(settings),
+        "invertedIndexConfig": build_inverted_index_config(settings),
+        "properties": [_build_property(spec) for spec in PROPERTY_SPECS]
+    }
+
+    if settings.multi_tenancy:
+        class_obj["multiTenancyConfig"] = {"enabled": True}
+
+    if vectorizer == "text2vec-openai":
+        class_obj["moduleConfig"] = {
+            "text2vec-openai": {
+                "model": EMBEDDING_MODEL,
+                "modelVersion": "latest",
+                "dimensions": EMBEDDING_DIMENSIONS,
+                "type": "text"
+            },
+            "generative-openai": {}
+        }
+
+    return class_obj
+
+
+def get_class_schema(client, class_name: str = CLASS_NAME) -> Optional[Dict[str, Any]]:
+    """Hent class definition fra Weaviate eller None hvis den ikke findes"""
+    schema = client.schema.get()
+    for cls in schema.get('classes', []):
+        if cls['class'] == class_name:
+            return cls
+    return None
+
+
+def detect_schema_version(class_obj: Dict[str, Any]) -> int:
+    """Læs schema version fra description - klasser uden version er v1 (før legal_schema.py)"""
+    description = class_obj.get('description') or ''
+    match = re.search(r'schema v(\d+)', description)
+    return int(match.group(1)) if match else 1
+
+
+def get_compression(class_obj: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Returnér aktiv komprimering ("pq"/"bq") for en class definition eller None"""
+    index_config = (class_obj or {}).get('vectorIndexConfig', {})
+    for mode in COMPRESSION_MODES:
+        if index_config.get(mode, {}).get('enabled'):
+            return mode
+    return None
+
+
+def _immutable_differences(class_obj: Dict[str, Any], settings: SchemaSettings) -> List[str]:
+    """Find forskelle der kun kan rettes ved at genskabe klassen"""
+    differences = []
+    index_config = class_obj.get('vectorIndexConfig', {})
+
+    if index_config.get('efConstruction') != settings.ef_construction:
+        differences.append(f"efConstruction {index_config.get('efConstruction')} -> {settings.ef_construction}")
+    if index_config.get('maxConnections') != settings.max_connections:
+        differences.append(f"maxConnections {index_config.get('maxConnections')} -> {settings.max_connections}")
+    if settings.compression == "bq" and not index_config.get('bq', {}).get('enabled'):
+        differences.append("bq kan kun slås til ved oprettelse")
+    partitioned = bool(class_obj.get('multiTenancyConfig', {}).get('enabled'))
+    if partitioned != settings.multi_tenancy:
+        differences.append(f"multi-tenancy {partitioned} -> {settings.multi_tenancy}")
+
+    existing = {p['name']: p for p in class_obj.get('properties', [])}
+    for spec in PROPERTY_SPECS:
+        prop = existing.get(spec[0])
+        if prop is None:
+            continue
+        wanted = spec[0] in FILTERABLE_PROPERTIES
+        # Legacy properties har kun indexInverted - Weaviate default er filterable
+        actual = prop.get('indexFilterable', prop.get('indexInverted', True))
+        if actual != wanted:
+            differences.append(f"{spec[0]}.indexFilterable {actual} -> {wanted}")
+
+    return differences
+
+
+def apply_mutable_settings(client, settings: SchemaSettings, class_name: str = CLASS_NAME) -> None:
+    """Opdatér settings der kan ændres på en eksisterende klasse (ef, stopord, bm25, pq)"""
+    vector_config = {"ef": settings.ef}
+    if settings.compression == "pq":
+        vector_config["pq"] = build_vector_index_config(settings)["pq"]
+
+    client.schema.update_config(class_name, {
+        "vectorIndexConfig": vector_config,
+        "invertedIndexConfig": build_inverted_index_config(settings)
+    })
+
+
+def _migrate_v1_to_v2(client, class_obj: Dict[str, Any], settings: SchemaSettings) -> None:
+    """v1 -> v2: tilføj manglende felter og danske stopord/tunet ef"""
+    class_name = class_obj['class']
+    existing = {p['name'] for p in class_obj.get('properties', [])}
+
+    for spec in PROPERTY_SPECS:
+        if spec[0] not in existing:
+            client.schema.property.create(class_name, _build_property(spec))
+            print(f"   ➕ Tilføjet felt: {spec[0]}")
+
+    apply_mutable_settings(client, settings, class_name)
+
+
+# version -> funktion der migrerer fra version til version + 1
+MIGRATIONS = {
+    1: _migrate_v1_to_v2,
+}
+
+
+def migrate_schema(client, class_obj: Dict[str, Any], settings: SchemaSettings) -> int:
+    """Kør alle migrationer fra klassens version op til SCHEMA_VERSION"""
+    version = detect_schema_version(class_obj)
+
+    while version < SCHEMA_VERSION:
+        print(f"🔄 Migrerer {class_obj['class']} schema v{version} -> v{version + 1}...")
+        MIGRATIONS[version](client, class_obj, settings)
+        version += 1
+
+    client.schema.update_config(class_obj['class'], {
+        "description": f"Danske skattelove og noter (schema v{SCHEMA_VERSION})"
+    })
+    return version
+
+
+def ensure_schema(client, settings: Optional[SchemaSettings] = None,
+                  force_recreate: bool = False, class_name: str = CLASS_NAME) -> Dict[str, Any]:
+    """
+    Sørg for at LegalDocument findes med nyeste schema version
+
+    Args:
+        client: Weaviate klient
+        settings: Index indstillinger
+        force_recreate: Slet og genskab klassen (sletter alle data!)
+        class_name: Klassenavn
+
+    Returns:
+        Dict med 'action' ('created', 'recreated', 'migrated', 'up_to_date'),
+        'version' og 'needs_recreate' (liste af immutable forskelle)
+    """
+    settings = settings or SchemaSettings()
+    print("🔧 Kontrollerer eksisterende skema...")
+
+    class_obj = get_class_schema(client, class_name)
+    action = "created"
+
+    if class_obj is not None:
+        if force_recreate:
+            print(f"♻️  Sletter eksisterende {class_name} for at genskabe det...")
+            client.schema.delete_class(class_name)
+            action = "recreated"
+        else:
+            dimensions = class_obj.get('moduleConfig', {}).get('text2vec-openai', {}).get('dimensions', 'default')
+            if dimensions != EMBEDDING_DIMENSIONS:
+                print(f"⚠️  Advarsel: Schema bruger {dimensions} dimensioner, ikke {EMBEDDING_DIMENSIONS}!")
+
+            version = detect_schema_version(class_obj)
+            if version < SCHEMA_VERSION:
+                migrate_schema(client, class_obj, settings)
+                action = "migrated"
+            else:
+                apply_mutable_settings(client, settings, class_name)
+                action = "up_to_date"
+
+            needs_recreate = _immutable_differences(class_obj, settings)
+            if needs_recreate:
+                print("⚠️  Følgende indstillinger kræver --force-recreate (og genimport):")
+                for difference in needs_recreate:
+                    print(f"     - {difference}")
+            else:
+                print(f"✅ Schema v{SCHEMA_VERSION} er opdateret.")
+
+            return {"action": action, "version": SCHEMA_VERSION, "needs_recreate": needs_recreate}
+
+    print(f"🔧 Opretter {class_name} schema v{SCHEMA_VERSION} med {EMBEDDING_DIMENSIONS} dimensioner...")
+    create_settings = settings
+    if settings.compression == "pq":
+        # PQ codebook trænes på eksisterende vektorer - aktiveres efter import (enable_compression)
+        create_settings = replace(settings, compression=None)
+        print("🗜️  PQ aktiveres efter import når der er data at træne på")
+    elif settings.compression == "bq":
+        print("🗜️  BQ komprimering aktiveret ved oprettelse")
+    client.schema.create_class(build_class_definition(create_settings, class_name=class_name))
+
+    created = get_class_schema(client, class_name) or {}
+    dimensions = created.get('moduleConfig', {}).get('text2vec-openai', {}).get('dimensions', 'default')
+    print(f"🎯 Schema verificeret - Dimensioner: {dimensions}")
+
+    return {"action": action, "version": SCHEMA_VERSION, "needs_recreate": []}
+
+
+def enable_compression(client, settings: SchemaSettings, class_name: str = CLASS_NAME) -> bool:
+    """
+    Aktivér PQ efter import (kaldes af import scripts når data er indlæst)
+
+    Returns:
+        True hvis komprimering er aktiv efter kaldet
+    """
+    class_obj = get_class_schema(client, class_name)
+    active = get_compression(class_obj)
+
+    if settings.compression is None or active == settings.compression:
+        return active is not None
+    if settings.compression == "bq":
+        print("⚠️  BQ kan kun slås til ved oprettelse - brug --force-recreate")
+        return False
+
+    print(f"🗜️  Aktiverer PQ ({settings.pq_segments} segmenter, {settings.pq_centroids} centroids)...")
+    client.schema.update_config(class_name, {
+        "vectorIndexConfig": {"pq": build_vector_index_config(settings)["pq"]}
+    })
+    return True
+
+
+def add_schema_arguments(parser) -> None:
+    """Tilføj fælles schema argumenter til en argparse parser"""
+    defaults = SchemaSettings()
+    parser.add_argument('--ef-construction', type=int, default=defaults.ef_construction,
+                        help=f'HNSW efConstruction (default: {defaults.ef_construction}, kræver genskabelse)')
+    parser.add_argument('--max-connections', type=int, default=defaults.max_connections,
+                        help=f'HNSW maxConnections (default: {defaults.max_connections}, kræver genskabelse)')
+    parser.add_argument('--ef', type=int, default=defaults.ef,
+                        help=f'HNSW ef ved søgning (default: {defaults.ef})')
+    parser.add_argument('--compression', choices=["none"] + list(COMPRESSION_MODES), default="none",
+                        help='Vektor komprimering: pq (aktiveres efter import) eller bq (kræver genskabelse)')
+    parser.add_argument('--pq-segments', type=int, default=defaults.pq_segments,
+                        help=f'PQ segmenter - skal gå op i {EMBEDDING_DIMENSIONS} (default: {defaults.pq_segments})')
+    parser.add_argument('--partitioning', choices=["none", "tenant"], default="none",
+                        help='tenant = én multi-tenancy partition per lov (kræver genskabelse)')
+
+
+def settings_from_args(args) -> SchemaSettings:
+    """Byg SchemaSettings fra argparse argumenter (se add_schema_arguments)"""
+    return SchemaSettings(
+        ef_construction=args.ef_construction,
+        max_connections=args.max_connections,
+        ef=args.ef,
+        compression=None if args.compression == "none" else args.compression,
+        pq_segments=args.pq_segments,
+        multi_tenancy=args.partitioning == "tenant"
+    )
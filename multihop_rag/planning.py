@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+PLANNING - Typede resultater og JSON schemas for multihop planlægnings-stages
+============================================================================
+
+Query analyse og dokument analyse er korte planlægningskald der skal
+returnere et fast JSON format. I stedet for at skrabe JSON ud af fritekst
+med regex bedes modellen om schema-bundet output (OpenAI structured outputs,
+response_format=json_schema med strict=True), og svaret parses til typede
+dataclasses.
+
+    QueryAnalysis     - laws, paragraphs, concepts, needs_multihop, reasoning, search_queries, confidence
+    DocumentAnalysis  - key_findings, missing_info, references, needs_more_search, next_queries, confidence
+
+parse_planning_output() returner None ved ugyldigt svar, så kalderen kan
+tælle fejlen og eskalere/falde tilbage i stedet for stille at stoppe søgningen.
+Et svar uden (gyldig) confidence får confidence=None - intet signal, ikke 0.
+
+BRUG:
+    llm.bind(response_format=response_format(QueryAnalysis), max_tokens=400)
+    analysis = parse_planning_output(response.content, QueryAnalysis)
+"""
+
+import json
+import re
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+T = TypeVar("T", bound="PlanningResult")
+
+
+def _string_list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if not isinstance(value, (list, tuple)):
+        return []
+    return [str(item).strip() for item in value if item is not None and str(item).strip()]
+
+
+def _boolean(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "ja", "yes", "1")
+    return bool(value)
+
+
+def _confidence(value: Any) -> Optional[float]:
+    try:
+        return min(max(float(value), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return None
+
+
+_COERCE = {List[str]: _string_list, bool: _boolean, Optional[float]: _confidence, str: lambda value: str(value or "")}
+_JSON_TYPES = {
+    List[str]: {"type": "array", "items": {"type": "string"}},
+    bool: {"type": "boolean"},
+    # Schema-bundet output skal altid give et tal; None opstår kun ved fritekst svar
+    Optional[float]: {"type": "number"},
+    str: {"type": "string"},
+}
+
+
+@dataclass
+class PlanningResult:
+    """Fælles base: schema, parsing og dict-konvertering"""
+
+    @classmethod
+    def schema_name(cls) -> str:
+        return re.sub(r'(?<!^)(?=[A-Z])', '_', cls.__name__).lower()
+
+    @classmethod
+    def json_schema(cls) -> Dict:
+        """Strict JSON schema (alle felter påkrævet, ingen ekstra felter)"""
+        return {
+            "type": "object",
+            "properties": {f.name: _JSON_TYPES[f.type] for f in fields(cls)},
+            "required": [f.name for f in fields(cls)],
+            "additionalProperties": False,
+        }
+
+    @classmethod
+    def from_dict(cls: Type[T], data: Dict) -> T:
+        """Byg resultat fra parset JSON - manglende felter får default, typer tvinges"""
+        values = {f.name: _COERCE[f.type](data[f.name]) for f in fields(cls) if f.name in data}
+        return cls(**values)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-lignende adgang for kode der behandler analyser som dicts"""
+        return getattr(self, key, default)
+
+
+@dataclass
+class QueryAnalysis(PlanningResult):
+    laws: List[str] = field(default_factory=list)
+    paragraphs: List[str] = field(default_factory=list)
+    concepts: List[str] = field(default_factory=list)
+    needs_multihop: bool = False
+    reasoning: str = ""
+    search_queries: List[str] = field(default_factory=list)
+    confidence: Optional[float] = None
+
+
+@dataclass
+class DocumentAnalysis(PlanningResult):
+    key_findings: List[str] = field(default_factory=list)
+    missing_info: List[str] = field(default_factory=list)
+    references: List[str] = field(default_factory=list)
+    needs_more_search: bool = False
+    next_queries: List[str] = field(default_factory=list)
+    confidence: Optional[float] = None
+
+
+def response_format(result_type: Type[PlanningResult]) -> Dict:
+    """OpenAI response_format for schema-bundet output"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": result_type.schema_name(), "strict": True, "schema": result_type.json_schema()},
+    }
+
+
+def parse_planning_output(content: str, result_type: Type[T]) -> Optional[T]:
+    """
+    Parse et planlægningssvar til result_type
+
+    Structured outputs giver rent JSON; for modeller uden schema-support
+    accepteres også et JSON objekt indlejret i tekst (fx ```json blokke).
+
+    Returns:
+        Resultatet eller None hvis svaret ikke indeholder et gyldigt JSON objekt
+    """
+    content = (content or "").strip()
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        if not match:
+            return None
+        try:
+            data = json.loads(match.group())
+        except json.JSONDecodeError:
+            return None
+    return result_type.from_dict(data) if isinstance(data, dict) else None
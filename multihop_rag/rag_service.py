@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+RAG SERVICE - Én SearchEngine og én MultihopJuridiskRAG per proces
+==================================================================
+
+SearchEngine og MultihopJuridiskRAG er dyre at oprette (Weaviate klient +
+schema-tjek, partition-opslag, LLM klienter, prompts, thread pools og et
+test-kald til OpenAI). Servicen opretter dem første gang de bruges og
+deler dem derefter mellem alle kaldere i processen (CLI, GUI, HTTP).
+
+warm_up() betaler opstartsprisen én gang før første rigtige forespørgsel:
+- Weaviate forbindelse og lov-partitioner
+- OpenAI forbindelse (LLM test-kald) og query embedding cache
+- lokale indekser: gemte grafer (graph_retriever) og tiktoken encoding
+
+BRUG:
+    service = get_service()
+    service.warm_up()
+    service.rag.ask("Hvad siger ligningslovens § 33 A?")
+    service.search_engine.search("§ 9 C", limit=5)
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from juridisk_rag_langchain import LangChainRAGConfig, MultihopJuridiskRAG
+from search_engine import SearchEngine
+
+# Typiske forespørgsler - primer embedding cache og Weaviate søgestier
+WARMUP_QUERIES = (
+    "ligningslovens § 33 A",
+    "skattepligt ved fraflytning",
+    "beskatning af aktieavance",
+)
+
+
+class RAGService:
+    """Lazy, trådsikre singletons for søgemaskine og multihop RAG"""
+
+    def __init__(self, weaviate_url: str = "http://localhost:8080", config: Optional[LangChainRAGConfig] = None,
+                 verbose: bool = False, graph_retriever: Any = None):
+        self.weaviate_url = weaviate_url
+        self.config = config or LangChainRAGConfig()
+        self.verbose = verbose
+        self.graph_retriever = graph_retriever
+        self._search_engine: Optional[SearchEngine] = None
+        self._rag: Optional[MultihopJuridiskRAG] = None
+        self._lock = threading.RLock()
+        self.warmed_up = False
+
+    @property
+    def search_engine(self) -> SearchEngine:
+        if self._search_engine is None:
+            with self._lock:
+                if self._search_engine is None:
+                    self._search_engine = SearchEngine(
+                        weaviate_url=self.weaviate_url,
+                        verbose=self.verbose,
+                        graph_retriever=self.graph_retriever
+                    )
+        return self._search_engine
+
+    @property
+    def rag(self) -> MultihopJuridiskRAG:
+        if self._rag is None:
+            with self._lock:
+                if self._rag is None:
+                    # Forbindelserne testes i warm_up - ikke ved hver oprettelse
+                    self._rag = MultihopJuridiskRAG(
+                        config=self.config,
+                        weaviate_url=self.weaviate_url,
+                        verbose=self.verbose,
+                        search_engine=self.search_engine,
+                        validate_connections=False
+                    )
+        return self._rag
+
+    def warm_up(self, queries: Iterable[str] = WARMUP_QUERIES, validate: bool = True) -> Dict[str, float]:
+        """
+        Opret komponenterne og prim forbindelser, caches og lokale indekser
+
+        Args:
+            queries: Forespørgsler der embeddes og søges én gang
+            validate: Test Weaviate og OpenAI (rejser ConnectionError/ValueError ved fejl)
+
+        Returns:
+            Sekunder brugt per trin
+        """
+        timings = {}
+        with self._lock:
+            start = time.perf_counter()
+            rag = self.rag
+            timings['init'] = time.perf_counter() - start
+
+            if validate:
+                start = time.perf_counter()
+                rag._validate_connections()
+                timings['connections'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.search_engine.router.refresh()
+            for query in queries:
+                self.search_engine.embed_query(query)
+                self.search_engine.search(query, limit=1)
+            timings['search'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            if self.graph_retriever is not None:
+                for law_name in self.graph_retriever.get_available_graphs():
+                    self.graph_retriever.get_graph(law_name)
+            rag.context_packer.count_tokens("opvarmning")
+            timings['indexes'] = time.perf_counter() - start
+
+            self.warmed_up = True
+
+        if self.verbose:
+            print("🔥 RAG service varmet op: " + ", ".join(f"{step} {seconds:.2f}s" for step, seconds in timings.items()))
+        return timings
+
+    def close(self) -> None:
+        """Luk thread pools (ved proces-nedlukning)"""
+        with self._lock:
+            if self._rag is not None:
+                self._rag._executor.shutdown(wait=False)
+            if self._search_engine is not None:
+                self._search_engine.router.close()
+            self._rag = None
+            self._search_engine = None
+            self.warmed_up = False
+
+
+_services: Dict[str, RAGService] = {}
+_services_lock = threading.Lock()
+
+
+def get_service(weaviate_url: str = "http://localhost:8080", **kwargs) -> RAGService:
+    """Processens RAGService for en Weaviate URL (kwargs bruges kun første gang)"""
+    with _services_lock:
+        service = _services.get(weaviate_url)
+        if service is None:
+            service = _services[weaviate_url] = RAGService(weaviate_url=weaviate_url, **kwargs)
+        return service
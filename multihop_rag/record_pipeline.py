@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+RECORD PIPELINE - Streaming læsning og validering af *_chunks.jsonl
+
+Læser chunk filer linje for linje (ingen hel-fil indlæsning) og
+validerer/konverterer hver record mod LegalDocument schemaet i ét gennemløb
+via en forudberegnet felt-type tabel bygget fra legal_schema.PROPERTY_SPECS.
+
+Bruges af begge import scripts, benchmarks og simple_search (felt-listen).
+
+FEATURES:
+- Valgfri hurtig JSON dekodning: orjson -> msgspec -> json (standardbibliotek)
+- Én konverteringsfunktion per felt slået op i en dict (ingen per-felt if-kæder)
+- Ukendte felter droppes (Weaviate auto-schema ville ellers oprette dem)
+- Statistik over ugyldige linjer, manglende chunk_id og droppede felter
+
+BRUG:
+    from record_pipeline import iter_records, RecordStats
+    stats = RecordStats()
+    for record in iter_records("Ligningsloven_chunks.jsonl", stats):
+        ...
+"""
+
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from legal_schema import PROPERTY_SPECS
+
+# Hurtigste tilgængelige JSON dekoder (alle accepterer bytes)
+try:
+    import orjson
+    _loads = orjson.loads
+    _DECODE_ERRORS = (orjson.JSONDecodeError,)
+    JSON_DECODER = "orjson"
+except ImportError:
+    try:
+        import msgspec
+        _loads = msgspec.json.Decoder().decode
+        _DECODE_ERRORS = (msgspec.DecodeError,)
+        JSON_DECODER = "msgspec"
+    except ImportError:
+        _loads = json.loads
+        _DECODE_ERRORS = (json.JSONDecodeError, UnicodeDecodeError)
+        JSON_DECODER = "json"
+
+# Optimal længde af hovedteksten i text_for_embedding ved 1024 dims
+MAX_EMBEDDING_TEXT_CHARS = 6000
+
+
+def _to_text(value: Any) -> str:
+    # notes (dict) og note_references (liste af dicts) gemmes som JSON strings
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _to_text_list(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(item) for item in value if item is not None]
+    return [str(value)]
+
+
+def _to_number(value: Any) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+_COERCERS_BY_TYPE: Dict[str, Callable[[Any], Any]] = {
+    "text": _to_text,
+    "text[]": _to_text_list,
+    "number": _to_number,
+    "int": lambda value: int(_to_number(value)),
+    "boolean": bool,
+}
+
+# Forudberegnet felt -> konverteringsfunktion (og felt -> Weaviate dataType)
+FIELD_TYPES: Dict[str, str] = {spec[0]: spec[1] for spec in PROPERTY_SPECS}
+FIELD_COERCERS: Dict[str, Callable[[Any], Any]] = {
+    name: _COERCERS_BY_TYPE[data_type] for name, data_type in FIELD_TYPES.items()
+}
+
+# Alle felter i LegalDocument - bruges af søgeværktøjer til at hente hele records
+ALL_FIELDS: List[str] = list(FIELD_TYPES)
+
+
+@dataclass
+class RecordStats:
+    """Tællere for en eller flere filer"""
+    read: int = 0
+    valid: int = 0
+    invalid_json: int = 0
+    missing_chunk_id: int = 0
+    dropped_fields: Counter = field(default_factory=Counter)
+
+    def summary(self) -> str:
+        text = f"{self.valid}/{self.read} gyldige"
+        if self.invalid_json:
+            text += f", {self.invalid_json} ugyldig JSON"
+        if self.missing_chunk_id:
+            text += f", {self.missing_chunk_id} uden chunk_id"
+        if self.dropped_fields:
+            dropped = ", ".join(f"{name} ({count})" for name, count in self.dropped_fields.most_common(5))
+            text += f", droppede felter: {dropped}"
+        return text
+
+
+def build_embedding_text(record: Dict[str, Any]) -> str:
+    """Byg text_for_embedding: titel | type: topic | tekst (afkortet) | sammendrag"""
+    parts = []
+
+    # 1. Titel (vigtig kontekst)
+    if record.get('title'):
+        parts.append(f"Titel: {record['title']}")
+
+    # 2. Type og topic (strukturel kontekst)
+    if record.get('type') and record.get('topic'):
+        parts.append(f"{record['type']}: {record['topic']}")
+
+    # 3. Hoved tekst (prioriteret)
+    text = record.get('text')
+    if text:
+        if len(text) > MAX_EMBEDDING_TEXT_CHARS:
+            text = text[:MAX_EMBEDDING_TEXT_CHARS] + "..."
+        parts.append(text)
+
+    # 4. Sammendrag hvis tilgængeligt
+    if record.get('summary'):
+        parts.append(f"Sammendrag: {record['summary']}")
+
+    return " | ".join(parts)
+
+
+def prepare_record(record: Dict[str, Any], stats: Optional[RecordStats] = None) -> Dict[str, Any]:
+    """
+    Valider og konvertér én record til LegalDocument format i ét gennemløb
+
+    None værdier og ukendte felter fjernes; text_for_embedding bygges altid forfra.
+    Returnerer en ny dict - input ændres ikke.
+    """
+    prepared = {}
+    coercers = FIELD_COERCERS
+
+    for name, value in record.items():
+        if value is None:
+            continue
+        coerce = coercers.get(name)
+        if coerce is None:
+            if stats is not None:
+                stats.dropped_fields[name] += 1
+            continue
+        prepared[name] = coerce(value)
+
+    prepared['text_for_embedding'] = build_embedding_text(prepared)
+    return prepared
+
+
+def iter_numbered_records(path: str, stats: Optional[RecordStats] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Stream (linjenummer i filen, record) fra en JSONL fil (ugyldige linjer springes over)"""
+    with open(path, 'rb') as source:
+        for line_number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            if stats is not None:
+                stats.read += 1
+            try:
+                record = _loads(line)
+            except _DECODE_ERRORS:
+                if stats is not None:
+                    stats.invalid_json += 1
+                continue
+            if not isinstance(record, dict):
+                if stats is not None:
+                    stats.invalid_json += 1
+                continue
+            yield line_number, record
+
+
+def iter_raw_records(path: str, stats: Optional[RecordStats] = None) -> Iterator[Dict[str, Any]]:
+    """Stream dekodede records fra en JSONL fil (ugyldige linjer springes over)"""
+    for _, record in iter_numbered_records(path, stats):
+        yield record
+
+
+def iter_records(path: str, stats: Optional[RecordStats] = None,
+                 require_chunk_id: bool = True) -> Iterator[Dict[str, Any]]:
+    """Stream validerede, import-klare records fra en JSONL fil"""
+    for record in iter_raw_records(path, stats):
+        if require_chunk_id and not record.get('chunk_id'):
+            if stats is not None:
+                stats.missing_chunk_id += 1
+            continue
+        prepared = prepare_record(record, stats)
+        if stats is not None:
+            stats.valid += 1
+        yield prepared
+
+
+def iter_batches(records: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Gruppér en record-strøm i batches af batch_size"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
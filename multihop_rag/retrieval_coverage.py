@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+RETRIEVAL COVERAGE - Hvor godt dækker HOP 1 spørgsmålet?
+=======================================================
+
+Bruges som gate i MultihopJuridiskRAG: er dækningen høj nok
+(>= LangChainRAGConfig.hop_confidence_threshold), springes dokument-analyse
+og yderligere hops over, og svaret genereres direkte.
+
+Score (0-1) sammensat af:
+- exact_match (0.5 / 0.3): spørgsmålets § (og stk.) findes blandt hits - 0.5 hvis
+  både paragraf og stk. matcher, 0.3 hvis kun paragraffen (samme lov hvis nævnt)
+- certainty (op til 0.3): top-certainty for semantiske hits, dæmpet hvis
+  fordelingen er flad (ingen klar vinder)
+- note_coverage (op til 0.2): andel af paragraf-hits der er fulgt af noter
+
+Rene semantiske hits kan højst give 0.5, så kun spørgsmål med et præcist
+paragraf-match kan passere standard-tærsklen 0.7.
+
+BRUG:
+    coverage = score_coverage("§ 9 C stk. 3 i ligningsloven", documents)
+    coverage.score, coverage.exact_match
+"""
+
+import re
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+from law_partitions import detect_law
+
+EXACT_STK_WEIGHT = 0.5
+EXACT_PARAGRAPH_WEIGHT = 0.3
+CERTAINTY_WEIGHT = 0.3
+NOTE_WEIGHT = 0.2
+
+# Certainty under CERTAINTY_FLOOR tæller ikke; CERTAINTY_FLOOR + CERTAINTY_SPAN giver fuld vægt
+CERTAINTY_FLOOR = 0.75
+CERTAINTY_SPAN = 0.15
+
+# "§ 9 C, stk. 3" / "§ 9c stk 3" / "§ 33 A" - et lille "i" efter nummeret er præpositionen, ikke et litra
+_REFERENCE = re.compile(
+    r'§\s*(\d+)(?:\s?([A-HJ-Za-hj-zÆØÅæøå]|I)(?![A-Za-zÆØÅæøå]))?(?:\s*,?\s*stk\.?\s*(\d+))?'
+)
+
+
+@dataclass
+class CoverageScore:
+    score: float = 0.0
+    exact_match: Optional[str] = None  # 'stk', 'paragraph' eller None
+    certainty: float = 0.0
+    note_coverage: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def parse_reference(text: str) -> Optional[Tuple[str, Optional[str]]]:
+    """'§ 9 C, stk. 3' -> ('9c', '3'); '§ 33 A' -> ('33a', None); ingen § -> None"""
+    match = _REFERENCE.search(text or "")
+    if not match:
+        return None
+    number, letter, stk = match.groups()
+    return f"{number}{(letter or '').lower()}", stk
+
+
+def parse_paragraph(text: str) -> Optional[Tuple[str, Optional[str]]]:
+    """'§ 9c stk 3' -> ('§ 9 C', '3') - paragraffen skrevet som i chunks' paragraph/heading felter"""
+    match = _REFERENCE.search(text or "")
+    if not match:
+        return None
+    number, letter, stk = match.groups()
+    return (f"§ {number} {letter.upper()}" if letter else f"§ {number}"), stk
+
+
+def has_explicit_reference(question: str) -> bool:
+    return parse_reference(question) is not None
+
+
+def _document_reference(doc: Document) -> Optional[Tuple[str, Optional[str]]]:
+    metadata = doc.metadata
+    for key in ('stk', 'paragraph', 'reference'):
+        reference = parse_reference(str(metadata.get(key) or ""))
+        if reference:
+            return reference
+    return None
+
+
+def score_coverage(question: str, documents: List[Document]) -> CoverageScore:
+    """Dæknings-score for et sæt hits i forhold til spørgsmålet"""
+    coverage = CoverageScore()
+    if not documents:
+        return coverage
+
+    # 1. Præcist § match (samme lov hvis spørgsmålet nævner en)
+    wanted = parse_reference(question)
+    law = detect_law(question)
+    if wanted:
+        for doc in documents:
+            if law and doc.metadata.get('title') and doc.metadata['title'].lower() != law.lower():
+                continue
+            found = _document_reference(doc)
+            if not found or found[0] != wanted[0]:
+                continue
+            if wanted[1] is None or found[1] == wanted[1]:
+                coverage.exact_match = 'stk'
+                break
+            coverage.exact_match = 'paragraph'
+
+    # 2. Certainty fordeling - høj top og tydelig afstand til resten
+    certainties = sorted((doc.metadata.get('certainty') or 0.0 for doc in documents), reverse=True)
+    certainties = [certainty for certainty in certainties if certainty > 0]
+    if certainties:
+        top = certainties[0]
+        strength = min(max((top - CERTAINTY_FLOOR) / CERTAINTY_SPAN, 0.0), 1.0)
+        mean = sum(certainties) / len(certainties)
+        # Flad fordeling (alle hits lige gode/dårlige) giver halv vægt
+        separation = 1.0 if len(certainties) == 1 else min((top - mean) / 0.02 + 0.5, 1.0)
+        coverage.certainty = strength * separation
+
+    # 3. Note dækning - paragraffer fulgt af deres noter
+    paragraphs = sum(1 for doc in documents if doc.metadata.get('type') == 'paragraf')
+    notes = sum(1 for doc in documents if doc.metadata.get('type') in ('note', 'notes'))
+    if paragraphs:
+        coverage.note_coverage = min(notes / paragraphs, 1.0)
+
+    exact_weight = {'stk': EXACT_STK_WEIGHT, 'paragraph': EXACT_PARAGRAPH_WEIGHT}.get(coverage.exact_match, 0.0)
+    coverage.score = round(min(
+        exact_weight + CERTAINTY_WEIGHT * coverage.certainty + NOTE_WEIGHT * coverage.note_coverage, 1.0
+    ), 4)
+    return coverage
@@ -6,11 +6,19 @@ Opgraderet til modulær arkitektur - kan importeres af andre systemer
 
 import weaviate
 import os
+import re
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 from typing import List, Dict, Optional, Any
 import time
+import numpy as np
 from openai import OpenAI
 
+from legal_schema import CLASS_NAME, DEFAULT_RESCORE_OVERSAMPLING, get_class_schema, get_compression
+from law_partitions import PartitionRouter, detect_law
+from retrieval_coverage import parse_paragraph
+
 # Indlæs miljøvariabler
 load_dotenv()
 
@@ -24,18 +32,36 @@ class SearchEngine:
     - Keyword søgning  
     - Auto-valg af optimal søgestrategi
     - Hybrid søgning
+    - Graf søgning (top-k hits + naboer fra lov-grafen via GraphRetriever)
     """
     
-    def __init__(self, weaviate_url: str = "http://localhost:8080", verbose: bool = True):
+    def __init__(self, weaviate_url: str = "http://localhost:8080", verbose: bool = True,
+                 rescore_oversampling: Optional[int] = None, graph_retriever: Any = None,
+                 graph_seed_k: int = 3, graph_max_related: int = 5, embedding_cache_size: int = 1024):
         """
         Initialize søgemaskinen
         
         Args:
             weaviate_url: URL til Weaviate database
             verbose: Print debug information
+            rescore_oversampling: Hent N x limit kandidater og rescore med fulde vektorer.
+                None = automatisk (aktiv når indekset er PQ/BQ komprimeret), 1 = slået fra
+            graph_retriever: GraphRetriever (graph_retriever/) - aktiverer search_type="graph"
+            graph_seed_k: Antal top hits grafen ekspanderes fra
+            graph_max_related: Maks graf-naboer per hit
+            embedding_cache_size: Antal query embeddings der huskes (0 = ingen cache)
         """
         self.weaviate_url = weaviate_url
         self.verbose = verbose
+        self.graph_retriever = graph_retriever
+        self.graph_seed_k = graph_seed_k
+        self.graph_max_related = graph_max_related
+        
+        # Én OpenAI klient (genbruger HTTP forbindelser) og LRU cache af query embeddings
+        self._openai_client = None
+        self.embedding_cache_size = embedding_cache_size
+        self._embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
         
         # Get OpenAI API key
         openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -58,10 +84,21 @@ class SearchEngine:
         if not self.test_connection():
             raise ConnectionError(f"Kan ikke forbinde til Weaviate på {weaviate_url}")
         
+        # Per-lov partitioner (multi-tenancy) - lov-specifikke søgninger rammer kun én partition
+        self.router = PartitionRouter(self.client, CLASS_NAME, verbose=verbose)
+        
+        # Komprimeret indeks giver approksimative afstande - rescore med fulde vektorer
+        self.compression = self._detect_compression()
+        if rescore_oversampling is None:
+            rescore_oversampling = DEFAULT_RESCORE_OVERSAMPLING if self.compression else 1
+        self.rescore_oversampling = max(1, rescore_oversampling)
+        
         if self.verbose:
             print(f"✅ Søgemaskine forbundet til Weaviate ({weaviate_url})")
             if openai_api_key:
                 print(f"✅ OpenAI API key konfigureret - semantic search aktiveret (1024 dims)")
+            if self.compression:
+                print(f"🗜️ {self.compression.upper()} komprimering - rescoring med {self.rescore_oversampling}x oversampling")
     
     def test_connection(self) -> bool:
         """Test om Weaviate forbindelse virker"""
@@ -73,6 +110,43 @@ class SearchEngine:
                 print(f"❌ Weaviate forbindelse fejlede: {e}")
             return False
     
+    @property
+    def openai_client(self) -> OpenAI:
+        """Delt OpenAI klient - oprettes ved første semantiske søgning"""
+        if self._openai_client is None:
+            self._openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._openai_client
+    
+    def embed_query(self, query: str) -> List[float]:
+        """1024-dim query embedding (text-embedding-3-large) med LRU cache"""
+        with self._cache_lock:
+            embedding = self._embedding_cache.get(query)
+            if embedding is not None:
+                self._embedding_cache.move_to_end(query)
+                return embedding
+        
+        # Force 1024 dimensions to match existing data
+        response = self.openai_client.embeddings.create(
+            model="text-embedding-3-large",
+            input=query,
+            dimensions=1024
+        )
+        embedding = response.data[0].embedding
+        
+        if self.embedding_cache_size > 0:
+            with self._cache_lock:
+                self._embedding_cache[query] = embedding
+                while len(self._embedding_cache) > self.embedding_cache_size:
+                    self._embedding_cache.popitem(last=False)
+        return embedding
+    
+    def _detect_compression(self) -> Optional[str]:
+        """Find om LegalDocument bruger PQ/BQ komprimering"""
+        try:
+            return get_compression(get_class_schema(self.client, CLASS_NAME))
+        except Exception:
+            return None
+    
     def search(self, query: str, limit: int = 5, search_type: str = "auto") -> List[Dict]:
         """
         Hovedsøgefunktion - automatisk valg af optimal strategi
@@ -80,7 +154,7 @@ class SearchEngine:
         Args:
             query: Søgeforespørgsel
             limit: Maksimalt antal resultater
-            search_type: "auto", "paragraph", "semantic", "keyword", "hybrid"
+            search_type: "auto", "paragraph", "semantic", "keyword", "hybrid", "graph"
             
         Returns:
             Liste af søgeresultater
@@ -105,6 +179,8 @@ class SearchEngine:
             results = self._search_keyword(query, limit)
         elif search_type == "hybrid":
             results = self._search_hybrid(query, limit)
+        elif search_type == "graph":
+            results = self._search_graph(query, limit)
         else:
             # Fallback til paragraph_first
             results = self._search_paragraph_first(query, limit)
@@ -116,17 +192,29 @@ class SearchEngine:
             
         return results
     
-    def _determine_search_strategy(self, query: str) -> str:
+    def _determine_search_strategy(self, query: str, use_graph: bool = True) -> str:
         """
         Intelligent valg af søgestrategi baseret på query indhold
         
         Prioritering:
-        1. Paragraf søgning hvis § eller juridiske referencer
-        2. Semantisk søgning for konceptuelle spørgsmål
-        3. Keyword som fallback
+        1. Graf søgning for spørgsmål om sammenhænge mellem regler (kræver graf) -
+           ikke når spørgsmålet nævner præcis én §, så den slås præcist op først
+        2. Paragraf søgning hvis § eller juridiske referencer
+        3. Semantisk søgning for konceptuelle spørgsmål
+        4. Keyword som fallback
         """
         query_lower = query.lower()
         
+        # Spørgsmål der spænder over flere bestemmelser - ét opslag + graf i stedet for flere hop
+        relationelle_patterns = [
+            'sammenhæng', 'hænger sammen', 'sammen med', 'samspil', 'henvis', 'kombineret med'
+        ]
+        
+        if (use_graph and self.graph_retriever is not None
+                and any(pattern in query_lower for pattern in relationelle_patterns)
+                and len(re.findall(r'§\s*\d+', query)) != 1):
+            return "graph"
+        
         # Check for juridiske referencer
         juridisk_patterns = [
             '§', 'paragraf', 'stk', 'stykke', 'nr', 'nummer', 
@@ -263,6 +351,54 @@ class SearchEngine:
         
         return results[:limit]
     
+    def _search_graph(self, query: str, limit: int) -> List[Dict]:
+        """
+        Graf-ekspansion: top-k hits + deres stærkeste naboer i lov-grafen
+        
+        1. Basis søgning (auto-strategi uden graf) giver graph_seed_k seeds
+        2. GraphRetriever følger forudberegnede relationer efter kantstyrke
+        3. Alle nabo-chunks hentes i ét batched opslag (chunk_id ContainsAny)
+        """
+        search_base = {
+            "paragraph_first": self._search_paragraph_first,
+            "hybrid": self._search_hybrid
+        }.get(self._determine_search_strategy(query, use_graph=False), self._search_semantic_first)
+        
+        if self.graph_retriever is None:
+            if self.verbose:
+                print("   ⚠️ Ingen graph_retriever - bruger basis søgning")
+            return search_base(query, limit)
+        
+        seeds = search_base(query, max(1, min(self.graph_seed_k, limit)))
+        
+        # Rang-baseret seed score - certainty findes ikke for where-filter hits
+        graph_seeds = [
+            (seed.get('title', ''), seed.get('chunk_id'), 1.0 / (rank + 1))
+            for rank, seed in enumerate(r for r in seeds if r.get('type') == 'paragraf')
+        ]
+        related = self.graph_retriever.expand_from_chunks(graph_seeds, max_related=self.graph_max_related)
+        
+        results = list(seeds)
+        existing_ids = {r.get('chunk_id') for r in results}
+        related = [r for r in related if r['chunk_id'] not in existing_ids][:max(0, limit - len(results))]
+        
+        if related:
+            neighbors = {c['chunk_id']: c for c in self.get_chunks_by_ids([r['chunk_id'] for r in related])}
+            for relation in related:
+                neighbor = neighbors.get(relation['chunk_id'])
+                if neighbor:
+                    neighbor.update({
+                        'search_method': 'graph',
+                        'graph_score': relation['score'],
+                        'graph_via': relation['via']
+                    })
+                    results.append(neighbor)
+            
+            if self.verbose:
+                print(f"   🕸️ Graf: {len(results) - len(seeds)} naboer fra {len(graph_seeds)} seeds")
+        
+        return results[:limit]
+    
     def _search_precise_paragraph(self, query: str, limit: int) -> List[Dict]:
         """Præcis paragraf søgning med juridiske mønstre"""
         
@@ -272,18 +408,21 @@ class SearchEngine:
         if where_filters:
             # Brug where filter hvis juridiske mønstre fundet
             try:
-                results = (
-                    self.client.query
-                    .get("LegalDocument", [
-                        "text", "title", "topic", "heading", "nr", "type", 
-                        "chunk_id", "law_number", "document_name"
-                    ])
-                    .with_where(where_filters)
-                    .with_limit(limit)
-                    .do()
+                chunks = self.router.get(
+                    lambda: (
+                        self.client.query
+                        .get("LegalDocument", [
+                            "text", "title", "topic", "heading", "nr", "type", 
+                            "chunk_id", "law_number", "document_name",
+                            "related_note_chunks"  # Præcist match udvides med sine noter
+                        ])
+                        .with_where(where_filters)
+                        .with_limit(limit)
+                    ),
+                    law_title=detect_law(query),
+                    limit=limit
                 )
                 
-                chunks = results.get('data', {}).get('Get', {}).get('LegalDocument', [])
                 return self._format_search_results(chunks, "paragraph_where")
                 
             except Exception as e:
@@ -296,31 +435,31 @@ class SearchEngine:
     def _search_semantic(self, query: str, limit: int) -> List[Dict]:
         """Semantisk vektorsøgning med manual vector search (1024-dim fix)"""
         try:
-            # Create OpenAI client and get 1024-dimensional embedding
-            openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+            # 1024-dimensional embedding (delt klient, cachet per query)
+            embedding = self.embed_query(query)
             
-            # Force 1024 dimensions to match existing data
-            response = openai_client.embeddings.create(
-                model="text-embedding-3-large",
-                input=query,
-                dimensions=1024
-            )
-            embedding = response.data[0].embedding
+            # Ved komprimeret indeks hentes flere kandidater som rescores med fulde vektorer
+            rescore = self.rescore_oversampling > 1
+            additional = ["certainty", "distance", "vector"] if rescore else ["certainty", "distance"]
             
             # Use manual vector search with the 1024-dim embedding
-            results = (
-                self.client.query
-                .get("LegalDocument", [
-                    "text", "title", "topic", "heading", "nr", "type",
-                    "chunk_id", "law_number", "document_name"
-                ])
-                .with_near_vector({"vector": embedding})
-                .with_limit(limit)
-                .with_additional(["certainty", "distance"])
-                .do()
+            chunks = self.router.get(
+                lambda: (
+                    self.client.query
+                    .get("LegalDocument", [
+                        "text", "title", "topic", "heading", "nr", "type",
+                        "chunk_id", "law_number", "document_name"
+                    ])
+                    .with_near_vector({"vector": embedding})
+                    .with_limit(limit * self.rescore_oversampling)
+                    .with_additional(additional)
+                ),
+                law_title=detect_law(query),
+                limit=limit * self.rescore_oversampling
             )
             
-            chunks = results.get('data', {}).get('Get', {}).get('LegalDocument', [])
+            if rescore:
+                chunks = self._rescore_with_full_vectors(embedding, chunks, limit)
             return self._format_search_results(chunks, "semantic")
             
         except Exception as e:
@@ -329,21 +468,50 @@ class SearchEngine:
             # Fallback to keyword search
             return self._search_keyword(query, limit)
     
+    @staticmethod
+    def _rescore_with_full_vectors(query_vector: List[float], chunks: List[Dict], limit: int) -> List[Dict]:
+        """Rescore kandidater med eksakt cosine mod de ukomprimerede vektorer"""
+        if not chunks:
+            return []
+        
+        with_vectors = [c for c in chunks if c.get('_additional', {}).get('vector')]
+        if not with_vectors:
+            return chunks[:limit]
+        
+        matrix = np.asarray([c['_additional']['vector'] for c in with_vectors], dtype=np.float32)
+        query = np.asarray(query_vector, dtype=np.float32)
+        similarities = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        
+        rescored = []
+        for index in np.argsort(-similarities)[:limit]:
+            chunk = with_vectors[index]
+            additional = dict(chunk['_additional'])
+            additional.pop('vector', None)
+            # Samme skala som Weaviate's cosine certainty/distance
+            additional['distance'] = float(1.0 - similarities[index])
+            additional['certainty'] = float((1.0 + similarities[index]) / 2.0)
+            rescored.append({**chunk, '_additional': additional})
+        
+        return rescored
+    
     def _search_keyword(self, query: str, limit: int) -> List[Dict]:
         """Keyword-baseret tekstsøgning"""
         try:
-            results = (
-                self.client.query
-                .get("LegalDocument", [
-                    "text", "title", "topic", "heading", "nr", "type",
-                    "chunk_id", "law_number", "document_name"  
-                ])
-                .with_bm25(query=query)
-                .with_limit(limit)
-                .do()
+            chunks = self.router.get(
+                lambda: (
+                    self.client.query
+                    .get("LegalDocument", [
+                        "text", "title", "topic", "heading", "nr", "type",
+                        "chunk_id", "law_number", "document_name"  
+                    ])
+                    .with_bm25(query=query)
+                    .with_limit(limit)
+                    .with_additional(["score"])
+                ),
+                law_title=detect_law(query),
+                limit=limit
             )
             
-            chunks = results.get('data', {}).get('Get', {}).get('LegalDocument', [])
             return self._format_search_results(chunks, "keyword")
             
         except Exception as e:
@@ -358,24 +526,26 @@ class SearchEngine:
             boost_limit = max(1, limit // 2)
             
             # Først: Søg kun i paragraffer
-            paragraph_results = (
-                self.client.query
-                .get("LegalDocument", [
-                    "text", "title", "topic", "heading", "nr", "type",
-                    "chunk_id", "law_number", "document_name"
-                ])
-                .with_near_text({"concepts": [query]})
-                .with_where({
-                    "path": ["type"],
-                    "operator": "Equal", 
-                    "valueText": "paragraf"
-                })
-                .with_limit(boost_limit)
-                .with_additional(["certainty"])
-                .do()
+            results = self.router.get(
+                lambda: (
+                    self.client.query
+                    .get("LegalDocument", [
+                        "text", "title", "topic", "heading", "nr", "type",
+                        "chunk_id", "law_number", "document_name"
+                    ])
+                    .with_near_text({"concepts": [query]})
+                    .with_where({
+                        "path": ["type"],
+                        "operator": "Equal", 
+                        "valueText": "paragraf"
+                    })
+                    .with_limit(boost_limit)
+                    .with_additional(["certainty"])
+                ),
+                law_title=detect_law(query),
+                limit=boost_limit
             )
             
-            results = paragraph_results.get('data', {}).get('Get', {}).get('LegalDocument', [])
             if results is None:
                 results = []
             
@@ -413,18 +583,22 @@ class SearchEngine:
     def _build_juridisk_where_filter(self, query: str) -> Optional[Dict]:
         """Byg where filter for juridiske referencer"""
         
-        # Udtræk § referencer  
-        import re
-        
-        # Match § nummer
-        section_match = re.search(r'§\s*(\d+[a-z]*)', query.lower())
-        if section_match:
-            section_num = section_match.group(1)
-            return {
-                "path": ["topic"],
-                "operator": "Like",
-                "valueText": f"*§ {section_num}*"
-            }
+        # Match § (med litra) og evt. stk. mod paragraph/stk felterne ("§ 9 C" + "3")
+        reference = parse_paragraph(query)
+        if reference:
+            paragraph, stk = reference
+            filters = [
+                {"path": ["paragraph"], "operator": "Equal", "valueText": paragraph},
+                # Noterne hentes med paragraffen (_expand_paragraph_with_notes)
+                {"path": ["type"], "operator": "Equal", "valueText": "paragraf"}
+            ]
+            if stk:
+                filters.append({"path": ["stk"], "operator": "Equal", "valueText": stk})
+            # Nævnt lov - ellers rammer "§ 9" i ligningsloven også andre loves § 9
+            law_title = detect_law(query)
+            if law_title:
+                filters.append({"path": ["title"], "operator": "Equal", "valueText": law_title})
+            return {"operator": "And", "operands": filters}
         
         # Match lovnavne
         if 'kildeskatteloven' in query.lower() or 'ksl' in query.lower():
@@ -464,7 +638,8 @@ class SearchEngine:
         
         # Tjek om det er en paragraf med relaterede noter
         if paragraph_chunk.get('type') == 'paragraf':
-            related_note_ids = paragraph_chunk.get('related_note_chunks', [])
+            # Weaviate returnerer null for paragraffer uden noter
+            related_note_ids = paragraph_chunk.get('related_note_chunks') or []
             
             if related_note_ids and self.verbose:
                 print(f"   📝 Udvider med {len(related_note_ids)} relaterede noter...")
@@ -473,22 +648,24 @@ class SearchEngine:
             for note_id in related_note_ids:
                 if note_id:  # Sikr at note_id ikke er None/tom
                     try:
-                        note_results = (
-                            self.client.query
-                            .get("LegalDocument", [
-                                "text", "title", "topic", "heading", "nr", "type",
-                                "chunk_id", "law_number", "document_name"
-                            ])
-                            .with_where({
-                                "path": ["chunk_id"],
-                                "operator": "Equal",
-                                "valueText": note_id
-                            })
-                            .with_limit(1)
-                            .do()
+                        # Noter ligger i samme lov (partition) som paragraffen
+                        note_docs = self.router.get(
+                            lambda: (
+                                self.client.query
+                                .get("LegalDocument", [
+                                    "text", "title", "topic", "heading", "nr", "type",
+                                    "chunk_id", "law_number", "document_name"
+                                ])
+                                .with_where({
+                                    "path": ["chunk_id"],
+                                    "operator": "Equal",
+                                    "valueText": note_id
+                                })
+                                .with_limit(1)
+                            ),
+                            law_title=paragraph_chunk.get('title'),
+                            limit=1
                         )
-                        
-                        note_docs = note_results.get('data', {}).get('Get', {}).get('LegalDocument', [])
                         if note_docs:
                             expanded_chunks.extend(note_docs)
                             
@@ -498,7 +675,8 @@ class SearchEngine:
         
         return expanded_chunks
     
-    def _format_search_results(self, chunks: List[Dict], search_method: str) -> List[Dict]:
+    def _format_search_results(self, chunks: List[Dict], search_method: str,
+                               expand_notes: bool = True) -> List[Dict]:
         """Formater søgeresultater til standard format med smart chunk expansion"""
         # Ensure chunks is always a list
         if chunks is None:
@@ -511,7 +689,7 @@ class SearchEngine:
         for chunk in chunks:
             if chunk and chunk.get('chunk_id') not in seen_chunk_ids:
                 # Udvid paragraf med noter
-                if chunk.get('type') == 'paragraf':
+                if expand_notes and chunk.get('type') == 'paragraf':
                     expanded = self._expand_paragraph_with_notes(chunk)
                     for expanded_chunk in expanded:
                         if expanded_chunk and expanded_chunk.get('chunk_id') not in seen_chunk_ids:
@@ -568,22 +746,23 @@ class SearchEngine:
     def get_chunk_by_id(self, chunk_id: str) -> Optional[Dict]:
         """Hent specifik chunk baseret på ID"""
         try:
-            results = (
-                self.client.query
-                .get("LegalDocument", [
-                    "text", "title", "topic", "heading", "nr", "type",
-                    "chunk_id", "law_number", "document_name"
-                ])
-                .with_where({
-                    "path": ["chunk_id"],
-                    "operator": "Equal",
-                    "valueText": chunk_id
-                })
-                .with_limit(1)
-                .do()
+            chunks = self.router.get(
+                lambda: (
+                    self.client.query
+                    .get("LegalDocument", [
+                        "text", "title", "topic", "heading", "nr", "type",
+                        "chunk_id", "law_number", "document_name"
+                    ])
+                    .with_where({
+                        "path": ["chunk_id"],
+                        "operator": "Equal",
+                        "valueText": chunk_id
+                    })
+                    .with_limit(1)
+                ),
+                limit=1
             )
             
-            chunks = results.get('data', {}).get('Get', {}).get('LegalDocument', [])
             if chunks:
                 return self._format_search_results(chunks, "direct_id")[0]
             
@@ -593,36 +772,57 @@ class SearchEngine:
         
         return None
     
+    def get_chunks_by_ids(self, chunk_ids: List[str], law_title: Optional[str] = None) -> List[Dict]:
+        """
+        Hent mange chunks i ét opslag (chunk_id ContainsAny) - bruges af graf søgning
+        
+        Noter udvides ikke; rækkefølgen følger chunk_ids.
+        """
+        chunk_ids = [c for c in dict.fromkeys(chunk_ids) if c]
+        if not chunk_ids:
+            return []
+        try:
+            chunks = self.router.get(
+                lambda: (
+                    self.client.query
+                    .get("LegalDocument", [
+                        "text", "title", "topic", "heading", "nr", "type",
+                        "chunk_id", "law_number", "document_name"
+                    ])
+                    .with_where({
+                        "path": ["chunk_id"],
+                        "operator": "ContainsAny",
+                        "valueTextArray": chunk_ids
+                    })
+                    .with_limit(len(chunk_ids))
+                ),
+                law_title=law_title
+            )
+        except Exception as e:
+            if self.verbose:
+                print(f"❌ Fejl ved batched hentning af {len(chunk_ids)} chunks: {e}")
+            return []
+        
+        order = {chunk_id: position for position, chunk_id in enumerate(chunk_ids)}
+        formatted = self._format_search_results(chunks, "direct_id", expand_notes=False)
+        return sorted(formatted, key=lambda r: order.get(r['chunk_id'], len(order)))
+    
     def get_database_stats(self) -> Dict:
         """Hent statistikker om databasen"""
         try:
-            # Totalt antal chunks
-            total_results = (
-                self.client.query
-                .aggregate("LegalDocument")
-                .with_meta_count()
-                .do()
-            )
-            
-            total_count = total_results.get('data', {}).get('Aggregate', {}).get('LegalDocument', [{}])[0].get('meta', {}).get('count', 0)
+            # Totalt antal chunks (summeret over evt. lov-partitioner)
+            total_count = self.router.count()
             
             # Simple count per type (compatibility fix for v3)
             type_counts = {}
             try:
                 # Try the old v3 API first  
                 for doc_type in ['paragraf', 'stykke', 'nummer', 'other']:
-                    type_results = (
-                        self.client.query
-                        .aggregate("LegalDocument")
-                        .with_where({
-                            "path": ["type"],
-                            "operator": "Equal",
-                            "valueText": doc_type
-                        })
-                        .with_meta_count()
-                        .do()
-                    )
-                    count = type_results.get('data', {}).get('Aggregate', {}).get('LegalDocument', [{}])[0].get('meta', {}).get('count', 0)
+                    count = self.router.count(where={
+                        "path": ["type"],
+                        "operator": "Equal",
+                        "valueText": doc_type
+                    })
                     if count > 0:
                         type_counts[doc_type] = count
             except Exception:
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for coverage gaten i MultihopJuridiskRAG mod det medfølgende mock index
+
+Spørgsmål med en præcis § reference (med litra, stk. og lov) skal findes ved
+HOP 1's præcise opslag og besvares med ét LLM kald - uden query analyse,
+dokument-analyse eller flere hops.
+
+KØRSEL:
+    python -m pytest multihop_rag/test_coverage_gate.py -q
+"""
+
+import json
+import os
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from benchmarks.mock_weaviate import InMemoryWeaviate, StubEmbedder, StubOpenAI
+from benchmarks.perf_benchmark import IMPORTER_DIR, IMPORTERS, CHUNKS_DIR, load_script, quiet
+from legal_schema import SchemaSettings
+
+LAWS = ("Ligningsloven", "Aktieavancebeskatningsloven")
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Svarer JSON på planlægnings-prompts og fritekst på svar-prompten - tæller kaldene"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def bind(self, **options):
+        return self
+
+    def invoke(self, messages):
+        prompt = messages[0].content
+        self.prompts.append(prompt)
+        if "query-analyse" in prompt:
+            return FakeResponse(json.dumps({"search_queries": [], "needs_multihop": False, "confidence": 0.9}))
+        if "dokumentanalyse" in prompt:
+            return FakeResponse(json.dumps({"needs_more_search": False, "confidence": 0.9}))
+        return FakeResponse("SVAR")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    files = [str(path) for law in LAWS for path in Path(CHUNKS_DIR).glob(f"{law}*_chunks.jsonl")]
+    if len(files) != len(LAWS):
+        pytest.skip(f"Chunk filer mangler i {CHUNKS_DIR}")
+
+    embedder = StubEmbedder(256)
+    db = InMemoryWeaviate(embedder=embedder)
+    # Import scriptet afbryder uden nøgle - mock/stub kalder aldrig OpenAI
+    with mock.patch.dict(os.environ, {"OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "test-stub"}), \
+            mock.patch("weaviate.Client", lambda *a, **kw: db):
+        with quiet():
+            importer = load_script("import_simple_1024", IMPORTER_DIR / IMPORTERS["simple"])
+            importer.create_optimized_schema(db, force_recreate=True, settings=SchemaSettings())
+            importer.import_documents_optimized(db, files, batch_size=200, rate_limit=0)
+
+        import search_engine
+        with mock.patch.object(search_engine, "OpenAI", lambda *a, **kw: StubOpenAI(embedder)):
+            yield search_engine.SearchEngine(verbose=False)
+
+
+@pytest.fixture
+def rag(engine):
+    from juridisk_rag_langchain import MultihopJuridiskRAG
+
+    with quiet():
+        rag = MultihopJuridiskRAG(search_engine=engine, validate_connections=False, verbose=False)
+    rag.llm = FakeLLM()
+    rag.stage_llms = {stage: rag.llm for stage in rag.stage_llms}
+    yield rag
+    rag._executor.shutdown(wait=True)
+
+
+@pytest.mark.parametrize("question, law, paragraph", [
+    ("§ 9 C stk. 3 i ligningsloven", "ligningsloven", "9c"),
+    ("ligningsloven § 9 C, stk. 3", "ligningsloven", "9c"),
+])
+def test_precise_lookup_keeps_letter_and_law(engine, question, law, paragraph):
+    from retrieval_coverage import parse_reference
+
+    results = engine.search(question, limit=5, search_type="paragraph")
+    assert results
+    top = results[0]
+    assert top["title"].lower() == law
+    assert parse_reference(top["stk"]) == (paragraph, "3")
+    # Præcist match udvides med paragraffens noter
+    assert any(result["type"] == "notes" for result in results)
+
+
+def test_precise_lookup_does_not_match_letters_or_other_laws(engine):
+    # Ligningsloven har § 16 og § 16 A, aktieavancebeskatningsloven har også § 16
+    results = engine.search("ligningslovens § 16", limit=10, search_type="paragraph")
+    # Semantisk opfyldning må gerne finde § 16 A - det præcise opslag må ikke
+    exact = [result for result in results
+             if result["search_method"] == "paragraph_where" and result["type"] == "paragraf"]
+    assert exact
+    for result in exact:
+        assert result["title"] == "Ligningsloven"
+        assert result["stk"].startswith("§ 16, ")
+
+
+@pytest.mark.parametrize("question", [
+    "§ 9 C stk. 3 i ligningsloven",
+    "ligningsloven § 9 C, stk. 3",
+])
+def test_coverage_gate_answers_explicit_reference_with_one_llm_call(rag, question):
+    result = rag.ask(question)
+
+    assert result["coverage"]["exact_match"] == "stk"
+    assert result["coverage"]["score"] >= rag.config.hop_confidence_threshold
+    assert [step["step"] for step in result["reasoning_path"]] == ["coverage_gate"]
+    # Kun svar-kaldet - ingen query analyse eller dokument-analyse
+    assert len(rag.llm.prompts) == 1
+    assert "query-analyse" not in rag.llm.prompts[0] and "dokumentanalyse" not in rag.llm.prompts[0]
+    assert result["hops_performed"] == 1
+    assert result["documents_per_hop"]["hop2"] == 0
+
+
+def test_question_without_reference_is_analysed(rag):
+    result = rag.ask("fradrag for befordring mellem hjem og arbejde")
+
+    steps = [step["step"] for step in result["reasoning_path"]]
+    assert "coverage_gate" not in steps
+    assert steps[:2] == ["query_analysis", "hop1_analysis"]
+    assert result["hops_performed"] >= 1
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Tests for http_service - request coalescing, load shedding (503) og streaming til sent ankomne
+
+Kører ASGI appen direkte (uden server) mod falske motorer der blokerer indtil
+testen slipper dem, så samtidigheden er deterministisk.
+
+KØRSEL:
+    python -m pytest multihop_rag/test_http_service.py -q
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from http_service import AnswerStream, BoundedWorkerPool, RequestCoalescer, ServiceOverloaded, create_app
+
+TIMEOUT = 5
+
+
+class FakeSearchEngine:
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def search(self, query, limit=5, search_type="auto"):
+        self.calls.append(query)
+        self.release.wait(TIMEOUT)
+        return [{"chunk_id": f"{query}-{i}"} for i in range(limit)]
+
+
+class FakeRAG:
+    TOKENS = ["Svar ", "om ", "§ 9 C"]
+
+    def __init__(self):
+        self.calls = 0
+        self.first_token_sent = threading.Event()
+        self.release = threading.Event()
+
+    def ask(self, question, on_token=None):
+        self.calls += 1
+        for position, token in enumerate(self.TOKENS):
+            if on_token:
+                on_token(token)
+            if position == 0:
+                self.first_token_sent.set()
+                self.release.wait(TIMEOUT)
+        return {"answer": "".join(self.TOKENS), "question": question}
+
+
+class FakeRAGService:
+    def __init__(self):
+        self.search_engine = FakeSearchEngine()
+        self.rag = FakeRAG()
+        self.warmed_up = False
+
+    def warm_up(self):
+        self.warmed_up = True
+        return {}
+
+
+@pytest.fixture
+def app():
+    app = create_app(FakeRAGService(), max_workers=2, max_queue=1, warm_up=False, verbose=False)
+    yield app
+    app.service.rag_service.search_engine.release.set()
+    app.service.rag_service.rag.release.set()
+    app.service.pool.executor.shutdown(wait=True)
+
+
+async def call(app, method, path, body=None, query_string=b""):
+    """Én HTTP forespørgsel gennem ASGI appen -> (status, headers, body)"""
+    messages = [{"type": "http.request", "body": json.dumps(body).encode() if body is not None else b"",
+                 "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app({"type": "http", "method": method, "path": path, "query_string": query_string}, receive, send)
+    headers = dict(sent[0]["headers"])
+    return sent[0]["status"], headers, b"".join(message.get("body", b"") for message in sent[1:]).decode("utf-8")
+
+
+async def wait_for(event: threading.Event):
+    """Vent på en worker tråd uden at blokere event loopet"""
+    await asyncio.get_running_loop().run_in_executor(None, event.wait, TIMEOUT)
+    assert event.is_set()
+
+
+def sse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+# --- RequestCoalescer ---
+
+def test_identical_concurrent_searches_share_one_execution(app):
+    engine = app.service.rag_service.search_engine
+
+    async def scenario():
+        # Forskellig whitespace normaliseres til samme nøgle
+        queries = ["skat ved fraflytning", "skat  ved fraflytning", " skat ved fraflytning "]
+        requests = [asyncio.ensure_future(call(app, "POST", "/search", {"query": query, "limit": 2}))
+                    for query in queries]
+        await asyncio.sleep(0.05)
+        engine.release.set()
+        return await asyncio.gather(*requests)
+
+    responses = asyncio.run(scenario())
+
+    assert [status for status, _, _ in responses] == [200, 200, 200]
+    assert len({json.dumps(json.loads(body)["results"]) for _, _, body in responses}) == 1
+    assert engine.calls == ["skat ved fraflytning"]
+    assert app.service.coalescer.statistics() == {'inflight': 0, 'executions': 1, 'coalesced': 2}
+
+
+def test_different_parameters_are_not_coalesced(app):
+    engine = app.service.rag_service.search_engine
+    engine.release.set()
+
+    async def scenario():
+        return await asyncio.gather(call(app, "POST", "/search", {"query": "fradrag", "limit": 2}),
+                                    call(app, "POST", "/search", {"query": "fradrag", "limit": 3}))
+
+    responses = asyncio.run(scenario())
+    assert [len(json.loads(body)["results"]) for _, _, body in responses] == [2, 3]
+    assert len(engine.calls) == 2
+
+
+def test_coalescer_keeps_running_when_a_waiter_is_cancelled():
+    async def scenario():
+        coalescer = RequestCoalescer()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "svar"
+
+        first = asyncio.ensure_future(coalescer.run(("ask", "x"), work))
+        second = asyncio.ensure_future(coalescer.run(("ask", "x"), work))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        return await second, coalescer.statistics()
+
+    result, statistics = asyncio.run(scenario())
+    assert result == "svar"
+    assert statistics == {'inflight': 0, 'executions': 1, 'coalesced': 1}
+
+
+# --- BoundedWorkerPool: load shedding ---
+
+def test_requests_beyond_workers_and_queue_are_shed_with_503(app):
+    engine = app.service.rag_service.search_engine
+
+    async def scenario():
+        # max_workers=2 + max_queue=1 -> tre accepteres, resten afvises straks
+        requests = [asyncio.ensure_future(call(app, "POST", "/search", {"query": f"spørgsmål {i}"}))
+                    for i in range(5)]
+        await asyncio.sleep(0.05)
+        statistics = app.service.pool.statistics()
+        engine.release.set()
+        return await asyncio.gather(*requests), statistics
+
+    responses, statistics = asyncio.run(scenario())
+
+    assert sorted(status for status, _, _ in responses) == [200, 200, 200, 503, 503]
+    for status, headers, body in responses:
+        if status == 503:
+            assert headers[b"retry-after"] == b"1"
+            assert "overbelastet" in json.loads(body)["error"]
+    assert statistics['pending'] == 3 and statistics['queued'] == 1
+    assert app.service.pool.statistics()['shed'] == 2
+    assert len(engine.calls) == 3
+
+
+def test_pool_accepts_new_work_after_load_drops():
+    async def scenario():
+        pool = BoundedWorkerPool(max_workers=1, max_queue=0)
+        release = threading.Event()
+        busy = asyncio.ensure_future(pool.run(release.wait, TIMEOUT))
+        await asyncio.sleep(0)
+        with pytest.raises(ServiceOverloaded):
+            await pool.run(lambda: "afvist")
+        release.set()
+        await busy
+        accepted = await pool.run(lambda: "ok")
+        pool.executor.shutdown(wait=True)
+        return accepted, pool.statistics()
+
+    accepted, statistics = asyncio.run(scenario())
+    assert accepted == "ok"
+    assert statistics['shed'] == 1 and statistics['completed'] == 2 and statistics['pending'] == 0
+
+
+def test_stream_is_shed_when_pool_is_full(app):
+    engine = app.service.rag_service.search_engine
+
+    async def scenario():
+        searches = [asyncio.ensure_future(call(app, "POST", "/search", {"query": f"q{i}"})) for i in range(3)]
+        await asyncio.sleep(0.05)
+        stream = await call(app, "POST", "/ask/stream", {"question": "Hvad?"})
+        engine.release.set()
+        await asyncio.gather(*searches)
+        return stream
+
+    status, headers, _ = asyncio.run(scenario())
+    assert status == 503
+    assert headers[b"retry-after"] == b"1"
+    assert app.service.rag_service.rag.calls == 0
+
+
+# --- AnswerStream: replay til sent ankomne ---
+
+def test_late_stream_joiner_gets_tokens_already_sent(app):
+    rag = app.service.rag_service.rag
+
+    async def scenario():
+        first = asyncio.ensure_future(call(app, "POST", "/ask/stream", {"question": "Hvad siger § 9 C?"}))
+        await wait_for(rag.first_token_sent)
+        await asyncio.sleep(0.05)                       # første token er publiceret på loopet
+        stream = app.service.streams["Hvad siger § 9 C?"]
+        assert stream.tokens == ["Svar "]
+
+        late = asyncio.ensure_future(call(app, "POST", "/ask/stream", {"question": "Hvad  siger § 9 C?"}))
+        plain = asyncio.ensure_future(call(app, "POST", "/ask", {"question": "Hvad siger § 9 C?"}))
+        await asyncio.sleep(0.05)
+        rag.release.set()
+        return await asyncio.gather(first, late, plain)
+
+    (status, headers, body), (late_status, _, late_body), (plain_status, _, plain_body) = asyncio.run(scenario())
+
+    assert status == late_status == plain_status == 200
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    events = sse_events(body)
+    assert [data["text"] for kind, data in events if kind == "token"] == FakeRAG.TOKENS
+    assert events[-1] == ("result", {"answer": "Svar om § 9 C", "question": "Hvad siger § 9 C?"})
+    # Den sent ankomne får de allerede sendte tokens og derefter resten
+    assert late_body == body
+    assert json.loads(plain_body)["answer"] == "Svar om § 9 C"
+    assert rag.calls == 1
+    assert app.service.streams == {}
+    assert app.service.coalescer.statistics()['coalesced'] == 2
+
+
+def test_answer_stream_replays_finished_stream_and_error():
+    async def scenario():
+        stream = AnswerStream()
+        stream.publish("a")
+        stream.publish("b")
+        stream.finish(result={"answer": "ab"})
+        finished = [event async for event in stream.events()]
+
+        failed = AnswerStream()
+        failed.publish("a")
+        failed.finish(error=RuntimeError("LLM fejl"))
+        failed_events = [event async for event in failed.events()]
+        with pytest.raises(RuntimeError):
+            await failed.wait()
+        return finished, failed_events, await stream.wait()
+
+    finished, failed_events, result = asyncio.run(scenario())
+    assert finished == [("token", "a"), ("token", "b"), ("result", {"answer": "ab"})]
+    assert failed_events[0] == ("token", "a")
+    assert failed_events[1][0] == "error" and str(failed_events[1][1]) == "LLM fejl"
+    assert result == {"answer": "ab"}
+
+
+# --- Routing og validering ---
+
+@pytest.mark.parametrize("method, path, body, status", [
+    ("POST", "/search", {"query": "x", "limit": "abc"}, 400),
+    ("POST", "/search", {"query": "x", "limit": 100}, 400),
+    ("POST", "/ask", {}, 400),
+    ("GET", "/ask", None, 405),
+    ("GET", "/ukendt", None, 404),
+])
+def test_invalid_requests(app, method, path, body, status):
+    assert asyncio.run(call(app, method, path, body))[0] == status
+
+
+def test_get_search_with_query_string_and_health(app):
+    app.service.rag_service.search_engine.release.set()
+
+    async def scenario():
+        search = await call(app, "GET", "/search", query_string="query=%C2%A7+9&limit=2".encode())
+        health = await call(app, "GET", "/health")
+        return search, health
+
+    (status, _, body), (health_status, _, health_body) = asyncio.run(scenario())
+    assert status == 200
+    assert json.loads(body) == {"query": "§ 9", "results": [{"chunk_id": "§ 9-0"}, {"chunk_id": "§ 9-1"}]}
+    assert health_status == 200
+    assert json.loads(health_body)["pool"]["completed"] == 1
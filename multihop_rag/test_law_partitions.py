@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for PartitionRouter - fletning og fejl fra Weaviate (GraphQL errors)
+
+KØRSEL:
+    python -m pytest multihop_rag/test_law_partitions.py -q
+"""
+
+import pytest
+
+from law_partitions import PartitionQueryError, PartitionRouter, merge_partition_results
+
+ERROR = [{"message": "no such prop with name 'heading' found in class 'LegalDocument'"}]
+
+
+class FakeQuery:
+    def __init__(self, responses, tenant=None):
+        self.responses = responses
+        self.tenant = tenant
+
+    def with_tenant(self, tenant):
+        return FakeQuery(self.responses, tenant)
+
+    def do(self):
+        return self.responses[self.tenant]
+
+
+class FakeSchema:
+    def __init__(self, tenants):
+        self.tenants = tenants
+
+    def get(self):
+        return {"classes": [{"class": "LegalDocument", "multiTenancyConfig": {"enabled": bool(self.tenants)}}]}
+
+    def get_class_tenants(self, class_name):
+        return [type("Tenant", (), {"name": name})() for name in self.tenants]
+
+
+class FakeClient:
+    def __init__(self, tenants=()):
+        self.schema = FakeSchema(list(tenants))
+
+
+def hits(*chunk_ids, distance=None):
+    return {"data": {"Get": {"LegalDocument": [
+        {"chunk_id": chunk_id, "_additional": {"distance": distance} if distance is not None else {}}
+        for chunk_id in chunk_ids
+    ]}}}
+
+
+def route(responses, tenants=(), **kwargs):
+    router = PartitionRouter(FakeClient(tenants))
+    try:
+        return router.get(lambda: FakeQuery(responses), **kwargs)
+    finally:
+        router.close()
+
+
+def test_empty_result_is_not_an_error():
+    assert route({None: hits()}) == []
+
+
+def test_error_without_data_raises():
+    with pytest.raises(PartitionQueryError, match="heading"):
+        route({None: {"data": {"Get": {"LegalDocument": None}}, "errors": ERROR}})
+
+
+def test_error_in_every_partition_raises():
+    error = {"data": None, "errors": ERROR}
+    with pytest.raises(PartitionQueryError):
+        route({"Ligningsloven": error, "Kildeskatteloven": error}, tenants=["Ligningsloven", "Kildeskatteloven"])
+
+
+def test_partial_partition_error_keeps_data_and_is_logged(capsys):
+    responses = {"Ligningsloven": hits("a", "b"), "Kildeskatteloven": {"errors": ERROR}}
+    docs = route(responses, tenants=["Ligningsloven", "Kildeskatteloven"])
+
+    assert [doc["chunk_id"] for doc in docs] == ["a", "b"]
+    # Logges også uden verbose
+    assert "Kildeskatteloven" in capsys.readouterr().out
+
+
+def test_law_title_routes_to_one_partition():
+    responses = {"Ligningsloven": hits("a"), "Kildeskatteloven": {"errors": ERROR}}
+    docs = route(responses, tenants=["Ligningsloven", "Kildeskatteloven"], law_title="Ligningsloven")
+    assert [doc["chunk_id"] for doc in docs] == ["a"]
+
+
+def test_merge_by_distance_or_round_robin():
+    by_distance = merge_partition_results([hits("a", "c", distance=0.1)["data"]["Get"]["LegalDocument"],
+                                           hits("b", distance=0.05)["data"]["Get"]["LegalDocument"]])
+    assert [doc["chunk_id"] for doc in by_distance][0] == "b"
+
+    round_robin = merge_partition_results([[{"chunk_id": "a1"}, {"chunk_id": "a2"}], [{"chunk_id": "b1"}]], limit=2)
+    assert [doc["chunk_id"] for doc in round_robin] == ["a1", "b1"]
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Tests for record_pipeline - konvertering, ugyldige linjer, JSON dekodere og batches
+
+KØRSEL:
+    python -m pytest multihop_rag/test_record_pipeline.py -q
+"""
+
+import builtins
+import importlib
+import json
+
+import pytest
+
+import record_pipeline
+from record_pipeline import (
+    MAX_EMBEDDING_TEXT_CHARS, RecordStats, build_embedding_text, iter_batches,
+    iter_numbered_records, iter_raw_records, iter_records, prepare_record
+)
+
+
+def write_lines(path, lines):
+    """Skriv rå linjer (str eller bytes) som en JSONL fil"""
+    with open(path, 'wb') as f:
+        for line in lines:
+            f.write((line if isinstance(line, bytes) else line.encode('utf-8')) + b"\n")
+    return str(path)
+
+
+# --- prepare_record: konvertering ---
+
+def test_prepare_record_coerces_by_schema_type():
+    record = {
+        "chunk_id": "c1",
+        "title": "Ligningsloven",
+        "notes": {"1": "Note tekst"},                       # dict -> JSON string
+        "note_references": [{"id": "n1"}],                  # liste af dicts -> JSON string
+        "keywords": "fradrag",                              # skalar -> liste
+        "entities": ["SKAT", None, 42],                     # None fjernes, tal -> str
+        "rule_type_confidence": "0.8",                      # str -> float
+        "interpretation_flag": 1,                           # -> bool
+        "stk": 2,                                           # tal -> str
+    }
+    prepared = prepare_record(record)
+
+    assert prepared["notes"] == json.dumps({"1": "Note tekst"})
+    assert prepared["note_references"] == json.dumps([{"id": "n1"}])
+    assert prepared["keywords"] == ["fradrag"]
+    assert prepared["entities"] == ["SKAT", "42"]
+    assert prepared["rule_type_confidence"] == 0.8
+    assert prepared["interpretation_flag"] is True
+    assert prepared["stk"] == "2"
+
+
+def test_prepare_record_invalid_number_becomes_zero():
+    assert prepare_record({"rule_type_confidence": "høj"})["rule_type_confidence"] == 0.0
+    assert prepare_record({"rule_type_confidence": [1]})["rule_type_confidence"] == 0.0
+
+
+def test_prepare_record_drops_none_and_unknown_fields():
+    stats = RecordStats()
+    prepared = prepare_record({"chunk_id": "c1", "summary": None, "ukendt": "x", "andet": 1}, stats)
+
+    assert "summary" not in prepared
+    assert "ukendt" not in prepared and "andet" not in prepared
+    assert stats.dropped_fields == {"ukendt": 1, "andet": 1}
+
+
+def test_prepare_record_does_not_modify_input_and_rebuilds_embedding_text():
+    record = {"chunk_id": "c1", "title": "Kildeskatteloven", "text_for_embedding": "gammel"}
+    prepared = prepare_record(record)
+
+    assert record["text_for_embedding"] == "gammel"
+    assert prepared["text_for_embedding"] == "Titel: Kildeskatteloven"
+
+
+def test_build_embedding_text_order_and_truncation():
+    text = "x" * (MAX_EMBEDDING_TEXT_CHARS + 10)
+    result = build_embedding_text({"title": "Ligningsloven", "type": "paragraf", "topic": "§ 33 A",
+                                   "text": text, "summary": "Kort"})
+    parts = result.split(" | ")
+
+    assert parts[0] == "Titel: Ligningsloven"
+    assert parts[1] == "paragraf: § 33 A"
+    assert parts[2] == "x" * MAX_EMBEDDING_TEXT_CHARS + "..."
+    assert parts[3] == "Sammendrag: Kort"
+
+
+def test_build_embedding_text_skips_topic_without_type():
+    assert build_embedding_text({"topic": "§ 1", "text": "Tekst"}) == "Tekst"
+
+
+# --- iter_raw_records / iter_records: ugyldige linjer ---
+
+def test_invalid_lines_are_skipped_and_counted(tmp_path):
+    path = write_lines(tmp_path / "chunks.jsonl", [
+        '{"chunk_id": "a", "title": "Ligningsloven"}',
+        '',
+        '{"chunk_id": "b", "title": ',          # halv linje
+        '[1, 2, 3]',                            # gyldig JSON men ikke et objekt
+        b'{"chunk_id": "\xff"}',                # ugyldig UTF-8
+        '{"title": "uden id"}',
+        '{"chunk_id": "c", "stk": 3}',
+    ])
+    stats = RecordStats()
+    records = list(iter_records(path, stats))
+
+    assert [record["chunk_id"] for record in records] == ["a", "c"]
+    assert records[1]["stk"] == "3"
+    assert stats.read == 6                      # tomme linjer tælles ikke
+    assert stats.invalid_json == 3
+    assert stats.missing_chunk_id == 1
+    assert stats.valid == 2
+    assert "3 ugyldig JSON" in stats.summary() and "1 uden chunk_id" in stats.summary()
+
+
+def test_iter_records_without_chunk_id_requirement(tmp_path):
+    path = write_lines(tmp_path / "chunks.jsonl", ['{"title": "uden id"}'])
+    assert len(list(iter_records(path, require_chunk_id=False))) == 1
+
+
+def test_numbered_records_keep_file_line_numbers(tmp_path):
+    path = write_lines(tmp_path / "chunks.jsonl", [
+        'ikke json',
+        '',
+        '{"chunk_id": "a"}',
+        '{"chunk_id": "b"}',
+    ])
+    assert [(number, record["chunk_id"]) for number, record in iter_numbered_records(path)] == [(3, "a"), (4, "b")]
+    assert [record["chunk_id"] for record in iter_raw_records(path)] == ["a", "b"]
+
+
+def test_raw_records_are_not_coerced(tmp_path):
+    path = write_lines(tmp_path / "chunks.jsonl", ['{"chunk_id": "a", "stk": 2, "ukendt": true}'])
+    assert list(iter_raw_records(path)) == [{"chunk_id": "a", "stk": 2, "ukendt": True}]
+
+
+# --- JSON dekoder fallbacks ---
+
+@pytest.fixture
+def reload_pipeline(monkeypatch):
+    """Genindlæs record_pipeline med udvalgte dekodere 'uinstalleret'"""
+    real_import = builtins.__import__
+
+    def reload(*missing):
+        def fake_import(name, *args, **kwargs):
+            if name.split(".")[0] in missing:
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+        monkeypatch.setattr(builtins, "__import__", fake_import)
+        return importlib.reload(record_pipeline)
+
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(record_pipeline)
+
+
+def _check_decoder(module, tmp_path):
+    path = write_lines(tmp_path / "chunks.jsonl", [
+        '{"chunk_id": "a", "title": "Ligningsloven", "keywords": ["æøå"]}',
+        '{"chunk_id": ',
+        b'{"chunk_id": "\xff"}',
+    ])
+    stats = module.RecordStats()
+    records = list(module.iter_records(path, stats))
+    assert [record["chunk_id"] for record in records] == ["a"]
+    assert records[0]["keywords"] == ["æøå"]
+    assert stats.invalid_json == 2
+
+
+def test_standard_library_json_fallback(reload_pipeline, tmp_path):
+    module = reload_pipeline("orjson", "msgspec")
+    assert module.JSON_DECODER == "json"
+    _check_decoder(module, tmp_path)
+
+
+def test_msgspec_fallback(reload_pipeline, tmp_path):
+    pytest.importorskip("msgspec")
+    module = reload_pipeline("orjson")
+    assert module.JSON_DECODER == "msgspec"
+    _check_decoder(module, tmp_path)
+
+
+def test_orjson_decoder(reload_pipeline, tmp_path):
+    pytest.importorskip("orjson")
+    module = reload_pipeline()
+    assert module.JSON_DECODER == "orjson"
+    _check_decoder(module, tmp_path)
+
+
+# --- iter_batches ---
+
+@pytest.mark.parametrize("count, batch_size, sizes", [
+    (0, 3, []),
+    (1, 3, [1]),
+    (3, 3, [3]),
+    (7, 3, [3, 3, 1]),
+    (6, 3, [3, 3]),
+    (2, 1, [1, 1]),
+])
+def test_batch_boundaries(count, batch_size, sizes):
+    batches = list(iter_batches(iter(range(count)), batch_size))
+    assert [len(batch) for batch in batches] == sizes
+    assert [item for batch in batches for item in batch] == list(range(count))
+
+
+def test_batches_are_streamed():
+    consumed = []
+
+    def records():
+        for i in range(5):
+            consumed.append(i)
+            yield i
+
+    batches = iter_batches(records(), 2)
+    assert next(batches) == [0, 1]
+    assert consumed == [0, 1]
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for where filtre mod et LegalDocument schema oprettet af legal_schema
+
+Mock Weaviate afviser (som serveren) filtre på felter uden indexFilterable -
+filtrene SearchEngine bygger skal derfor virke mod det rigtige schema. Alle
+"path" felter i søgekoden skal desuden stå i FILTERABLE_PROPERTIES.
+
+KØRSEL:
+    python -m pytest multihop_rag/test_schema_filters.py -q
+"""
+
+import ast
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from benchmarks.mock_weaviate import InMemoryWeaviate, StubEmbedder, StubOpenAI
+from benchmarks.perf_benchmark import quiet
+from law_partitions import PartitionQueryError, PartitionRouter
+from legal_schema import CLASS_NAME, FILTERABLE_PROPERTIES, SchemaSettings, ensure_schema
+
+MULTIHOP_DIR = Path(__file__).parent
+# Moduler der bygger where filtre mod LegalDocument
+FILTER_MODULES = [
+    MULTIHOP_DIR / "search_engine.py",
+    MULTIHOP_DIR.parent / "simple_search.py",
+    MULTIHOP_DIR / "embedder import" / "import_incremental_1024.py",
+]
+
+CHUNKS = [
+    {"chunk_id": "ll-9c-3", "title": "Ligningsloven", "type": "paragraf", "paragraph": "§ 9 C",
+     "stk": "3", "heading": "§ 9 C, stk. 3", "topic": "§ 9 c, stk. 3", "text": "Befordringsfradrag"},
+    {"chunk_id": "ll-16-1", "title": "Ligningsloven", "type": "paragraf", "paragraph": "§ 16",
+     "stk": "1", "heading": "§ 16, stk. 1", "topic": "§ 16, stk. 1", "text": "Fri bil"},
+    {"chunk_id": "ll-16a-1", "title": "Ligningsloven", "type": "paragraf", "paragraph": "§ 16 A",
+     "stk": "1", "heading": "§ 16 A, stk. 1", "topic": "§ 16 a, stk. 1", "text": "Udbytte"},
+    {"chunk_id": "abl-16-1", "title": "Aktieavancebeskatningsloven", "type": "paragraf", "paragraph": "§ 16",
+     "stk": "1", "heading": "§ 16, stk. 1", "topic": "§ 16, stk. 1", "text": "Investeringsselskaber"},
+]
+
+
+def where_paths(path: Path):
+    """(linje, felt) for alle {"path": [...]} dict literals i et modul - felt er None hvis det ikke er en konstant"""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Dict):
+            continue
+        for key, value in zip(node.keys, node.values):
+            if isinstance(key, ast.Constant) and key.value == "path":
+                last = value.elts[-1] if isinstance(value, ast.List) and value.elts else None
+                yield node.lineno, last.value if isinstance(last, ast.Constant) else None
+
+
+@pytest.fixture(scope="module")
+def db():
+    embedder = StubEmbedder(64)
+    db = InMemoryWeaviate(embedder=embedder)
+    with quiet():
+        ensure_schema(db, SchemaSettings())
+    with db.batch as batch:
+        for chunk in CHUNKS:
+            batch.add_data_object(chunk, CLASS_NAME)
+    return db
+
+
+@pytest.fixture(scope="module")
+def engine(db):
+    import search_engine
+
+    with mock.patch("weaviate.Client", lambda *a, **kw: db), \
+            mock.patch.object(search_engine, "OpenAI", lambda *a, **kw: StubOpenAI(db.embedder)):
+        yield search_engine.SearchEngine(verbose=False)
+
+
+@pytest.mark.parametrize("module", FILTER_MODULES, ids=lambda path: path.name)
+def test_filter_paths_are_filterable(module):
+    paths = list(where_paths(module))
+    assert paths, f"Ingen where filtre fundet i {module.name}"
+    # Et ikke-filterable felt giver GraphQL errors på serveren - opslaget returnerer intet
+    unfilterable = [(line, name) for line, name in paths if name not in FILTERABLE_PROPERTIES]
+    assert not unfilterable, f"{module.name}: felter mangler i FILTERABLE_PROPERTIES: {unfilterable}"
+
+
+def get(db, where):
+    return db.query.get(CLASS_NAME, ["chunk_id"]).with_where(where).do()
+
+
+@pytest.mark.parametrize("query, chunk_ids", [
+    ("§ 9 C stk. 3 i ligningsloven", ["ll-9c-3"]),
+    ("ligningsloven § 9 C, stk. 3", ["ll-9c-3"]),
+    ("ligningslovens § 16", ["ll-16-1"]),
+    ("§ 16 stk. 1", ["ll-16-1", "abl-16-1"]),
+    ("hvad siger kildeskatteloven om udbytte", []),
+    ("fradrag i ligningsloven", ["ll-9c-3", "ll-16-1", "ll-16a-1"]),
+])
+def test_juridisk_where_filter_is_accepted_by_schema(engine, db, query, chunk_ids):
+    where = engine._build_juridisk_where_filter(query)
+    assert where is not None
+
+    result = get(db, where)
+    assert "errors" not in result
+    assert sorted(doc["chunk_id"] for doc in result["data"]["Get"][CLASS_NAME]) == sorted(chunk_ids)
+
+
+def test_filter_on_non_filterable_property_is_rejected(db):
+    # heading har indexFilterable=False i legal_schema
+    result = get(db, {"path": ["heading"], "operator": "Equal", "valueText": "§ 9 C, stk. 3"})
+    assert result["data"]["Get"][CLASS_NAME] is None
+    assert "indexFilterable" in result["errors"][0]["message"]
+
+    result = get(db, {"path": ["ukendt"], "operator": "Equal", "valueText": "x"})
+    assert "no such prop" in result["errors"][0]["message"]
+
+    count = db.query.aggregate(CLASS_NAME).with_meta_count().with_where(
+        {"path": ["heading"], "operator": "Like", "valueText": "§ 9*"}).do()
+    assert count["errors"]
+
+    with pytest.raises(ValueError):
+        db.batch.delete_objects(CLASS_NAME, {"path": ["heading"], "operator": "Equal", "valueText": "§ 16"})
+
+
+def test_rejected_filter_raises_through_router(db):
+    router = PartitionRouter(db)
+    try:
+        with pytest.raises(PartitionQueryError, match="heading"):
+            router.get(lambda: db.query.get(CLASS_NAME, ["chunk_id"]).with_where(
+                {"path": ["heading"], "operator": "Equal", "valueText": "§ 16, stk. 1"}))
+    finally:
+        router.close()
+
+
+def test_precise_search_falls_back_when_filter_is_rejected(engine):
+    rejected = {"path": ["heading"], "operator": "Equal", "valueText": "§ 9 C, stk. 3"}
+    with mock.patch.object(engine, "_build_juridisk_where_filter", lambda query: rejected):
+        results = engine.search("§ 9 C stk. 3 i ligningsloven", limit=3, search_type="paragraph")
+
+    assert results
+    assert all(result["search_method"] != "paragraph_where" for result in results)
@@ -9,6 +9,13 @@ import os
 from dotenv import load_dotenv
 import re
 import sys
+from pathlib import Path
+
+# Fælles moduler (lov-partitionering) ligger i multihop_rag
+sys.path.append(str(Path(__file__).parent / "multihop_rag"))
+
+from law_partitions import PartitionRouter
+from record_pipeline import ALL_FIELDS as SCHEMA_FIELDS
 
 # Indlæs miljøvariabler
 load_dotenv()
@@ -20,26 +27,11 @@ client = weaviate.Client(
     additional_headers={"X-OpenAI-Api-Key": openai_api_key}
 )
 
-# Kun felter der faktisk eksisterer i databasen - OPDATERET TIL NY SCHEMA
-ALL_FIELDS = [
-    # Grundlæggende felter
-    "chunk_id", "title", "text", "text_for_embedding", "type", "topic", 
-    "document_name", "law_number", "status", "date",
-    
-    # LLM genererede felter
-    "summary", "keywords", "entities", "rule_type", "rule_type_confidence", 
-    "rule_type_explanation", "interpretation_flag", "llm_model_used",
-    
-    # Strukturelle felter
-    "section", "paragraph", "stk", "nr", "heading",
-    
-    # Relations felter
-    "note_reference_ids", "related_note_chunks", "related_paragraph_chunk_id",
-    "related_paragraph_ref", "related_paragraph_text", "related_paragraphs",
-    
-    # Metadata felter
-    "note_references", "notes", "note_number", "dom_references"
-]
+# Router lov-specifikke søgninger til lovens partition (hvis LegalDocument er partitioneret)
+router = PartitionRouter(client)
+
+# Kun felter der faktisk eksisterer i databasen - samme felt-tabel som import scripts (legal_schema)
+ALL_FIELDS = list(SCHEMA_FIELDS)
 
 # LOV-SPECIFIKKE FILTRE - OPTIMERET FOR PRÆCIS SØGNING
 LAW_FILTERS = {
@@ -106,13 +98,11 @@ def chunk_search(chunk_id):
     try:
         print(f"🔍 Søger efter chunk ID: {chunk_id}")
         
-        results = client.query.get("LegalDocument", ALL_FIELDS).with_where({
+        documents = router.get(lambda: client.query.get("LegalDocument", ALL_FIELDS).with_where({
             "path": ["chunk_id"],
             "operator": "Equal",
             "valueText": chunk_id.strip()
-        }).do()
-        
-        documents = results.get('data', {}).get('Get', {}).get('LegalDocument', [])
+        }))
         
         if documents:
             doc = documents[0]
@@ -127,13 +117,11 @@ def chunk_search(chunk_id):
                 
                 for note_id in related_notes:
                     if note_id:  # Tjek at note_id ikke er None
-                        note_results = client.query.get("LegalDocument", ALL_FIELDS).with_where({
+                        note_docs = router.get(lambda: client.query.get("LegalDocument", ALL_FIELDS).with_where({
                             "path": ["chunk_id"],
                             "operator": "Equal",
                             "valueText": note_id
-                        }).do()
-                        
-                        note_docs = note_results.get('data', {}).get('Get', {}).get('LegalDocument', [])
+                        }), law_title=doc.get('title'))
                         all_results.extend([doc for doc in note_docs if doc])  # Kun tilføj ikke-None docs
             
             # Hvis det er en note, hent relateret paragraf
@@ -142,13 +130,11 @@ def chunk_search(chunk_id):
                 if para_id:
                     print(f"📖 Henter relateret paragraf...")
                     
-                    para_results = client.query.get("LegalDocument", ALL_FIELDS).with_where({
+                    para_docs = router.get(lambda: client.query.get("LegalDocument", ALL_FIELDS).with_where({
                         "path": ["chunk_id"],
                         "operator": "Equal",
                         "valueText": para_id
-                    }).do()
-                    
-                    para_docs = para_results.get('data', {}).get('Get', {}).get('LegalDocument', [])
+                    }), law_title=doc.get('title'))
                     all_results.extend([doc for doc in para_docs if doc])  # Kun tilføj ikke-None docs
             
             return all_results
@@ -214,8 +200,12 @@ def paragraph_search(query, limit=5):
             for strategy in sorted(search_strategies, key=lambda x: x['priority']):
                 print(f"🔍 Søger: {strategy['description']}")
                 
-                results = client.query.get("LegalDocument", ALL_FIELDS).with_where(strategy['where']).with_limit(strategy['limit']).do()
-                documents = results.get('data', {}).get('Get', {}).get('LegalDocument', [])
+                # Med lov-filter rammes kun lovens partition - ellers fan-out til alle love
+                documents = router.get(
+                    lambda: client.query.get("LegalDocument", ALL_FIELDS).with_where(strategy['where']).with_limit(strategy['limit']),
+                    law_title=law_filter,
+                    limit=strategy['limit']
+                )
                 
                 if documents:
                     found_results = True
@@ -230,13 +220,11 @@ def paragraph_search(query, limit=5):
                             if related_notes:
                                 for note_id in related_notes[:1]:  # Maksimalt 1 note per paragraf
                                     if note_id:
-                                        note_results = client.query.get("LegalDocument", ALL_FIELDS).with_where({
+                                        note_docs = router.get(lambda: client.query.get("LegalDocument", ALL_FIELDS).with_where({
                                             "path": ["chunk_id"],
                                             "operator": "Equal",
                                             "valueText": note_id
-                                        }).do()
-                                        
-                                        note_docs = note_results.get('data', {}).get('Get', {}).get('LegalDocument', [])
+                                        }), law_title=doc.get('title'))
                                         for note_doc in note_docs:
                                             if note_doc and not any(existing and existing.get('chunk_id') == note_doc.get('chunk_id') for existing in all_results):
                                                 all_results.append(note_doc)
@@ -337,11 +325,9 @@ def build_paragraph_where_clause(paragraph_ref):
 def semantic_search(query, limit=5):
     """Semantisk søgning med Weaviate"""
     try:
-        results = client.query.get("LegalDocument", ALL_FIELDS).with_near_text({
+        return router.get(lambda: client.query.get("LegalDocument", ALL_FIELDS).with_near_text({
             "concepts": [query]
-        }).with_limit(limit).do()
-        
-        return results.get('data', {}).get('Get', {}).get('LegalDocument', [])
+        }).with_limit(limit).with_additional(["distance"]), law_title=detect_law_filter(query), limit=limit)
     except Exception as e:
         print(f"❌ Fejl ved semantisk søgning: {e}")
         return []
@@ -349,13 +335,11 @@ def semantic_search(query, limit=5):
 def keyword_search(query, limit=5):
     """Nøgleordssøgning - bruger Like operator"""
     try:
-        results = client.query.get("LegalDocument", ALL_FIELDS).with_where({
+        return router.get(lambda: client.query.get("LegalDocument", ALL_FIELDS).with_where({
             "path": ["text"],
             "operator": "Like",  # Bruger Like i stedet for Contains
             "valueText": f"*{query}*"
-        }).with_limit(limit).do()
-        
-        return results.get('data', {}).get('Get', {}).get('LegalDocument', [])
+        }).with_limit(limit), law_title=detect_law_filter(query), limit=limit)
     except Exception as e:
         print(f"❌ Fejl ved nøgleord søgning: {e}")
         return []
@@ -581,8 +565,10 @@ def fallback_manual_search(query, limit=5):
     try:
         # Hent dokumenter i batches
         for offset in range(0, 4000, batch_size):  # Maksimalt 4000 dokumenter
-            results = client.query.get("LegalDocument", ALL_FIELDS).with_limit(batch_size).with_offset(offset).do()
-            batch_docs = results.get('data', {}).get('Get', {}).get('LegalDocument', [])
+            batch_docs = router.get(
+                lambda: client.query.get("LegalDocument", ALL_FIELDS).with_limit(batch_size).with_offset(offset),
+                law_title=law_filter
+            )
             
             if not batch_docs:  # Ingen flere dokumenter
                 break
@@ -622,13 +608,11 @@ def fallback_manual_search(query, limit=5):
                     if related_notes:
                         for note_id in related_notes[:1]:  # Maksimalt 1 note
                             if note_id:
-                                note_results = client.query.get("LegalDocument", ALL_FIELDS).with_where({
+                                note_docs = router.get(lambda: client.query.get("LegalDocument", ALL_FIELDS).with_where({
                                     "path": ["chunk_id"],
                                     "operator": "Equal",
                                     "valueText": note_id
-                                }).do()
-                                
-                                note_docs = note_results.get('data', {}).get('Get', {}).get('LegalDocument', [])
+                                }), law_title=doc.get('title'))
                                 for note_doc in note_docs:
                                     if note_doc and not any(existing and existing.get('chunk_id') == note_doc.get('chunk_id') for existing in all_results):
                                         all_results.append(note_doc)